@@ -203,6 +203,8 @@ class DataCollectionService:
             import re
             # Regex patterns for different log messages
             filing_pattern = re.compile(r'Processing filing (\d+)/(\d+): (.+)')
+            trace_pattern = re.compile(r'TRACE_SUMMARY (\{.*\})')
+            trace_summary = None  # Stage timing of the run (see scripts/tracing.py)
             
             # Calculate progress increments
             # 15% -> 80% = 65% total range for data collection
@@ -222,6 +224,14 @@ class DataCollectionService:
                 line_count += 1
                 current_time = asyncio.get_event_loop().time()
                 
+                trace_match = trace_pattern.search(line_text)
+                if trace_match:
+                    try:
+                        trace_summary = json.loads(trace_match.group(1))
+                    except ValueError:
+                        logger.warning(f"[{ticker}] Could not parse the trace summary")
+                    continue
+                
                 # Enhanced: Log ALL lines that contain key pipeline information
                 if any(keyword in line_text for keyword in [
                     'Processing filing', 'Processing Income Statement', 'Processing Balance Sheet', 'Processing Cash Flow',
@@ -350,7 +360,7 @@ class DataCollectionService:
                     except Exception as e:
                         logger.warning(f"Could not clean up CSV files for {ticker}: {e}")
             
-            yield f"data: {json.dumps({'status': 'complete', 'message': 'Data collection complete!', 'progress': 100, 'data': financial_data})}\n\n"
+            yield f"data: {json.dumps({'status': 'complete', 'message': 'Data collection complete!', 'progress': 100, 'data': financial_data, 'timing': trace_summary})}\n\n"
             
         except Exception as e:
             error_msg = f"Unexpected error during collection: {str(e)}"
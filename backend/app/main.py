@@ -6,6 +6,7 @@ from . import financials_cached
 from . import ai_models
 from . import stock_price
 from . import insider_endpoints
+from . import ticker_endpoints
 from starlette.middleware.cors import CORSMiddleware
 
 
@@ -32,6 +33,7 @@ app.add_middleware(
 
 # Include the API routes
 # NOTE: Order matters! More specific routes must come first
+app.include_router(ticker_endpoints.router)  # Ticker autocomplete (before /api/tickers)
 app.include_router(financials_cached.router)  # New cached financials with progress tracking (more specific)
 app.include_router(data.router)  # Legacy data endpoints (less specific)
 app.include_router(ai_endpoints.router)
@@ -0,0 +1,54 @@
+"""
+Ticker Search API Endpoints
+
+Thin backend layer over data-collection/scripts/ticker_index.py, the shared
+ticker/CIK/name index (persisted locally, refreshed daily).
+
+Endpoints:
+  GET /api/tickers/search?q=     — ticker / company-name autocomplete
+"""
+
+import sys
+import asyncio
+import logging
+from pathlib import Path
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+# ── Import data-collection module (adds scripts/ to sys.path) ────
+_DC_PATH = Path(__file__).parent.parent.parent / "data-collection" / "scripts"
+if str(_DC_PATH) not in sys.path:
+    sys.path.insert(0, str(_DC_PATH))
+
+try:
+    from ticker_index import get_ticker_index
+    _DC_AVAILABLE = True
+except ImportError as _err:
+    logger.error("Could not import ticker_index from data-collection: %s", _err)
+    _DC_AVAILABLE = False
+
+
+@router.get("/api/tickers/search")
+async def search_tickers(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(default=10, ge=1, le=50),
+):
+    """Autocomplete tickers by symbol or company-name prefix."""
+    if not _DC_AVAILABLE:
+        raise HTTPException(
+            status_code=503,
+            detail="Data collection module unavailable. Check server logs.",
+        )
+
+    try:
+        # First call (or the daily refresh) may download from SEC
+        results = await asyncio.to_thread(get_ticker_index().search, q, limit)
+    except Exception as exc:
+        logger.error("Ticker search error for '%s': %s", q, exc)
+        raise HTTPException(status_code=502, detail=f"Ticker index error: {exc}")
+
+    return JSONResponse({"query": q, "results": results})
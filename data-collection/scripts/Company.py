@@ -2,8 +2,12 @@ from headers import *
 from constants import *
 from healpers import *
 from Filling import *
-import requests
+from edgar_client import get_edgar_client
+from ticker_index import get_ticker_index
+from companyfacts_store import get_company_facts_table
+from tracing import span
 import pandas as pd
+import requests
 
 
 ## Fucntions not copied 
@@ -18,33 +22,28 @@ class Company():
         if not ticker and not cik:
             raise ValueError(f"Must include the ticker or the CIK")
         self.ticker = ticker
-        if not cik:
-            self.cik = self.cik_matching_ticker()
-        else:
-            self.cik = cik
+        with span("company.init", "company", ticker=ticker) as s:
+            if not cik:
+                self.cik = self.cik_matching_ticker()
+            else:
+                self.cik = cik
 
-        self.company_filings = None
-        self.company_all_filings = None
-        self.ten_k_fillings = None
-        self.ten_q_fillings = None
-        self.company_facts = None
+            self.company_filings = None
+            self.company_all_filings = None
+            self.ten_k_fillings = None
+            self.ten_q_fillings = None
+            self._company_facts = None
+            self.facts_table = None
 
-        self.get_submission_data_for_ticker()
-        self.get_filtered_filings()
-        self.get_company_facts()
+            self.get_submission_data_for_ticker()
+            self.get_filtered_filings()
+            self.get_company_facts()
+            s.set(cik=self.cik, ten_k=len(self.ten_k_fillings), ten_q=len(self.ten_q_fillings))
 
     def cik_matching_ticker(self):
-        # return ticker
-        ticker = self.ticker.upper().replace(".", "-")
-        ticker_json = requests.get(
-            "https://www.sec.gov/files/company_tickers.json", headers=headers
-        ).json()
-
-        for company in ticker_json.values():
-            if company["ticker"] == ticker:
-                cik = str(company["cik_str"]).zfill(10)
-                return cik
-        raise ValueError(f"Ticker {ticker} not found in SEC database")
+        # Shared, locally persisted index (refreshed daily) instead of
+        # downloading company_tickers.json for every Company
+        return get_ticker_index().lookup_cik(self.ticker)
 
     def get_submission_data_for_ticker(self):
         """
@@ -55,11 +54,11 @@ class Company():
         cik = self.cik
         url = f"https://data.sec.gov/submissions/CIK{cik}.json"
         print(url)
-        company_json = requests.get(url, headers=headers).json()
+        company_json = get_edgar_client().get(url).json()
         for old_file in company_json['filings']['files']:
             old_submission_url = "https://data.sec.gov/submissions/" + old_file['name']
             print(old_submission_url)
-            old_sub = requests.get(old_submission_url, headers=headers).json()
+            old_sub = get_edgar_client().get(old_submission_url).json()
             for column in old_sub:
                 company_json['filings']['recent'][column] += old_sub[column]
        
@@ -87,13 +86,25 @@ class Company():
 
     def get_company_facts(self):
         """
-        Retrieves company facts for a given ticker.
-        Returns:
-            dict: Company facts in JSON format.
+        Loads the company facts table for the company.
+        The companyfacts JSON is streamed into a compact columnar store per CIK
+        (memory-mapped on later runs) instead of being held as a dict.
         """
-        # Construct URL for company facts
-        url = f"https://data.sec.gov/api/xbrl/companyfacts/CIK{self.cik}.json"
-        print("facts url :")
-        print(url)
-        # Fetch and return company facts
-        self.company_facts = requests.get(url, headers=headers).json()
+        try:
+            self.facts_table = get_company_facts_table(self.cik)
+        except (KeyError, ValueError, OSError, requests.RequestException) as e:
+            print(f"Could not build company facts table: {e}")
+            self.facts_table = None
+
+    @property
+    def company_facts(self):
+        """
+        Raw companyfacts JSON (dict), fetched on first access only.
+        Prefer facts_table; this is kept for callers that need the full dict.
+        """
+        if self._company_facts is None:
+            url = f"https://data.sec.gov/api/xbrl/companyfacts/CIK{self.cik}.json"
+            print("facts url :")
+            print(url)
+            self._company_facts = get_edgar_client().get(url).json()
+        return self._company_facts
@@ -3,9 +3,14 @@ from constants import *
 from healpers import *
 from FinancialStatement import *
 from dates import *
-from cal_xml import fetch_file_content, parse_calculation_arcs
+from calc_graph import load_calculation_graph
 from pattern_logger import get_pattern_logger
+from parse_artifacts import get_parse_artifacts
 from unit_detector import UnitDetector, UnitInfo, UnitType
+from edgar_client import get_edgar_client
+from tracing import span, trace_context, SpanTimer
+from company_facts import CompanyFactsTable
+from statement_parser import ParsedStatement, as_parsed_statement, parse_statement_content
 
 import requests
 from bs4 import BeautifulSoup
@@ -43,9 +48,15 @@ def parse_table_header(table):
     return currency_scale, shares_scale
 
 
+def parse_table_header_texts(header_texts):
+    """parse_table_header() for a statement_parser.StatementTable's header texts."""
+    currency_scale, shares_scale, has_explicit_units = UnitDetector.parse_header_texts(header_texts)
+    return currency_scale, shares_scale
+
+
 class Filling():
 
-    def __init__(self, ticker, cik, acc_num_unfiltered, company_facts, quarterly=False) -> None:
+    def __init__(self, ticker, cik, acc_num_unfiltered, company_facts, quarterly=False, facts_table=None) -> None:
         self.ticker = ticker
         acc_num_filtered = acc_num_unfiltered.replace("-", "")
         self.accession_number_unfiltered = acc_num_unfiltered
@@ -59,51 +70,30 @@ class Filling():
         self.balance_sheet = None
         self.cash_flow = None
 
-        self.xml_equations = None
+        self._xml_equations = None  # loaded on first use, see xml_equations
         self.statements_file_name_dict = None
+        self.facts_table = facts_table  # CompanyFactsTable shared by all filings of the company
         self.company_facts_DF = None
         self.taxonomy = None
         self.facts_taxonomy_to_financial_terms = {} # before named labels_dict
         self.unit_multiplier_set = []
+        self.prefetched_documents = {}  # statement_name -> ParsedStatement, filled by prefetch_statement_documents()
 
         self.get_statement_file_names_in_filing_summary()
-        self.get_cal_xml_equations()
         self.get_company_facts_DF()
 
     def get_company_facts_DF(self):
         """
         Converts company facts into a DataFrame.
         IMPORTANT: Preserves unit information for each fact.
-        Returns: tuple: DataFrame of facts and a dictionary of labels.
+        The indexed table is normally built once per Company and passed in
+        (facts_table); it is only built here when the Filling is used alone.
         """
-        # Retrieve facts data
-        taxonomy = GAAP
-        try:
-            us_gaap_data = self.company_facts["facts"][GAAP]
-        except Exception as e:
-            try:
-                us_gaap_data = self.company_facts["facts"][IFRS]
-                taxonomy = IFRS
-            except Exception as e:
-                pass
-        df_data = []
-        # Process each fact and its details
-        for fact, details in us_gaap_data.items():
-            for unit in details["units"]:
-                for item in details["units"][unit]:
-                    row = item.copy()
-                    row["fact"] = fact
-                    row["unit"] = unit  # PRESERVE UNIT INFORMATION
-                    df_data.append(row)
-
-        df = pd.DataFrame(df_data)
-        # Convert 'end' and 'start' to datetime
-        df["end"] = pd.to_datetime(df["end"])
-        df["start"] = pd.to_datetime(df["start"])
-        # Drop duplicates and set index
-        self.company_facts_DF = df.drop_duplicates(subset=["fact", "end", "val"])
-        self.facts_taxonomy_to_financial_terms = {fact: details["label"] for fact, details in us_gaap_data.items()}
-        self.taxonomy = taxonomy
+        if self.facts_table is None:
+            self.facts_table = CompanyFactsTable.from_company_facts(self.company_facts)
+        self.company_facts_DF = self.facts_table.df
+        self.facts_taxonomy_to_financial_terms = self.facts_table.labels
+        self.taxonomy = self.facts_table.taxonomy
 
     def _get_file_name(self, report):
         """
@@ -140,12 +130,11 @@ class Filling():
             dict: Dictionary mapping statement types to their file names.
         """
         try:
-            # Set up request session and get filing summary
-            session = requests.Session()
+            # Get filing summary through the shared EDGAR client
             base_link = f"https://www.sec.gov/Archives/edgar/data/{self.cik}/{self.accession_number}"
             filing_summary_link = f"{base_link}/FilingSummary.xml"
-            filing_summary_response = session.get(
-                filing_summary_link, headers=headers
+            filing_summary_response = get_edgar_client().get(
+                filing_summary_link
             ).content.decode("utf-8")
 
             # Parse the filing summary
@@ -162,55 +151,44 @@ class Filling():
             raise ValueError(f"Error fetching the Filing Summary: {e}")
             print(f"An error occurred: {e}")
             
+    @property
+    def xml_equations(self):
+        """
+        Calculation relationships from the filing's _cal.xml, loaded on first
+        use (see calc_graph) so filings whose statements are never mapped
+        skip the download and parse.
+
+        Raises:
+            ValueError: If the filing has no cal.xml or there is an error fetching it.
+        """
+        if self._xml_equations is None:
+            self.get_cal_xml_equations()
+        return self._xml_equations
+
     def get_cal_xml_equations(self):
         """
-        Retrieves the BeautifulSoup object for a specific financial statement.
-        Returns:
-            BeautifulSoup: Parsed HTML/XML content of the financial statement.
+        Loads the calculation graph of the filing: from the per-accession
+        store, or discovered via the filing's index.json, parsed and stored.
 
         Raises:
-            ValueError: If the statement file name is not found or if there is an error fetching the statement.
+            ValueError: If the filing has no cal.xml or there is an error fetching it.
         """
-        session = requests.Session()
-        base_link = f"https://www.sec.gov/Archives/edgar/data/{self.cik}/{self.accession_number}"
-        print(base_link)
-        # Get statement file names
-        statement_link = None
-        # Fetch the statement
-        try:
-            statement_response = session.get(base_link, headers=headers)
-            statement_response.raise_for_status()  # Check for a successful request
-            # Parse the HTML content
-            soup = BeautifulSoup(statement_response.content, 'html.parser')
-            # Find all links in the page
-            links = soup.find_all('a')
-            # Iterate over links and find the one that ends with '_cal.xml'
-            for link in links:
-                href = link.get('href')
-                if href and href.endswith('_cal.xml'):
-                    statement_link = base_link + '/' + href.split('/')[-1]
-                    break
-            if not statement_link:
-                raise ValueError(f"Could not find cal.xml")
-            print(statement_link)
-            cal_content = fetch_file_content(statement_link)
-            self.xml_equations = parse_calculation_arcs(cal_content)
-        except requests.RequestException as e:
-            raise ValueError(f"Error fetching the statement: {e}")
-        
-    
-    def get_statement_file_soup(self, statement_name):
+        self._xml_equations = load_calculation_graph(self.cik, self.accession_number)
+        return self._xml_equations
+
+    def _get_statement_link(self, statement_name):
         """
-        Retrieves the BeautifulSoup object for a specific financial statement.
+        Resolves the R file URL of a specific financial statement.
 
         Args:
             ticker (str): Stock ticker symbol.
             accession_number (str): SEC filing accession number.
             statement_name (str): has to be 'balance_sheet', 'income_statement', 'cash_flow_statement'
         Returns:
-            BeautifulSoup: Parsed HTML/XML content of the financial statement.
+            str: URL of the statement R file.
+        Raises:
+            ValueError: If the statement file name is not found.
         """
-        session = requests.Session()
         base_link = f"https://www.sec.gov/Archives/edgar/data/{self.cik}/{self.accession_number}"
         print(base_link)
         # Get statement file names
@@ -252,9 +230,21 @@ class Filling():
 
             if not statement_link:
                 raise ValueError(f"Could not find statement file name for {statement_name}")
+        return statement_link
+
+    def get_statement_file_soup(self, statement_name):
+        """
+        Retrieves the BeautifulSoup object for a specific financial statement.
+
+        Args:
+            statement_name (str): has to be 'balance_sheet', 'income_statement', 'cash_flow_statement'
+        Returns:
+            BeautifulSoup: Parsed HTML/XML content of the financial statement.
+        """
+        statement_link = self._get_statement_link(statement_name)
         # Fetch the statement
         try:
-            statement_response = session.get(statement_link, headers=headers)
+            statement_response = get_edgar_client().get(statement_link)
             statement_response.raise_for_status()  # Check for a successful request
             # Parse and return the content
             if statement_link.endswith(".xml"):
@@ -265,7 +255,46 @@ class Filling():
                 return BeautifulSoup(statement_response.content, "lxml")
         except requests.RequestException as e:
             raise ValueError(f"Error fetching the statement: {e}")
-        
+
+    def get_statement_document(self, statement_name):
+        """
+        Retrieves a specific financial statement parsed by statement_parser
+        (lxml backend by default, see STATEMENT_PARSER).
+
+        Args:
+            statement_name (str): has to be 'balance_sheet', 'income_statement', 'cash_flow_statement'
+        Returns:
+            ParsedStatement: Header, row and cell data of the statement tables.
+        """
+        statement_link = self._get_statement_link(statement_name)
+        try:
+            statement_response = get_edgar_client().get(statement_link)
+            statement_response.raise_for_status()  # Check for a successful request
+        except requests.RequestException as e:
+            raise ValueError(f"Error fetching the statement: {e}")
+        with span("statement.parse_document", "parse", statement=statement_name,
+                  bytes=len(statement_response.content)):
+            return parse_statement_content(statement_response.content, is_xml=statement_link.endswith(".xml"))
+
+    def prefetch_statement_documents(self, statement_names):
+        """
+        Download and parse the R files for the given statements ahead of
+        process_one_statement() (used by the filing prefetcher). Failures are
+        left for process_one_statement() to report.
+        """
+        with trace_context(accession=self.accession_number_unfiltered), \
+                span("filing.prefetch", "filing", statements=len(statement_names)):
+            for statement_name in statement_names:
+                try:
+                    self.prefetched_documents[statement_name] = self.get_statement_document(statement_name)
+                except Exception as e:
+                    logger.debug(f"Prefetch of {statement_name} failed for {self.accession_number}: {e}")
+            if self.prefetched_documents:
+                # At least one statement will be mapped, so it needs the calculation graph
+                try:
+                    self.get_cal_xml_equations()
+                except Exception as e:
+                    logger.debug(f"Prefetch of cal.xml failed for {self.accession_number}: {e}")
 
     def get_unit_multiplier(self, row_title, end_date, value_from_table):
         unit_multiplier = 1
@@ -277,17 +306,7 @@ class Filling():
                 end_date = str(end_date)
                 end_date = end_date.split(" ")[0]
                 # print(end_date)
-                criteria = f'fact=="{fact}" and accn=="{self.accession_number_unfiltered}" and end=="{end_date}"'
-                # print(criteria)
-                try:
-                    filtered_data = self.company_facts_DF[(self.company_facts_DF['fact'] == fact) & (self.company_facts_DF['end'] == end_date) ]
-                except Exception as e:
-                    pass
-                filtered_value = 0
-                try:
-                    filtered_value = filtered_data.iloc[0]['val']
-                except Exception as e:
-                    pass
+                filtered_value = self.facts_table.first_value(fact, end_date) or 0
 
                 if filtered_value != 0:
                     fact_unit = check_units(abs(filtered_value), value_from_table)
@@ -302,10 +321,12 @@ class Filling():
         """
         Extracts columns, values, dates, and unit information from an HTML soup object representing a financial statement.
         Args:
-            soup (BeautifulSoup): The BeautifulSoup object of the HTML document.
+            soup (BeautifulSoup | ParsedStatement): The HTML document, or the statement
+                already parsed by statement_parser (lxml or bs4 backend).
         Returns:
             tuple: Tuple containing columns, values_set, dates, rows_that_are_sum, text_set, sections_dict, units_dict
         """
+        document = as_parsed_statement(soup)
 
 
         columns = []
@@ -314,9 +335,9 @@ class Filling():
         units_dict = {}  # Store UnitInfo for each row/fact
         text_set = {}
         if statement_name == "income_statement":
-            dates, date_indexes = get_datetime_index_dates_from_statement(soup, quarterly=self.quarterly)
+            dates, date_indexes = get_datetime_index_dates_from_statement(document, quarterly=self.quarterly)
         else: 
-            dates, date_indexes = get_datetime_index_dates_from_statement(soup, quarterly=self.quarterly, check_date_indexes=False)
+            dates, date_indexes = get_datetime_index_dates_from_statement(document, quarterly=self.quarterly, check_date_indexes=False)
         # print(dates)
         # TODO : this function is in company class
 
@@ -326,30 +347,31 @@ class Filling():
         
         # Track scale verifications to correct table header if needed
         verified_scales = []  # List of (fact, verified_scale) tuples
+        # Time of the per-row unit detection, recorded as one span
+        unit_timer = SpanTimer("statement.units", "units", statement=statement_name)
 
-        for table in soup.find_all("table"):
-            unit_multiplier, shares_unit_multiplier = parse_table_header(table)
+        for table in document.tables:
+            unit_multiplier, shares_unit_multiplier = parse_table_header_texts(table.header_texts)
             # We'll verify and potentially correct this multipler using company_facts
             # Process each row of the table
             inside_section = False
             is_row_header = False
             current_section_name = FIRST_SECTION
-            for row in table.select("tr"):
-                onclick_elements = row.select("td.pl a, td.pl.custom a")
-                if not onclick_elements:
-                    continue
-
-                onclick_attr = onclick_elements[0]["onclick"]
+            # table.rows only holds rows with a fact link (td.pl a)
+            for row in table.rows:
+                if row.onclick is None:
+                    raise KeyError("onclick")
+                onclick_attr = row.onclick
                 row_title = onclick_attr.split("defref_")[-1].split("',")[0]
-                row_text = onclick_elements[0].get_text(strip=True)
+                row_text = row.label
 
                 if get_duplicates:
-                    row_contain_number = row.select("td.num, td.nump")
+                    row_contain_number = row.has_number
                     if row_contain_number:
                         is_row_header = False
                     else:
                         if row_title.endswith("Abstract"):
-                            current_section_name = onclick_elements[0].get_text(strip=True)
+                            current_section_name = row.label
                             if current_section_name:
                                 if is_row_header: # previous row is also header
                                     row_section_name += ":" + current_section_name
@@ -363,7 +385,7 @@ class Filling():
                                 continue
 
                                     
-                row_class = row.get('class')
+                row_class = row.classes
                 # print("row class:" , row_class)
                 if row_class == ['reu'] or row_class == ['rou']:
                     rows_that_are_sum.append(row_title)
@@ -400,11 +422,11 @@ class Filling():
                 raw_values = [0] * length_dates  # Store raw values for unit verification
                 column_counter = 0
                 # Process each cell in the row
-                for date_idx, cell in enumerate((row.select("td.text, td.nump, td.num"))):
+                for date_idx, cell in enumerate(row.cells):
                     if date_idx not in date_indexes:
                         continue
 
-                    if "text" in cell.get("class"):
+                    if "text" in cell.classes:
                         column_counter += 1
                         continue
 
@@ -421,7 +443,7 @@ class Filling():
                     if value and date_idx == date_indexes[0]:
                         value = float(value)
                         # Store raw value for unit verification (BEFORE applying multiplier)
-                        is_negative = "nump" not in cell.get("class")
+                        is_negative = "nump" not in cell.classes
                         raw_values[column_counter] = -value if is_negative else value
                         
                         # Extract fact name for company_facts lookup
@@ -435,7 +457,7 @@ class Filling():
                         
                         # Try to verify scale with company_facts
                         verified_scale = None
-                        if fact_name and self.company_facts_DF is not None and not self.company_facts_DF.empty:
+                        if fact_name and self.facts_table is not None and not self.facts_table.empty:
                             try:
                                 # Get the date for this column
                                 if column_counter < len(dates):
@@ -445,14 +467,10 @@ class Filling():
                                     else:
                                         col_date_str = str(col_date).split(' ')[0]
                                     
-                                    # Look up in company_facts
-                                    filtered_data = self.company_facts_DF[
-                                        (self.company_facts_DF['fact'] == fact_name) & 
-                                        (self.company_facts_DF['end'] == col_date_str)
-                                    ]
+                                    # Look up in company_facts ((fact, end) index)
+                                    company_value = self.facts_table.first_value(fact_name, col_date_str)
                                     
-                                    if not filtered_data.empty:
-                                        company_value = filtered_data.iloc[0]['val']
+                                    if company_value is not None:
                                         if company_value != 0 and value != 0:
                                             # Calculate ratio to determine scale
                                             ratio = abs(company_value) / abs(value)
@@ -490,7 +508,7 @@ class Filling():
                         # else: use header currency scale (already set)
                         
                         # Apply multiplier to get full number
-                        if "nump" in cell.get("class"):
+                        if "nump" in cell.classes:
                             values[column_counter] = value * row_multiplier
                         else:
                             values[column_counter] = -value * row_multiplier
@@ -502,11 +520,11 @@ class Filling():
                         column_counter += 1
                     elif value:
                         value = float(value)
-                        is_negative = "nump" not in cell.get("class")
+                        is_negative = "nump" not in cell.classes
                         raw_values[column_counter] = -value if is_negative else value
                         
                         # Use row_multiplier from previous cell in this row
-                        if "nump" in cell.get("class"):
+                        if "nump" in cell.classes:
                             values[column_counter] = value * row_multiplier
                         else:
                             values[column_counter] = -value * row_multiplier
@@ -540,16 +558,17 @@ class Filling():
                 try:
                     # Use new UnitDetector system
                     # Pass the scale that WAS applied (row_multiplier)
-                    unit_info = UnitDetector.detect_unit_for_row(
-                        row_name=row_title,
-                        raw_value=table_value,
-                        end_date=date_str,
-                        header_currency_scale=row_multiplier,  # Pass actual scale applied
-                        header_shares_scale=shares_unit_multiplier,
-                        company_facts_df=self.company_facts_DF,
-                        is_quarterly=self.quarterly,
-                        human_label=human_label
-                    )
+                    with unit_timer.time():
+                        unit_info = UnitDetector.detect_unit_for_row(
+                            row_name=row_title,
+                            raw_value=table_value,
+                            end_date=date_str,
+                            header_currency_scale=row_multiplier,  # Pass actual scale applied
+                            header_shares_scale=shares_unit_multiplier,
+                            company_facts_df=self.facts_table,
+                            is_quarterly=self.quarterly,
+                            human_label=human_label
+                        )
                     
                     units_dict[row_title] = unit_info
                     
@@ -603,6 +622,7 @@ class Filling():
                         # Update the multiplier record
                         unit_multiplier_set[i] = corrected_default_scale
         
+        unit_timer.close()
         return columns, values_set, dates, rows_that_are_sum, text_set, sections_dict, units_dict
 
 
@@ -627,29 +647,34 @@ class Filling():
         return df
     
 
-    def process_one_statement(self, statement_name, historical_statements=None):
+    def process_one_statement(self, statement_name, historical_statements=None, llm_budget=None):
         """
         Processes a single financial statement identified by ticker, accession number, and statement name.
         Args:
             statement_name (str): Name of the financial statement.
             historical_statements (dict, optional): Dict of {year: mapped_df} from previously
                 parsed filings for the same company. Used for temporal cross-validation.
+            llm_budget (LLMBudget, optional): LLM calls / seconds the statement may spend.
         Returns:
             pd.DataFrame or None: DataFrame of the processed statement or None if an error occurs.
         """
         try:
-            # Fetch the statement HTML soup
-            soup = self.get_statement_file_soup(statement_name)
+            # Fetch and parse the statement (unless already prefetched)
+            soup = self.prefetched_documents.pop(statement_name, None)
+            if soup is None:
+                soup = self.get_statement_document(statement_name)
         except Exception as e:
             logging.error(f"Failed to get statement soup: {e} for accession number: {self.accession_number}")
             return None
         if soup:
             try:
                 # Extract data and create DataFrame (including unit information)
-                columns, values, dates, rows_that_are_sum, rows_text, sections_dict, units_dict = self.extract_columns_values_and_dates_from_statement(
-                    soup, statement_name,
-                )
-                df = self.create_dataframe_of_statement_values_columns_dates(values, columns, dates)
+                with span("statement.extract", "parse", statement=statement_name) as extract_span:
+                    columns, values, dates, rows_that_are_sum, rows_text, sections_dict, units_dict = self.extract_columns_values_and_dates_from_statement(
+                        soup, statement_name,
+                    )
+                    df = self.create_dataframe_of_statement_values_columns_dates(values, columns, dates)
+                    extract_span.set(rows=len(rows_text))
 
                 if not df.empty:
                     # Remove duplicate columns
@@ -667,17 +692,23 @@ class Filling():
                 #     df = last_three_columns
                 df = df.round(2)
                 
+                # Keep the parse-stage output so mapping can be rerun without it (main.py --remap)
+                artifacts = get_parse_artifacts()
+                if artifacts is not None:
+                    artifacts.save_statement(self.cik, self.accession_number, statement_name, df,
+                                             rows_that_are_sum, rows_text, sections_dict, units_dict)
+                
                 # Create the statement object with unit information and historical data
                 hist = historical_statements or {}
                 statement_obj = None
                 if statement_name == 'income_statement':
-                    self.income_statement = IncomeStatement(df, rows_that_are_sum, rows_text, self.xml_equations, sections_dict, units_dict, historical_statements=hist)
+                    self.income_statement = IncomeStatement(df, rows_that_are_sum, rows_text, self.xml_equations, sections_dict, units_dict, historical_statements=hist, llm_budget=llm_budget, cik=self.cik)
                     statement_obj = self.income_statement
                 elif statement_name == 'balance_sheet':
-                    self.balance_sheet = BalanceSheet(df, rows_that_are_sum, rows_text, self.xml_equations, sections_dict, units_dict, historical_statements=hist)
+                    self.balance_sheet = BalanceSheet(df, rows_that_are_sum, rows_text, self.xml_equations, sections_dict, units_dict, historical_statements=hist, llm_budget=llm_budget, cik=self.cik)
                     statement_obj = self.balance_sheet
                 elif statement_name == 'cash_flow_statement':
-                    self.cash_flow = CashFlow(df, rows_that_are_sum, rows_text, self.xml_equations, sections_dict, units_dict, historical_statements=hist)
+                    self.cash_flow = CashFlow(df, rows_that_are_sum, rows_text, self.xml_equations, sections_dict, units_dict, historical_statements=hist, llm_budget=llm_budget, cik=self.cik)
                     statement_obj = self.cash_flow
                 
                 # Log patterns for regex improvement (deduplicates automatically)
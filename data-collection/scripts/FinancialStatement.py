@@ -1,10 +1,15 @@
 import pandas as pd
+import numpy as np
 import re
 import logging
 import os
 from typing import List, Dict, Tuple, Optional
 from constants import *
 from statement_maps import *
+from pattern_matcher import get_statement_map_matcher
+from mapped_state import MappedState, frame_values
+from fact_cube import get_fact_cube
+from tracing import span
 
 # Pipeline imports (graceful fallback if not available)
 try:
@@ -94,7 +99,8 @@ class MatchCandidate:
 
 def calculate_match_score(candidate: MatchCandidate, row_data: pd.Series, 
                           mapped_df: Optional[pd.DataFrame] = None, 
-                          statement_obj: Optional['FinancialStatement'] = None) -> float:
+                          statement_obj: Optional['FinancialStatement'] = None,
+                          mapped_state: Optional[MappedState] = None) -> float:
     """
     Calculate a score for a match candidate based on multiple criteria.
     
@@ -103,6 +109,7 @@ def calculate_match_score(candidate: MatchCandidate, row_data: pd.Series,
         row_data: Pandas Series with row values
         mapped_df: DataFrame with already-mapped rows (for numeric comparison)
         statement_obj: FinancialStatement object (for numeric similarity and historical comparison)
+        mapped_state: MappedState with already-mapped rows (used instead of mapped_df)
     
     Returns:
         Float score (higher is better)
@@ -148,23 +155,26 @@ def calculate_match_score(candidate: MatchCandidate, row_data: pd.Series,
         score += config['pattern_position'].get(first_pattern_idx, 0)
     
     # Criterion 7: Numeric Similarity (NEW - compare values across years)
-    if (config['numeric_similarity']['enabled'] and 
-        mapped_df is not None and 
-        statement_obj is not None and
-        candidate.map_fact.fact in mapped_df.index):
-        
-        # Get the row from mapped_df that would be updated
-        existing_row = mapped_df.loc[candidate.map_fact.fact]
-        
-        # Check if the existing row has any data (might have been pre-matched)
-        if (existing_row != 0).any():
-            # Compare numeric values
-            if statement_obj._rows_numerically_similar(
-                row_data, existing_row, 
-                tolerance=config['numeric_similarity']['tolerance']):
-                # Strong bonus for numeric match
-                score += config['numeric_similarity']['weight']
-                logger.debug(f"  Numeric match bonus: +{config['numeric_similarity']['weight']}")
+    existing_row = None
+    if config['numeric_similarity']['enabled'] and statement_obj is not None:
+        fact = candidate.map_fact.fact
+        # Get the row that would be updated, if it already has data (might have been pre-matched)
+        if mapped_state is not None:
+            if mapped_state.is_fact_mapped(fact):
+                existing_row = mapped_state.row_series(fact)
+        elif mapped_df is not None and fact in mapped_df.index:
+            existing_row = mapped_df.loc[fact]
+            if not (existing_row != 0).any():
+                existing_row = None
+
+    if existing_row is not None:
+        # Compare numeric values
+        if statement_obj._rows_numerically_similar(
+            row_data, existing_row, 
+            tolerance=config['numeric_similarity']['tolerance']):
+            # Strong bonus for numeric match
+            score += config['numeric_similarity']['weight']
+            logger.debug(f"  Numeric match bonus: +{config['numeric_similarity']['weight']}")
     
     # Criterion 8: Historical Data Comparison (NEW - compare against previously parsed statements)
     if (config['historical_similarity']['enabled'] and 
@@ -189,6 +199,8 @@ def calculate_match_score(candidate: MatchCandidate, row_data: pd.Series,
 def find_pattern_matches(search_string: str, patterns: List[str], pattern_type: str) -> List[PatternMatch]:
     """
     Find all patterns that match the search string.
+    Reference implementation; the mappers use pattern_matcher's precompiled
+    StatementMapMatcher, which returns the same matches.
     
     Args:
         search_string: String to search in
@@ -229,7 +241,7 @@ class FinancialStatement():
     - Storing calculation relationships from XML
     """
 
-    def __init__(self, og_df: pd.DataFrame, rows_that_are_sum: list, rows_text: dict, cal_facts: dict, sections_dict={}, units_dict=None, historical_statements=None):
+    def __init__(self, og_df: pd.DataFrame, rows_that_are_sum: list, rows_text: dict, cal_facts: dict, sections_dict={}, units_dict=None, historical_statements=None, llm_budget=None, cik=None):
         """
         Initialize the financial statement.
         
@@ -241,6 +253,8 @@ class FinancialStatement():
             sections_dict: Dict grouping facts by sections in the statement
             units_dict: Dict mapping row indices to UnitInfo objects (unit information)
             historical_statements: Dict of previously parsed statements {year: mapped_df} for disambiguation
+            llm_budget: llm_budget.LLMBudget limiting the LLM calls of the pipeline / enhanced mappers
+            cik: Company CIK, scope of the mappings learned by the LLM mappers (mapping_memory)
         """
         self.og_df = og_df
         self.mapped_df = None
@@ -254,8 +268,11 @@ class FinancialStatement():
         self.units_dict = units_dict or {}  # NEW: Store UnitInfo for each row
         self.sections_dict = sections_dict
         self.mapped_facts = []      # List of successfully mapped facts
+        self._mapped_state = None   # Array-backed state of the scoring / legacy mappers
         self.mapping_score = {}     # Score for each mapping
         self.historical_statements = historical_statements or {}  # Historical data for disambiguation
+        self.llm_budget = llm_budget  # LLM calls / seconds this statement may spend (None = unlimited)
+        self.cik = cik
         
         # NEW: Raw/unmapped data for debugging
         self.raw_df = None          # All original rows with human-readable labels
@@ -317,8 +334,8 @@ class FinancialStatement():
         3. Select the best match
         4. Skip if fact already mapped
         """
-        if self.mapped_df is None:
-            self.create_zeroed_df_from_map()
+        og_values = self._begin_mapping()
+        state = self._mapped_state
         
         # Get all MapFact objects (no need to sort by priority - scoring handles it)
         map_facts = vars(self.statement_map)
@@ -329,26 +346,27 @@ class FinancialStatement():
         unmapped_rows = []
         
         logger.debug("Starting score-based matching...")
-        for idx, row in self.og_df.iterrows():
-            if self._is_row_mapped(idx):
+        for pos, idx in enumerate(self.og_df.index):
+            if state.is_row_mapped(idx):
                 continue
             
             human_string = self.rows_text.get(idx, "")
             
             # Find all potential candidates
-            candidates = self._find_all_candidates(idx, row, map_fact_items, human_string)
+            candidates = self._find_all_candidates(idx, None, map_fact_items, human_string)
             
             if not candidates:
                 unmapped_rows.append((idx, human_string))
                 continue
             
             # Score and select best
+            row = pd.Series(og_values[pos], index=self.og_df.columns, name=idx)
             best_match = self._score_and_select_best(candidates, row, idx)
             
             if best_match:
                 # Map the row
                 fact_row = best_match.map_fact.fact
-                self.mapped_df.loc[fact_row] = row
+                state.assign(fact_row, og_values[pos], idx)
                 self.mapped_facts.append((idx, fact_row, best_match.pattern_type))
                 self.mapping_score[idx] = best_match.score
                 mapped_count += 1
@@ -359,6 +377,7 @@ class FinancialStatement():
                 # All candidates already mapped
                 unmapped_rows.append((idx, human_string))
         
+        self.mapped_df = state.to_dataframe()
         logger.info(f"Score-based matching: {mapped_count} out of {len(self.og_df)} rows mapped")
         logger.info(f"Unmapped rows: {len(unmapped_rows)}")
         
@@ -379,27 +398,28 @@ class FinancialStatement():
         """
         matching_mode = os.environ.get('USE_MATCHING', 'enhanced').lower()
         
-        if matching_mode == 'legacy':
-            logger.info("Using legacy first-match-wins matching")
-            self._map_facts_legacy()
-        elif matching_mode == 'scoring':
-            logger.debug("Using score-based matching")
-            self.map_facts_with_scoring()
-        elif matching_mode == 'enhanced' and ENHANCED_PARSER_AVAILABLE:
-            logger.info("Using enhanced agentic parser (batch LLM, cross-year validation, verification loop)")
-            self._map_facts_enhanced()
-        elif matching_mode == 'pipeline' or not ENHANCED_PARSER_AVAILABLE:
-            if not ENHANCED_PARSER_AVAILABLE and matching_mode == 'enhanced':
-                logger.warning("Enhanced parser not available, falling back to pipeline mode")
-            if not PIPELINE_AVAILABLE:
-                logger.warning("Pipeline not available, falling back to scoring mode")
+        with span("statement.match", "mapping", mode=matching_mode):
+            if matching_mode == 'legacy':
+                logger.info("Using legacy first-match-wins matching")
+                self._map_facts_legacy()
+            elif matching_mode == 'scoring':
+                logger.debug("Using score-based matching")
                 self.map_facts_with_scoring()
+            elif matching_mode == 'enhanced' and ENHANCED_PARSER_AVAILABLE:
+                logger.info("Using enhanced agentic parser (batch LLM, cross-year validation, verification loop)")
+                self._map_facts_enhanced()
+            elif matching_mode == 'pipeline' or not ENHANCED_PARSER_AVAILABLE:
+                if not ENHANCED_PARSER_AVAILABLE and matching_mode == 'enhanced':
+                    logger.warning("Enhanced parser not available, falling back to pipeline mode")
+                if not PIPELINE_AVAILABLE:
+                    logger.warning("Pipeline not available, falling back to scoring mode")
+                    self.map_facts_with_scoring()
+                else:
+                    logger.info("Using full parsing pipeline (with temporal/sum/LLM)")
+                    self._map_facts_pipeline()
             else:
-                logger.info("Using full parsing pipeline (with temporal/sum/LLM)")
-                self._map_facts_pipeline()
-        else:
-            logger.warning("No suitable matching mode available, using scoring")
-            self.map_facts_with_scoring()
+                logger.warning("No suitable matching mode available, using scoring")
+                self.map_facts_with_scoring()
 
     def _map_facts_enhanced(self):
         """
@@ -432,6 +452,9 @@ class FinancialStatement():
             historical_statements=self.historical_statements,
             max_verification_iterations=3,
             cross_year_tolerance=0.10,
+            llm_budget=self.llm_budget,
+            deterministic_mappings=self._deterministic_mappings,
+            cik=self.cik,
         )
 
         result = parser.parse(
@@ -442,6 +465,7 @@ class FinancialStatement():
 
         # Apply results
         self.mapped_df = result.mapped_df
+        self._mapped_state = None
         self.mapped_facts = [
             (m.row_idx, m.mapped_to, m.mapped_via)
             for m in result.mappings
@@ -462,6 +486,35 @@ class FinancialStatement():
             f"{result.verification_iterations} verification iterations"
         )
 
+    def _deterministic_mappings(self) -> dict:
+        """
+        {row_idx: fact} of the pipeline without LLM calls (regex, temporal and
+        summation scores). The enhanced parser uses it for the confusable
+        groups its LLM budget does not cover.
+        """
+        if not PIPELINE_AVAILABLE:
+            return {}
+        statement_type = 'income_statement'
+        if isinstance(self, BalanceSheet):
+            statement_type = 'balance_sheet'
+        elif isinstance(self, CashFlow):
+            statement_type = 'cash_flow_statement'
+        config = PipelineConfig()
+        config.llm_enabled = False
+        config.discovery_enabled = False
+        result = ParsingPipeline(
+            statement_map=self.statement_map,
+            og_df=self.og_df,
+            rows_text=self.rows_text,
+            rows_that_are_sum=self.rows_that_are_sum,
+            cal_facts=self.cal_facts,
+            historical_statements=self.historical_statements,
+            statement_type=statement_type,
+            config=config,
+            cik=self.cik,
+        ).run()
+        return {m.row_idx: m.fact_name for m in result.mappings}
+
     def _map_facts_pipeline(self):
         """
         Full parsing pipeline: Regex Candidates → Temporal Validation → 
@@ -497,12 +550,15 @@ class FinancialStatement():
             historical_statements=self.historical_statements,
             statement_type=statement_type,
             config=config,
+            llm_budget=self.llm_budget,
+            cik=self.cik,
         )
 
         result = pipeline.run()
 
         # Apply results
         self.mapped_df = result.mapped_df
+        self._mapped_state = None
         self.mapped_facts = [
             (m.row_idx, m.fact_name, m.pattern_type)
             for m in result.mappings
@@ -525,8 +581,8 @@ class FinancialStatement():
     def _map_facts_legacy(self):
         """Legacy first-match-wins approach (for comparison/rollback)."""
         
-        if self.mapped_df is None:
-            self.create_zeroed_df_from_map()
+        og_values = self._begin_mapping()
+        state = self._mapped_state
         
         # Get all MapFact objects sorted by priority (highest first)
         map_facts = vars(self.statement_map)
@@ -539,34 +595,33 @@ class FinancialStatement():
         
         # PASS 1: Priority-based matching
         logger.debug("Starting priority-based matching...")
-        for idx, row in self.og_df.iterrows():
-            if self._is_row_mapped(idx):
+        for pos, idx in enumerate(self.og_df.index):
+            if state.is_row_mapped(idx):
                 continue
                 
+            row = og_values[pos]
             found_match = False
             human_string = self.rows_text.get(idx, "")
+            row_hits = self._row_pattern_hits(idx, human_string)
             
             for fact_name, map_fact in map_fact_items:
                 if found_match:
                     break
                 
                 # Try GAAP patterns first
-                if self._try_pattern_match(idx, row, map_fact, map_fact.gaap_pattern,
-                                          human_string, 'GAAP'):
+                if self._try_pattern_match(idx, row, map_fact, row_hits['GAAP'].get(fact_name), 'GAAP'):
                     mapped_count += 1
                     found_match = True
                     break
                 
                 # Try IFRS patterns
-                if self._try_pattern_match(idx, row, map_fact, map_fact.ifrs_pattern,
-                                          human_string, 'IFRS'):
+                if self._try_pattern_match(idx, row, map_fact, row_hits['IFRS'].get(fact_name), 'IFRS'):
                     mapped_count += 1
                     found_match = True
                     break
                 
                 # Try human patterns
-                if self._try_pattern_match(idx, row, map_fact, map_fact.human_pattern,
-                                          human_string, 'Human'):
+                if self._try_pattern_match(idx, row, map_fact, row_hits['Human'].get(fact_name), 'Human'):
                     mapped_count += 1
                     found_match = True
                     break
@@ -574,6 +629,7 @@ class FinancialStatement():
             if not found_match:
                 unmapped_rows.append((idx, human_string))
         
+        self.mapped_df = state.to_dataframe()
         logger.info(f"Successfully mapped {mapped_count} out of {len(self.og_df)} rows")
         logger.info(f"Unmapped rows: {len(unmapped_rows)}")
         
@@ -583,12 +639,29 @@ class FinancialStatement():
             for idx, human_text in unmapped_rows[:10]:
                 logger.debug(f"  - {idx}: {human_text}")
     
+    def _begin_mapping(self) -> np.ndarray:
+        """
+        Set up the array-backed mapped state for the scoring / legacy mappers
+        (from mapped_df, created zeroed if needed, and the rows already in
+        mapped_facts) and return the original values as a matrix.
+        """
+        if self.mapped_df is None:
+            self.create_zeroed_df_from_map()
+        og_values = frame_values(self.og_df)
+        self._mapped_state = MappedState.from_dataframe(self.mapped_df, og_values)
+        self._mapped_state.mapped_rows.update(m[0] for m in self.mapped_facts)
+        return og_values
+
     def _is_row_mapped(self, idx):
         """Check if a row has already been mapped."""
+        if self._mapped_state is not None:
+            return self._mapped_state.is_row_mapped(idx)
         return any(m[0] == idx for m in self.mapped_facts)
     
     def _is_fact_mapped(self, fact_name: str) -> bool:
         """Check if a fact has already been mapped."""
+        if self._mapped_state is not None:
+            return self._mapped_state.is_fact_mapped(fact_name)
         if self.mapped_df is None:
             return False
         return fact_name in self.mapped_df.index and (self.mapped_df.loc[fact_name] != 0).any()
@@ -607,27 +680,29 @@ class FinancialStatement():
             List of MatchCandidate objects
         """
         candidates = []
+        row_hits = self._row_pattern_hits(idx, human_string)
         
         for fact_name, map_fact in map_fact_items:
-            # Try GAAP patterns
-            gaap_matches = find_pattern_matches(idx, map_fact.gaap_pattern, 'GAAP')
-            if gaap_matches:
-                candidate = MatchCandidate(map_fact, 'GAAP', gaap_matches)
-                candidates.append(candidate)
-            
-            # Try IFRS patterns
-            ifrs_matches = find_pattern_matches(idx, map_fact.ifrs_pattern, 'IFRS')
-            if ifrs_matches:
-                candidate = MatchCandidate(map_fact, 'IFRS', ifrs_matches)
-                candidates.append(candidate)
-            
-            # Try Human patterns
-            human_matches = find_pattern_matches(human_string, map_fact.human_pattern, 'Human')
-            if human_matches:
-                candidate = MatchCandidate(map_fact, 'Human', human_matches)
-                candidates.append(candidate)
+            for pattern_type in ('GAAP', 'IFRS', 'Human'):
+                hits = row_hits[pattern_type].get(fact_name)
+                if hits:
+                    matches = [PatternMatch(pattern, match_string, index) for index, pattern, match_string in hits]
+                    candidates.append(MatchCandidate(map_fact, pattern_type, matches))
         
         return candidates
+
+    def _row_pattern_hits(self, idx: str, human_string: str) -> Dict[str, Dict[str, list]]:
+        """
+        Regex hits of every MapFact for one row, from the precompiled matcher:
+        {'GAAP' | 'IFRS' | 'Human': {MapFact attribute: [(index, pattern, match), ...]}}.
+        GAAP/IFRS patterns are searched in the row index, Human ones in the label.
+        """
+        matcher = get_statement_map_matcher(self.statement_map)
+        return {
+            'GAAP': matcher.search('GAAP', idx),
+            'IFRS': matcher.search('IFRS', idx),
+            'Human': matcher.search('Human', human_string),
+        }
     
     def _score_and_select_best(self, candidates: List[MatchCandidate], row: pd.Series, idx: str) -> Optional[MatchCandidate]:
         """
@@ -648,7 +723,8 @@ class FinancialStatement():
         for candidate in candidates:
             candidate.score = calculate_match_score(candidate, row, 
                                                    mapped_df=self.mapped_df,
-                                                   statement_obj=self)
+                                                   statement_obj=self,
+                                                   mapped_state=self._mapped_state)
         
         # Sort by score (highest first)
         candidates.sort(key=lambda c: c.score, reverse=True)
@@ -665,46 +741,39 @@ class FinancialStatement():
         # All candidates already mapped
         return None
     
-    def _try_pattern_match(self, idx, row, map_fact, patterns, human_string, pattern_type):
+    def _try_pattern_match(self, idx, row, map_fact, pattern_hits, pattern_type):
         """
-        Try to match a row against a list of patterns.
+        Try to map a row to a MapFact whose patterns matched it.
         
         Args:
             idx: Row index (GAAP taxonomy name)
-            row: Row data
+            row: Row values (array, in og_df column order)
             map_fact: MapFact object
-            patterns: List of regex patterns
-            human_string: Human-readable label
+            pattern_hits: Matcher hits of the MapFact's patterns of this type
+                (see _row_pattern_hits), in pattern order; the first one wins
             pattern_type: 'GAAP', 'IFRS', or 'Human'
         
         Returns:
             True if matched, False otherwise
         """
-        if not patterns:
+        if not pattern_hits:
             return False
         
-        search_string = human_string if pattern_type == 'Human' else idx
-        
-        for pattern in patterns:
-            try:
-                if not pattern:  # Skip empty patterns
-                    continue
-                    
-                if re.search(pattern, search_string, re.IGNORECASE):
-                    fact_row = map_fact.fact
-                    
-                    # Check if this fact is already mapped
-                    if (self.mapped_df.loc[fact_row] != 0).any():
-                        logger.debug(f"Fact '{fact_row}' already mapped, skipping '{idx}'")
-                        return False
-                    
-                    # Map the row
-                    self.mapped_df.loc[fact_row] = row
-                    self.mapped_facts.append((idx, fact_row, pattern_type, pattern))
-                    logger.debug(f"Mapped '{idx}' -> '{fact_row}' ({pattern_type}: {pattern})")
-                    return True
-            except Exception as e:
-                logger.error(f"Error matching {pattern_type} pattern '{pattern}' for '{idx}': {e}")
+        pattern = pattern_hits[0][1]
+        fact_row = map_fact.fact
+        try:
+            # Check if this fact is already mapped
+            if self._mapped_state.is_fact_mapped(fact_row):
+                logger.debug(f"Fact '{fact_row}' already mapped, skipping '{idx}'")
+                return False
+            
+            # Map the row
+            self._mapped_state.assign(fact_row, row, idx)
+            self.mapped_facts.append((idx, fact_row, pattern_type, pattern))
+            logger.debug(f"Mapped '{idx}' -> '{fact_row}' ({pattern_type}: {pattern})")
+            return True
+        except Exception as e:
+            logger.error(f"Error matching {pattern_type} pattern '{pattern}' for '{idx}': {e}")
         
         return False
     
@@ -918,55 +987,32 @@ class FinancialStatement():
         if not self.historical_statements:
             return None
         
-        # Get columns from current row (these are years/periods)
-        current_columns = current_row.index.tolist()
+        # All historical filings at once, aligned on the current columns (periods)
+        cube = get_fact_cube(self.historical_statements)
+        columns = current_row.index
+        hist = cube.lookup([fact_name], columns)[:, 0, :]                  # (filings, columns)
+        curr = np.broadcast_to(
+            pd.to_numeric(current_row, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan),
+            hist.shape)
+        
+        # Skip NaN comparisons
+        compared = ~np.isnan(curr) & ~np.isnan(hist)
+        total_comparisons = int(compared.sum())
+        
+        # IMPORTANT: Don't count zero==zero as a match (as per user requirement),
+        # and if one is zero and other isn't, not a match
+        nonzero = compared & (curr != 0) & (hist != 0)
+        avg = (np.abs(curr) + np.abs(hist)) / 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pct_diff = np.where(nonzero, np.abs(curr - hist) / avg, np.inf)
         
         matched_years = []
-        total_comparisons = 0
-        
-        # For each historical statement
-        for hist_year, hist_df in self.historical_statements.items():
-            # Check if this fact exists in historical data
-            if fact_name not in hist_df.index:
-                continue
-            
-            hist_row = hist_df.loc[fact_name]
-            
-            # Find overlapping columns (years that exist in both current and historical)
-            common_cols = [col for col in current_columns if col in hist_row.index]
-            
-            if not common_cols:
-                continue
-            
-            # Compare values in common columns
-            for col in common_cols:
-                curr_val = current_row[col]
-                hist_val = hist_row[col]
-                
-                # Skip NaN comparisons
-                if pd.isna(curr_val) or pd.isna(hist_val):
-                    continue
-                
-                total_comparisons += 1
-                
-                # IMPORTANT: Don't count zero==zero as a match (as per user requirement)
-                if curr_val == 0 and hist_val == 0:
-                    continue
-                
-                # If one is zero and other isn't, not a match
-                if curr_val == 0 or hist_val == 0:
-                    continue
-                
-                # Calculate percentage difference
-                avg = (abs(curr_val) + abs(hist_val)) / 2
-                diff = abs(curr_val - hist_val)
-                pct_diff = diff / avg if avg != 0 else 0
-                
-                if pct_diff <= tolerance:
-                    matched_years.append((hist_year, col))
-                    logger.debug(f"    Historical match: {fact_name} {col}: "
-                               f"current={curr_val:,.0f} vs hist({hist_year})={hist_val:,.0f} "
-                               f"(diff={pct_diff*100:.1f}%)")
+        for f, c in zip(*np.nonzero(pct_diff <= tolerance)):
+            hist_year, col = cube.filings[f], columns[c]
+            matched_years.append((hist_year, col))
+            logger.debug(f"    Historical match: {fact_name} {col}: "
+                       f"current={curr[f, c]:,.0f} vs hist({hist_year})={hist[f, c]:,.0f} "
+                       f"(diff={pct_diff[f, c]*100:.1f}%)")
         
         # Return match info if we had successful comparisons
         if matched_years:
@@ -26,6 +26,9 @@ from typing import Dict, List, Optional, Tuple, Any
 import pandas as pd
 import re
 
+from agents.llm_cache import get_llm_cache
+from tracing import span
+
 logger = logging.getLogger(__name__)
 
 # Try importing langchain
@@ -411,8 +414,13 @@ class AgenticParser:
             return None
 
         model = model or self.model_name
+        cache = get_llm_cache()
 
         for attempt_model in [model, self.fallback_model]:
+            cached = cache.get(attempt_model, self.temperature, system_prompt, user_prompt) if cache else None
+            if cached is not None:
+                logger.info(f"[AgenticParser] Cached response for model '{attempt_model}'")
+                return cached
             llm = self._get_llm(attempt_model)
             if llm is None:
                 continue
@@ -423,9 +431,12 @@ class AgenticParser:
                     SystemMessage(content=system_prompt),
                     HumanMessage(content=user_prompt),
                 ]
-                response = llm.invoke(messages)
+                with span("llm.invoke", "llm", agent="AgenticParser", model=attempt_model):
+                    response = llm.invoke(messages)
                 duration = time.time() - t0
                 content = response.content
+                if cache is not None:
+                    cache.put(attempt_model, self.temperature, system_prompt, user_prompt, content)
                 logger.info(
                     f"[AgenticParser] Response from '{attempt_model}' "
                     f"({duration:.1f}s, {len(content)} chars)"
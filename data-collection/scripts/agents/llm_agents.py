@@ -28,21 +28,20 @@ import logging
 import json
 import os
 import time
-from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, field
 
+from agents.llm_cache import get_llm_cache
+from agents.llm_pool import map_ordered
+from agents.llm_log import get_llm_logger
+from tracing import span
+
 logger = logging.getLogger(__name__)
 
 # ─── LLM File Logger ─────────────────────────────────────────────────────────
-# Writes full prompt/response pairs to a JSONL file for review.
-
-_LLM_LOG_DIR = Path(__file__).parent / "logs"
-_LLM_LOG_FILE = _LLM_LOG_DIR / "llm_interactions.jsonl"
-
-def _ensure_log_dir():
-    _LLM_LOG_DIR.mkdir(parents=True, exist_ok=True)
+# Full prompt/response pairs go to agents/logs/llm_interactions.jsonl for review,
+# written by a background thread (agents.llm_log).
 
 def log_llm_interaction(
     agent_name: str,
@@ -54,9 +53,11 @@ def log_llm_interaction(
     error: Optional[str] = None,
     metadata: Optional[Dict] = None,
 ):
-    """Write a full prompt/response record to the JSONL log file."""
-    _ensure_log_dir()
-    record = {
+    """Queue a full prompt/response record for the JSONL log."""
+    llm_logger = get_llm_logger()
+    if llm_logger is None:
+        return
+    llm_logger.log({
         "timestamp": datetime.now().isoformat(),
         "agent": agent_name,
         "model": model,
@@ -66,12 +67,7 @@ def log_llm_interaction(
         "duration_seconds": round(duration_seconds, 2),
         "error": error,
         **(metadata or {}),
-    }
-    try:
-        with open(_LLM_LOG_FILE, "a") as f:
-            f.write(json.dumps(record, default=str) + "\n")
-    except Exception as e:
-        logger.warning(f"Could not write LLM log: {e}")
+    })
 
 # Try importing langchain - graceful fallback if not available
 try:
@@ -293,6 +289,7 @@ class AgentOrchestrator:
         self.timeout = timeout
         self._llm_cache = {}
         self.enabled = LANGCHAIN_AVAILABLE
+        self.llm_budget = None  # llm_budget.LLMBudget charged for every call, if set
 
         if not self.enabled:
             logger.warning("LLM agents disabled - langchain not available")
@@ -319,6 +316,7 @@ class AgentOrchestrator:
         """
         Invoke an LLM with system + user prompts.
         Falls back to fallback_model if primary fails.
+        Answers already in the LLM response cache are returned without a call.
         Logs every call to terminal (INFO) and to the JSONL file.
         """
         if not self.enabled:
@@ -326,8 +324,25 @@ class AgentOrchestrator:
             return None
 
         model = model or self.model_name
+        cache = get_llm_cache()
         
         for attempt_model in [model, self.fallback_model]:
+            if cache is not None:
+                cached = cache.get(attempt_model, self.temperature, system_prompt, user_prompt)
+                if cached is not None:
+                    logger.info(f"[Agent:{agent_name}] Cached response for model '{attempt_model}'")
+                    log_llm_interaction(
+                        agent_name=agent_name,
+                        model=attempt_model,
+                        system_prompt=system_prompt,
+                        user_prompt=user_prompt,
+                        response=cached,
+                        duration_seconds=0.0,
+                        metadata={"cache": "hit"},
+                    )
+                    if self.llm_budget is not None:
+                        self.llm_budget.charge(0.0, cached=True)
+                    return cached
             llm = self._get_llm(attempt_model)
             if llm is None:
                 continue
@@ -338,9 +353,12 @@ class AgentOrchestrator:
                     SystemMessage(content=system_prompt),
                     HumanMessage(content=user_prompt),
                 ]
-                response = llm.invoke(messages)
+                with span("llm.invoke", "llm", agent=agent_name, model=attempt_model):
+                    response = llm.invoke(messages)
                 duration = time.time() - t0
                 content = response.content
+                if self.llm_budget is not None:
+                    self.llm_budget.charge(duration)
                 
                 # Terminal logging
                 logger.info(
@@ -356,12 +374,17 @@ class AgentOrchestrator:
                     user_prompt=user_prompt,
                     response=content,
                     duration_seconds=duration,
+                    metadata={"cache": "miss"} if cache is not None else None,
                 )
+                if cache is not None:
+                    cache.put(attempt_model, self.temperature, system_prompt, user_prompt, content)
                 
                 return content
             except Exception as e:
                 duration = time.time() - t0 if 't0' in dir() else 0
                 logger.warning(f"[Agent:{agent_name}] FAILED with model '{attempt_model}': {e}")
+                if self.llm_budget is not None:
+                    self.llm_budget.charge(duration)
                 
                 # Log the failure too
                 log_llm_interaction(
@@ -590,7 +613,8 @@ class AgentOrchestrator:
 
     def run_discoverer(self, unmatched_rows: List[Dict],
                        expected_items: List[str],
-                       statement_type: str) -> List[DiscoveryResult]:
+                       statement_type: str,
+                       max_calls: Optional[int] = None) -> List[DiscoveryResult]:
         """
         Agent 3: The Discoverer.
         
@@ -601,10 +625,16 @@ class AgentOrchestrator:
             unmatched_rows: List of dicts with keys: idx, human_label, values, camelcase_words
             expected_items: List of standardized fact names that are missing
             statement_type: 'income_statement', 'balance_sheet', or 'cash_flow_statement'
+            max_calls: Send at most this many batches (None = all), e.g. the
+                calls left in the LLM budget
         
         Returns:
             List of DiscoveryResult with suggested mappings
         """
+        if max_calls is not None and len(unmatched_rows) > max_calls * 5:
+            logger.info(f"[Agent:Discoverer] LLM budget allows {max_calls} batches, "
+                        f"searching the first {max_calls * 5} of {len(unmatched_rows)} unmatched rows")
+            unmatched_rows = unmatched_rows[:max_calls * 5]
         if not self.enabled or not unmatched_rows or not expected_items:
             if not self.enabled:
                 logger.info(f"[Agent:Discoverer] SKIPPED - agents disabled. Missing items: {expected_items}")
@@ -617,22 +647,28 @@ class AgentOrchestrator:
 
         results = []
         
-        # Process in batches of 5 unmatched rows
+        # Process in batches of 5 unmatched rows; the batches are independent,
+        # so they are sent concurrently and their responses merged in batch order
         num_batches = (len(unmatched_rows) + 4) // 5
+        batches = []
         for i in range(0, len(unmatched_rows), 5):
             batch = unmatched_rows[i:i+5]
             batch_num = i // 5 + 1
             batch_tags = [r.get('idx', '?') for r in batch]
             logger.info(f"[Agent:Discoverer] Batch {batch_num}/{num_batches}: {batch_tags}")
-            
-            prompt = self._build_discoverer_prompt(batch, expected_items, statement_type)
-            
-            response = self._invoke_llm(
-                DISCOVERER_SYSTEM_PROMPT, prompt,
+            batches.append(batch)
+        
+        responses = map_ordered(
+            lambda batch: self._invoke_llm(
+                DISCOVERER_SYSTEM_PROMPT,
+                self._build_discoverer_prompt(batch, expected_items, statement_type),
                 model=self.analysis_model,
                 agent_name="Discoverer"
-            )
-            
+            ),
+            batches,
+        )
+        
+        for batch, response in zip(batches, responses):
             # The response should be a JSON array, but might be a single object
             parsed = self._parse_json_response(response)
             if parsed:
@@ -745,7 +781,8 @@ class AgentOrchestrator:
     def discover_missing_items(self, og_df, rows_text: Dict,
                                 mapped_facts: set,
                                 expected_items: List[str],
-                                statement_type: str) -> List[DiscoveryResult]:
+                                statement_type: str,
+                                max_calls: Optional[int] = None) -> List[DiscoveryResult]:
         """
         High-level method: find missing expected items among unmatched rows.
         
@@ -755,6 +792,7 @@ class AgentOrchestrator:
             mapped_facts: Set of row indices already mapped
             expected_items: Fact names that should be present
             statement_type: Type of financial statement
+            max_calls: Discoverer batches allowed (None = all)
         
         Returns:
             List of DiscoveryResult
@@ -782,7 +820,7 @@ class AgentOrchestrator:
         if not unmatched_rows:
             return []
 
-        return self.run_discoverer(unmatched_rows, expected_items, statement_type)
+        return self.run_discoverer(unmatched_rows, expected_items, statement_type, max_calls=max_calls)
 
     # ─── NEW AGENT METHODS ─────────────────────────────────────────────────
 
@@ -0,0 +1,224 @@
+"""
+LLM CACHE - Persistent Prompt-Hash Response Cache for the LLM Agents
+
+AgentOrchestrator, EnhancedAgenticParser and AgenticParser send the same
+system + user prompts every time a filing is collected again, and with
+USE_MATCHING=enhanced re-collections spent minutes re-asking Ollama
+questions it had already answered. Successful responses are now cached on
+disk under
+
+    (model, temperature, sha256(system prompt), sha256(user prompt))
+
+in a sqlite file (WAL mode, shared by threads and processes), by default
+.api_cache/llm/responses.sqlite. Failed calls are never cached.
+
+- Entries older than LLM_CACHE_TTL_DAYS are treated as misses and deleted
+- Beyond LLM_CACHE_MAX_ENTRIES, the least recently used entries are evicted
+- LLM_CACHE_BYPASS=1 skips lookups (every prompt goes to the model) but
+  still stores the fresh responses, e.g. after changing the model itself
+
+Hit-rate stats are appended, one JSON record per process, to
+agents/logs/llm_cache_stats.jsonl next to llm_interactions.jsonl.
+
+Configuration (environment variables):
+    LLM_CACHE               Set to 0 to disable the cache
+    LLM_CACHE_BYPASS        Set to 1 to ignore cached responses (they are still refreshed)
+    LLM_CACHE_TTL_DAYS      Age after which a response expires (default 30, 0 = never)
+    LLM_CACHE_MAX_ENTRIES   Entries kept (default 20000, 0 = unbounded)
+    LLM_CACHE_PATH          sqlite file (default .api_cache/llm/responses.sqlite)
+
+Usage:
+    from agents.llm_cache import get_llm_cache
+    cache = get_llm_cache()
+    content = cache.get(model, temperature, system_prompt, user_prompt) if cache else None
+    if content is None:
+        content = llm.invoke(messages).content
+        if cache:
+            cache.put(model, temperature, system_prompt, user_prompt, content)
+"""
+
+import os
+import json
+import time
+import atexit
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+
+_AGENTS_DIR = Path(__file__).parent
+_PROJECT_ROOT = _AGENTS_DIR.parent.parent.parent  # data-collection/scripts/agents -> project root
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE", "1") != "0"
+LLM_CACHE_BYPASS = os.environ.get("LLM_CACHE_BYPASS", "0") == "1"
+LLM_CACHE_TTL_DAYS = float(os.environ.get("LLM_CACHE_TTL_DAYS", "30"))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "20000"))
+LLM_CACHE_PATH = Path(os.environ.get(
+    "LLM_CACHE_PATH", _PROJECT_ROOT / ".api_cache" / "llm" / "responses.sqlite"
+))
+LLM_CACHE_STATS_FILE = _AGENTS_DIR / "logs" / "llm_cache_stats.jsonl"
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+# ─── Cache ─────────────────────────────────────────────────────────────────────
+
+class LLMResponseCache:
+    """
+    sqlite-backed cache of LLM responses keyed by model, temperature and
+    the hashes of the system and user prompts. Safe to use from several
+    threads and processes.
+    """
+
+    def __init__(self, path: Path = LLM_CACHE_PATH, ttl_days: float = LLM_CACHE_TTL_DAYS,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES, bypass: bool = LLM_CACHE_BYPASS):
+        """
+        Args:
+            path: sqlite file
+            ttl_days: Age after which an entry expires (0 = never)
+            max_entries: Entries kept, least recently used evicted first (0 = unbounded)
+            bypass: Skip lookups but keep storing responses
+        """
+        self.path = Path(path)
+        self.ttl_seconds = ttl_days * 86400
+        self.max_entries = max_entries
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.stored = 0
+        self.evicted = 0
+        self.bypassed = 0
+        self._lock = threading.Lock()
+        self._db = None
+        self._open()
+
+    def _open(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " model TEXT, temperature REAL, system_hash TEXT, user_hash TEXT,"
+                " response TEXT, created REAL, last_used REAL,"
+                " PRIMARY KEY (model, temperature, system_hash, user_hash))"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            db.commit()
+            self._db = db
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache at {self.path} unavailable: {e}")
+            self._db = None
+
+    def _key(self, model: str, temperature: float, system_prompt: str, user_prompt: str) -> tuple:
+        return (model, float(temperature), prompt_hash(system_prompt), prompt_hash(user_prompt))
+
+    def get(self, model: str, temperature: float, system_prompt: str, user_prompt: str) -> Optional[str]:
+        """Cached response for the prompts, or None (miss, expired, bypassed or unavailable)."""
+        with self._lock:
+            if self.bypass:
+                self.bypassed += 1
+                return None
+            if self._db is None:
+                self.misses += 1
+                return None
+            key = self._key(model, temperature, system_prompt, user_prompt)
+            where = "model = ? AND temperature = ? AND system_hash = ? AND user_hash = ?"
+            now = time.time()
+            try:
+                row = self._db.execute(f"SELECT response, created FROM responses WHERE {where}", key).fetchone()
+                if row is not None and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                    self._db.execute(f"DELETE FROM responses WHERE {where}", key)
+                    self._db.commit()
+                    self.expired += 1
+                    row = None
+                if row is not None:
+                    self._db.execute(f"UPDATE responses SET last_used = ? WHERE {where}", (now,) + key)
+                    self._db.commit()
+            except sqlite3.Error as e:
+                logger.debug(f"LLM cache read failed: {e}")
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, model: str, temperature: float, system_prompt: str, user_prompt: str, response: str):
+        """Store a successful response (None / empty responses are not cached)."""
+        if not response:
+            return
+        with self._lock:
+            if self._db is None:
+                return
+            now = time.time()
+            key = self._key(model, temperature, system_prompt, user_prompt)
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    key + (response, now, now),
+                )
+                self.stored += 1
+                if self.max_entries:
+                    count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+                    if count > self.max_entries:
+                        self.evicted += self._db.execute(
+                            "DELETE FROM responses WHERE rowid IN ("
+                            " SELECT rowid FROM responses ORDER BY last_used LIMIT ?)",
+                            (count - self.max_entries,),
+                        ).rowcount
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache write failed: {e}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "expired": self.expired,
+            "stored": self.stored,
+            "evicted": self.evicted,
+            "bypassed": self.bypassed,
+        }
+
+    def write_stats(self, stats_file: Path = LLM_CACHE_STATS_FILE):
+        """Append this process's stats to the stats log (only if the cache was used)."""
+        stats = self.stats()
+        if not (self.hits or self.misses or self.bypassed or self.stored):
+            return
+        record = {"timestamp": datetime.now().isoformat(), "path": str(self.path), **stats}
+        try:
+            stats_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(stats_file, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not write LLM cache stats: {e}")
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Return the shared LLMResponseCache, or None if disabled via LLM_CACHE=0."""
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMResponseCache()
+                atexit.register(_cache.write_stats)
+    return _cache
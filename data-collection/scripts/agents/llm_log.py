@@ -0,0 +1,393 @@
+"""
+LLM LOG - Buffered Background Logger for LLM Interactions, with Rotation
+
+log_llm_interaction() used to open agents/logs/llm_interactions.jsonl, append
+one full prompt/response record and close it again on every LLM call, from
+the calling thread and without any size limit. Records are now put on a
+bounded queue and written by a background thread in batches:
+
+- log() never blocks: when the queue is full the record is dropped (counted
+  in stats()["dropped"])
+- The writer appends up to LLM_LOG_BATCH records per write, at least every
+  LLM_LOG_FLUSH_SECONDS
+- The file is rotated once it exceeds LLM_LOG_MAX_MB or its first record is
+  older than LLM_LOG_MAX_AGE_HOURS. Rotated files are gzip-compressed to
+  llm_interactions.<rotation time YYYYmmdd-HHMMSS>-<nnn>.jsonl.gz, and only
+  the newest LLM_LOG_BACKUPS are kept
+- Several processes (backend runs, main.py --workers) may share the file:
+  the size check, rotation and each append happen under an fcntl lock on
+  .llm_interactions.lock, and a writer whose file was rotated by another
+  process reopens the new one before writing
+- Sampling: every call is logged with agent, model, duration, error and
+  cache status, but only a LLM_LOG_SAMPLE_RATE fraction of the successful
+  calls keep their prompts and response ("sampled": true). Failed calls are
+  always kept in full. The choice is a hash of the prompts, so the same
+  prompt is always sampled or always not
+
+Pending records are written at exit (atexit) or by flush().
+
+The query tool aggregates per-agent call counts, error rates and latency
+over the current and the rotated files:
+
+    python -m agents.llm_log                       # all agents, all files
+    python -m agents.llm_log --agent Auditor --since 2026-01-01 --json
+
+Configuration (environment variables):
+    LLM_LOG                 Set to 0 to disable the interaction log
+    LLM_LOG_DIR             Directory of the log (default agents/logs)
+    LLM_LOG_MAX_MB          Size that rotates the file (default 50, 0 = never)
+    LLM_LOG_MAX_AGE_HOURS   Age that rotates the file (default 24, 0 = never)
+    LLM_LOG_BACKUPS         Rotated files kept (default 20)
+    LLM_LOG_SAMPLE_RATE     Share of successful calls logged with prompts (default 1.0)
+    LLM_LOG_QUEUE_SIZE      Records waiting to be written before new ones are dropped (default 10000)
+    LLM_LOG_BATCH           Records per write (default 200)
+    LLM_LOG_FLUSH_SECONDS   Longest wait before queued records are written (default 1.0)
+
+Usage:
+    from agents.llm_log import get_llm_logger
+    llm_logger = get_llm_logger()
+    if llm_logger is not None:
+        llm_logger.log({"agent": "Auditor", "model": "llama3.2", ...})
+"""
+
+import os
+import sys
+import gzip
+import json
+import math
+import time
+import zlib
+import queue
+import atexit
+import shutil
+import logging
+import argparse
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+    _HAS_FCNTL = True
+except ImportError:  # Windows: rotation is only coordinated within the process
+    _HAS_FCNTL = False
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+
+LLM_LOG_ENABLED = os.environ.get("LLM_LOG", "1") != "0"
+LLM_LOG_DIR = Path(os.environ.get("LLM_LOG_DIR", Path(__file__).parent / "logs"))
+LLM_LOG_MAX_MB = float(os.environ.get("LLM_LOG_MAX_MB", "50"))
+LLM_LOG_MAX_AGE_HOURS = float(os.environ.get("LLM_LOG_MAX_AGE_HOURS", "24"))
+LLM_LOG_BACKUPS = int(os.environ.get("LLM_LOG_BACKUPS", "20"))
+LLM_LOG_SAMPLE_RATE = float(os.environ.get("LLM_LOG_SAMPLE_RATE", "1.0"))
+LLM_LOG_QUEUE_SIZE = int(os.environ.get("LLM_LOG_QUEUE_SIZE", "10000"))
+LLM_LOG_BATCH = int(os.environ.get("LLM_LOG_BATCH", "200"))
+LLM_LOG_FLUSH_SECONDS = float(os.environ.get("LLM_LOG_FLUSH_SECONDS", "1.0"))
+
+LOG_NAME = "llm_interactions"
+FULL_FIELDS = ("system_prompt", "user_prompt", "response")   # dropped from unsampled records
+
+_STOP = object()
+
+
+# ─── Logger ────────────────────────────────────────────────────────────────────
+
+class LLMInteractionLogger:
+    """Writes interaction records from a bounded queue on a background thread."""
+
+    def __init__(self, log_dir: Path = LLM_LOG_DIR, max_mb: float = LLM_LOG_MAX_MB,
+                 max_age_hours: float = LLM_LOG_MAX_AGE_HOURS, backups: int = LLM_LOG_BACKUPS,
+                 sample_rate: float = LLM_LOG_SAMPLE_RATE, queue_size: int = LLM_LOG_QUEUE_SIZE,
+                 batch: int = LLM_LOG_BATCH, flush_seconds: float = LLM_LOG_FLUSH_SECONDS):
+        """
+        Args:
+            log_dir: Directory of llm_interactions.jsonl and its rotated files
+            max_mb: Size that rotates the file (0 = never)
+            max_age_hours: Age of the first record that rotates the file (0 = never)
+            backups: Rotated files kept
+            sample_rate: Share of successful calls logged with prompts and response
+            queue_size: Records waiting to be written before new ones are dropped
+            batch: Records per write
+            flush_seconds: Longest wait before queued records are written
+        """
+        self.log_dir = Path(log_dir)
+        self.path = self.log_dir / f"{LOG_NAME}.jsonl"
+        self.lock_path = self.log_dir / f".{LOG_NAME}.lock"
+        self.max_bytes = max_mb * 1024 * 1024
+        self.max_age_seconds = max_age_hours * 3600
+        self.backups = backups
+        self.sample_rate = sample_rate
+        self.batch = max(1, batch)
+        self.flush_seconds = flush_seconds
+        self.written = 0
+        self.dropped = 0
+        self.unsampled = 0
+        self.rotations = 0
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+        self._file = None
+        self._lock_fd: Optional[int] = None
+        self._started: Optional[float] = None   # time of the current file's first record
+        self._thread = threading.Thread(target=self._run, name="llm-log", daemon=True)
+        self._thread.start()
+
+    # ── Producer side (agent threads) ─────────────────────────────────────
+
+    def sampled(self, record: Dict) -> bool:
+        """Whether a record keeps its prompts and response."""
+        if record.get("error") or self.sample_rate >= 1.0:
+            return True
+        if self.sample_rate <= 0.0:
+            return False
+        key = f"{record.get('system_prompt', '')}\x00{record.get('user_prompt', '')}".encode("utf-8")
+        return zlib.crc32(key) / 0xFFFFFFFF < self.sample_rate
+
+    def log(self, record: Dict):
+        """Queue a record (never blocks; dropped if the queue is full)."""
+        if self.sampled(record):
+            record = {**record, "sampled": True}
+        else:
+            record = {k: v for k, v in record.items() if k not in FULL_FIELDS}
+            record["sampled"] = False
+            with self._lock:
+                self.unsampled += 1
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def flush(self):
+        """Block until every queued record is written."""
+        self._queue.join()
+
+    def close(self):
+        """Write the pending records and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def stats(self) -> Dict:
+        return {
+            "written": self.written,
+            "dropped": self.dropped,
+            "unsampled": self.unsampled,
+            "rotations": self.rotations,
+            "queued": self._queue.qsize(),
+        }
+
+    # ── Writer thread ─────────────────────────────────────────────────────
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                first = self._queue.get(timeout=self.flush_seconds)
+            except queue.Empty:
+                continue
+            items = [first]
+            while len(items) < self.batch:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [item for item in items if item is not _STOP]
+            stopping = len(records) < len(items)
+            try:
+                if records:
+                    self._write(records)
+            except Exception as e:
+                logger.warning(f"Could not write LLM log: {e}")
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive lock shared by every process writing to log_dir."""
+        if not _HAS_FCNTL:
+            yield
+            return
+        if self._lock_fd is None:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            self._lock_fd = os.open(str(self.lock_path), os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _open(self):
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        if self._started is None:
+            self._started = self._first_record_time() or time.time()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _first_record_time(self) -> Optional[float]:
+        """Time of the first record of an existing log file."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return datetime.fromisoformat(json.loads(f.readline())["timestamp"]).timestamp()
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _write(self, records: List[Dict]):
+        data = "".join(json.dumps(r, default=str) + "\n" for r in records)
+        with self._locked():
+            if self._file is not None and self._rotated_elsewhere():
+                self._file.close()
+                self._file = None
+                self._started = None
+            if self._file is None:
+                self._open()
+            if self._should_rotate():
+                self._rotate()
+                self._open()
+            self._file.write(data)
+            self._file.flush()
+        self.written += len(records)
+
+    def _rotated_elsewhere(self) -> bool:
+        """Whether another process rotated the file this one has open."""
+        try:
+            return os.stat(self.path).st_ino != os.fstat(self._file.fileno()).st_ino
+        except FileNotFoundError:
+            return True
+
+    def _should_rotate(self) -> bool:
+        size = os.fstat(self._file.fileno()).st_size   # includes other processes' appends
+        if not size:
+            return False
+        if self.max_bytes and size >= self.max_bytes:
+            return True
+        return bool(self.max_age_seconds and time.time() - self._started >= self.max_age_seconds)
+
+    def _rotate(self):
+        """Compress the current file to a timestamped .jsonl.gz and prune old ones."""
+        self._file.close()
+        self._file = None
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        sequence = 0
+        target = self.log_dir / f"{LOG_NAME}.{stamp}-{sequence:03d}.jsonl.gz"
+        while target.exists():
+            sequence += 1
+            target = self.log_dir / f"{LOG_NAME}.{stamp}-{sequence:03d}.jsonl.gz"
+        with open(self.path, "rb") as src, gzip.open(target, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        self.path.unlink()
+        self._started = None
+        self.rotations += 1
+        for old in rotated_logs(self.log_dir)[:-self.backups or None]:
+            old.unlink(missing_ok=True)
+        logger.debug(f"Rotated LLM log to {target}")
+
+
+_llm_logger: Optional[LLMInteractionLogger] = None
+_llm_logger_lock = threading.Lock()
+
+
+def get_llm_logger() -> Optional[LLMInteractionLogger]:
+    """Return the shared LLMInteractionLogger, or None if disabled via LLM_LOG=0."""
+    global _llm_logger
+    if not LLM_LOG_ENABLED:
+        return None
+    if _llm_logger is None:
+        with _llm_logger_lock:
+            if _llm_logger is None:
+                _llm_logger = LLMInteractionLogger()
+                atexit.register(_llm_logger.close)
+    return _llm_logger
+
+
+# ─── Query tool ────────────────────────────────────────────────────────────────
+
+def rotated_logs(log_dir: Path) -> List[Path]:
+    """Rotated log files, oldest first."""
+    return sorted(Path(log_dir).glob(f"{LOG_NAME}.*.jsonl.gz"))
+
+
+def iter_records(log_dir: Path = LLM_LOG_DIR) -> Iterator[Dict]:
+    """Records of the rotated files (oldest first), then of the current file."""
+    log_dir = Path(log_dir)
+    current = log_dir / f"{LOG_NAME}.jsonl"
+    for path in rotated_logs(log_dir) + ([current] if current.exists() else []):
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def summarize(records: Iterator[Dict], agent: Optional[str] = None,
+              since: Optional[str] = None) -> Dict[str, Dict]:
+    """
+    Per-agent totals: calls, errors, error rate, cache hits, and the mean /
+    p50 / p95 latency of the calls that reached the model.
+    """
+    durations: Dict[str, List[float]] = {}
+    totals: Dict[str, Dict] = {}
+    for record in records:
+        name = record.get("agent", "unknown")
+        if agent and name != agent:
+            continue
+        if since and str(record.get("timestamp", "")) < since:
+            continue
+        entry = totals.setdefault(name, {"calls": 0, "errors": 0, "cached": 0})
+        entry["calls"] += 1
+        if record.get("error"):
+            entry["errors"] += 1
+        if record.get("cache") == "hit":
+            entry["cached"] += 1
+        else:
+            durations.setdefault(name, []).append(float(record.get("duration_seconds") or 0.0))
+    for name, entry in totals.items():
+        values = durations.get(name, [])
+        entry["error_rate"] = entry["errors"] / entry["calls"]
+        entry["mean_seconds"] = sum(values) / len(values) if values else 0.0
+        entry["p50_seconds"] = _percentile(values, 0.50)
+        entry["p95_seconds"] = _percentile(values, 0.95)
+    return dict(sorted(totals.items()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-agent latency and error rates from the LLM interaction logs")
+    parser.add_argument("--dir", type=Path, default=LLM_LOG_DIR, help="Log directory (default agents/logs)")
+    parser.add_argument("--agent", help="Only this agent")
+    parser.add_argument("--since", help="Only records at or after this ISO timestamp / date")
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of a table")
+    args = parser.parse_args(argv)
+
+    summary = summarize(iter_records(args.dir), agent=args.agent, since=args.since)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return 0
+    print(f"{'agent':22s} {'calls':>7s} {'errors':>7s} {'err %':>6s} {'cached':>7s} "
+          f"{'mean s':>7s} {'p50 s':>7s} {'p95 s':>7s}")
+    for name, s in summary.items():
+        print(f"{name:22s} {s['calls']:7d} {s['errors']:7d} {s['error_rate'] * 100:6.1f} {s['cached']:7d} "
+              f"{s['mean_seconds']:7.2f} {s['p50_seconds']:7.2f} {s['p95_seconds']:7.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+LLM POOL - Bounded Concurrent LLM Calls with Ordered Results
+
+Ollama serves several requests at once (OLLAMA_NUM_PARALLEL), but the agents
+used to send independent prompts one at a time: one batch per confusable
+group in EnhancedAgenticParser.parse, one chunk of five unmatched rows per
+call in AgentOrchestrator.run_discoverer. map_ordered() runs such calls on a
+process-wide pool of LLM_CONCURRENCY threads and returns the results in input
+order, so merging them gives the same result whatever order the calls finish
+in. The pool is shared, so statements mapped concurrently (StatementRunner)
+still have at most LLM_CONCURRENCY prompts in flight together.
+
+Functions run on the pool must not call map_ordered() themselves.
+
+Configuration (environment variables):
+    LLM_CONCURRENCY     Concurrent LLM calls (default 4, 1 = sequential)
+
+Usage:
+    from agents.llm_pool import map_ordered
+    responses = map_ordered(lambda prompt: self._invoke_llm(SYSTEM_PROMPT, prompt), prompts)
+"""
+
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Iterable, List, Optional, TypeVar
+
+from tracing import propagate
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+
+LLM_CONCURRENCY = int(os.environ.get("LLM_CONCURRENCY", "4"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_llm_executor() -> ThreadPoolExecutor:
+    """Shared thread pool for LLM calls (LLM_CONCURRENCY threads)."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=max(1, LLM_CONCURRENCY), thread_name_prefix="llm")
+    return _executor
+
+
+def map_ordered(fn: Callable[[T], R], items: Iterable[T]) -> List[R]:
+    """
+    Apply fn to every item on the shared LLM pool and return the results in
+    input order. If a call raised, its exception is re-raised (the first one
+    in input order) after all calls have finished. With LLM_CONCURRENCY=1
+    the calls run inline, one after another.
+    """
+    items = list(items)
+    if LLM_CONCURRENCY <= 1 or len(items) < 2:
+        return [fn(item) for item in items]
+    executor = get_llm_executor()
+    futures = [executor.submit(propagate(fn), item) for item in items]
+    wait(futures)
+    return [future.result() for future in futures]
@@ -0,0 +1,410 @@
+"""
+MOCK OLLAMA - Local Stand-In Ollama Server for Deterministic Agent Runs
+
+The agent paths (agents/llm_agents.py, enhanced_agentic_parser.py,
+agentic_parser.py) need a running Ollama with a real model, so they could not
+be exercised in CI or on machines without a GPU. MockOllamaServer speaks the
+parts of the Ollama HTTP API that ChatOllama and check_ollama_available() use:
+
+    GET  /api/tags          models offered (see --models)
+    GET  /api/version
+    POST /api/chat          streamed (NDJSON) or single JSON reply
+    POST /api/generate
+    GET  /mock/stats        request counts, answer sources, peak concurrency
+
+Each chat request is answered, in order of precedence, by
+
+1. Replay: a recorded response for the same system + user prompts, from
+   JSONL files in the agents/logs/llm_interactions.jsonl format, rotated
+   .jsonl.gz files included (system_prompt, user_prompt, response; failed
+   and unsampled records are skipped)
+2. Rules: the first rule whose agent and user-prompt regex match. The
+   response is a JSON object, or a string in which \\1 / \\g<name> expand the
+   regex groups
+3. A default answer: a valid "no opinion" JSON object for the agent whose
+   system prompt it is (Auditor, BatchMapper, Verifier, ...), so every
+   parser runs end to end without mapping anything
+
+Answers are delayed by the rule's latency (else --latency) plus up to
+--jitter seconds, drawn deterministically from the prompt hash, so repeated
+runs take the same time. --max-parallel emulates OLLAMA_NUM_PARALLEL:
+further requests queue for a slot, as they do on a real server.
+
+Rules file (JSON):
+    [
+        {"agent": "Auditor", "match": "`(us-gaap_Revenue\\\\w*)`",
+         "response": {"selected_fact": "Total revenue", "confidence": 0.95, "reasoning": "mock"}},
+        {"match": "Cost of sales", "response": "{\\"suggested_fact\\": \\"COGS\\", \\"confidence\\": 0.8}",
+         "latency": 2.0}
+    ]
+
+Usage:
+    python -m agents.mock_ollama --port 11434 --latency 0.5 --max-parallel 4 \\
+        --replay agents/logs/llm_interactions.jsonl --rules mock_rules.json
+
+    from agents.mock_ollama import MockOllamaServer
+    with MockOllamaServer(latency=0.1) as server:
+        orchestrator = AgentOrchestrator(base_url=server.base_url)
+"""
+
+import re
+import sys
+import gzip
+import json
+import time
+import random
+import hashlib
+import logging
+import argparse
+import threading
+from pathlib import Path
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Agent detection ───────────────────────────────────────────────────────────
+
+# Distinctive part of each agent's system prompt -> agent name
+AGENT_SIGNATURES = [
+    ("Senior Financial Data Auditor", "Auditor"),
+    ("makes final decisions on financial data mapping", "Finalizer"),
+    ("Financial Statement Discovery Agent", "Discoverer"),
+    ("specializing in identifying sum/total rows", "SumRowValidator"),
+    ("specializing in date column selection", "DateColumnValidator"),
+    ("Financial Row Classifier", "RowClassifier"),
+    ("map MULTIPLE related rows", "BatchMapper"),
+    ("verifies financial statement mappings", "Verifier"),
+    ("map rows from raw financial statements", "Mapper"),
+    ("initial mapping has some issues", "ValidationFix"),
+]
+
+# Valid answers that map nothing, in each agent's response format
+DEFAULT_RESPONSES = {
+    "Auditor": {"selected_fact": None, "confidence": 0.0, "reasoning": "mock: no opinion"},
+    "Finalizer": {"final_fact": None, "confidence": 0.0, "agrees_with_auditor": True,
+                  "reasoning": "mock: no opinion"},
+    "Discoverer": {"suggested_fact": None, "confidence": 0.0, "reasoning": "mock: no opinion"},
+    "SumRowValidator": {"is_sum_row": False, "confidence": 0.0, "component_rows": [],
+                        "reasoning": "mock: no opinion"},
+    "DateColumnValidator": {"selected_columns": [], "rejected_columns": [], "confidence": 0.0,
+                            "reasoning": "mock: no opinion"},
+    "RowClassifier": {"financial_concept": None, "is_relevant": False, "confidence": 0.0,
+                      "reasoning": "mock: no opinion"},
+    "BatchMapper": {"mappings": []},
+    "Verifier": {"is_valid": True, "issues": [], "suggestions": [], "confidence": 1.0,
+                 "reasoning": "mock: no opinion"},
+    "Mapper": {"mappings": []},
+    "ValidationFix": {"corrections": [], "missing_items": []},
+}
+
+
+def detect_agent(system_prompt: str) -> str:
+    """Agent name of a system prompt ('unknown' if none matches)."""
+    for signature, agent in AGENT_SIGNATURES:
+        if signature in (system_prompt or ""):
+            return agent
+    return "unknown"
+
+
+def _prompt_key(system_prompt: str, user_prompt: str) -> str:
+    return hashlib.sha256(f"{system_prompt}\x00{user_prompt}".encode("utf-8")).hexdigest()
+
+
+# ─── Responder ─────────────────────────────────────────────────────────────────
+
+class MockResponder:
+    """Chooses the answer and latency of a prompt (replay → rules → default)."""
+
+    def __init__(self, rules: Optional[List[Dict]] = None, replay_files: Optional[List[Path]] = None,
+                 latency: float = 0.0, jitter: float = 0.0):
+        """
+        Args:
+            rules: [{"agent"?, "match"?, "response", "latency"?}] tried in order
+            replay_files: JSONL files of recorded interactions
+            latency: Seconds added to every answer without a rule latency
+            jitter: Up to this many extra seconds, deterministic per prompt
+        """
+        self.rules = [dict(rule, _regex=re.compile(rule["match"], re.S) if rule.get("match") else None)
+                      for rule in (rules or [])]
+        self.latency = latency
+        self.jitter = jitter
+        self.recorded: Dict[str, str] = {}
+        for path in replay_files or []:
+            self.load_replay(path)
+
+    def load_replay(self, path: Path):
+        """Load recorded responses; later records of the same prompts win."""
+        loaded = 0
+        opener = gzip.open if str(path).endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("response") and not record.get("error"):
+                    self.recorded[_prompt_key(record.get("system_prompt", ""), record.get("user_prompt", ""))] = \
+                        record["response"]
+                    loaded += 1
+        logger.info(f"[MockOllama] Loaded {loaded} recorded responses from {path}")
+
+    def respond(self, system_prompt: str, user_prompt: str) -> Tuple[str, str, str, float]:
+        """
+        Returns:
+            (content, source, agent, latency seconds) - source is 'replay',
+            'rule' or 'default'
+        """
+        agent = detect_agent(system_prompt)
+        key = _prompt_key(system_prompt, user_prompt)
+        delay = self.latency
+        if key in self.recorded:
+            content, source = self.recorded[key], "replay"
+        else:
+            content, source = None, "default"
+            for rule in self.rules:
+                if rule.get("agent") and rule["agent"] != agent:
+                    continue
+                match = rule["_regex"].search(user_prompt) if rule["_regex"] else None
+                if rule["_regex"] and match is None:
+                    continue
+                response = rule["response"]
+                if isinstance(response, str):
+                    content = match.expand(response) if match else response
+                else:
+                    content = json.dumps(response)
+                source = "rule"
+                delay = rule.get("latency", self.latency)
+                break
+            if content is None:
+                content = json.dumps(DEFAULT_RESPONSES.get(agent, {}))
+        if self.jitter:
+            delay += random.Random(key).uniform(0.0, self.jitter)
+        return content, source, agent, delay
+
+
+# ─── HTTP server ───────────────────────────────────────────────────────────────
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "MockOllama/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug("[MockOllama] " + format % args)
+
+    def _send_json(self, status: int, body: Dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        mock: "MockOllamaServer" = self.server.mock
+        if self.path == "/api/tags":
+            self._send_json(200, {"models": [
+                {"name": f"{name}:latest", "model": f"{name}:latest", "size": 0, "digest": "mock",
+                 "modified_at": mock.started_at, "details": {"family": "mock"}}
+                for name in mock.models
+            ]})
+        elif self.path == "/api/version":
+            self._send_json(200, {"version": "0.0.0-mock"})
+        elif self.path == "/mock/stats":
+            self._send_json(200, mock.stats())
+        elif self.path == "/":
+            self._send_json(200, {"status": "Ollama is running"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        mock: "MockOllamaServer" = self.server.mock
+        if self.path not in ("/api/chat", "/api/generate"):
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        except json.JSONDecodeError as e:
+            self._send_json(400, {"error": f"invalid JSON: {e}"})
+            return
+
+        model = request.get("model", "")
+        if not mock.has_model(model):
+            self._send_json(404, {"error": f"model '{model}' not found, try pulling it first"})
+            return
+
+        if self.path == "/api/chat":
+            messages = request.get("messages") or []
+            system_prompt = "\n".join(m.get("content", "") for m in messages if m.get("role") == "system")
+            user_prompt = "\n".join(m.get("content", "") for m in messages if m.get("role") == "user")
+        else:
+            system_prompt = request.get("system", "")
+            user_prompt = request.get("prompt", "")
+
+        start = time.perf_counter()
+        content, source, agent, delay = mock.responder.respond(system_prompt, user_prompt)
+        with mock.slot():
+            time.sleep(delay)
+        mock.count(agent, source)
+        duration_ns = int((time.perf_counter() - start) * 1e9)
+
+        created_at = datetime.now(timezone.utc).isoformat()
+        final = {
+            "model": model, "created_at": created_at, "done": True, "done_reason": "stop",
+            "total_duration": duration_ns, "load_duration": 0,
+            "prompt_eval_count": len((system_prompt + user_prompt).split()), "prompt_eval_duration": 0,
+            "eval_count": len(content.split()), "eval_duration": duration_ns,
+        }
+        if self.path == "/api/chat":
+            reply, empty = {"message": {"role": "assistant", "content": content}}, \
+                {"message": {"role": "assistant", "content": ""}}
+        else:
+            reply, empty = {"response": content}, {"response": ""}
+
+        if request.get("stream", True):
+            # NDJSON: the whole answer in one chunk, then the closing stats chunk
+            chunks = [{"model": model, "created_at": created_at, **reply, "done": False}, {**final, **empty}]
+            data = b"".join(json.dumps(chunk).encode("utf-8") + b"\n" for chunk in chunks)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self._send_json(200, {**final, **reply})
+
+
+class MockOllamaServer:
+    """
+    Mock Ollama HTTP server on a background thread. Use as a context
+    manager, or start() / stop().
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 models: Tuple[str, ...] = ("llama3.2", "mistral"),
+                 rules: Optional[List[Dict]] = None, replay_files: Optional[List[Path]] = None,
+                 latency: float = 0.0, jitter: float = 0.0, max_parallel: int = 0):
+        """
+        Args:
+            host: Interface to listen on
+            port: Port (0 = any free port, see base_url)
+            models: Models offered; requests for others get Ollama's 404
+            rules, replay_files, latency, jitter: See MockResponder
+            max_parallel: Requests answered at once (0 = unlimited)
+        """
+        self.models = list(models)
+        self.responder = MockResponder(rules, replay_files, latency, jitter)
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self._slots = threading.BoundedSemaphore(max_parallel) if max_parallel > 0 else None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._max_in_flight = 0
+        self._requests = 0
+        self._by_source: Dict[str, int] = {}
+        self._by_agent: Dict[str, int] = {}
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def has_model(self, model: str) -> bool:
+        return not self.models or model.split(":")[0] in self.models
+
+    def slot(self):
+        """Context manager holding one of the max_parallel answer slots."""
+        server = self
+
+        class _Slot:
+            def __enter__(self):
+                if server._slots is not None:
+                    server._slots.acquire()
+                with server._lock:
+                    server._in_flight += 1
+                    server._max_in_flight = max(server._max_in_flight, server._in_flight)
+
+            def __exit__(self, *exc):
+                with server._lock:
+                    server._in_flight -= 1
+                if server._slots is not None:
+                    server._slots.release()
+                return False
+
+        return _Slot()
+
+    def count(self, agent: str, source: str):
+        with self._lock:
+            self._requests += 1
+            self._by_source[source] = self._by_source.get(source, 0) + 1
+            self._by_agent[agent] = self._by_agent.get(agent, 0) + 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "by_source": dict(self._by_source),
+                "by_agent": dict(self._by_agent),
+                "max_in_flight": self._max_in_flight,
+            }
+
+    def start(self) -> "MockOllamaServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-ollama", daemon=True)
+        self._thread.start()
+        logger.info(f"[MockOllama] Serving {self.models} at {self.base_url}")
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mock Ollama server for deterministic agent runs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--models", default="llama3.2,mistral", help="Comma-separated models to offer")
+    parser.add_argument("--rules", type=Path, help="JSON file with a list of response rules")
+    parser.add_argument("--replay", type=Path, action="append", default=[],
+                        help="llm_interactions.jsonl to replay (repeatable)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per answer")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Up to this many extra seconds per answer")
+    parser.add_argument("--max-parallel", type=int, default=0, help="Answers at once (0 = unlimited)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    rules = json.loads(args.rules.read_text()) if args.rules else []
+    server = MockOllamaServer(
+        host=args.host, port=args.port, models=tuple(m.strip() for m in args.models.split(",") if m.strip()),
+        rules=rules, replay_files=args.replay, latency=args.latency, jitter=args.jitter,
+        max_parallel=args.max_parallel,
+    )
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logger.info(f"[MockOllama] Stats: {server.stats()}")
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
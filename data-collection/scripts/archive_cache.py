@@ -0,0 +1,247 @@
+"""
+ARCHIVE CACHE - Permanent, Content-Addressed Cache for EDGAR Archive Documents
+
+Everything under https://www.sec.gov/Archives/edgar/data/{cik}/{accession}/
+is immutable once filed (FilingSummary.xml, R*.htm statements, *_cal.xml,
+Form 4 / 13F XML, the filing index). This cache stores those documents on
+disk forever (no TTL) so re-collections and mapping experiments never
+download the same file twice.
+
+Layout (under ARCHIVE_CACHE_DIR):
+    urls/<h[:2]>/<h>.json       h = sha256(url); {url, sha256, content_type, size}
+    objects/<s[:2]>/<s>.zz      s = sha256(content); zlib-compressed bytes
+    latest/<h[:2]>/<h>.zz       latest copy of a mutable endpoint (see below)
+
+Objects are content-addressed, so identical documents referenced by several
+URLs are stored once. Writes are atomic (temp file + os.replace) so several
+processes can share the cache. URLs are the full request URL, query string
+included.
+
+Only archive documents go into the content-addressed store: it is never
+pruned, so a mutable endpoint stored there would add a new object every
+time it changed. edgar_client keeps the latest copy of mutable endpoints
+(submissions, companyfacts, company_tickers.json, browse-edgar queries) in
+latest/ instead, one file per URL overwritten on every fetch. Those are
+never served online, but offline mode (EDGAR_OFFLINE=1) replays them
+together with archive documents, so a rerun after mapping changes needs no
+network at all; anything missing raises OfflineCacheMiss instead of
+touching the network.
+
+Configuration (environment variables):
+    EDGAR_ARCHIVE_CACHE_DIR   Cache root (default .api_cache/edgar/archive)
+    EDGAR_ARCHIVE_CACHE       Set to 0 to disable the cache
+    EDGAR_OFFLINE             Set to 1 to serve from cache only
+
+Usage:
+    from archive_cache import get_archive_cache, is_archive_url
+    cache = get_archive_cache()
+    if is_archive_url(url):
+        hit = cache.get(url)   # -> (bytes, content_type) or None
+    else:
+        cache.put_latest(url, content, content_type)
+"""
+
+import os
+import re
+import json
+import zlib
+import hashlib
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+
+_SCRIPT_DIR = Path(__file__).parent
+_PROJECT_ROOT = _SCRIPT_DIR.parent.parent  # data-collection/scripts -> project root
+ARCHIVE_CACHE_DIR = Path(os.environ.get(
+    "EDGAR_ARCHIVE_CACHE_DIR", _PROJECT_ROOT / ".api_cache" / "edgar" / "archive"
+))
+ARCHIVE_CACHE_ENABLED = os.environ.get("EDGAR_ARCHIVE_CACHE", "1") != "0"
+
+COMPRESSION_LEVEL = 6
+
+# /Archives/edgar/data/{cik}/{18-digit accession}[/...]
+_ARCHIVE_URL_RE = re.compile(
+    r'^https?://www\.sec\.gov/Archives/edgar/data/\d+/\d{18}(?:/|$)', re.IGNORECASE
+)
+
+
+def is_archive_url(url: str) -> bool:
+    """True if the URL points inside an (immutable) filing accession folder."""
+    return bool(_ARCHIVE_URL_RE.match(url))
+
+
+def is_offline() -> bool:
+    """True when EDGAR_OFFLINE=1 (no network access for SEC requests)."""
+    return os.environ.get("EDGAR_OFFLINE", "0") == "1"
+
+
+class OfflineCacheMiss(requests.ConnectionError):
+    """Raised in offline mode when a request cannot be served from disk."""
+
+
+# ─── Cache ─────────────────────────────────────────────────────────────────────
+
+class ArchiveCache:
+    """
+    Content-addressed, compressed on-disk store keyed by URL.
+    """
+
+    def __init__(self, root: Path = ARCHIVE_CACHE_DIR):
+        """
+        Args:
+            root: Directory holding the urls/ and objects/ trees
+        """
+        self.root = Path(root)
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def _sha256(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def _url_path(self, url: str) -> Path:
+        h = self._sha256(url.encode())
+        return self.root / "urls" / h[:2] / f"{h}.json"
+
+    def _object_path(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / f"{digest}.zz"
+
+    def _latest_path(self, url: str) -> Path:
+        h = self._sha256(url.encode())
+        return self.root / "latest" / h[:2] / f"{h}.zz"
+
+    @staticmethod
+    def _atomic_write(path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def _count(self, hit: bool):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, url: str) -> Optional[Tuple[bytes, str]]:
+        """
+        Look up a URL.
+
+        Returns:
+            (content, content_type) or None on a miss / corrupt entry
+        """
+        url_path = self._url_path(url)
+        try:
+            with open(url_path) as f:
+                entry = json.load(f)
+            with open(self._object_path(entry["sha256"]), "rb") as f:
+                content = zlib.decompress(f.read())
+        except FileNotFoundError:
+            self._count(False)
+            return None
+        except Exception as exc:
+            logger.warning("Archive cache entry for %s unreadable: %s", url, exc)
+            self._count(False)
+            return None
+
+        if self._sha256(content) != entry["sha256"]:
+            logger.warning("Archive cache checksum mismatch for %s; ignoring entry", url)
+            self._count(False)
+            return None
+
+        self._count(True)
+        return content, entry.get("content_type", "")
+
+    def put(self, url: str, content: bytes, content_type: str = "") -> str:
+        """
+        Store a document.
+
+        Returns:
+            sha256 digest of the content
+        """
+        digest = self._sha256(content)
+        object_path = self._object_path(digest)
+        if not object_path.exists():
+            self._atomic_write(object_path, zlib.compress(content, COMPRESSION_LEVEL))
+        entry = {
+            "url": url,
+            "sha256": digest,
+            "content_type": content_type,
+            "size": len(content),
+        }
+        self._atomic_write(self._url_path(url), json.dumps(entry).encode())
+        return digest
+
+    def get_latest(self, url: str) -> Optional[Tuple[bytes, str]]:
+        """
+        Look up the latest stored copy of a mutable endpoint.
+
+        Returns:
+            (content, content_type) or None on a miss / corrupt entry
+        """
+        try:
+            with open(self._latest_path(url), "rb") as f:
+                header, content = zlib.decompress(f.read()).split(b"\n", 1)
+            entry = json.loads(header)
+        except FileNotFoundError:
+            self._count(False)
+            return None
+        except Exception as exc:
+            logger.warning("Archive cache copy of %s unreadable: %s", url, exc)
+            self._count(False)
+            return None
+
+        if entry.get("url") != url or entry.get("size") != len(content):
+            logger.warning("Archive cache copy of %s is inconsistent; ignoring it", url)
+            self._count(False)
+            return None
+
+        self._count(True)
+        return content, entry.get("content_type", "")
+
+    def put_latest(self, url: str, content: bytes, content_type: str = ""):
+        """Store a mutable endpoint's response, replacing the previous copy."""
+        header = json.dumps({"url": url, "content_type": content_type, "size": len(content)})
+        self._atomic_write(self._latest_path(url),
+                           zlib.compress(header.encode() + b"\n" + content, COMPRESSION_LEVEL))
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
+
+
+_cache: Optional[ArchiveCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_archive_cache() -> Optional[ArchiveCache]:
+    """Return the shared ArchiveCache, or None if disabled via EDGAR_ARCHIVE_CACHE=0."""
+    global _cache
+    if not ARCHIVE_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ArchiveCache()
+    return _cache
@@ -0,0 +1,214 @@
+"""
+BATCH RUNNER - Multi-Ticker Collection on a Process Pool
+
+Collecting several tickers used to mean a shell loop around
+`main.py --ticker`, paying interpreter start-up and the pandas / bs4 /
+langchain imports for every ticker. `main.py --tickers` / `--tickers-file`
+now collects them in one command on a pool of `--workers` processes:
+
+    parent                                  worker processes (spawned once)
+    ──────                                  ───────────────────────────────
+    read tickers, start pool        ──►     collect ticker, write OUTPUT/TICKER/
+    gather TickerOutcome per ticker  ◄──    next ticker ...
+    log + write batch_report.json
+
+Workers are spawned rather than forked: the parent's EdgarClient (its
+fcntl-locked rate-limit descriptor, HTTP session) and sqlite connections
+are not inherited. Each worker imports everything once and then collects
+ticker after ticker. Nothing else has to be coordinated, because everything
+the workers share is already process-safe:
+
+- the EDGAR token bucket is an fcntl-locked state file (EDGAR_MAX_RPS holds
+  for the whole batch, see edgar_client.py)
+- the archive cache, ticker index, companyfacts store and parse artifacts
+  are written atomically (temp file + os.replace)
+- the LLM response cache, candidate memo and mapping memory are sqlite files
+  in WAL mode
+
+Each ticker's CSV files are written by its worker to OUTPUT/TICKER/. A
+ticker that raises is recorded as failed with its error and the batch goes
+on. If a worker process dies, the tickers it took down with the pool are
+retried one at a time in a fresh single-worker pool, so a crash only fails
+the ticker that caused it. The consolidated report (status, seconds,
+filings, statements, stage timing and error of every ticker) is logged and
+written to OUTPUT/batch_report.json.
+
+Configuration (environment variables):
+    BATCH_WORKERS       Worker processes when --workers is not given (default 2)
+
+Usage:
+    from batch_runner import run_batch, read_tickers_file
+    report = run_batch(["AAPL", "MSFT"], collect_ticker, workers=4, options={...})
+    report.write(Path(output_dir) / "batch_report.json")
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import multiprocessing
+from pathlib import Path
+from dataclasses import dataclass, field, asdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", "2"))
+
+REPORT_FILE_NAME = "batch_report.json"
+
+
+# ─── Ticker lists ──────────────────────────────────────────────────────────────
+
+def parse_tickers(values: Iterable[str]) -> List[str]:
+    """
+    Normalise ticker arguments: split on commas / whitespace, upper-case,
+    drop duplicates (first occurrence wins).
+    """
+    tickers = []
+    for value in values:
+        for ticker in re.split(r"[\s,]+", value.strip()):
+            ticker = ticker.upper()
+            if ticker and ticker not in tickers:
+                tickers.append(ticker)
+    return tickers
+
+
+def read_tickers_file(path) -> List[str]:
+    """Tickers of a file: one or more per line, '#' starts a comment."""
+    with open(path) as f:
+        return parse_tickers(line.split("#", 1)[0] for line in f)
+
+
+# ─── Outcomes and report ───────────────────────────────────────────────────────
+
+@dataclass
+class TickerOutcome:
+    """Result of one ticker, returned by the worker (picklable, JSON serialisable)."""
+    ticker: str
+    status: str                        # 'ok' or 'failed'
+    seconds: float = 0.0
+    filings: int = 0                   # filings with mapped statements
+    statements: int = 0
+    output: Optional[str] = None       # directory of the ticker's CSV files
+    error: Optional[str] = None
+    pid: Optional[int] = None
+    timing: Dict = field(default_factory=dict)   # tracing summary of the ticker
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+
+@dataclass
+class BatchReport:
+    """Outcomes of a batch, in input order."""
+    outcomes: List[TickerOutcome]
+    workers: int
+    seconds: float
+
+    @property
+    def failed(self) -> List[TickerOutcome]:
+        return [o for o in self.outcomes if not o.ok]
+
+    def as_dict(self) -> Dict:
+        busy = sum(o.seconds for o in self.outcomes)
+        return {
+            "tickers": len(self.outcomes),
+            "succeeded": len(self.outcomes) - len(self.failed),
+            "failed": [o.ticker for o in self.failed],
+            "workers": self.workers,
+            "seconds": round(self.seconds, 3),
+            "ticker_seconds": round(busy, 3),
+            "outcomes": [asdict(o) for o in self.outcomes],
+        }
+
+    def write(self, path) -> Path:
+        """Write as_dict() as JSON to path (directories are created)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.as_dict(), f, indent=2, default=str)
+        return path
+
+    def log(self, level: int = logging.INFO):
+        """Log one line per ticker, slowest first, and the batch totals."""
+        logger.log(level, f"Batch report ({len(self.outcomes)} tickers, {self.workers} workers, "
+                          f"{self.seconds:.1f}s):")
+        for o in sorted(self.outcomes, key=lambda o: -o.seconds):
+            stages = o.timing.get("by_name", {})
+            slowest = max(stages, key=lambda n: stages[n]["total_s"], default=None) if stages else None
+            detail = o.error if not o.ok else (f"slowest stage {slowest} {stages[slowest]['total_s']:.1f}s"
+                                               if slowest else "")
+            logger.log(level, f"  {o.ticker:8s} {o.status:6s} {o.seconds:7.1f}s "
+                              f"filings={o.filings:3d} statements={o.statements:3d}  {detail}")
+        logger.log(level, f"  {len(self.outcomes) - len(self.failed)} succeeded, {len(self.failed)} failed"
+                          + (f": {', '.join(o.ticker for o in self.failed)}" if self.failed else ""))
+
+
+# ─── Pool ──────────────────────────────────────────────────────────────────────
+
+def _failed(ticker: str, error: str) -> TickerOutcome:
+    return TickerOutcome(ticker=ticker, status="failed", error=error)
+
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def run_batch(tickers: List[str], collect: Callable[[str, Dict], TickerOutcome],
+              workers: int = BATCH_WORKERS, options: Optional[Dict] = None) -> BatchReport:
+    """
+    Collect every ticker with collect(ticker, options) on a process pool.
+
+    Args:
+        tickers: Tickers in report order
+        collect: Module-level function run in the workers; it should catch
+            its own errors and return a failed TickerOutcome
+        workers: Worker processes (capped at the number of tickers)
+        options: Picklable keyword options handed to every collect() call
+
+    Returns:
+        BatchReport with one outcome per ticker
+    """
+    options = options or {}
+    workers = max(1, min(workers, len(tickers) or 1))
+    start = time.perf_counter()
+    outcomes: Dict[str, TickerOutcome] = {}
+    lost: List[str] = []
+
+    logger.info(f"Collecting {len(tickers)} tickers on {workers} worker processes")
+    with _pool(workers) as pool:
+        futures = {pool.submit(collect, ticker, options): ticker for ticker in tickers}
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                outcomes[ticker] = future.result()
+            except BrokenProcessPool:
+                lost.append(ticker)
+            except Exception as e:
+                outcomes[ticker] = _failed(ticker, f"{type(e).__name__}: {e}")
+            else:
+                o = outcomes[ticker]
+                logger.info(f"[batch] {ticker} {o.status} in {o.seconds:.1f}s "
+                            f"({len(outcomes)}/{len(tickers)} done)")
+
+    # A dead worker breaks the whole pool: retry its tickers one at a time
+    for ticker in sorted(lost, key=tickers.index):
+        logger.warning(f"[batch] Worker process died; retrying {ticker} alone")
+        with _pool(1) as pool:
+            try:
+                outcomes[ticker] = pool.submit(collect, ticker, options).result()
+            except BrokenProcessPool:
+                outcomes[ticker] = _failed(ticker, "worker process died")
+            except Exception as e:
+                outcomes[ticker] = _failed(ticker, f"{type(e).__name__}: {e}")
+
+    return BatchReport(outcomes=[outcomes[t] for t in tickers], workers=workers,
+                       seconds=time.perf_counter() - start)
@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""
+PARSING PIPELINE BENCHMARK - Matching Modes and Pipeline Stages over a Fixed Corpus
+
+Maps every statement of a fixed offline corpus with each USE_MATCHING mode
+    legacy     first-match-wins
+    scoring    score-based selection
+    pipeline   ParsingPipeline (regex candidates, temporal, summation, selection, discovery)
+    enhanced   EnhancedAgenticParser (falls back like FinancialStatement.map_facts does)
+and reports per mode and per stage:
+    wall time (best of --repeat, after one warm-up pass), rows/second
+    allocation peak per stage (tracemalloc, in a separate untimed pass)
+    mapping accuracy against a golden set of row -> fact answers
+
+Filings are mapped newest first per ticker with the mapped statements of
+newer filings as history, like a collection, so the temporal stage runs.
+Stages are measured by wrapping
+    candidates   HybridMatcher.find_all_row_candidates
+    temporal     TemporalValidator.validate_all_candidates
+    summation    SummationChecker.score_all_candidates
+    selection    ParsingPipeline._select_best_mappings
+    discovery    AgentOrchestrator.discover_missing_items
+    enhanced     EnhancedAgenticParser.parse
+    map          statement construction + get_mapped_df (every mode)
+Times are inclusive: the enhanced parser runs the deterministic pipeline
+inside its own stage. "engines" shows which mapper actually ran per mode
+(enhanced falls back to scoring with DISABLE_LLM=1 and to the pipeline
+without langchain).
+
+The corpus is the parse artifact store written by every collection
+(parse_artifacts.py; --corpus DIR for a frozen copy, --tickers to select)
+or, with --fixtures or an empty store, the R file fixtures in
+test/fixtures/r_files. The golden set maps "<ticker>/<accession>/<statement>"
+to {row tag: expected fact or null}; benchmarks/golden/fixtures.json covers
+the fixtures. --write-golden seeds one from a mode's answers for review.
+
+The LLM is disabled (DISABLE_LLM=1) unless --llm or --mock-llm (starts
+agents/mock_ollama.py on port 11434) is given. The candidate memo, mapping
+memory and LLM response cache are off unless enabled in the environment, so
+every pass does the same work.
+
+Results are saved as JSON with --output; --compare BASELINE.json prints the
+change per mode and exits with status 1 when a mode got slower than
+--time-tolerance or less accurate than --accuracy-tolerance.
+
+Usage:
+    python benchmarks/bench_parsing_pipeline.py
+    python benchmarks/bench_parsing_pipeline.py --tickers AAPL MSFT --repeat 5 --output bench.json
+    python benchmarks/bench_parsing_pipeline.py --modes scoring pipeline --compare bench.json
+    python benchmarks/bench_parsing_pipeline.py --tickers AAPL --write-golden golden/aapl.json
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import platform
+import argparse
+import functools
+import subprocess
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Same work on every pass: no memoised candidates, learned mappings or cached answers
+for _name in ("CANDIDATE_MEMO", "MAPPING_MEMORY", "LLM_CACHE"):
+    os.environ.setdefault(_name, "0")
+
+import pandas as pd
+
+from Filling import Filling
+from constants import GAAP
+from statement_parser import parse_statement_lxml
+from parse_artifacts import PARSE_ARTIFACTS_DIR, ParseArtifactStore, StatementArtifact, STATEMENT_CLASSES
+from hybrid_matcher import HybridMatcher
+from temporal_validator import TemporalValidator
+from summation_checker import SummationChecker
+from pipeline import ParsingPipeline
+from agents import AgentOrchestrator
+from enhanced_agentic_parser import EnhancedAgenticParser
+
+BENCH_DIR = Path(__file__).parent
+FIXTURES_DIR = BENCH_DIR.parent / "test" / "fixtures" / "r_files"
+FIXTURES_GOLDEN = BENCH_DIR / "golden" / "fixtures.json"
+
+MODES = ["legacy", "scoring", "pipeline", "enhanced"]
+RESULTS_VERSION = 1
+
+STAGE_METHODS = [
+    ("candidates", HybridMatcher, "find_all_row_candidates"),
+    ("temporal", TemporalValidator, "validate_all_candidates"),
+    ("summation", SummationChecker, "score_all_candidates"),
+    ("selection", ParsingPipeline, "_select_best_mappings"),
+    ("discovery", AgentOrchestrator, "discover_missing_items"),
+    ("enhanced", EnhancedAgenticParser, "parse"),
+]
+
+
+class CorpusStatement(NamedTuple):
+    key: str            # "<ticker>/<accession>/<statement>", key of the golden set
+    group: str          # filings mapped in sequence, sharing history (ticker, 10-K / 10-Q)
+    report_date: str
+    statement_name: str
+    artifact: StatementArtifact
+    cal_facts: dict
+
+
+# ─── Corpus ────────────────────────────────────────────────────────────────────
+
+def _fixture_filling(quarterly: bool) -> Filling:
+    filing = Filling.__new__(Filling)
+    filing.quarterly = quarterly
+    filing.yearly = not quarterly
+    filing.facts_table = None
+    filing.taxonomy = GAAP
+    filing.unit_multiplier_set = []
+    return filing
+
+
+def load_fixture_corpus() -> List[CorpusStatement]:
+    """The R file fixtures, parsed like Filling.process_one_statement does."""
+    corpus = []
+    for path in sorted(FIXTURES_DIR.glob("*.htm")):
+        statement_name = "balance_sheet" if path.stem.startswith("balance_sheet") else "income_statement"
+        quarterly = "quarterly" in path.stem
+        filing = _fixture_filling(quarterly)
+        columns, values, dates, sums, rows_text, sections, units = \
+            filing.extract_columns_values_and_dates_from_statement(parse_statement_lxml(path.read_bytes()),
+                                                                   statement_name)
+        og_df = filing.create_dataframe_of_statement_values_columns_dates(values, columns, dates)
+        og_df = og_df.drop_duplicates().T.round(2)
+        corpus.append(CorpusStatement(
+            key=f"fixtures/{path.stem}/{statement_name}", group=f"fixtures/{path.stem}",
+            report_date=str(og_df.columns[0].date()), statement_name=statement_name,
+            artifact=StatementArtifact(og_df, sums, rows_text, sections, units), cal_facts={},
+        ))
+    return corpus
+
+
+def load_artifact_corpus(root: Path, tickers: Optional[List[str]] = None,
+                         years: Optional[int] = None) -> List[CorpusStatement]:
+    """Stored filings (newest first per ticker and form), at most `years` per ticker and form."""
+    store = ParseArtifactStore(root)
+    per_group = defaultdict(list)
+    for manifest in store.filings():
+        if tickers and manifest["ticker"] not in {t.upper() for t in tickers}:
+            continue
+        per_group[(manifest["ticker"], manifest["quarterly"])].append(manifest)
+
+    corpus = []
+    for (ticker, quarterly), manifests in sorted(per_group.items()):
+        if years is not None:
+            manifests = manifests[:years * 4 if quarterly else years]
+        group = f"{ticker}/{'10-Q' if quarterly else '10-K'}"
+        for manifest in manifests:
+            cal_facts = store.load_calc_graph(manifest) or {}
+            for statement_name in manifest["statements"]:
+                artifact = store.load_statement(manifest["cik"], manifest["accession_number"], statement_name)
+                if artifact is None or statement_name not in STATEMENT_CLASSES:
+                    continue
+                corpus.append(CorpusStatement(
+                    key=f"{ticker}/{manifest['accession_number']}/{statement_name}", group=group,
+                    report_date=manifest["report_date"], statement_name=statement_name,
+                    artifact=artifact, cal_facts=cal_facts,
+                ))
+    return corpus
+
+
+# ─── Stage probes ──────────────────────────────────────────────────────────────
+
+class StageProfiler:
+    """
+    Wall time and (while tracemalloc is tracing) allocation peak of each stage.
+
+    Peaks are relative to the memory in use when the stage starts; a nested
+    stage's peak also counts towards the stage around it.
+    """
+
+    def __init__(self):
+        self.stats: Dict[str, dict] = {}
+        self._stack: List[list] = []
+        self._originals = []
+
+    def reset(self):
+        self.stats = {}
+
+    def measure(self, stage: str, fn, *args, **kwargs):
+        tracing = tracemalloc.is_tracing()
+        frame = [tracemalloc.get_traced_memory()[0] if tracing else 0, 0]  # [start, max absolute peak]
+        if tracing:
+            tracemalloc.reset_peak()
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            self._stack.pop()
+            entry = self.stats.setdefault(stage, {"calls": 0, "seconds": 0.0, "peak_kb": 0.0})
+            entry["calls"] += 1
+            entry["seconds"] += seconds
+            if tracing:
+                peak = max(tracemalloc.get_traced_memory()[1], frame[1])
+                entry["peak_kb"] = max(entry["peak_kb"], (peak - frame[0]) / 1024)
+                if self._stack:
+                    self._stack[-1][1] = max(self._stack[-1][1], peak)
+
+    def __enter__(self):
+        for stage, cls, name in STAGE_METHODS:
+            original = getattr(cls, name)
+
+            @functools.wraps(original)
+            def probe(*args, _stage=stage, _original=original, **kwargs):
+                return self.measure(_stage, _original, *args, **kwargs)
+
+            self._originals.append((cls, name, original))
+            setattr(cls, name, probe)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        for cls, name, original in reversed(self._originals):
+            setattr(cls, name, original)
+        self._originals = []
+        return False
+
+
+# ─── Runs ──────────────────────────────────────────────────────────────────────
+
+def _engine(statement, mode: str) -> str:
+    if getattr(statement, "_enhanced_result", None) is not None:
+        return "enhanced"
+    if getattr(statement, "_pipeline_result", None) is not None:
+        return "pipeline"
+    return mode if mode in ("legacy", "scoring") else "scoring"
+
+
+def map_corpus(corpus: List[CorpusStatement], mode: str, profiler: StageProfiler) -> dict:
+    """
+    One pass of a mode over the corpus.
+
+    Returns:
+        {"predictions": {key: {row: fact}}, "engines": {engine: statements}, "errors": n}
+    """
+    os.environ["USE_MATCHING"] = mode
+    history = defaultdict(dict)   # (group, statement) -> {report_date: mapped_df}
+    predictions, engines, errors = {}, defaultdict(int), 0
+    for item in corpus:
+        artifact = item.artifact
+        inputs = (artifact.og_df.copy(), list(artifact.rows_that_are_sum), dict(artifact.rows_text),
+                  item.cal_facts, dict(artifact.sections_dict), dict(artifact.units_dict))
+        historical = history[(item.group, item.statement_name)]
+
+        def map_statement():
+            statement = STATEMENT_CLASSES[item.statement_name](
+                *inputs, historical_statements=dict(historical), cik=None)
+            return statement, statement.get_mapped_df()
+
+        statement, mapped_df = profiler.measure("map", map_statement)
+        if mapped_df is None:
+            errors += 1
+            continue
+        historical[item.report_date] = mapped_df.copy()
+        engines[_engine(statement, mode)] += 1
+        predictions[item.key] = {}
+        for mapping in statement.mapped_facts:
+            predictions[item.key].setdefault(mapping[0], mapping[1])
+    return {"predictions": predictions, "engines": dict(engines), "errors": errors}
+
+
+def score_accuracy(predictions: Dict[str, Dict[str, str]], golden: Dict[str, Dict[str, Optional[str]]]) -> dict:
+    """
+    Compare answers with the golden set (rows absent from it are not scored).
+
+    correct   predicted fact == expected fact (both None counts as correct)
+    wrong     mapped to another fact
+    missed    expected a fact, left unmapped
+    spurious  expected unmapped, mapped anyway
+    """
+    counts = defaultdict(lambda: defaultdict(int))
+    for key, expected_rows in golden.items():
+        statement_type = key.rsplit("/", 1)[-1]
+        predicted_rows = predictions.get(key, {})
+        for row, expected in expected_rows.items():
+            predicted = predicted_rows.get(row)
+            outcome = ("correct" if predicted == expected else
+                       "missed" if predicted is None else
+                       "spurious" if expected is None else "wrong")
+            for scope in ("all", statement_type):
+                counts[scope][outcome] += 1
+                counts[scope]["rows"] += 1
+
+    def summary(c):
+        return {**{k: c[k] for k in ("rows", "correct", "wrong", "missed", "spurious")},
+                "accuracy": round(c["correct"] / c["rows"], 4) if c["rows"] else None}
+
+    result = summary(counts["all"])
+    result["by_statement"] = {scope: summary(c) for scope, c in sorted(counts.items()) if scope != "all"}
+    return result
+
+
+def benchmark_mode(corpus: List[CorpusStatement], mode: str, repeat: int, allocations: bool,
+                   golden: Optional[dict]) -> dict:
+    rows = sum(len(item.artifact.og_df) for item in corpus)
+    with StageProfiler() as profiler:
+        run = map_corpus(corpus, mode, profiler)   # warm-up: compiled patterns, imports, first-use caches
+        best = None
+        for _ in range(max(1, repeat)):
+            profiler.reset()
+            map_corpus(corpus, mode, profiler)
+            if best is None or profiler.stats["map"]["seconds"] < best["map"]["seconds"]:
+                best = profiler.stats
+        order = [stage for stage, _, _ in STAGE_METHODS] + ["map"]
+        stages = {name: {"calls": best[name]["calls"], "seconds": round(best[name]["seconds"], 6)}
+                  for name in order if name in best}
+
+        peak_mb = None
+        if allocations:
+            profiler.reset()
+            tracemalloc.start()
+            try:
+                map_corpus(corpus, mode, profiler)
+                peak_mb = round(tracemalloc.get_traced_memory()[1] / 1e6, 3)
+            finally:
+                tracemalloc.stop()
+            for name, s in profiler.stats.items():
+                stages.setdefault(name, {"calls": s["calls"], "seconds": None})["peak_kb"] = round(s["peak_kb"], 1)
+
+    seconds = stages["map"]["seconds"]
+    return {
+        "engines": run["engines"],
+        "errors": run["errors"],
+        "statements": len(corpus),
+        "rows": rows,
+        "wall_seconds": seconds,
+        "rows_per_second": round(rows / seconds, 1) if seconds else None,
+        "peak_alloc_mb": peak_mb,
+        "stages": stages,
+        "accuracy": score_accuracy(run["predictions"], golden) if golden else None,
+        "predictions": run["predictions"],
+    }
+
+
+# ─── Results ───────────────────────────────────────────────────────────────────
+
+def _git_revision() -> dict:
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=BENCH_DIR, capture_output=True, text=True,
+                              timeout=30, check=True).stdout.strip()
+    try:
+        return {"revision": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "-uno"))}
+    except (OSError, subprocess.SubprocessError):
+        return {"revision": None, "dirty": None}
+
+
+def print_results(results: dict):
+    corpus = results["corpus"]
+    print(f"{corpus['statements']} statements, {corpus['rows']} rows ({corpus['source']}), "
+          f"best of {results['settings']['repeat']}, LLM {'on' if results['settings']['llm'] else 'off'}\n")
+    print(f"{'mode':<10s} {'engines':<24s} {'wall':>9s} {'rows/s':>9s} {'peak':>9s} {'accuracy':>9s}")
+    for mode, r in results["modes"].items():
+        engines = ",".join(f"{k}:{v}" for k, v in sorted(r["engines"].items())) or "-"
+        accuracy = f"{r['accuracy']['accuracy'] * 100:8.1f}%" if r["accuracy"] and r["accuracy"]["rows"] else "        -"
+        peak = f"{r['peak_alloc_mb']:7.1f}MB" if r["peak_alloc_mb"] is not None else "        -"
+        print(f"{mode:<10s} {engines:<24s} {r['wall_seconds'] * 1000:7.1f}ms {r['rows_per_second'] or 0:9.0f} "
+              f"{peak} {accuracy}")
+    print(f"\n{'mode':<10s} {'stage':<11s} {'calls':>6s} {'seconds':>9s} {'peak KB':>9s}")
+    for mode, r in results["modes"].items():
+        for stage, s in r["stages"].items():
+            seconds = f"{s['seconds']:9.4f}" if s.get("seconds") is not None else "        -"
+            peak = f"{s['peak_kb']:9.0f}" if s.get("peak_kb") is not None else "        -"
+            print(f"{mode:<10s} {stage:<11s} {s['calls']:6d} {seconds} {peak}")
+
+
+def compare_results(current: dict, baseline: dict, time_tolerance: float, accuracy_tolerance: float) -> List[str]:
+    """Print the change per mode; return the regressions."""
+    regressions = []
+    print(f"\nvs {baseline.get('revision') or 'baseline'} ({baseline.get('created', '?')})")
+    for mode, r in current["modes"].items():
+        base = baseline.get("modes", {}).get(mode)
+        if base is None:
+            continue
+        ratio = r["wall_seconds"] / base["wall_seconds"] if base["wall_seconds"] else 1.0
+        line = f"{mode:<10s} time {ratio:6.2f}x"
+        if ratio > 1 + time_tolerance:
+            regressions.append(f"{mode}: {ratio:.2f}x slower")
+        acc, base_acc = (r.get("accuracy") or {}).get("accuracy"), (base.get("accuracy") or {}).get("accuracy")
+        if acc is not None and base_acc is not None:
+            line += f"   accuracy {(acc - base_acc) * 100:+6.2f} pt"
+            if base_acc - acc > accuracy_tolerance:
+                regressions.append(f"{mode}: accuracy {base_acc:.4f} -> {acc:.4f}")
+        print(line)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES, help="Matching modes to run")
+    parser.add_argument("--corpus", type=Path, default=PARSE_ARTIFACTS_DIR, help="Parse artifact store root")
+    parser.add_argument("--tickers", nargs="+", default=None, help="Only these tickers of the store")
+    parser.add_argument("--years", type=int, default=None, help="Newest filings per ticker and form")
+    parser.add_argument("--fixtures", action="store_true", help="Use the R file fixtures instead of the store")
+    parser.add_argument("--golden", type=Path, default=None,
+                        help="Golden set (default: golden/fixtures.json for the fixtures)")
+    parser.add_argument("--write-golden", type=Path, default=None, help="Write --golden-mode's answers as a golden set")
+    parser.add_argument("--golden-mode", choices=MODES, default="pipeline", help="Mode seeding --write-golden")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes per mode (best is reported)")
+    parser.add_argument("--no-alloc", action="store_true", help="Skip the tracemalloc pass")
+    parser.add_argument("--llm", action="store_true", help="Allow LLM calls (Ollama must be running)")
+    parser.add_argument("--mock-llm", action="store_true", help="Run the LLM agents against agents/mock_ollama.py")
+    parser.add_argument("--output", type=Path, default=None, help="Write machine-readable results (JSON)")
+    parser.add_argument("--compare", type=Path, default=None, help="Baseline results to compare with")
+    parser.add_argument("--time-tolerance", type=float, default=0.10, help="Allowed slowdown (default 10%%)")
+    parser.add_argument("--accuracy-tolerance", type=float, default=0.005, help="Allowed accuracy drop (default 0.5 pt)")
+    args = parser.parse_args(argv)
+    logging.disable(logging.CRITICAL)
+
+    corpus, source = [], "fixtures"
+    if not args.fixtures:
+        corpus, source = load_artifact_corpus(args.corpus, args.tickers, args.years), str(args.corpus)
+    if not corpus:
+        corpus, source = load_fixture_corpus(), "fixtures"
+    golden_path = args.golden
+    if golden_path is None and source == "fixtures" and FIXTURES_GOLDEN.exists():
+        golden_path = FIXTURES_GOLDEN
+    golden = json.loads(golden_path.read_text())["statements"] if golden_path else None
+
+    llm = args.llm or args.mock_llm
+    if not llm:
+        os.environ["DISABLE_LLM"] = "1"
+    mock = None
+    if args.mock_llm:
+        from agents.mock_ollama import MockOllamaServer
+        mock = MockOllamaServer(port=11434).start()
+
+    modes = list(dict.fromkeys(args.modes + ([args.golden_mode] if args.write_golden else [])))
+    try:
+        mode_results = {mode: benchmark_mode(corpus, mode, args.repeat, not args.no_alloc, golden)
+                        for mode in modes}
+    finally:
+        if mock is not None:
+            mock.stop()
+
+    if args.write_golden:
+        args.write_golden.parent.mkdir(parents=True, exist_ok=True)
+        predictions = mode_results[args.golden_mode]["predictions"]
+        statements = {item.key: {row: predictions.get(item.key, {}).get(row) for row in item.artifact.og_df.index}
+                      for item in corpus}
+        args.write_golden.write_text(json.dumps({"version": RESULTS_VERSION, "source": args.golden_mode,
+                                                 "statements": statements}, indent=2) + "\n")
+        print(f"Golden set seeded from {args.golden_mode} written to {args.write_golden} (review before use)")
+
+    results = {
+        "version": RESULTS_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        **_git_revision(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "corpus": {"source": source, "statements": len(corpus),
+                   "rows": sum(len(item.artifact.og_df) for item in corpus),
+                   "groups": len({item.group for item in corpus}),
+                   "golden": str(golden_path) if golden_path else None},
+        "settings": {"repeat": args.repeat, "llm": llm, "mock_llm": args.mock_llm},
+        "modes": {mode: {k: v for k, v in r.items() if k != "predictions"}
+                  for mode, r in mode_results.items() if mode in args.modes},
+    }
+    print_results(results)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        if compare_results(results, baseline, args.time_tolerance, args.accuracy_tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
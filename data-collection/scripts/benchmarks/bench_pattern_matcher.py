@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+PATTERN MATCHER BENCHMARK - Per-Pattern re.search vs Precompiled Matcher
+
+Runs the regex stage of the mappers over a corpus of statement rows with
+    loop      find_pattern_matches() per MapFact and kind (re.search per pattern)
+    matcher   pattern_matcher.StatementMapMatcher.search() per kind
+for IncomeStatementMap, BalanceSheetMap and CashFlowMap, checks that both
+produce identical candidates and reports the timings.
+
+The corpus is every (tag, label) row of the R file fixtures plus, with
+--cache, every R file in the local EDGAR archive cache, plus a built-in list
+of GAAP / IFRS / company-specific / dimensional rows.
+
+Usage:
+    python benchmarks/bench_pattern_matcher.py
+    python benchmarks/bench_pattern_matcher.py --cache --repeat 10
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from statement_maps import IncomeStatementMap, BalanceSheetMap, CashFlowMap, MapFact
+from statement_parser import parse_statement_lxml
+from archive_cache import ARCHIVE_CACHE_DIR, ArchiveCache
+from hybrid_matcher import find_pattern_matches, strip_dimensional_prefix
+from pattern_matcher import StatementMapMatcher, PATTERN_KINDS
+
+FIXTURES_DIR = Path(__file__).parent.parent / "test" / "fixtures" / "r_files"
+
+EXTRA_ROWS = [
+    ("us-gaap_Revenues", "Total revenues"),
+    ("us-gaap_NetIncomeLoss", "Net income"),
+    ("us-gaap_OperatingIncomeLoss", "Operating income"),
+    ("us-gaap_ResearchAndDevelopmentExpense", "Research and development"),
+    ("us-gaap_SellingGeneralAndAdministrativeExpense", "Selling, general and administrative"),
+    ("us-gaap_IncomeTaxExpenseBenefit", "Provision for income taxes"),
+    ("us-gaap_EarningsPerShareBasic", "Basic (in dollars per share)"),
+    ("us-gaap_EarningsPerShareDiluted", "Diluted (in dollars per share)"),
+    ("us-gaap_WeightedAverageNumberOfDilutedSharesOutstanding", "Diluted (in shares)"),
+    ("us-gaap_InterestExpense", "Interest expense"),
+    ("us-gaap_Assets", "Total assets"),
+    ("us-gaap_AccountsReceivableNetCurrent", "Accounts receivable, net"),
+    ("us-gaap_InventoryNet", "Inventories"),
+    ("us-gaap_PropertyPlantAndEquipmentNet", "Property, plant and equipment, net"),
+    ("us-gaap_Goodwill", "Goodwill"),
+    ("us-gaap_AccountsPayableCurrent", "Accounts payable"),
+    ("us-gaap_LongTermDebtNoncurrent", "Term debt"),
+    ("us-gaap_LiabilitiesAndStockholdersEquity", "Total liabilities and shareholders' equity"),
+    ("us-gaap_RetainedEarningsAccumulatedDeficit", "Accumulated deficit"),
+    ("us-gaap_NetCashProvidedByUsedInOperatingActivities", "Cash generated by operating activities"),
+    ("us-gaap_PaymentsToAcquirePropertyPlantAndEquipment", "Payments for acquisition of property, plant and equipment"),
+    ("us-gaap_PaymentsForRepurchaseOfCommonStock", "Repurchases of common stock"),
+    ("us-gaap_DepreciationDepletionAndAmortization", "Depreciation and amortization"),
+    ("us-gaap_ShareBasedCompensation", "Share-based compensation expense"),
+    ("ifrs-full_Revenue", "Revenue"),
+    ("ifrs-full_ProfitLoss", "Profit for the year"),
+    ("ifrs-full_CashAndCashEquivalents", "Cash and cash equivalents"),
+    ("ifrs-full_Equity", "Total equity"),
+    ("tsla_DepreciationAmortizationAndImpairment", "Depreciation, amortization and impairment"),
+    ("amzn_FulfillmentExpense", "Fulfillment"),
+    ("Revenue::us-gaap_RevenueFromContractWithCustomerExcludingAssessedTax", "Products"),
+    ("D1:us-gaap_CostOfGoodsAndServicesSold", "Services"),
+    ("us-gaap_OtherNonoperatingIncomeExpense", "Other income (expense), net"),
+    ("msft_IncomeTaxesPaidNet", "Cash paid for income taxes, net"),
+]
+
+MAPS = [("income", IncomeStatementMap), ("balance", BalanceSheetMap), ("cashflow", CashFlowMap)]
+
+
+def load_rows(include_cache: bool):
+    contents = [path.read_bytes() for path in sorted(FIXTURES_DIR.glob("*.htm"))]
+    if include_cache:
+        cache = ArchiveCache(ARCHIVE_CACHE_DIR)
+        for entry_path in (ARCHIVE_CACHE_DIR / "urls").glob("*/*.json"):
+            url = json.loads(entry_path.read_text()).get("url", "")
+            if url.rsplit("/", 1)[-1].startswith("R") and url.endswith(".htm"):
+                hit = cache.get(url)
+                if hit:
+                    contents.append(hit[0])
+
+    rows = list(EXTRA_ROWS)
+    for content in contents:
+        for table in parse_statement_lxml(content).tables:
+            for row in table.rows:
+                if row.onclick:
+                    rows.append((row.onclick.split("defref_")[-1].split("',")[0], row.label))
+    return rows
+
+
+def loop_candidates(items, tag, label):
+    """The regex stage as HybridMatcher.find_candidates used to run it."""
+    search = strip_dimensional_prefix(tag)
+    out = {}
+    for kind, attr in PATTERN_KINDS.items():
+        text = label if kind == "Human" else search
+        for name, mf in items:
+            matches = find_pattern_matches(text, getattr(mf, attr), kind)
+            if matches:
+                out[(kind, name)] = [(m.pattern_index, m.pattern, m.match_string) for m in matches]
+    return out
+
+
+def matcher_candidates(matcher, tag, label):
+    search = strip_dimensional_prefix(tag)
+    out = {}
+    for kind in PATTERN_KINDS:
+        text = label if kind == "Human" else search
+        if not text:
+            continue
+        for name, hits in matcher.search(kind, text).items():
+            out[(kind, name)] = hits
+    return out
+
+
+def _time(fn, rows, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for tag, label in rows:
+            fn(tag, label)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--cache", action="store_true", help="Include R files from the archive cache")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions (best time is reported)")
+    args = parser.parse_args()
+
+    rows = load_rows(args.cache)
+    print(f"{len(rows)} rows\n")
+    print(f"{'map':10s} {'patterns':>8s} {'loop':>10s} {'matcher':>10s} {'speedup':>8s}  identical")
+
+    for name, map_cls in MAPS:
+        statement_map = map_cls()
+        items = [(n, mf) for n, mf in vars(statement_map).items() if isinstance(mf, MapFact)]
+        build_start = time.perf_counter()
+        matcher = StatementMapMatcher(statement_map)
+        build = time.perf_counter() - build_start
+
+        identical = all(loop_candidates(items, t, l) == matcher_candidates(matcher, t, l) for t, l in rows)
+        loop = _time(lambda t, l: loop_candidates(items, t, l), rows, args.repeat)
+        fast = _time(lambda t, l: matcher_candidates(matcher, t, l), rows, args.repeat)
+        n_patterns = sum(len(k.patterns) for k in matcher.kinds.values())
+        print(f"{name:10s} {n_patterns:8d} {loop * 1000:8.1f}ms {fast * 1000:8.1f}ms "
+              f"{loop / fast:7.1f}x  {identical}  (build {build * 1000:.0f}ms)")
+        if not identical:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
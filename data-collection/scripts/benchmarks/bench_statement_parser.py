@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+STATEMENT PARSER BENCHMARK - BeautifulSoup vs lxml Backend
+
+Times parsing + extraction of R files with both statement_parser backends:
+    bs4   BeautifulSoup(content, "lxml") -> parse_statement_bs4
+    lxml  parse_statement_lxml(content)
+and the full Filling.extract_columns_values_and_dates_from_statement on each.
+
+Input is the recorded fixtures (test/fixtures/r_files) plus, with --cache,
+every R file in the local EDGAR archive cache.
+
+Usage:
+    python benchmarks/bench_statement_parser.py
+    python benchmarks/bench_statement_parser.py --cache --repeat 5
+"""
+
+import sys
+import json
+import time
+import logging
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bs4 import BeautifulSoup
+
+from statement_parser import parse_statement_bs4, parse_statement_lxml
+from archive_cache import ARCHIVE_CACHE_DIR, ArchiveCache
+from Filling import Filling
+from constants import GAAP
+
+FIXTURES_DIR = Path(__file__).parent.parent / "test" / "fixtures" / "r_files"
+
+
+def load_r_files(include_cache: bool):
+    files = [path.read_bytes() for path in sorted(FIXTURES_DIR.glob("*.htm"))]
+    if include_cache:
+        cache = ArchiveCache(ARCHIVE_CACHE_DIR)
+        for entry_path in (ARCHIVE_CACHE_DIR / "urls").glob("*/*.json"):
+            url = json.loads(entry_path.read_text()).get("url", "")
+            if url.rsplit("/", 1)[-1].startswith("R") and url.endswith(".htm"):
+                hit = cache.get(url)
+                if hit:
+                    files.append(hit[0])
+    return files
+
+
+def _filling():
+    filing = Filling.__new__(Filling)
+    filing.quarterly = False
+    filing.yearly = True
+    filing.facts_table = None
+    filing.taxonomy = GAAP
+    filing.unit_multiplier_set = []
+    return filing
+
+
+def _time(fn, files, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for content in files:
+            fn(content)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark statement parser backends")
+    parser.add_argument("--cache", action="store_true", help="Include R files from the archive cache")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions (best time is reported)")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    files = load_r_files(args.cache)
+    total_mb = sum(len(f) for f in files) / 1e6
+    print(f"{len(files)} R files, {total_mb:.2f} MB, best of {args.repeat}\n")
+
+    cases = {
+        "parse      bs4": lambda c: parse_statement_bs4(BeautifulSoup(c, "lxml")),
+        "parse      lxml": parse_statement_lxml,
+        "extract    bs4": lambda c: _filling().extract_columns_values_and_dates_from_statement(
+            BeautifulSoup(c, "lxml"), "balance_sheet"),
+        "extract    lxml": lambda c: _filling().extract_columns_values_and_dates_from_statement(
+            parse_statement_lxml(c), "balance_sheet"),
+    }
+    results = {name: _time(fn, files, args.repeat) for name, fn in cases.items()}
+    for name, seconds in results.items():
+        print(f"{name:<18} {seconds * 1000:9.1f} ms   {seconds * 1000 / len(files):7.2f} ms/file")
+    print(f"\nparse speedup:   {results['parse      bs4'] / results['parse      lxml']:.1f}x")
+    print(f"extract speedup: {results['extract    bs4'] / results['extract    lxml']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
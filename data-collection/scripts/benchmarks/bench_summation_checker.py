@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+SUMMATION CHECKER BENCHMARK - First-Column Suffix Sums vs Prefix-Sum Blocks
+
+Runs the numeric sum-row check for every row of synthetic statements with
+    first_column  the previous per-row search (list.index, per-cell .loc,
+                  Python suffix sums over the first column)
+    prefix_sums   SummationChecker._check_numeric_sum (prefix sums, every
+                  block of every row and period at once; includes building
+                  the checker)
+and reports the timings and the rows each flags as sums, split into section
+totals and other rows (line items or the grand total matching by chance).
+
+Statements are built like real ones: sections of line items followed by
+their totals, a grand total, several periods and NaN header rows.
+
+Usage:
+    python benchmarks/bench_summation_checker.py
+    python benchmarks/bench_summation_checker.py --rows 120 --periods 5 --repeat 10
+"""
+
+import sys
+import time
+import random
+import logging
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from summation_checker import SummationChecker
+
+logging.disable(logging.CRITICAL)
+
+
+def build_statement(n_rows: int, n_periods: int, seed: int = 0) -> pd.DataFrame:
+    rng = random.Random(seed)
+    rows, index, section_totals = [], [], []
+    while len(rows) < n_rows - 1:
+        index.append(f"Header{len(index)}")
+        rows.append([np.nan] * n_periods)
+        items = [[float(rng.randint(1, 10_000)) * rng.choice([1, 1, -1]) for _ in range(n_periods)]
+                 for _ in range(rng.randint(2, 8))]
+        for item in items:
+            index.append(f"Item{len(index)}")
+            rows.append(item)
+        total = [sum(col) for col in zip(*items)]
+        index.append(f"Total{len(index)}")
+        rows.append(total)
+        section_totals.append(total)
+    index.append("GrandTotal")
+    rows.append([sum(col) for col in zip(*section_totals)])
+    return pd.DataFrame(rows, index=index, columns=[str(2024 - p) for p in range(n_periods)])
+
+
+def run_first_column(df):
+    checker = SummationChecker(df, [], {})
+    found = []
+    for idx in df.index:
+        row = df.loc[idx]
+        actual = next((float(v) for v in row if not pd.isna(v) and v != 0), 0.0)
+        if actual and checker._check_numeric_sum_first_column(idx, row, actual):
+            found.append(idx)
+    return found
+
+
+def run_prefix_sums(df):
+    checker = SummationChecker(df, [], {})
+    found = []
+    for idx, values in zip(df.index, df.to_numpy()):
+        actual = next((float(v) for v in values if not np.isnan(v) and v != 0), 0.0)
+        if actual and checker._check_numeric_sum(idx, None, actual):
+            found.append(idx)
+    return found
+
+
+def _describe(found):
+    totals = sum(1 for idx in found if idx.startswith("Total"))
+    return f"{totals} totals + {len(found) - totals} other"
+
+
+def _time(fn, df, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(df)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=60, help="Rows per statement")
+    parser.add_argument("--periods", type=int, default=3, help="Period columns per statement")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions (best time is reported)")
+    args = parser.parse_args()
+
+    print(f"{'rows':>5s} {'periods':>7s} {'first_column':>13s} {'prefix_sums':>12s} {'speedup':>8s}  "
+          f"flagged (first_column -> prefix_sums)")
+    for n_rows in sorted({20, args.rows, args.rows * 2}):
+        df = build_statement(n_rows, args.periods)
+        old, old_found = _time(run_first_column, df, args.repeat)
+        new, new_found = _time(run_prefix_sums, df, args.repeat)
+        print(f"{len(df):5d} {args.periods:7d} {old * 1000:11.1f}ms {new * 1000:10.1f}ms "
+              f"{old / new:7.1f}x  {_describe(old_found)} -> {_describe(new_found)}")
+
+
+if __name__ == "__main__":
+    main()
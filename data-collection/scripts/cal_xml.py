@@ -10,10 +10,9 @@
 #         equations.append(f"{to_element} = {weight} * {from_element}")
 #     return equations
 
-import requests
 import xml.etree.ElementTree as ET
 from collections import defaultdict
-from headers import headers
+from edgar_client import get_edgar_client
 import re
 
 def get_part_before_pattern(input_string):
@@ -29,7 +28,7 @@ def get_part_before_pattern(input_string):
     return new_string
     
 def fetch_file_content(url):
-    response = requests.get(url, headers=headers)
+    response = get_edgar_client().get(url)
     response.raise_for_status()
     return response.content
 
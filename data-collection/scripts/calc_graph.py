@@ -0,0 +1,199 @@
+"""
+CALC GRAPH - Calculation Linkbase Discovery + Per-Accession Graph Store
+
+Every filing ships a calculation linkbase (*_cal.xml) describing which facts
+sum into which (Assets = AssetsCurrent + NoncurrentAssets, ...). Filling
+used to find it by downloading the filing's HTML directory listing and
+scanning every <a> with BeautifulSoup, then parsed the linkbase on every run.
+This module instead:
+
+1. Discovers the linkbase through the machine-readable {base}/index.json
+   (directory.item[].name), falling back to the HTML listing for the rare
+   filing without one
+2. Parses it once with cal_xml.parse_calculation_arcs
+3. Persists the resulting graph per accession in a compact, interned form
+   under .api_cache/edgar/calc/<cik>/<accession>.json.gz, so later runs (and
+   offline remaps) load a few KB of JSON instead of fetching and parsing XML
+
+Stored layout:
+    {"version": 1, "url": <cal.xml url>,
+     "facts": [fact, ...],                                  # interned names
+     "graph": [[parent, [[child, weight], ...]], ...]}      # indexes into facts
+
+While an HTTP cassette is recording or replaying (see http_cassette.py) the
+store is bypassed, so the linkbase exchanges are always made.
+
+The decoded graph is exactly parse_calculation_arcs()'s output
+(parent -> [{'fact': child, 'weight': weight}, ...]) in the same order.
+
+Configuration (environment variables):
+    CALC_GRAPH_DIR      Store root (default .api_cache/edgar/calc)
+
+Usage:
+    from calc_graph import load_calculation_graph
+    equations = load_calculation_graph("320193", "000032019324000123")
+"""
+
+import os
+import json
+import gzip
+import logging
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import requests
+from bs4 import BeautifulSoup
+
+from cal_xml import fetch_file_content, parse_calculation_arcs
+from edgar_client import get_edgar_client
+from http_cassette import cassette_active
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+
+_SCRIPT_DIR = Path(__file__).parent
+_PROJECT_ROOT = _SCRIPT_DIR.parent.parent  # data-collection/scripts -> project root
+CALC_GRAPH_DIR = Path(os.environ.get(
+    "CALC_GRAPH_DIR", _PROJECT_ROOT / ".api_cache" / "edgar" / "calc"
+))
+
+GRAPH_FORMAT_VERSION = 1
+CAL_SUFFIX = "_cal.xml"
+
+
+# ─── Discovery ─────────────────────────────────────────────────────────────────
+
+def _find_in_index_json(base_link: str) -> Optional[str]:
+    response = get_edgar_client().get(f"{base_link}/index.json")
+    response.raise_for_status()
+    for item in response.json().get("directory", {}).get("item", []):
+        name = item.get("name", "")
+        if name.endswith(CAL_SUFFIX):
+            return f"{base_link}/{name}"
+    return None
+
+
+def _find_in_directory_listing(base_link: str) -> Optional[str]:
+    response = get_edgar_client().get(base_link)
+    response.raise_for_status()
+    soup = BeautifulSoup(response.content, "html.parser")
+    for link in soup.find_all("a"):
+        href = link.get("href")
+        if href and href.endswith(CAL_SUFFIX):
+            return f"{base_link}/{href.split('/')[-1]}"
+    return None
+
+
+def find_cal_xml_url(base_link: str) -> str:
+    """
+    URL of the filing's calculation linkbase.
+
+    Args:
+        base_link: https://www.sec.gov/Archives/edgar/data/{cik}/{accession}
+
+    Raises:
+        ValueError: if the filing has no *_cal.xml
+        requests.RequestException: if neither listing could be fetched
+    """
+    try:
+        url = _find_in_index_json(base_link)
+        if url:
+            return url
+    except (requests.RequestException, ValueError) as e:
+        logger.debug(f"index.json lookup failed for {base_link}: {e}")
+
+    url = _find_in_directory_listing(base_link)
+    if not url:
+        raise ValueError("Could not find cal.xml")
+    return url
+
+
+# ─── Compact encoding ──────────────────────────────────────────────────────────
+
+def encode_graph(graph: Dict[str, List[dict]]) -> dict:
+    """parse_calculation_arcs() output -> interned, list-based form."""
+    codes: Dict[str, int] = {}
+
+    def code(fact: str) -> int:
+        if fact not in codes:
+            codes[fact] = len(codes)
+        return codes[fact]
+
+    encoded = [[code(parent), [[code(arc["fact"]), arc["weight"]] for arc in arcs]]
+               for parent, arcs in graph.items()]
+    return {"version": GRAPH_FORMAT_VERSION, "facts": list(codes), "graph": encoded}
+
+
+def decode_graph(payload: dict) -> Dict[str, List[dict]]:
+    facts = payload["facts"]
+    return {facts[parent]: [{"fact": facts[child], "weight": weight} for child, weight in arcs]
+            for parent, arcs in payload["graph"]}
+
+
+# ─── Persistence ───────────────────────────────────────────────────────────────
+
+def graph_path(cik, accession_number: str) -> Path:
+    return CALC_GRAPH_DIR / str(int(cik)) / f"{accession_number.replace('-', '')}.json.gz"
+
+
+def save_graph(path: Path, payload: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(gzip.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8")))
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def load_graph(path: Path) -> Optional[Dict[str, List[dict]]]:
+    """Stored graph, or None if missing, unreadable or in an old format."""
+    try:
+        with open(path, "rb") as f:
+            payload = json.loads(gzip.decompress(f.read()))
+        if payload.get("version") != GRAPH_FORMAT_VERSION:
+            return None
+        return decode_graph(payload)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Calculation graph at {path} unreadable: {e}")
+        return None
+
+
+def load_calculation_graph(cik, accession_number: str) -> Dict[str, List[dict]]:
+    """
+    Calculation graph of a filing, from the store or discovered, downloaded,
+    parsed and stored on first use.
+
+    Raises:
+        ValueError: if the filing has no cal.xml or it could not be fetched
+    """
+    path = graph_path(cik, accession_number)
+    use_store = not cassette_active()
+    graph = load_graph(path) if use_store else None
+    if graph is not None:
+        return graph
+
+    base_link = f"https://www.sec.gov/Archives/edgar/data/{cik}/{accession_number.replace('-', '')}"
+    try:
+        url = find_cal_xml_url(base_link)
+        graph = parse_calculation_arcs(fetch_file_content(url))
+    except requests.RequestException as e:
+        raise ValueError(f"Error fetching the statement: {e}")
+
+    if not use_store:
+        return graph
+    payload = encode_graph(graph)
+    payload["url"] = url
+    try:
+        save_graph(path, payload)
+    except OSError as e:
+        logger.warning(f"Could not persist calculation graph for {accession_number}: {e}")
+    return graph
@@ -0,0 +1,213 @@
+"""
+CANDIDATE MEMO - Persistent Memo of HybridMatcher Regex-Stage Candidates
+
+The same XBRL tags (us-gaap_Revenues, us-gaap_NetIncomeLoss, ...) appear in
+nearly every filing of every company, yet HybridMatcher.find_candidates used
+to rerun the regex matching, CamelCase decomposition and regex scoring for
+each of them from scratch. The regex stage only depends on
+
+    (statement map, normalised tag, human label, statement_maps version)
+
+so its result is memoised under that key:
+
+- in memory for the rest of the process (dict lookup)
+- on disk across runs and processes (sqlite, WAL mode), under
+  .api_cache/mapping/candidate_memo.sqlite
+
+The version is a hash of statement_maps.py, hybrid_matcher.py and
+pattern_matcher.py, so editing a pattern, the regex scoring or the compiled
+pattern search (literal prefilter) invalidates the memo automatically.
+Entries of other versions are dropped the first time the memo is opened.
+
+Entries are stored as plain data (MapFact attribute, pattern type, matched
+patterns, regex score, context); HybridMatcher rebuilds fresh MatchCandidate
+objects from them on every lookup, so later pipeline stages can keep
+mutating candidates.
+
+Configuration (environment variables):
+    CANDIDATE_MEMO          Set to 0 to disable the memo
+    CANDIDATE_MEMO_PATH     sqlite file (default .api_cache/mapping/candidate_memo.sqlite)
+
+Usage:
+    from candidate_memo import get_candidate_memo
+    memo = get_candidate_memo()
+    entries = memo.get(key)           # -> list or None
+    memo.put(key, entries)
+"""
+
+import os
+import json
+import atexit
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from statement_maps import MapFact
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+
+_SCRIPT_DIR = Path(__file__).parent
+_PROJECT_ROOT = _SCRIPT_DIR.parent.parent  # data-collection/scripts -> project root
+CANDIDATE_MEMO_ENABLED = os.environ.get("CANDIDATE_MEMO", "1") != "0"
+CANDIDATE_MEMO_PATH = Path(os.environ.get(
+    "CANDIDATE_MEMO_PATH", _PROJECT_ROOT / ".api_cache" / "mapping" / "candidate_memo.sqlite"
+))
+
+# Sources whose content determines the regex-stage result
+VERSIONED_SOURCES = ["statement_maps.py", "hybrid_matcher.py", "pattern_matcher.py"]
+FLUSH_EVERY = 256   # pending writes before they are committed to disk
+
+# (statement map, normalised tag, is dimensional, human label)
+MemoKey = Tuple[str, str, bool, str]
+
+# Entry of a memoised candidate list:
+#   [MapFact attribute, pattern type, regex score, context,
+#    [[pattern index, pattern, matched text], ...]]
+
+
+def statement_maps_version(sources: List[str] = VERSIONED_SOURCES) -> str:
+    """Short hash of the files whose content determines the candidates."""
+    digest = hashlib.sha256()
+    for name in sources:
+        try:
+            digest.update((_SCRIPT_DIR / name).read_bytes())
+        except OSError:
+            digest.update(name.encode())
+    return digest.hexdigest()[:16]
+
+
+def statement_key(statement_map) -> str:
+    """
+    Memo name of a statement map instance: its class plus a hash of its
+    MapFacts, so a map altered at runtime never shares entries with the
+    class defaults.
+    """
+    signature = repr([
+        (name, mf.fact, mf.priority, mf.gaap_pattern, mf.ifrs_pattern, mf.human_pattern)
+        for name, mf in vars(statement_map).items() if isinstance(mf, MapFact)
+    ])
+    return f"{type(statement_map).__name__}:{hashlib.sha256(signature.encode()).hexdigest()[:12]}"
+
+
+# ─── Memo ──────────────────────────────────────────────────────────────────────
+
+class CandidateMemo:
+    """
+    Two-level (memory + sqlite) memo of regex-stage candidate lists.
+    Safe to use from several threads and processes.
+    """
+
+    def __init__(self, path: Optional[Path] = CANDIDATE_MEMO_PATH, version: Optional[str] = None):
+        """
+        Args:
+            path: sqlite file (None = in-memory only)
+            version: statement_maps version (default: hash of the sources)
+        """
+        self.path = Path(path) if path is not None else None
+        self.version = version or statement_maps_version()
+        self.hits = 0
+        self.misses = 0
+        self._memory: Dict[MemoKey, list] = {}
+        self._pending: Dict[MemoKey, list] = {}
+        self._lock = threading.Lock()
+        self._db = None
+        if self.path is not None:
+            self._open()
+
+    def _open(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS candidates ("
+                " version TEXT, statement TEXT, tag TEXT, dimensional INTEGER, label TEXT,"
+                " payload TEXT, PRIMARY KEY (version, statement, tag, dimensional, label))"
+            )
+            deleted = db.execute("DELETE FROM candidates WHERE version != ?", (self.version,)).rowcount
+            db.commit()
+            if deleted:
+                logger.info(f"Candidate memo: dropped {deleted} entries of older statement_maps versions")
+            self._db = db
+        except sqlite3.Error as e:
+            logger.warning(f"Candidate memo at {self.path} unavailable, memory only: {e}")
+            self._db = None
+
+    def get(self, key: MemoKey) -> Optional[list]:
+        with self._lock:
+            entries = self._memory.get(key)
+            if entries is None and self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT payload FROM candidates WHERE version = ? AND statement = ?"
+                        " AND tag = ? AND dimensional = ? AND label = ?",
+                        (self.version, key[0], key[1], int(key[2]), key[3]),
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logger.debug(f"Candidate memo read failed: {e}")
+                    row = None
+                if row is not None:
+                    entries = self._memory[key] = json.loads(row[0])
+            if entries is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entries
+
+    def put(self, key: MemoKey, entries: list):
+        with self._lock:
+            self._memory[key] = entries
+            if self._db is not None:
+                self._pending[key] = entries
+                if len(self._pending) >= FLUSH_EVERY:
+                    self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending or self._db is None:
+            return
+        rows = [(self.version, k[0], k[1], int(k[2]), k[3], json.dumps(v, separators=(",", ":")))
+                for k, v in self._pending.items()]
+        try:
+            self._db.executemany("INSERT OR REPLACE INTO candidates VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Candidate memo write failed: {e}")
+        self._pending.clear()
+
+    def flush(self):
+        """Commit pending entries to disk."""
+        with self._lock:
+            self._flush_locked()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "entries_in_memory": len(self._memory),
+            "version": self.version,
+        }
+
+
+_memo: Optional[CandidateMemo] = None
+_memo_lock = threading.Lock()
+
+
+def get_candidate_memo() -> Optional[CandidateMemo]:
+    """Return the shared CandidateMemo, or None if disabled via CANDIDATE_MEMO=0."""
+    global _memo
+    if not CANDIDATE_MEMO_ENABLED:
+        return None
+    if _memo is None:
+        with _memo_lock:
+            if _memo is None:
+                _memo = CandidateMemo()
+                atexit.register(_memo.flush)
+    return _memo
@@ -0,0 +1,165 @@
+"""
+COMPANY FACTS TABLE - Indexed companyfacts Table Shared Across Filings
+
+The companyfacts JSON of a company (every XBRL value it ever reported) is
+flattened into a DataFrame ONCE per Company instead of once per Filling,
+and indexed so the per-cell verification lookups in Filling / UnitDetector
+are dictionary hits instead of boolean masks over hundreds of thousands of
+rows.
+
+- fact / unit / accn / form / fp / frame are stored as categoricals
+- end / start are datetimes, period_days = end - start is precomputed
+- (fact, end) -> row positions hash index, in the original row order, so
+  "first matching row" semantics of df[(fact == f) & (end == e)].iloc[0]
+  are preserved exactly
+
+Tables are normally built from the persisted columnar store
+(companyfacts_store.get_company_facts_table); from_company_facts() builds one
+from an already-parsed companyfacts JSON dict.
+
+Usage:
+    from company_facts import CompanyFactsTable
+    table = CompanyFactsTable.from_company_facts(company.company_facts)
+    table.first_value("Revenues", "2024-09-28")             # -> 391035000000.0 or None
+    table.fact_for_period("Revenues", "2024-06-29", True)   # -> pd.Series (3-month row)
+"""
+
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from constants import GAAP, IFRS
+
+logger = logging.getLogger(__name__)
+
+
+CATEGORICAL_COLUMNS = ["fact", "unit", "accn", "form", "fp", "frame"]
+
+# A quarterly (3-month) duration is 85-95 days long
+QUARTER_MIN_DAYS = 85
+QUARTER_MAX_DAYS = 95
+
+
+class CompanyFactsTable:
+    """
+    Flattened, indexed company facts for one company.
+
+    Attributes:
+        df: DataFrame of facts (fact, unit, val, end, start, period_days, ...)
+        labels: XBRL fact name -> human label (facts_taxonomy_to_financial_terms)
+        taxonomy: GAAP or IFRS, whichever the company reports under
+    """
+
+    def __init__(self, df: pd.DataFrame, labels: Dict[str, str], taxonomy: str):
+        self.df = df.reset_index(drop=True)
+        self.labels = labels
+        self.taxonomy = taxonomy
+
+        self._val = self.df["val"].to_numpy() if "val" in self.df else np.array([])
+        self._period_days = self.df["period_days"].to_numpy(dtype=float) \
+            if "period_days" in self.df else np.array([])
+        self._index: Dict[tuple, np.ndarray] = {}
+        if not self.df.empty:
+            groups = self.df.groupby(["fact", "end"], sort=False, observed=True).indices
+            self._index = {(str(fact), pd.Timestamp(end)): positions
+                           for (fact, end), positions in groups.items()}
+
+    @classmethod
+    def from_company_facts(cls, company_facts: dict) -> "CompanyFactsTable":
+        """
+        Build the table from the companyfacts JSON (GAAP facts, else IFRS).
+
+        Raises:
+            KeyError: if the company reports neither us-gaap nor ifrs-full facts
+        """
+        facts = company_facts["facts"]
+        taxonomy = GAAP if GAAP in facts else IFRS
+        taxonomy_data = facts[taxonomy]
+
+        rows = []
+        for fact, details in taxonomy_data.items():
+            for unit, items in details["units"].items():
+                for item in items:
+                    row = item.copy()
+                    row["fact"] = fact
+                    row["unit"] = unit  # preserve unit information
+                    rows.append(row)
+
+        df = pd.DataFrame(rows)
+        if not df.empty:
+            df["end"] = pd.to_datetime(df["end"])
+            df["start"] = pd.to_datetime(df["start"]) if "start" in df else pd.NaT
+            for col in CATEGORICAL_COLUMNS:
+                if col in df:
+                    df[col] = df[col].astype("category")
+
+        labels = {fact: details["label"] for fact, details in taxonomy_data.items()}
+        return cls(cls._prepare(df), labels, taxonomy)
+
+    @classmethod
+    def from_columns(cls, columns) -> "CompanyFactsTable":
+        """Build the table from companyfacts_store.FactColumns (no JSON parsing)."""
+        labels = dict(zip(columns.strings["fact"], columns.labels))
+        return cls(cls._prepare(columns.to_dataframe()), labels, columns.taxonomy)
+
+    @staticmethod
+    def _prepare(df: pd.DataFrame) -> pd.DataFrame:
+        """Drop duplicate observations and precompute period lengths."""
+        if df.empty:
+            return df
+        df = df.drop_duplicates(subset=["fact", "end", "val"])
+        df["period_days"] = (df["end"] - df["start"]).dt.days
+        return df
+
+    @property
+    def empty(self) -> bool:
+        return self.df.empty
+
+    def positions(self, fact: str, end) -> Optional[np.ndarray]:
+        """Row positions matching (fact, end), in table order, or None."""
+        try:
+            key = (fact, pd.Timestamp(str(end).split(" ")[0]))
+        except (ValueError, TypeError):
+            return None
+        return self._index.get(key)
+
+    def lookup(self, fact: str, end) -> pd.DataFrame:
+        """Equivalent of df[(df.fact == fact) & (df.end == end)]."""
+        positions = self.positions(fact, end)
+        if positions is None:
+            return self.df.iloc[0:0]
+        return self.df.iloc[positions]
+
+    def first_value(self, fact: str, end) -> Optional[float]:
+        """'val' of the first row matching (fact, end), or None."""
+        positions = self.positions(fact, end)
+        if positions is None:
+            return None
+        return self._val[positions[0]]
+
+    def fact_for_period(self, fact: str, end, is_quarterly: bool = False) -> Optional[pd.Series]:
+        """
+        Row to verify a statement cell against. Quarterly filings report
+        several durations ending on the same date (3, 6, 9 months), so for
+        quarterly data the 3-month row is preferred, else the shortest one.
+        """
+        positions = self.positions(fact, end)
+        if positions is None:
+            return None
+        if not is_quarterly or len(positions) == 1:
+            return self.df.iloc[positions[0]]
+
+        days = self._period_days[positions]
+        quarter = (days >= QUARTER_MIN_DAYS) & (days <= QUARTER_MAX_DAYS)
+        if quarter.any():
+            logger.debug(f"Selected 3-month period for {fact} (from {len(positions)} options)")
+            return self.df.iloc[positions[np.argmax(quarter)]]
+
+        if np.isnan(days).all():
+            return self.df.iloc[positions[0]]
+        shortest = positions[np.nanargmin(days)]
+        logger.warning(f"No 3-month period found for {fact}, using shortest: "
+                       f"{self._period_days[shortest]:.0f} days")
+        return self.df.iloc[shortest]
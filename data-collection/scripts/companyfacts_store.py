@@ -0,0 +1,315 @@
+"""
+COMPANYFACTS STORE - Streaming, Columnar companyfacts Ingestion + Per-CIK Store
+
+The companyfacts JSON of a large filer is tens of MB. Loading it with
+response.json() and then flattening it into one dict per observation costs
+several times the payload in peak memory. This module instead:
+
+1. Streams the JSON from the socket (response.raw, ijson, one fact at a
+   time) straight into typed columnar arrays (array.array), interning fact /
+   unit / form / fp / frame / accn strings into small string tables and
+   storing integer codes. The whole payload is never held in memory
+2. Persists the columns per CIK as .npy files plus a meta.json with the string
+   tables and labels, under .api_cache/edgar/companyfacts/CIK{cik}/
+3. On later runs memory-maps the .npy files (np.load(mmap_mode='r')) instead
+   of downloading and parsing the JSON again
+
+Column layout (one row per fact observation):
+    fact, unit, form, fp, frame, accn   int32 codes into meta["strings"] (-1 = missing)
+    val                                 float64
+    fy                                  int16 (-1 = missing)
+    start, end, filed                   int32 days since 1970-01-01 (INT32_MIN = missing)
+
+While an HTTP cassette is recording or replaying (see http_cassette.py) the
+store is bypassed: the JSON is always fetched and ingested, nothing is saved.
+
+Configuration (environment variables):
+    COMPANY_FACTS_STORE_DIR     Store root (default .api_cache/edgar/companyfacts)
+    COMPANY_FACTS_TTL_HOURS     Re-download after this many hours (default 24)
+
+Usage:
+    from companyfacts_store import get_company_facts_table
+    table = get_company_facts_table("0000320193")   # -> CompanyFactsTable
+"""
+
+import io
+import os
+import json
+import time
+import shutil
+import logging
+import tempfile
+from array import array
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import ijson
+import numpy as np
+import pandas as pd
+
+from constants import GAAP, IFRS
+from edgar_client import get_edgar_client
+from archive_cache import is_offline
+from http_cassette import cassette_active
+from company_facts import CompanyFactsTable
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+
+_SCRIPT_DIR = Path(__file__).parent
+_PROJECT_ROOT = _SCRIPT_DIR.parent.parent  # data-collection/scripts -> project root
+COMPANY_FACTS_STORE_DIR = Path(os.environ.get(
+    "COMPANY_FACTS_STORE_DIR", _PROJECT_ROOT / ".api_cache" / "edgar" / "companyfacts"
+))
+COMPANY_FACTS_TTL_HOURS = float(os.environ.get("COMPANY_FACTS_TTL_HOURS", "24"))
+
+STORE_FORMAT_VERSION = 1
+READ_CHUNK_SIZE = 64 * 1024     # bytes read from the response per parser step
+
+STRING_FIELDS = ["fact", "unit", "form", "fp", "frame", "accn"]
+DATE_FIELDS = ["start", "end", "filed"]
+MISSING_DATE = np.iinfo(np.int32).min
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+# ─── Columns ───────────────────────────────────────────────────────────────────
+
+@dataclass
+class FactColumns:
+    """Typed columnar companyfacts for one taxonomy (GAAP or IFRS)."""
+    taxonomy: str
+    strings: Dict[str, List[str]]            # field -> interned string table
+    labels: List[str]                        # human label per strings["fact"] entry
+    columns: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.columns["val"]) if "val" in self.columns else 0
+
+    def nbytes(self) -> int:
+        return sum(col.nbytes for col in self.columns.values())
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """DataFrame with categorical string columns and datetime64 dates."""
+        data = {}
+        for name in STRING_FIELDS:
+            data[name] = pd.Categorical.from_codes(
+                np.asarray(self.columns[name]), categories=self.strings[name]
+            )
+        data["val"] = np.asarray(self.columns["val"])
+        fy = np.asarray(self.columns["fy"])
+        data["fy"] = pd.arrays.IntegerArray(fy.copy(), fy < 0)
+        for name in DATE_FIELDS:
+            days = np.asarray(self.columns[name])
+            dates = days.astype("datetime64[D]")
+            dates[days == MISSING_DATE] = np.datetime64("NaT")
+            data[name] = dates.astype("datetime64[ns]")
+        return pd.DataFrame(data)
+
+
+class _ColumnBuilder:
+    """Appends observations into typed arrays, interning repeated strings."""
+
+    def __init__(self):
+        self.codes = {name: array("i") for name in STRING_FIELDS}
+        self.tables: Dict[str, Dict[str, int]] = {name: {} for name in STRING_FIELDS}
+        self.val = array("d")
+        self.fy = array("h")
+        self.dates = {name: array("i") for name in DATE_FIELDS}
+        self._date_cache: Dict[str, int] = {}
+        self.labels: List[str] = []
+
+    def _intern(self, name: str, value) -> int:
+        if value is None or value == "":
+            return -1
+        table = self.tables[name]
+        code = table.get(value)
+        if code is None:
+            code = table[value] = len(table)
+        return code
+
+    def _day(self, value) -> int:
+        if not value:
+            return MISSING_DATE
+        day = self._date_cache.get(value)
+        if day is None:
+            try:
+                day = date.fromisoformat(value).toordinal() - _EPOCH_ORDINAL
+            except ValueError:
+                day = MISSING_DATE
+            self._date_cache[value] = day
+        return day
+
+    def add_fact(self, fact: str, details: dict):
+        fact_code = self._intern("fact", fact)
+        if fact_code == len(self.labels):
+            self.labels.append(details.get("label") or "")
+        for unit, items in details.get("units", {}).items():
+            unit_code = self._intern("unit", unit)
+            for item in items:
+                self.codes["fact"].append(fact_code)
+                self.codes["unit"].append(unit_code)
+                for name in ("form", "fp", "frame", "accn"):
+                    self.codes[name].append(self._intern(name, item.get(name)))
+                val = item.get("val")
+                self.val.append(float(val) if val is not None else float("nan"))
+                fy = item.get("fy")
+                self.fy.append(int(fy) if fy is not None else -1)
+                for name in DATE_FIELDS:
+                    self.dates[name].append(self._day(item.get(name)))
+
+    def finish(self, taxonomy: str) -> FactColumns:
+        columns = {name: np.frombuffer(self.codes[name], dtype=np.int32) for name in STRING_FIELDS}
+        columns["val"] = np.frombuffer(self.val, dtype=np.float64)
+        columns["fy"] = np.frombuffer(self.fy, dtype=np.int16)
+        for name in DATE_FIELDS:
+            columns[name] = np.frombuffer(self.dates[name], dtype=np.int32)
+        strings = {name: list(table) for name, table in self.tables.items()}
+        return FactColumns(taxonomy=taxonomy, strings=strings, labels=self.labels, columns=columns)
+
+
+# ─── Ingestion ─────────────────────────────────────────────────────────────────
+
+def ingest_company_facts(source) -> FactColumns:
+    """
+    Convert a companyfacts JSON document into FactColumns (GAAP facts, else
+    IFRS) in a single pass over the input.
+
+    Both taxonomies are parsed from the same chunks as they are read (one
+    ijson coroutine each); once GAAP facts have been seen the IFRS parser is
+    dropped, since GAAP takes precedence.
+
+    Args:
+        source: JSON bytes or a binary stream (e.g. a streamed response.raw)
+
+    Raises:
+        KeyError: if the payload has neither us-gaap nor ifrs-full facts
+    """
+    stream = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+    builders = {taxonomy: _ColumnBuilder() for taxonomy in (GAAP, IFRS)}
+    parsed = {taxonomy: ijson.sendable_list() for taxonomy in builders}
+    parsers = {taxonomy: ijson.kvitems_coro(parsed[taxonomy], f"facts.{taxonomy}", use_float=True)
+               for taxonomy in builders}
+
+    def add_parsed(taxonomy: str):
+        for fact, details in parsed[taxonomy]:
+            builders[taxonomy].add_fact(fact, details)
+        del parsed[taxonomy][:]
+
+    for chunk in iter(lambda: stream.read(READ_CHUNK_SIZE), b""):
+        for taxonomy, parser in parsers.items():
+            parser.send(chunk)
+            add_parsed(taxonomy)
+        if IFRS in parsers and builders[GAAP].labels:
+            del parsers[IFRS]
+    for taxonomy, parser in parsers.items():
+        parser.close()
+        add_parsed(taxonomy)
+
+    for taxonomy in (GAAP, IFRS):
+        if builders[taxonomy].labels:
+            return builders[taxonomy].finish(taxonomy)
+    raise KeyError(f"companyfacts payload has no {GAAP} or {IFRS} facts")
+
+
+# ─── Persistence ───────────────────────────────────────────────────────────────
+
+def store_path(cik: str) -> Path:
+    return COMPANY_FACTS_STORE_DIR / f"CIK{str(cik).zfill(10)}"
+
+
+def save_fact_columns(columns: FactColumns, path: Path):
+    """Write columns as .npy files plus meta.json; replaces the directory atomically."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(dir=path.parent, prefix=f".{path.name}.tmp-"))
+    try:
+        for name, col in columns.columns.items():
+            np.save(tmp / f"{name}.npy", np.ascontiguousarray(col))
+        meta = {
+            "version": STORE_FORMAT_VERSION,
+            "created": time.time(),
+            "taxonomy": columns.taxonomy,
+            "rows": len(columns),
+            "strings": columns.strings,
+            "labels": columns.labels,
+        }
+        with open(tmp / "meta.json", "w") as f:
+            json.dump(meta, f)
+
+        old = None
+        if path.exists():
+            old = path.with_name(f".{path.name}.old-{os.getpid()}")
+            os.replace(path, old)
+        os.replace(tmp, path)
+        if old is not None:
+            shutil.rmtree(old, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def load_fact_columns(path: Path, max_age_hours: Optional[float] = None) -> Optional[FactColumns]:
+    """
+    Memory-map stored columns.
+
+    Returns:
+        FactColumns, or None if missing, unreadable or older than max_age_hours
+    """
+    path = Path(path)
+    try:
+        with open(path / "meta.json") as f:
+            meta = json.load(f)
+        if meta.get("version") != STORE_FORMAT_VERSION:
+            return None
+        if max_age_hours is not None and time.time() - meta["created"] > max_age_hours * 3600:
+            return None
+        names = STRING_FIELDS + ["val", "fy"] + DATE_FIELDS
+        columns = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in names}
+    except FileNotFoundError:
+        return None
+    except Exception as exc:
+        logger.warning("Company facts store at %s unreadable: %s", path, exc)
+        return None
+    return FactColumns(taxonomy=meta["taxonomy"], strings=meta["strings"],
+                       labels=meta["labels"], columns=columns)
+
+
+def get_company_fact_columns(cik: str) -> FactColumns:
+    """
+    Stored columns for a CIK, downloading and re-ingesting them when the
+    store is missing or older than COMPANY_FACTS_TTL_HOURS (the age limit is
+    ignored in offline mode).
+    """
+    path = store_path(cik)
+    use_store = not cassette_active()
+    max_age = None if is_offline() else COMPANY_FACTS_TTL_HOURS
+    columns = load_fact_columns(path, max_age_hours=max_age) if use_store else None
+    if columns is not None:
+        logger.info("Loaded %d company facts for CIK %s from %s", len(columns), cik, path)
+        return columns
+
+    url = f"https://data.sec.gov/api/xbrl/companyfacts/CIK{str(cik).zfill(10)}.json"
+    with get_edgar_client().get(url, stream=True) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True     # undo gzip transfer encoding
+        columns = ingest_company_facts(response.raw)
+    logger.info("Ingested %d company facts for CIK %s (%.1f MB columns)",
+                len(columns), cik, columns.nbytes() / 1e6)
+    if not use_store:
+        return columns
+    try:
+        save_fact_columns(columns, path)
+        # Re-open memory-mapped so the in-process arrays are backed by the file
+        columns = load_fact_columns(path) or columns
+    except OSError as exc:
+        logger.warning("Could not persist company facts for CIK %s: %s", cik, exc)
+    return columns
+
+
+def get_company_facts_table(cik: str) -> CompanyFactsTable:
+    """CompanyFactsTable for a CIK built from the (memory-mapped) columnar store."""
+    return CompanyFactsTable.from_columns(get_company_fact_columns(cik))
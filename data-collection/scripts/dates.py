@@ -3,6 +3,7 @@ import calendar  # for date standardization
 import pandas as pd
 import logging
 from currency import *
+from statement_parser import as_parsed_statement
 
 logger = logging.getLogger(__name__)
 
@@ -58,14 +59,16 @@ def get_datetime_index_dates_from_statement(soup: BeautifulSoup, quarterly=False
     Extracts datetime index dates from the HTML soup object of a financial statement.
 
     Args:
-        soup (BeautifulSoup): The BeautifulSoup object of the HTML document.
+        soup (BeautifulSoup | ParsedStatement): The HTML document, or the statement
+            already parsed by statement_parser (any backend).
 
     Returns:
         pd.DatetimeIndex: A Pandas DatetimeIndex object containing the extracted dates.
         # TODO comapnies that file 20F might have columns for same date but differnet currency
         # take the currency with the most columns as the base, also check its the same as previous statements
     """
-    table_headers = soup.find_all("th", {"class": "th"})
+    document = as_parsed_statement(soup)
+    table_headers = document.date_headers
     # Define the target column headers
     target_columns = ["1 Months", "2 Months", "3 Months", "4 Months", "5 Months", 
                      "6 Months", "7 Months", "8 Months", "9 Months", "10 Months", 
@@ -73,13 +76,11 @@ def get_datetime_index_dates_from_statement(soup: BeautifulSoup, quarterly=False
     column_indexes = {}
     currencies = []
     contain_two_currency = False
-    for header in soup.find_all("th", {"class": "tl"}):
-        if header:
-            header_text = header.get_text()
-            if not contain_two_currency:
-                contain_two_currency = check_for_two_currency(header_text)
+    for header_text in document.title_headers:
+        if not contain_two_currency:
+            contain_two_currency = check_for_two_currency(header_text)
     for index, header in enumerate(table_headers):
-        header_text = header.text.strip()
+        header_text = header.text
         if contain_two_currency:
             header_currency = extract_currency(header_text)
             if header_currency:
@@ -88,10 +89,10 @@ def get_datetime_index_dates_from_statement(soup: BeautifulSoup, quarterly=False
             if target in header_text:
                 column_indexes[target] = {
                     'index': index,
-                    'colspan': int(header.get("colspan", 1))  # Default colspan to 1 if not specified
+                    'colspan': int(header.colspan if header.colspan is not None else 1)  # Default colspan to 1 if not specified
                 }
 
-    dates = [str(th.div.string) for th in table_headers if th.div and th.div.string]
+    dates = [th.date for th in table_headers if th.date]
     
     if not dates:
         logger.warning("No dates found in statement headers")
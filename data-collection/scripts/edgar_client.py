@@ -0,0 +1,465 @@
+"""
+EDGAR CLIENT - Shared, Rate-Limited HTTP Client for SEC Endpoints
+
+Every request to sec.gov / data.sec.gov made by the data-collection scripts
+goes through a single EdgarClient. It provides:
+
+1. Keep-alive connection pooling (one requests.Session, pooled adapters)
+2. A token bucket enforcing SEC's fair-access limit (10 req/s by default)
+   - shared by all threads in the process (threading.Lock)
+   - shared by all processes on the machine (fcntl lock on a state file)
+3. Retry handling for 429 / 5xx responses and connection errors,
+   honouring the Retry-After header, with exponential backoff otherwise
+4. Per-endpoint latency metrics (count, errors, retries, avg/max latency)
+5. A permanent local cache for immutable /Archives/ documents and an
+   offline mode that never touches the network (see archive_cache.py)
+6. Record / replay of every exchange into a cassette directory for
+   deterministic offline runs (see http_cassette.py)
+
+Configuration (environment variables):
+    EDGAR_MAX_RPS           Max requests per second across processes (default 10)
+    EDGAR_RATE_LOCK_FILE    Path of the shared token-bucket state file
+    EDGAR_MAX_RETRIES       Retries for throttled/failed requests (default 5)
+
+Usage:
+    from edgar_client import get_edgar_client
+    client = get_edgar_client()
+    resp = client.get("https://data.sec.gov/submissions/CIK0000320193.json")
+    data = resp.json()
+    client.log_metrics()
+"""
+
+import io
+import os
+import re
+import time
+import random
+import logging
+import itertools
+import threading
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from headers import headers as DEFAULT_HEADERS
+from archive_cache import get_archive_cache, is_archive_url, is_offline, OfflineCacheMiss
+from http_cassette import get_cassette, request_url
+from tracing import span
+
+try:
+    import fcntl
+    _HAS_FCNTL = True
+except ImportError:  # Windows: fall back to per-process throttling only
+    _HAS_FCNTL = False
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+
+_SCRIPT_DIR = Path(__file__).parent
+_PROJECT_ROOT = _SCRIPT_DIR.parent.parent  # data-collection/scripts -> project root
+EDGAR_STATE_DIR = _PROJECT_ROOT / ".api_cache" / "edgar"
+
+MAX_REQUESTS_PER_SECOND = float(os.environ.get("EDGAR_MAX_RPS", 10))
+RATE_LOCK_FILE = Path(os.environ.get("EDGAR_RATE_LOCK_FILE", EDGAR_STATE_DIR / "rate_limit.state"))
+MAX_RETRIES = int(os.environ.get("EDGAR_MAX_RETRIES", 5))
+
+DEFAULT_TIMEOUT = 30          # seconds per request
+BACKOFF_BASE = 0.5            # seconds; doubled on every retry
+BACKOFF_MAX = 30.0            # never sleep longer than this between retries
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+# ─── Token bucket ──────────────────────────────────────────────────────────────
+
+class TokenBucket:
+    """
+    Token bucket shared across threads and (optionally) across processes.
+
+    The bucket state ("tokens last_refill") lives in a small text file that is
+    read and updated under an exclusive fcntl lock, so several main.py
+    processes (or the backend plus a CLI run) together stay under the SEC
+    limit. Without fcntl the state is kept in memory for this process only.
+    """
+
+    def __init__(self, rate: float = MAX_REQUESTS_PER_SECOND,
+                 capacity: Optional[float] = None,
+                 state_file: Optional[Path] = RATE_LOCK_FILE):
+        """
+        Args:
+            rate: Tokens added per second
+            capacity: Max burst size (defaults to `rate`)
+            state_file: Shared state file for cross-process limiting (None = in-process only)
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._last_refill = time.time()
+        self._fd = None
+
+        if state_file is not None and _HAS_FCNTL:
+            try:
+                Path(state_file).parent.mkdir(parents=True, exist_ok=True)
+                self._fd = os.open(str(state_file), os.O_RDWR | os.O_CREAT, 0o644)
+            except OSError as exc:
+                logger.warning("Could not open EDGAR rate-limit file %s: %s", state_file, exc)
+                self._fd = None
+
+    def _read_state(self):
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        raw = os.read(self._fd, 64).decode(errors="ignore").split()
+        if len(raw) == 2:
+            try:
+                return float(raw[0]), float(raw[1])
+            except ValueError:
+                pass
+        return self.capacity, time.time()
+
+    def _write_state(self, tokens: float, last_refill: float):
+        payload = f"{tokens:.6f} {last_refill:.6f}".encode()
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        os.write(self._fd, payload)
+        os.ftruncate(self._fd, len(payload))
+
+    def _try_take(self) -> float:
+        """Take one token if available. Returns 0 on success, else seconds to wait."""
+        now = time.time()
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                tokens, last = self._read_state()
+                tokens = min(self.capacity, tokens + max(0.0, now - last) * self.rate)
+                if tokens >= 1.0:
+                    self._write_state(tokens - 1.0, now)
+                    return 0.0
+                self._write_state(tokens, now)
+                return (1.0 - tokens) / self.rate
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+        self._tokens = min(self.capacity, self._tokens + max(0.0, now - self._last_refill) * self.rate)
+        self._last_refill = now
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return 0.0
+        return (1.0 - self._tokens) / self.rate
+
+    def acquire(self) -> float:
+        """
+        Block until a token is available.
+
+        Returns:
+            Total seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                wait = self._try_take()
+            if wait <= 0:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+
+# ─── Metrics ───────────────────────────────────────────────────────────────────
+
+@dataclass
+class EndpointStats:
+    """Latency/throughput counters for one endpoint category."""
+    requests: int = 0
+    errors: int = 0
+    retries: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    throttle_seconds: float = 0.0
+    bytes: int = 0
+    cache_hits: int = 0
+
+    def as_dict(self) -> Dict:
+        return {
+            'requests': self.requests,
+            'cache_hits': self.cache_hits,
+            'errors': self.errors,
+            'retries': self.retries,
+            'avg_ms': (self.total_seconds / self.requests * 1000) if self.requests else 0.0,
+            'max_ms': self.max_seconds * 1000,
+            'total_s': self.total_seconds,
+            'throttle_s': self.throttle_seconds,
+            'bytes': self.bytes,
+        }
+
+
+# Ordered (pattern, endpoint name) pairs used to bucket URLs for metrics
+_ENDPOINT_PATTERNS = [
+    (re.compile(r'data\.sec\.gov/submissions/'), 'submissions'),
+    (re.compile(r'data\.sec\.gov/api/xbrl/companyfacts/'), 'companyfacts'),
+    (re.compile(r'data\.sec\.gov/api/xbrl/'), 'xbrl_api'),
+    (re.compile(r'/files/company_tickers'), 'company_tickers'),
+    (re.compile(r'/cgi-bin/'), 'cgi_bin'),
+    (re.compile(r'/Archives/edgar/data/.*FilingSummary\.xml$', re.IGNORECASE), 'archives_filing_summary'),
+    (re.compile(r'/Archives/edgar/data/.*_cal\.xml$', re.IGNORECASE), 'archives_cal_xml'),
+    (re.compile(r'/Archives/edgar/data/.*/R\d+\.(htm|xml)$', re.IGNORECASE), 'archives_statement'),
+    (re.compile(r'/Archives/edgar/data/.*index(\.json|\.htm|-index\.htm)?$', re.IGNORECASE), 'archives_index'),
+    (re.compile(r'/Archives/edgar/data/[^/]+/[^/]+/?$'), 'archives_index'),
+    (re.compile(r'/Archives/edgar/data/.*\.xml$', re.IGNORECASE), 'archives_xml'),
+    (re.compile(r'/Archives/edgar/data/'), 'archives_other'),
+]
+
+
+def endpoint_name(url: str) -> str:
+    """Classify a SEC URL into a coarse endpoint name for metrics."""
+    for pattern, name in _ENDPOINT_PATTERNS:
+        if pattern.search(url):
+            return name
+    return urlparse(url).netloc or 'other'
+
+
+_CACHED_REASON = 'OK (archive cache)'
+
+
+def _cached_response(url: str, content: bytes, content_type: str) -> requests.Response:
+    """Build a requests.Response for a document served from the archive cache."""
+    response = requests.Response()
+    response.status_code = 200
+    response._content = content
+    response.raw = io.BytesIO(content)
+    response.url = url
+    response.reason = _CACHED_REASON
+    if content_type:
+        response.headers['Content-Type'] = content_type
+    return response
+
+
+def _retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP date)."""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# ─── Client ────────────────────────────────────────────────────────────────────
+
+class EdgarClient:
+    """
+    Pooled, rate-limited HTTP client for SEC EDGAR.
+
+    One instance is shared per process via get_edgar_client(); it is safe
+    to use from multiple threads.
+    """
+
+    def __init__(self, user_agent_headers: Optional[Dict] = None,
+                 rate_limiter: Optional[TokenBucket] = None,
+                 max_retries: int = MAX_RETRIES,
+                 timeout: float = DEFAULT_TIMEOUT,
+                 pool_size: int = 16,
+                 use_archive_cache: bool = True):
+        """
+        Args:
+            user_agent_headers: Default headers (must include SEC-compliant User-Agent)
+            rate_limiter: TokenBucket to use (defaults to the shared 10 req/s bucket)
+            max_retries: Retries for 429/5xx and connection errors
+            timeout: Default per-request timeout in seconds
+            pool_size: Keep-alive connections kept per host
+            use_archive_cache: Serve/store immutable /Archives/ documents from disk
+        """
+        self.session = requests.Session()
+        self.session.headers.update(user_agent_headers or DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self.rate_limiter = rate_limiter or TokenBucket()
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.archive_cache = get_archive_cache() if use_archive_cache else None
+
+        self._metrics: Dict[str, EndpointStats] = {}
+        self._metrics_lock = threading.Lock()
+
+    def _record(self, endpoint: str, elapsed: float, throttled: float,
+                size: int = 0, error: bool = False, retry: bool = False):
+        with self._metrics_lock:
+            stats = self._metrics.setdefault(endpoint, EndpointStats())
+            if retry:
+                stats.retries += 1
+            stats.requests += 1
+            stats.total_seconds += elapsed
+            stats.max_seconds = max(stats.max_seconds, elapsed)
+            stats.throttle_seconds += throttled
+            stats.bytes += size
+            if error:
+                stats.errors += 1
+
+    def _record_cache_hit(self, endpoint: str):
+        with self._metrics_lock:
+            self._metrics.setdefault(endpoint, EndpointStats()).cache_hits += 1
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Perform a rate-limited request with retries.
+
+        With a cassette in replay mode the recorded response is returned and
+        nothing else happens (CassetteMiss if it was not recorded); in record
+        mode the final response is written to the cassette.
+
+        GETs of immutable archive documents are answered from the archive
+        cache when possible. The latest successful GET of every other URL
+        (query string included) is kept too, so in offline mode a rerun can
+        replay submissions/companyfacts as well; anything not in the cache
+        then raises OfflineCacheMiss. Streamed GETs (stream=True) are not
+        cached: the caller consumes response.raw and keeps its own copy
+        (companyfacts_store). Responses served from the cache or a cassette
+        expose their body as response.raw too.
+
+        Throttled (429) and server-error (5xx) responses are retried after
+        the server's Retry-After delay, or an exponential backoff if absent.
+        After the final attempt the last response is returned so callers
+        can still use raise_for_status(); connection errors are re-raised.
+        """
+        with span("http", "http", method=method, endpoint=endpoint_name(url), url=url) as s:
+            cassette = get_cassette()
+            if cassette is not None and cassette.replaying:
+                response = cassette.play(method, url, kwargs.get('params'))
+                self._record_cache_hit(endpoint_name(url))
+                s.set(status=response.status_code, source='cassette')
+                return response
+
+            response = self._request(method, url, **kwargs)
+            if cassette is not None:
+                cassette.record(method, url, kwargs.get('params'), response)
+                if kwargs.get('stream'):
+                    response.raw = io.BytesIO(response.content)
+            s.set(status=response.status_code,
+                  source='archive_cache' if response.reason == _CACHED_REASON else 'network')
+            return response
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """request() without the cassette: archive cache, rate limit, retries."""
+        kwargs.setdefault('timeout', self.timeout)
+        endpoint = endpoint_name(url)
+
+        # Archive documents are immutable and always served from disk; the
+        # latest copy of mutable endpoints (submissions, companyfacts) is
+        # stored too, but only replayed in offline mode.
+        streamed = kwargs.get('stream', False)
+        cacheable = method == 'GET' and self.archive_cache is not None
+        cache_key = request_url(method, url, kwargs.get('params'))
+        archived = is_archive_url(url)
+        offline = is_offline()
+        if cacheable and (offline or archived):
+            if archived:
+                hit = self.archive_cache.get(cache_key)
+            else:
+                hit = self.archive_cache.get_latest(cache_key)
+            if hit is not None:
+                self._record_cache_hit(endpoint)
+                return _cached_response(url, *hit)
+        if offline:
+            raise OfflineCacheMiss(f"EDGAR offline mode: {method} {url} is not cached locally")
+
+        # Each attempt either returns, re-raises or retries; the last one
+        # (attempt == max_retries) never retries, so the loop ends there
+        for attempt in itertools.count():
+            throttled = self.rate_limiter.acquire()
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                elapsed = time.perf_counter() - start
+                self._record(endpoint, elapsed, throttled, error=True, retry=attempt > 0)
+                if attempt >= self.max_retries:
+                    raise
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)) + random.uniform(0, 0.25)
+                logger.warning("EDGAR %s %s failed (%s), retrying in %.1fs", method, url, exc, delay)
+                time.sleep(delay)
+                continue
+
+            elapsed = time.perf_counter() - start
+            failed = response.status_code in RETRY_STATUS_CODES
+            if streamed:
+                size = int(response.headers.get('Content-Length') or 0)
+            else:
+                size = len(response.content or b'')
+            self._record(endpoint, elapsed, throttled, size=size,
+                         error=response.status_code >= 400, retry=attempt > 0)
+
+            if not failed or attempt >= self.max_retries:
+                if cacheable and not streamed and response.status_code == 200:
+                    store = self.archive_cache.put if archived else self.archive_cache.put_latest
+                    try:
+                        store(cache_key, response.content, response.headers.get('Content-Type', ''))
+                    except OSError as exc:
+                        logger.warning("Could not cache SEC document %s: %s", url, exc)
+                return response
+
+            if streamed:
+                response.close()    # release the connection before retrying
+            delay = _retry_after_seconds(response)
+            if delay is None:
+                delay = BACKOFF_BASE * (2 ** attempt) + random.uniform(0, 0.25)
+            delay = min(BACKOFF_MAX, delay)
+            logger.warning("EDGAR %s %s returned %d, retrying in %.1fs (attempt %d/%d)",
+                           method, url, response.status_code, delay, attempt + 1, self.max_retries)
+            time.sleep(delay)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """GET a SEC URL (see request())."""
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        """HEAD a SEC URL (see request())."""
+        return self.request('HEAD', url, **kwargs)
+
+    def get_metrics(self) -> Dict[str, Dict]:
+        """Per-endpoint metrics as plain dicts (JSON serialisable)."""
+        with self._metrics_lock:
+            return {name: stats.as_dict() for name, stats in sorted(self._metrics.items())}
+
+    def reset_metrics(self):
+        with self._metrics_lock:
+            self._metrics.clear()
+
+    def log_metrics(self, level: int = logging.INFO):
+        """Log a one-line summary per endpoint."""
+        metrics = self.get_metrics()
+        if not metrics:
+            return
+        logger.log(level, "EDGAR request metrics:")
+        for name, m in metrics.items():
+            logger.log(
+                level,
+                f"  {name:26s} n={m['requests']:4d} cached={m['cache_hits']:4d} "
+                f"err={m['errors']:3d} retry={m['retries']:3d} "
+                f"avg={m['avg_ms']:7.1f}ms max={m['max_ms']:7.1f}ms throttle={m['throttle_s']:.1f}s"
+            )
+
+
+# ─── Shared instance ───────────────────────────────────────────────────────────
+
+_client: Optional[EdgarClient] = None
+_client_lock = threading.Lock()
+
+
+def get_edgar_client() -> EdgarClient:
+    """Return the process-wide EdgarClient (created on first use)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = EdgarClient()
+    return _client
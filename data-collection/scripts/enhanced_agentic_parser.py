@@ -8,6 +8,8 @@ Key Improvements over the original agentic_parser.py:
    and new filings to validate mappings with 10% tolerance (excludes zero values)
 3. ENHANCED PROMPTS: Includes numerical insights, summation relationships, and groupings
 4. VERIFICATION LOOP: Mapper Agent → Verifier Agent feedback loop (max 3 iterations)
+5. MAPPING MEMORY: Rows mapped in earlier runs (mapping_memory.py) are taken from
+   the knowledge base instead of being sent to the LLM; accepted mappings are stored
 
 Usage:
     from enhanced_agentic_parser import EnhancedAgenticParser
@@ -24,11 +26,16 @@ import os
 import re
 import time
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Tuple, Any, Set
+from typing import Callable, Dict, List, Optional, Tuple, Any, Set
 from collections import defaultdict
 import pandas as pd
 import numpy as np
 
+from agents.llm_cache import get_llm_cache
+from agents.llm_pool import map_ordered
+from mapping_memory import get_mapping_memory, LearnedMapping
+from tracing import span
+
 logger = logging.getLogger(__name__)
 
 # Try importing langchain
@@ -453,7 +460,18 @@ class EnhancedAgenticParser:
         max_verification_iterations: int = 3,
         cross_year_tolerance: float = 0.10,
         target_items: Optional[List[str]] = None,
+        llm_budget=None,
+        deterministic_mappings: Optional[Callable[[], Dict[str, str]]] = None,
+        cik: Optional[str] = None,
     ):
+        """
+        Args:
+            cik: Company CIK, scope of the learned mappings (mapping_memory)
+            llm_budget: llm_budget.LLMBudget limiting the LLM calls of this
+                statement (None = unlimited)
+            deterministic_mappings: Returns {row_idx: fact} of a mapper that
+                does not use the LLM; used for the groups the budget does not cover
+        """
         self.statement_type = statement_type
         self.historical_statements = historical_statements or {}
         self.model_name = model_name
@@ -465,6 +483,10 @@ class EnhancedAgenticParser:
         self.cross_year_tolerance = cross_year_tolerance
         self._llm_cache = {}
         self.enabled = LANGCHAIN_AVAILABLE
+        self.llm_budget = llm_budget
+        self.deterministic_mappings = deterministic_mappings
+        self.cik = cik
+        self.memory = get_mapping_memory()
 
         # Set target items based on statement type
         if statement_type == "income_statement":
@@ -507,8 +529,15 @@ class EnhancedAgenticParser:
             return None
 
         model = model or self.model_name
+        cache = get_llm_cache()
 
         for attempt_model in [model, self.fallback_model]:
+            cached = cache.get(attempt_model, self.temperature, system_prompt, user_prompt) if cache else None
+            if cached is not None:
+                logger.info(f"[{agent_name}] Cached response for model '{attempt_model}'")
+                if self.llm_budget is not None:
+                    self.llm_budget.charge(0.0, cached=True)
+                return cached
             llm = self._get_llm(attempt_model)
             if llm is None:
                 continue
@@ -519,13 +548,20 @@ class EnhancedAgenticParser:
                     SystemMessage(content=system_prompt),
                     HumanMessage(content=user_prompt),
                 ]
-                response = llm.invoke(messages)
+                with span("llm.invoke", "llm", agent=agent_name, model=attempt_model):
+                    response = llm.invoke(messages)
                 duration = time.time() - t0
                 content = response.content
+                if self.llm_budget is not None:
+                    self.llm_budget.charge(duration)
+                if cache is not None:
+                    cache.put(attempt_model, self.temperature, system_prompt, user_prompt, content)
                 logger.info(f"[{agent_name}] Response from '{attempt_model}' ({duration:.1f}s, {len(content)} chars)")
                 return content
             except Exception as e:
                 logger.warning(f"[{agent_name}] FAILED with '{attempt_model}': {e}")
+                if self.llm_budget is not None:
+                    self.llm_budget.charge(time.time() - t0)
                 if attempt_model == self.fallback_model:
                     return None
         return None
@@ -982,6 +1018,121 @@ class EnhancedAgenticParser:
         
         return result
 
+    def _learned_mappings(self, og_df: pd.DataFrame, rows_text: Dict[str, str]) -> Dict[str, LearnedMapping]:
+        """
+        Rows whose mapping was learned in an earlier run, to a target item.
+        When two rows learned the same fact, the first row keeps it.
+        """
+        if self.memory is None:
+            return {}
+        learned = {}
+        used_facts = set()
+        for idx in og_df.index:
+            entry = self.memory.lookup(self.cik, self.statement_type, idx, rows_text.get(idx, ''))
+            if entry is not None and entry.fact in self.target_items and entry.fact not in used_facts:
+                learned[idx] = entry
+                used_facts.add(entry.fact)
+        if learned:
+            logger.info(f"[EnhancedParser] {len(learned)} rows mapped from the mapping memory")
+        return learned
+
+    def _record_mappings(self, mappings: List[EnhancedMappingResult], rows_text: Dict[str, str]):
+        """Store the LLM's accepted mappings with their cross-year / summation evidence."""
+        if self.memory is None:
+            return
+        for m in mappings:
+            if m.mapped_via != "batch_llm":
+                continue
+            ctx = m.numerical_context
+            self.memory.record(
+                self.cik, self.statement_type, m.row_idx, rows_text.get(m.row_idx, ''), m.mapped_to,
+                source="enhanced_llm", confidence=m.confidence, temporal=m.cross_year_validated,
+                summation=bool(ctx and ctx.is_sum_row and ctx.sum_components),
+            )
+
+    def _group_value(self, group: ConfusableGroup, cross_year_hints: Dict[str, str]) -> float:
+        """
+        Expected value of asking the LLM about a group: its rows that no
+        cross-year match already settles, counted fully in keyword groups
+        (genuinely confusable) and half in the catch-all 'other' group.
+        """
+        open_rows = sum(1 for idx in group.rows if idx not in cross_year_hints)
+        return open_rows * (0.5 if group.group_type == "other" else 1.0)
+
+    def _schedule_groups(
+        self,
+        groups: List[ConfusableGroup],
+        cross_year_hints: Dict[str, str],
+    ) -> Tuple[List[ConfusableGroup], List[ConfusableGroup]]:
+        """
+        Split the groups into those mapped by the LLM and those mapped
+        deterministically, by expected value within the LLM budget (one call
+        per group). Without a budget every group goes to the LLM.
+        """
+        if self.llm_budget is None:
+            return groups, []
+        values = {group.group_id: self._group_value(group, cross_year_hints) for group in groups}
+        granted = self.llm_budget.plan((group.group_id, values[group.group_id], 1.0) for group in groups)
+        for group in groups:
+            self.llm_budget.record("group_batch", group.group_type, values[group.group_id],
+                                   group.group_id in granted,
+                                   "" if group.group_id in granted else "not within budget")
+        skipped = [group for group in groups if group.group_id not in granted]
+        if skipped:
+            logger.info(f"[EnhancedParser] LLM budget covers {len(groups) - len(skipped)}/{len(groups)} groups, "
+                        f"deterministic mapping for {[g.group_type for g in skipped]}")
+        return [group for group in groups if group.group_id in granted], skipped
+
+    def _apply_deterministic_mappings(
+        self,
+        groups: List[ConfusableGroup],
+        all_mappings: Dict[str, str],
+        all_confidence: Dict[str, float],
+        all_reasoning: Dict[str, str],
+    ) -> Set[str]:
+        """
+        Map the rows of the given groups from deterministic_mappings, without
+        overriding LLM or cross-year mappings. Returns the rows mapped.
+        """
+        if not groups or self.deterministic_mappings is None:
+            return set()
+        fallback = self.deterministic_mappings() or {}
+        used_facts = set(all_mappings.values())
+        mapped = set()
+        for group in groups:
+            for row_idx in group.rows:
+                fact = fallback.get(row_idx)
+                if (fact in self.target_items and row_idx not in all_mappings
+                        and fact not in used_facts):
+                    all_mappings[row_idx] = fact
+                    all_confidence[row_idx] = 0.5
+                    all_reasoning[row_idx] = "Deterministic match (outside the LLM budget)"
+                    used_facts.add(fact)
+                    mapped.add(row_idx)
+        logger.info(f"[EnhancedParser] Deterministic mapping: {len(mapped)} rows")
+        return mapped
+
+    def _map_groups(
+        self,
+        groups: List[ConfusableGroup],
+        og_df: pd.DataFrame,
+        rows_text: Dict[str, str],
+        sum_info: Dict[str, Dict],
+        numerical_contexts: Dict[str, RowNumericalContext],
+    ) -> List[BatchMappingResult]:
+        """
+        Map every confusable group. The groups are independent, so their
+        batches are sent to the LLM concurrently (see agents.llm_pool); the
+        results come back in group order, so merging them does not depend on
+        which call finished first.
+        """
+        for group in groups:
+            logger.info(f"[EnhancedParser] Mapping group '{group.group_type}' ({len(group.rows)} rows)")
+        return map_ordered(
+            lambda group: self._map_batch(group, og_df, rows_text, sum_info, numerical_contexts),
+            groups,
+        )
+
     # ═══════════════════════════════════════════════════════════════════════════
     # VERIFICATION AGENT
     # ═══════════════════════════════════════════════════════════════════════════
@@ -1174,28 +1325,39 @@ class EnhancedAgenticParser:
                     logger.info(f"[EnhancedParser] Cross-year hint: {idx} -> {best_match[0]} "
                                f"({'PERFECT' if has_perfect else 'within 10%'})")
         
-        # Step 3: Identify confusable groups
+        # Step 3: Identify confusable groups (rows learned in earlier runs need no prompt)
+        learned = self._learned_mappings(og_df, rows_text)
         groups = self._identify_confusable_groups(og_df, rows_text)
+        if learned:
+            groups = [
+                ConfusableGroup(group_id=g.group_id, group_type=g.group_type, target_items=g.target_items,
+                                rows=[idx for idx in g.rows if idx not in learned], reason=g.reason)
+                for g in groups if any(idx not in learned for idx in g.rows)
+            ]
         logger.info(f"[EnhancedParser] Identified {len(groups)} confusable groups: "
                    f"{[g.group_type for g in groups]}")
         
-        # Step 4: Batch LLM mapping for each group
+        # Step 4: Batch LLM mapping for each group (concurrently, merged in group order)
         all_mappings = {}
         all_confidence = {}
         all_reasoning = {}
         
-        for group in groups:
-            logger.info(f"[EnhancedParser] Mapping group '{group.group_type}' ({len(group.rows)} rows)")
-            
-            batch_result = self._map_batch(
-                group, og_df, rows_text, sum_info, numerical_contexts
-            )
-            
+        llm_groups, deterministic_groups = self._schedule_groups(groups, cross_year_hints)
+        for batch_result in self._map_groups(llm_groups, og_df, rows_text, sum_info, numerical_contexts):
             all_mappings.update(batch_result.mappings)
             all_confidence.update(batch_result.confidence)
             all_reasoning.update(batch_result.reasoning)
         
-        logger.info(f"[EnhancedParser] Initial mapping: {len(all_mappings)} rows mapped")
+        # Learned mappings take precedence over the LLM's answers for the same facts
+        learned_facts = {entry.fact for entry in learned.values()}
+        all_mappings = {idx: fact for idx, fact in all_mappings.items() if fact not in learned_facts}
+        for row_idx, entry in learned.items():
+            all_mappings[row_idx] = entry.fact
+            all_confidence[row_idx] = max(0.85, entry.confidence)
+            all_reasoning[row_idx] = f"Learned mapping ({entry.scope}, confirmed {entry.times_confirmed}x)"
+        
+        logger.info(f"[EnhancedParser] Initial mapping: {len(all_mappings)} rows mapped "
+                   f"({len(learned)} learned)")
         
         # Apply cross-year hints for unmapped rows with strong validation
         for row_idx, fact in cross_year_hints.items():
@@ -1205,11 +1367,23 @@ class EnhancedAgenticParser:
                 all_reasoning[row_idx] = "Cross-year numerical validation match"
                 logger.info(f"[EnhancedParser] Applied cross-year hint: {row_idx} -> {fact}")
         
+        # Groups the LLM budget did not cover take the deterministic mapping
+        deterministic_rows = self._apply_deterministic_mappings(
+            deterministic_groups, all_mappings, all_confidence, all_reasoning
+        )
+        
         # Step 5: Verification loop
         verification_history = []
         previous_feedback = None
         
         for iteration in range(self.max_verification_iterations):
+            if self.llm_budget is not None:
+                affordable = self.llm_budget.can_afford(1)
+                self.llm_budget.record("verification", iteration + 1, 1.0, affordable,
+                                       "" if affordable else "budget exhausted")
+                if not affordable:
+                    logger.info(f"[EnhancedParser] LLM budget exhausted, skipping verification")
+                    break
             logger.info(f"[EnhancedParser] Verification iteration {iteration + 1}/{self.max_verification_iterations}")
             
             verification = self._verify_mappings(
@@ -1253,7 +1427,8 @@ class EnhancedAgenticParser:
                     is_sum_row=row_idx in sum_info,
                     cross_year_validated=ctx.has_strong_cross_year_match if ctx else False,
                     cross_year_perfect_match=ctx.has_perfect_match if ctx else False,
-                    mapped_via="batch_llm",
+                    mapped_via=("memory" if row_idx in learned and all_mappings[row_idx] == learned[row_idx].fact
+                                else "deterministic" if row_idx in deterministic_rows else "batch_llm"),
                     numerical_context=ctx,
                 ))
         
@@ -1269,7 +1444,15 @@ class EnhancedAgenticParser:
             "verification_iterations": len(verification_history),
             "final_verification_valid": verification_history[-1].is_valid if verification_history else True,
             "confusable_groups_processed": len(groups),
+            "deterministic_groups": len(deterministic_groups),
+            "memory_hits": sum(1 for m in mappings_list if m.mapped_via == "memory"),
         }
+        # Only remember mappings a verification round actually accepted (not
+        # when the budget skipped verification or it was turned off)
+        if verification_history and verification_history[-1].is_valid:
+            self._record_mappings(mappings_list, rows_text)
+        if self.llm_budget is not None:
+            stats["llm_budget"] = self.llm_budget.report()
         
         logger.info(f"[EnhancedParser] Complete: {stats['mapped_rows']}/{stats['total_rows']} mapped "
                    f"({stats['match_percentage']:.1f}%), {stats['cross_year_validated']} cross-year validated, "
@@ -0,0 +1,171 @@
+"""
+FACT CUBE - Aligned Historical Fact Cube for Cross-Year Validation
+
+main.py accumulates, per statement type, a dict {filing date: mapped_df} of
+every filing parsed so far, and the cross-year checks (TemporalValidator,
+FinancialStatement._compare_with_historical) compare candidates against it.
+They used to walk that dict for every candidate: every historical filing,
+every overlapping column, one scalar .loc at a time, so the work grew with
+candidates × filings × periods and got quadratic over a 10-year run.
+
+A HistoricalFactCube merges the filings once into a single array
+
+    values[filing, fact, period-end]      NaN where a filing lacks the fact
+                                          or the period
+
+with facts and period-ends interned to integer positions. Filings are kept
+as separate layers (in dict order), so comparisons are exactly the ones the
+per-filing loops made. lookup() aligns any set of facts and current columns
+against the cube with a few fancy-indexing operations.
+
+get_fact_cube() keeps one cube per historical_statements dict and brings it
+up to date on every call: filings added since the last call (main.py adds
+one as each filing finishes) are appended as new layers; the cube is only
+rebuilt if an existing entry was replaced or removed. A cube references its
+dict and every DataFrame in it, so main.py releases the cubes of a ticker's
+dicts when the ticker is done (fact_cubes_released()); at most MAX_CUBES
+are kept in any case.
+
+Usage:
+    from fact_cube import get_fact_cube, fact_cubes_released
+    with fact_cubes_released([historical_statements]):
+        cube = get_fact_cube(historical_statements)
+        hist = cube.lookup(["Total revenue", "Net income"], og_df.columns)
+        # hist.shape == (len(cube.filings), 2, len(og_df.columns))
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence
+
+from mapped_state import numeric_frame_values
+
+logger = logging.getLogger(__name__)
+
+
+MAX_CUBES = 32   # historical dicts tracked at once (3 statement types per company)
+
+
+class HistoricalFactCube:
+    """
+    Facts × period-ends matrix per historical filing, aligned on shared
+    fact and period axes. Built incrementally, one filing at a time.
+    """
+
+    def __init__(self, source: Optional[Dict[str, pd.DataFrame]] = None):
+        """
+        Args:
+            source: {filing key: mapped_df} dict to track (see sync())
+        """
+        self.source = source
+        self.filings: List[str] = []
+        self.facts: Dict[str, int] = {}
+        self.periods: Dict[Hashable, int] = {}
+        self.values = np.zeros((0, 0, 0))
+        self._frames: List[pd.DataFrame] = []    # source frames, to detect replaced entries
+        self._lock = threading.Lock()
+        if source:
+            self.sync()
+
+    def __len__(self) -> int:
+        return len(self.filings)
+
+    def _intern(self, axis: Dict[Hashable, int], labels) -> np.ndarray:
+        positions = np.empty(len(labels), dtype=np.int64)
+        for i, label in enumerate(labels):
+            positions[i] = axis.setdefault(label, len(axis))
+        return positions
+
+    def add_filing(self, key: str, mapped_df: pd.DataFrame):
+        """Append one filing as a new layer, growing the fact / period axes as needed."""
+        keep_rows = ~mapped_df.index.duplicated()           # first occurrence, like .loc
+        keep_cols = ~mapped_df.columns.duplicated()
+        layer_values = numeric_frame_values(mapped_df)[keep_rows][:, keep_cols]
+        fact_pos = self._intern(self.facts, mapped_df.index[keep_rows])
+        period_pos = self._intern(self.periods, mapped_df.columns[keep_cols])
+
+        n_filings, n_facts, n_periods = self.values.shape
+        grown = np.full((n_filings + 1, len(self.facts), len(self.periods)), np.nan)
+        grown[:n_filings, :n_facts, :n_periods] = self.values
+        grown[n_filings][np.ix_(fact_pos, period_pos)] = layer_values
+        self.values = grown
+        self.filings.append(key)
+        self._frames.append(mapped_df)
+
+    def sync(self) -> 'HistoricalFactCube':
+        """Bring the cube up to date with its source dict (new filings are appended)."""
+        if self.source is None:
+            return self
+        with self._lock:
+            items = list(self.source.items())
+            known = len(self.filings)
+            unchanged = len(items) >= known and all(
+                key == self.filings[i] and df is self._frames[i] for i, (key, df) in enumerate(items[:known])
+            )
+            if not unchanged:
+                logger.debug("Historical statements changed, rebuilding fact cube")
+                self.filings, self._frames = [], []
+                self.facts, self.periods = {}, {}
+                self.values = np.zeros((0, 0, 0))
+                known = 0
+            for key, df in items[known:]:
+                self.add_filing(key, df)
+        return self
+
+    def lookup(self, fact_names: Sequence[str], columns: Sequence) -> np.ndarray:
+        """
+        Historical values of facts in the given current columns.
+
+        Returns:
+            Array (filings, len(fact_names), len(columns)); NaN where a filing
+            lacks the fact or the column (as the per-filing loops skipped them)
+        """
+        fact_pos = np.array([self.facts.get(f, -1) for f in fact_names], dtype=np.int64)
+        period_pos = np.array([self.periods.get(c, -1) for c in columns], dtype=np.int64)
+        hist = self.values[:, np.maximum(fact_pos, 0)][:, :, np.maximum(period_pos, 0)] \
+            if self.values.size else np.full((len(self.filings), len(fact_pos), len(period_pos)), np.nan)
+        missing = (fact_pos < 0)[None, :, None] | (period_pos < 0)[None, None, :]
+        return np.where(missing, np.nan, hist)
+
+
+_cubes: "OrderedDict[int, HistoricalFactCube]" = OrderedDict()
+_cubes_lock = threading.Lock()
+
+
+def get_fact_cube(historical_statements: Dict[str, pd.DataFrame]) -> HistoricalFactCube:
+    """
+    Up-to-date cube of a historical_statements dict. The same dict (one per
+    statement type in main.py) always gets the same, incrementally updated cube.
+    """
+    key = id(historical_statements)
+    with _cubes_lock:
+        cube = _cubes.get(key)
+        if cube is None or cube.source is not historical_statements:
+            cube = _cubes[key] = HistoricalFactCube(historical_statements)
+            while len(_cubes) > MAX_CUBES:
+                _cubes.popitem(last=False)
+        _cubes.move_to_end(key)
+    return cube.sync()
+
+
+def release_fact_cubes(*historical_statements: Dict[str, pd.DataFrame]):
+    """Drop the cubes of these dicts (and with them the references to their DataFrames)."""
+    with _cubes_lock:
+        for historical in historical_statements:
+            cube = _cubes.get(id(historical))
+            if cube is not None and cube.source is historical:
+                del _cubes[id(historical)]
+
+
+@contextmanager
+def fact_cubes_released(historical_dicts: Iterable[Dict[str, pd.DataFrame]]):
+    """Release the cubes of the given dicts when the block ends."""
+    historical_dicts = list(historical_dicts)
+    try:
+        yield
+    finally:
+        release_fact_cubes(*historical_dicts)
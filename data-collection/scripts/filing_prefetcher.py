@@ -0,0 +1,129 @@
+"""
+FILING PREFETCHER - Fetch/Parse Producer-Consumer Pipeline for Filings
+
+get_financial_statements() maps filings strictly newest to oldest, because
+each filing's temporal validation uses the mapped statements of the newer
+filings before it (historical_income/balance/cashflow). Mapping therefore
+stays sequential, but the network work does not have to be:
+
+    fetchers (thread pool)                     consumer (main thread)
+    ──────────────────────                     ──────────────────────
+    Filling(N+1): FilingSummary, R files,      map filing N
+                  calculation graph             └─ next(): waits for N+1
+    Filling(N+2): ...
+    ...up to N+depth
+
+A bounded pool of fetchers builds the Filling objects (which download the
+FilingSummary) and prefetches the statement R files and the calculation graph
+for filings N+1..N+depth while filing N is mapped. Results are yielded
+strictly in input order, so the newest-to-oldest contract is preserved. At
+most `depth` filings are held in memory ahead of the consumer. All HTTP goes
+through the shared EdgarClient, so the SEC rate limit still applies.
+
+Configuration (environment variables):
+    PREFETCH_DEPTH      Filings fetched ahead of the one being mapped (default 3, 0 = off)
+    PREFETCH_WORKERS    Fetcher threads (default 3)
+
+Usage:
+    from filing_prefetcher import FilingPrefetcher
+    with FilingPrefetcher(build_filing, filings.items(), statement_names) as prefetcher:
+        for (report_date, accession_num), filing_or_error in prefetcher:
+            ...
+"""
+
+import os
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Tuple, Any
+
+from tracing import propagate
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+
+PREFETCH_DEPTH = int(os.environ.get("PREFETCH_DEPTH", "3"))
+PREFETCH_WORKERS = int(os.environ.get("PREFETCH_WORKERS", "3"))
+
+
+class FilingPrefetcher:
+    """
+    Ordered, bounded-lookahead prefetcher of Filling objects.
+
+    Iterating yields (item, result) pairs in input order where result is the
+    prefetched Filling, or the Exception raised while building it (so the
+    consumer can log and skip the filing like it did before).
+    """
+
+    def __init__(self, build_filing: Callable[[Any], Any], items: Iterable,
+                 statement_names: List[str], depth: int = PREFETCH_DEPTH,
+                 workers: int = PREFETCH_WORKERS):
+        """
+        Args:
+            build_filing: Called with one item, returns a Filling
+            items: Filings in processing order, e.g. filings.items()
+            statement_names: Statements whose R files should be prefetched
+            depth: Number of filings fetched ahead of the consumer
+            workers: Size of the fetcher thread pool
+        """
+        self.build_filing = build_filing
+        self.items = iter(items)
+        self.statement_names = list(statement_names)
+        self.depth = max(0, depth)
+        self.workers = max(1, workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="prefetch") \
+            if self.depth else None
+        self._pending: deque = deque()  # (item, Future) in input order
+
+    def _fetch(self, item):
+        filing = self.build_filing(item)
+        filing.prefetch_statement_documents(self.statement_names)
+        return filing
+
+    def _fill(self, limit: int):
+        while len(self._pending) < limit:
+            try:
+                item = next(self.items)
+            except StopIteration:
+                return
+            self._pending.append((item, self._executor.submit(propagate(self._fetch), item)))
+
+    def __iter__(self) -> Iterator[Tuple[Any, Any]]:
+        if self._executor is None:
+            # Prefetching disabled: build each filing lazily, in order
+            for item in self.items:
+                try:
+                    yield item, self._fetch(item)
+                except Exception as e:
+                    yield item, e
+            return
+
+        # The filing being mapped plus `depth` filings fetched ahead of it
+        self._fill(self.depth + 1)
+        while self._pending:
+            item, future = self._pending.popleft()
+            try:
+                result = future.result()
+            except Exception as e:
+                result = e
+            # `item` is now handed to the consumer; keep `depth` fetched ahead of it
+            self._fill(self.depth)
+            yield item, result
+
+    def close(self):
+        """Cancel outstanding fetches and stop the pool."""
+        if self._executor is not None:
+            for _, future in self._pending:
+                future.cancel()
+            self._pending.clear()
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,235 @@
+"""
+HTTP CASSETTE - Record / Replay of SEC HTTP Exchanges for Offline Runs
+
+Runs of main.py against live SEC endpoints vary a lot in duration (latency,
+throttling) and in content (new filings, refreshed companyfacts), which makes
+benchmarking and regression-testing the mapping impossible. A cassette is a
+directory holding every HTTP exchange made through EdgarClient (Company,
+Filling, cal_xml / calc_graph, companyfacts_store, ticker_index,
+insider_trading) during a recording run:
+
+    record   Requests are served as usual (network / archive cache) and every
+             final response - including 404s and other errors - is written
+             to the cassette
+    replay   Requests are answered from the cassette only; nothing touches the
+             network, the rate limiter or the archive cache, and a request
+             that was not recorded raises CassetteMiss
+
+Layout (under the cassette directory):
+    interactions/<k[:2]>/<k>.json   k = sha256("METHOD url"); {method, url, status,
+                                    reason, content_type, sha256, size}
+    bodies/<s[:2]>/<s>.zz           s = sha256(body); zlib-compressed bytes
+
+Requests are keyed by method and full URL (query parameters included), so
+the same request always replays the same response. While a cassette is
+active the derived local stores (companyfacts columns, calculation graphs,
+ticker index, insider caches) are neither read nor written: a recording
+then captures every exchange the pipeline needs, and a replay rebuilds
+everything from the cassette instead of from whatever is on disk.
+
+Configuration (environment variables):
+    EDGAR_CASSETTE_MODE     'record' or 'replay' (unset = cassette off)
+    EDGAR_CASSETTE_DIR      Cassette directory (default .api_cache/edgar/cassette)
+
+Usage:
+    python main.py --ticker AAPL --years 3 --record cassettes/aapl
+    python main.py --ticker AAPL --years 3 --replay cassettes/aapl
+"""
+
+import io
+import os
+import json
+import zlib
+import hashlib
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+
+_SCRIPT_DIR = Path(__file__).parent
+_PROJECT_ROOT = _SCRIPT_DIR.parent.parent  # data-collection/scripts -> project root
+DEFAULT_CASSETTE_DIR = _PROJECT_ROOT / ".api_cache" / "edgar" / "cassette"
+
+RECORD = "record"
+REPLAY = "replay"
+COMPRESSION_LEVEL = 6
+
+
+def cassette_mode() -> Optional[str]:
+    """'record', 'replay' or None, from EDGAR_CASSETTE_MODE."""
+    mode = os.environ.get("EDGAR_CASSETTE_MODE", "").strip().lower()
+    if mode in (RECORD, REPLAY):
+        return mode
+    if mode:
+        logger.warning("Ignoring unknown EDGAR_CASSETTE_MODE=%r", mode)
+    return None
+
+
+def cassette_active() -> bool:
+    """True while recording or replaying; derived local stores are bypassed then."""
+    return cassette_mode() is not None
+
+
+class CassetteMiss(requests.ConnectionError):
+    """Raised in replay mode when a request was not recorded."""
+
+
+def request_url(method: str, url: str, params=None) -> str:
+    """Full request URL with query parameters, as requests would send it."""
+    if not params:
+        return url
+    return requests.Request(method, url, params=params).prepare().url
+
+
+# ─── Cassette ──────────────────────────────────────────────────────────────────
+
+class Cassette:
+    """
+    Directory of recorded HTTP exchanges, keyed by (method, full URL).
+    """
+
+    def __init__(self, root: Path, mode: str):
+        """
+        Args:
+            root: Cassette directory
+            mode: RECORD or REPLAY
+        """
+        self.root = Path(root)
+        self.mode = mode
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    @staticmethod
+    def _sha256(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def _interaction_path(self, method: str, url: str) -> Path:
+        k = self._sha256(f"{method.upper()} {url}".encode())
+        return self.root / "interactions" / k[:2] / f"{k}.json"
+
+    def _body_path(self, digest: str) -> Path:
+        return self.root / "bodies" / digest[:2] / f"{digest}.zz"
+
+    @staticmethod
+    def _atomic_write(path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def record(self, method: str, url: str, params, response: requests.Response):
+        """Store the final response of one exchange (overwrites an earlier one)."""
+        full_url = request_url(method, url, params)
+        body = response.content or b""
+        digest = self._sha256(body)
+        body_path = self._body_path(digest)
+        try:
+            if not body_path.exists():
+                self._atomic_write(body_path, zlib.compress(body, COMPRESSION_LEVEL))
+            entry = {
+                "method": method.upper(),
+                "url": full_url,
+                "status": response.status_code,
+                "reason": response.reason,
+                "content_type": response.headers.get("Content-Type", ""),
+                "sha256": digest,
+                "size": len(body),
+            }
+            self._atomic_write(self._interaction_path(method, full_url),
+                               json.dumps(entry, indent=1).encode())
+        except OSError as exc:
+            logger.warning("Could not record %s %s: %s", method, full_url, exc)
+            return
+        self._count("recorded")
+
+    def lookup(self, method: str, url: str, params=None) -> Optional[Tuple[dict, bytes]]:
+        """Recorded (entry, body) for a request, or None."""
+        full_url = request_url(method, url, params)
+        try:
+            with open(self._interaction_path(method, full_url)) as f:
+                entry = json.load(f)
+            with open(self._body_path(entry["sha256"]), "rb") as f:
+                body = zlib.decompress(f.read())
+        except FileNotFoundError:
+            return None
+        except Exception as exc:
+            logger.warning("Cassette entry for %s %s unreadable: %s", method, full_url, exc)
+            return None
+        return entry, body
+
+    def play(self, method: str, url: str, params=None) -> requests.Response:
+        """
+        Replay a recorded exchange.
+
+        Raises:
+            CassetteMiss: if the request is not in the cassette
+        """
+        hit = self.lookup(method, url, params)
+        if hit is None:
+            self._count("misses")
+            raise CassetteMiss(f"EDGAR cassette {self.root}: {method} "
+                               f"{request_url(method, url, params)} was not recorded")
+        entry, body = hit
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = entry.get("reason") or ""
+        response._content = body
+        response.raw = io.BytesIO(body)
+        response.url = entry["url"]
+        if entry.get("content_type"):
+            response.headers["Content-Type"] = entry["content_type"]
+        self._count("replayed")
+        return response
+
+    def stats(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "path": str(self.root),
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+        }
+
+
+_cassettes: Dict[Tuple[str, str], Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """
+    The Cassette selected by EDGAR_CASSETTE_MODE / EDGAR_CASSETTE_DIR, or None.
+    Read at call time, so main.py can switch it on after imports.
+    """
+    mode = cassette_mode()
+    if mode is None:
+        return None
+    root = str(Path(os.environ.get("EDGAR_CASSETTE_DIR", DEFAULT_CASSETTE_DIR)).resolve())
+    with _cassettes_lock:
+        cassette = _cassettes.get((root, mode))
+        if cassette is None:
+            cassette = _cassettes[(root, mode)] = Cassette(Path(root), mode)
+    return cassette
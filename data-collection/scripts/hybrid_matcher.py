@@ -24,6 +24,8 @@ import pandas as pd
 from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass, field
 from statement_maps import MapFact
+from pattern_matcher import get_statement_map_matcher
+from candidate_memo import CandidateMemo, get_candidate_memo, statement_key
 
 logger = logging.getLogger(__name__)
 
@@ -179,6 +181,8 @@ def decompose_gaap_tag(raw_label: str) -> Dict[str, str]:
 def find_pattern_matches(search_string: str, patterns: List[str], pattern_type: str) -> List[PatternMatch]:
     """
     Find all patterns that match the search string.
+    Reference implementation; the mappers use pattern_matcher's precompiled
+    StatementMapMatcher, which returns the same matches.
     
     Args:
         search_string: String to search in
@@ -209,6 +213,14 @@ def find_pattern_matches(search_string: str, patterns: List[str], pattern_type:
     return matches
 
 
+def _pattern_matches(hits) -> List[PatternMatch]:
+    """PatternMatch list from pattern_matcher hits (same result as find_pattern_matches)."""
+    if not hits:
+        return []
+    return [PatternMatch(pattern=pattern, match_string=match_string, pattern_index=index)
+            for index, pattern, match_string in hits]
+
+
 def compute_regex_score(candidate: MatchCandidate) -> float:
     """
     Compute the regex-based score for a candidate.
@@ -265,16 +277,24 @@ class HybridMatcher:
             candidates = matcher.find_candidates(idx, row, human_label)
     """
 
-    def __init__(self, statement_map):
+    def __init__(self, statement_map, memo: Optional[CandidateMemo] = None):
         """
         Args:
             statement_map: An IncomeStatementMap, BalanceSheetMap, or CashFlowMap instance.
+            memo: Candidate memo (default: the shared one, None if CANDIDATE_MEMO=0)
         """
         self.statement_map = statement_map
         self._map_fact_items = [
             (name, mf) for name, mf in vars(statement_map).items()
             if isinstance(mf, MapFact)
         ]
+        self._map_facts_by_attr = dict(self._map_fact_items)
+        self._attr_by_map_fact = {id(mf): name for name, mf in self._map_fact_items}
+        # Regex-stage results shared across filings, companies and runs
+        self._memo = memo if memo is not None else get_candidate_memo()
+        self._memo_statement = statement_key(statement_map)
+        # Precompiled regexes of all MapFacts (shared by every matcher of this map)
+        self._pattern_matcher = get_statement_map_matcher(statement_map)
         # Pre-build keyword index for CamelCase fallback matching
         self._keyword_index = self._build_keyword_index()
 
@@ -317,6 +337,9 @@ class HybridMatcher:
         3. Try IFRS regex against row_idx
         4. Try Human regex against human_label
         5. If no matches, try CamelCase decomposition fallback
+
+        The result only depends on the map, the normalised tag and the label,
+        so it is served from the candidate memo when possible.
         
         Args:
             row_idx: Row index / taxonomy tag (e.g., 'us-gaap_CostOfRevenue')
@@ -326,16 +349,34 @@ class HybridMatcher:
         Returns:
             List of MatchCandidate sorted by regex_score (descending)
         """
-        candidates = []
-        seen_facts = set()  # Avoid duplicate candidates for same fact
-        
         # Detect dimensional rows and use the stripped tag for matching
         is_dimensional = is_dimensional_row(row_idx)
         search_idx = strip_dimensional_prefix(row_idx) if is_dimensional else row_idx
 
+        if self._memo is None or not isinstance(search_idx, str) or not isinstance(human_label, str):
+            return self._match_candidates(row_idx, search_idx, is_dimensional, human_label)
+
+        key = (self._memo_statement, search_idx, is_dimensional, human_label)
+        entries = self._memo.get(key)
+        if entries is None:
+            candidates = self._match_candidates(row_idx, search_idx, is_dimensional, human_label)
+            self._memo.put(key, self._memo_entries(candidates))
+            return candidates
+        return self._candidates_from_memo(entries)
+
+    def _match_candidates(self, row_idx: str, search_idx: str, is_dimensional: bool,
+                          human_label: str) -> List[MatchCandidate]:
+        """Regex stage of find_candidates (what the candidate memo stores)."""
+        candidates = []
+        seen_facts = set()  # Avoid duplicate candidates for same fact
+
+        gaap_hits = self._pattern_matcher.search('GAAP', search_idx)
+        ifrs_hits = self._pattern_matcher.search('IFRS', search_idx)
+        human_hits = self._pattern_matcher.search('Human', human_label) if human_label else {}
+
         for attr_name, mf in self._map_fact_items:
             # --- GAAP patterns ---
-            gaap_matches = find_pattern_matches(search_idx, mf.gaap_pattern, 'GAAP')
+            gaap_matches = _pattern_matches(gaap_hits.get(attr_name))
             if gaap_matches and mf.fact not in seen_facts:
                 c = MatchCandidate(map_fact=mf, pattern_type='GAAP', matched_patterns=gaap_matches)
                 c.regex_score = compute_regex_score(c)
@@ -344,7 +385,7 @@ class HybridMatcher:
                 continue  # GAAP match found; skip IFRS/Human for this MapFact
 
             # --- IFRS patterns ---
-            ifrs_matches = find_pattern_matches(search_idx, mf.ifrs_pattern, 'IFRS')
+            ifrs_matches = _pattern_matches(ifrs_hits.get(attr_name))
             if ifrs_matches and mf.fact not in seen_facts:
                 c = MatchCandidate(map_fact=mf, pattern_type='IFRS', matched_patterns=ifrs_matches)
                 c.regex_score = compute_regex_score(c)
@@ -354,7 +395,7 @@ class HybridMatcher:
 
             # --- Human patterns ---
             if human_label:
-                human_matches = find_pattern_matches(human_label, mf.human_pattern, 'Human')
+                human_matches = _pattern_matches(human_hits.get(attr_name))
                 if human_matches and mf.fact not in seen_facts:
                     c = MatchCandidate(map_fact=mf, pattern_type='Human', matched_patterns=human_matches)
                     c.regex_score = compute_regex_score(c)
@@ -381,6 +422,29 @@ class HybridMatcher:
 
         return candidates
 
+    def _memo_entries(self, candidates: List[MatchCandidate]) -> list:
+        """Plain-data snapshot of a candidate list (see candidate_memo.py)."""
+        return [
+            [self._attr_by_map_fact[id(c.map_fact)], c.pattern_type, c.regex_score, dict(c.context),
+             [[m.pattern_index, m.pattern, m.match_string] for m in c.matched_patterns]]
+            for c in candidates
+        ]
+
+    def _candidates_from_memo(self, entries: list) -> List[MatchCandidate]:
+        """Fresh MatchCandidates from a memo entry; later stages mutate them freely."""
+        candidates = []
+        for attr_name, pattern_type, regex_score, context, matches in entries:
+            c = MatchCandidate(
+                map_fact=self._map_facts_by_attr[attr_name],
+                pattern_type=pattern_type,
+                matched_patterns=[PatternMatch(pattern=pattern, match_string=text, pattern_index=index)
+                                  for index, pattern, text in matches],
+            )
+            c.regex_score = regex_score
+            c.context = dict(context)
+            candidates.append(c)
+        return candidates
+
     def _camelcase_fallback(self, row_idx: str, human_label: str) -> List[MatchCandidate]:
         """
         Fallback: decompose the tag into CamelCase words and match keywords
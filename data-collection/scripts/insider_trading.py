@@ -10,6 +10,8 @@ Caching:
   - File-based JSON cache in output/insider/ and output/investors/
   - Default TTL: 24 hours (configurable via INSIDER_CACHE_TTL_HOURS env var)
   - Cache is checked before every EDGAR request
+  - All EDGAR requests go through edgar_client (pooled, 10 req/s shared limit)
+  - Bypassed while an HTTP cassette records/replays (see http_cassette.py)
 
 EDGAR API notes (verified from live data):
   - Form 4 primaryDocument has XSLT prefix (e.g. "xslF345X05/file.xml") → strip it
@@ -20,7 +22,6 @@ EDGAR API notes (verified from live data):
 
 import os
 import json
-import time
 import logging
 import re
 import threading
@@ -28,9 +29,12 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional, List, Dict, Any
 
-import requests
 from bs4 import BeautifulSoup
 
+from edgar_client import get_edgar_client
+from http_cassette import cassette_active
+from ticker_index import get_ticker_index
+
 logger = logging.getLogger(__name__)
 
 # ── Graceful-stop flag — set this to abort any in-progress EDGAR fetch ──────
@@ -61,7 +65,7 @@ def _cache_path(directory: Path, key: str) -> Path:
 
 
 def _read_cache(path: Path) -> Optional[Dict]:
-    if not path.exists():
+    if cassette_active() or not path.exists():  # cassettes capture/replay the raw HTTP
         return None
     try:
         with open(path) as f:
@@ -80,6 +84,8 @@ def _read_cache(path: Path) -> Optional[Dict]:
 
 
 def _write_cache(path: Path, data: Dict) -> None:
+    if cassette_active():
+        return
     try:
         data["_cached_at"] = datetime.now().isoformat()
         with open(path, "w") as f:
@@ -93,25 +99,11 @@ def _write_cache(path: Path, data: Dict) -> None:
 # ══════════════════════════════════════════════════════════════════
 
 def _get_cik_from_ticker(ticker: str) -> str:
-    """Resolve ticker → 10-digit zero-padded CIK. Cached in INSIDER_CACHE_DIR."""
-    cache_path = _cache_path(INSIDER_CACHE_DIR, f"cik_{ticker.upper()}")
-    cached = _read_cache(cache_path)
-    if cached:
-        return cached["cik"]
-
-    resp = requests.get(
-        "https://www.sec.gov/files/company_tickers.json",
-        headers=HEADERS,
-        timeout=10,
-    )
-    resp.raise_for_status()
-    ticker_norm = ticker.upper().replace(".", "-")
-    for company in resp.json().values():
-        if company["ticker"] == ticker_norm:
-            cik = str(company["cik_str"]).zfill(10)
-            _write_cache(cache_path, {"cik": cik})
-            return cik
-    raise ValueError(f"Ticker '{ticker}' not found in SEC database")
+    """Resolve ticker → 10-digit zero-padded CIK via the shared ticker index."""
+    try:
+        return get_ticker_index().lookup_cik(ticker)
+    except ValueError:
+        raise ValueError(f"Ticker '{ticker}' not found in SEC database")
 
 
 def _get_submissions(cik: str) -> dict:
@@ -120,14 +112,14 @@ def _get_submissions(cik: str) -> dict:
     Returns the full submissions dict with all filings merged into 'recent'.
     """
     url = f"https://data.sec.gov/submissions/CIK{cik}.json"
-    resp = requests.get(url, headers=HEADERS, timeout=15)
+    resp = get_edgar_client().get(url, headers=HEADERS, timeout=15)
     resp.raise_for_status()
     data = resp.json()
 
     for old_file in data.get("filings", {}).get("files", []):
         old_url = "https://data.sec.gov/submissions/" + old_file["name"]
         try:
-            old_resp = requests.get(old_url, headers=HEADERS, timeout=10)
+            old_resp = get_edgar_client().get(old_url, headers=HEADERS, timeout=10)
             old_sub = old_resp.json()
             for col in old_sub:
                 if col in data["filings"]["recent"]:
@@ -304,7 +296,7 @@ def _fetch_form4_xml(cik: str, accession_number: str, primary_doc: str) -> Optio
     doc_filename = primary_doc.split("/")[-1] if "/" in primary_doc else primary_doc
     url = f"https://www.sec.gov/Archives/edgar/data/{cik_int}/{acc_clean}/{doc_filename}"
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=10)
+        resp = get_edgar_client().get(url, headers=HEADERS, timeout=10)
         resp.raise_for_status()
         return resp.text
     except Exception as exc:
@@ -371,9 +363,7 @@ def _fetch_form4_all(ticker: str) -> Dict:
             else:
                 parse_errors += 1
 
-            # Respect SEC rate limit (~5 req/s burst, 10/s sustained)
-            if idx % 5 == 4:
-                time.sleep(0.2)
+            # SEC rate limit (10 req/s) is enforced by the shared EDGAR client
     except KeyboardInterrupt:
         logger.info("KeyboardInterrupt: stopping Form 4 fetch for %s, collected %d txns so far", ticker, len(all_transactions))
 
@@ -494,7 +484,7 @@ def _find_13f_info_table_url(cik: str, accession_number: str) -> Optional[str]:
         return True
 
     try:
-        resp = requests.get(index_url, headers=HEADERS, timeout=10)
+        resp = get_edgar_client().get(index_url, headers=HEADERS, timeout=10)
         resp.raise_for_status()
         soup = BeautifulSoup(resp.text, "html.parser")
 
@@ -526,7 +516,7 @@ def _find_13f_info_table_url(cik: str, accession_number: str) -> Optional[str]:
     for fname in ["informationtable.xml", "infotable.xml", "form13finfotable.xml"]:
         url = f"{base_url}/{fname}"
         try:
-            r = requests.head(url, headers=HEADERS, timeout=5)
+            r = get_edgar_client().head(url, headers=HEADERS, timeout=5)
             if r.status_code == 200:
                 return url
         except Exception:
@@ -615,7 +605,7 @@ def search_investors(query: str) -> Dict:
     if cached:
         return cached
 
-    resp = requests.get(
+    resp = get_edgar_client().get(
         "https://www.sec.gov/cgi-bin/browse-edgar",
         params={
             "company": query, "CIK": "", "type": "13F-HR",
@@ -758,7 +748,7 @@ def fetch_13f_holdings(
     raw_holdings: List[Dict] = []
     if info_url:
         try:
-            resp = requests.get(info_url, headers=HEADERS, timeout=20)
+            resp = get_edgar_client().get(info_url, headers=HEADERS, timeout=20)
             resp.raise_for_status()
             raw_holdings = _parse_13f_xml(resp.text)
         except Exception as exc:
@@ -868,7 +858,6 @@ def fetch_13f_history(
                 )
                 if best is None or data["total_holdings"] > best["total_holdings"]:
                     best = data
-                time.sleep(0.05)
             except Exception as exc:
                 logger.warning("Could not load filing %s: %s", filing["filingDate"], exc)
         if best and best["total_holdings"] > 0:
@@ -0,0 +1,214 @@
+"""
+LLM BUDGET - Per-Filing LLM Call / Time Budget with Expected-Value Scheduling
+
+Whether a statement asks the LLM used to depend only on static thresholds
+(PipelineConfig.llm_ambiguity_threshold / llm_low_confidence_threshold), and
+the enhanced parser always sent every confusable group plus up to three
+verification rounds, so one filing took seconds and the next minutes.
+
+Each filing now gets a budget of LLM calls and LLM seconds, split evenly
+between its statements (statements are mapped concurrently, so an even split
+keeps each statement's result independent of the others' timing):
+
+1. The mapper lists every decision the LLM could help with, with its
+   expected value (how close the candidates are, minus what temporal and
+   summation evidence already settle) and its expected cost in calls
+2. plan() grants decisions in decreasing value while their cost fits the
+   remaining budget
+3. Granted decisions still check can_afford() before calling (the cost model
+   is an estimate; seconds are measured); everything else takes the
+   deterministic result (best-scored candidate, regex mapping)
+4. Every call is charged to the budget (cache hits are free) and every
+   decision is recorded, so report() shows how the budget was spent
+
+A statement mapped without a budget (llm_budget=None) behaves as before.
+
+Configuration (environment variables):
+    LLM_BUDGET_CALLS        LLM calls per filing (default 30, 0 = unlimited)
+    LLM_BUDGET_SECONDS      LLM seconds per filing (default 240, 0 = unlimited)
+
+Usage:
+    from llm_budget import FilingLLMBudget
+    budget = FilingLLMBudget("2024-09-28", ["income_statement", "balance_sheet"])
+    statement_budget = budget.for_statement("income_statement")
+    granted = statement_budget.plan([(row_idx, value, 1.5), ...])
+    ...
+    logger.info(budget.summary())
+"""
+
+import os
+import math
+import logging
+import threading
+from typing import Dict, Hashable, Iterable, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+
+LLM_BUDGET_CALLS = int(os.environ.get("LLM_BUDGET_CALLS", "30"))
+LLM_BUDGET_SECONDS = float(os.environ.get("LLM_BUDGET_SECONDS", "240"))
+
+DEFAULT_CALL_SECONDS = 10.0   # cost estimate of a call until one has been measured
+
+
+class LLMBudget:
+    """
+    LLM calls and seconds one statement may spend, and how they were spent.
+    Safe to charge from several threads (agents.llm_pool).
+    """
+
+    def __init__(self, max_calls: int = 0, max_seconds: float = 0.0, name: str = ""):
+        """
+        Args:
+            max_calls: Calls allowed (0 = unlimited)
+            max_seconds: Seconds of LLM calls allowed (0 = unlimited)
+            name: Statement name, for reports
+        """
+        self.name = name
+        self.max_calls = max_calls
+        self.max_seconds = max_seconds
+        self.calls = 0
+        self.cached = 0
+        self.seconds = 0.0
+        self.decisions: List[Dict] = []
+        self._lock = threading.Lock()
+
+    # ── Cost model ────────────────────────────────────────────────────────
+
+    def call_seconds(self) -> float:
+        """Expected seconds of one call: the mean measured so far."""
+        return self.seconds / self.calls if self.calls else DEFAULT_CALL_SECONDS
+
+    def remaining_calls(self) -> float:
+        return math.inf if not self.max_calls else max(0, self.max_calls - self.calls)
+
+    def remaining_seconds(self) -> float:
+        return math.inf if not self.max_seconds else max(0.0, self.max_seconds - self.seconds)
+
+    def affordable_calls(self) -> float:
+        """Calls that still fit the budget (inf when unlimited)."""
+        return min(self.remaining_calls(), self.remaining_seconds() / self.call_seconds())
+
+    def can_afford(self, expected_calls: float = 1.0) -> bool:
+        return self.affordable_calls() >= expected_calls
+
+    # ── Scheduling ────────────────────────────────────────────────────────
+
+    def plan(self, decisions: Iterable[Tuple[Hashable, float, float]]) -> Set[Hashable]:
+        """
+        Grant the most valuable decisions that fit the budget.
+
+        Args:
+            decisions: (key, expected value, expected calls) per decision
+
+        Returns:
+            Keys of the granted decisions. Decisions are taken in decreasing
+            value (input order on ties); one that does not fit is skipped and
+            cheaper ones after it may still be granted.
+        """
+        ranked = sorted(enumerate(decisions), key=lambda item: (-item[1][1], item[0]))
+        available = self.affordable_calls()
+        granted = set()
+        for _, (key, value, cost) in ranked:
+            if value > 0 and cost <= available:
+                granted.add(key)
+                available -= cost
+        return granted
+
+    def record(self, kind: str, key, value: float, granted: bool, reason: str = ""):
+        """Record a decision the LLM was (granted) or was not asked about."""
+        with self._lock:
+            self.decisions.append({
+                "kind": kind,
+                "key": str(key),
+                "value": round(float(value), 3),
+                "granted": granted,
+                "reason": reason,
+            })
+
+    def charge(self, seconds: float, cached: bool = False):
+        """Account for one LLM call (cached answers cost nothing)."""
+        with self._lock:
+            if cached:
+                self.cached += 1
+            else:
+                self.calls += 1
+                self.seconds += seconds
+
+    # ── Reporting ─────────────────────────────────────────────────────────
+
+    def report(self) -> Dict:
+        by_kind: Dict[str, Dict[str, int]] = {}
+        for decision in self.decisions:
+            counts = by_kind.setdefault(decision["kind"], {"llm": 0, "deterministic": 0})
+            counts["llm" if decision["granted"] else "deterministic"] += 1
+        return {
+            "statement": self.name,
+            "max_calls": self.max_calls,
+            "max_seconds": self.max_seconds,
+            "calls": self.calls,
+            "cached": self.cached,
+            "seconds": round(self.seconds, 2),
+            "decisions": by_kind,
+            "deterministic": [d for d in self.decisions if not d["granted"]],
+        }
+
+
+class FilingLLMBudget:
+    """Budget of one filing, split evenly between the statements mapped from it."""
+
+    def __init__(self, filing: str, statement_names: List[str],
+                 max_calls: int = LLM_BUDGET_CALLS, max_seconds: float = LLM_BUDGET_SECONDS):
+        """
+        Args:
+            filing: Filing label (report date), for reports
+            statement_names: Statements that share the budget
+            max_calls: LLM calls for the whole filing (0 = unlimited)
+            max_seconds: LLM seconds for the whole filing (0 = unlimited)
+        """
+        self.filing = filing
+        self.max_calls = max_calls
+        self.max_seconds = max_seconds
+        n = max(1, len(statement_names))
+        base, extra = divmod(max_calls, n)
+        self.statements: Dict[str, LLMBudget] = {
+            name: LLMBudget(
+                max_calls=(base + (1 if i < extra else 0)) if max_calls else 0,
+                max_seconds=max_seconds / n if max_seconds else 0.0,
+                name=name,
+            )
+            for i, name in enumerate(statement_names)
+        }
+
+    def for_statement(self, statement_name: str) -> LLMBudget:
+        return self.statements[statement_name]
+
+    @property
+    def used(self) -> bool:
+        return any(b.calls or b.cached or b.decisions for b in self.statements.values())
+
+    def report(self) -> Dict:
+        statements = {name: budget.report() for name, budget in self.statements.items()}
+        return {
+            "filing": self.filing,
+            "max_calls": self.max_calls,
+            "max_seconds": self.max_seconds,
+            "calls": sum(r["calls"] for r in statements.values()),
+            "cached": sum(r["cached"] for r in statements.values()),
+            "seconds": round(sum(r["seconds"] for r in statements.values()), 2),
+            "statements": statements,
+        }
+
+    def summary(self) -> str:
+        """One log line: totals, then calls / deterministic fallbacks per statement."""
+        report = self.report()
+        limit_calls = report["max_calls"] or "∞"
+        limit_seconds = report["max_seconds"] or "∞"
+        parts = [
+            f"{name}: {r['calls']} calls ({r['cached']} cached), {len(r['deterministic'])} deterministic"
+            for name, r in report["statements"].items()
+        ]
+        return (f"LLM budget for filing {self.filing}: {report['calls']}/{limit_calls} calls, "
+                f"{report['seconds']:.1f}/{limit_seconds}s - " + "; ".join(parts))
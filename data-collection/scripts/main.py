@@ -9,11 +9,19 @@ Usage:
     python main.py --ticker AAPL
     python main.py --ticker AAPL --years 3 --statement income
     python main.py --ticker AAPL --output data/
+    python main.py --ticker AAPL --record cassettes/aapl   # then --replay cassettes/aapl
+    python main.py --remap AAPL MSFT                       # mapping only, over stored parse artifacts
+    python main.py --ticker AAPL --trace traces/aapl.json  # Chrome trace of the run's stages
+    python main.py --tickers AAPL MSFT GOOG --workers 3 --output data/
+    python main.py --tickers-file tickers.txt --workers 4  # one batch, report in data/batch_report.json
 """
 
 import argparse
+import json
 import sys
 import os
+import time
+from pathlib import Path
 import pandas as pd
 from typing import Optional
 import logging
@@ -24,6 +32,19 @@ from FinancialStatement import IncomeStatement, BalanceSheet, CashFlow
 from healpers import save_dataframe_to_csv
 from merge_utils import merge_all_statements, format_merged_output
 from pattern_logger import get_pattern_logger
+from edgar_client import get_edgar_client
+from filing_prefetcher import FilingPrefetcher
+from statement_runner import StatementRunner, statement_steps
+from fact_cube import fact_cubes_released
+from llm_budget import FilingLLMBudget
+from http_cassette import get_cassette
+from candidate_memo import get_candidate_memo
+from agents.llm_cache import get_llm_cache
+from mapping_memory import get_mapping_memory
+from parse_artifacts import get_parse_artifacts, ArtifactFiling
+from tracing import get_tracer, span, trace_context, TRACE_FILE
+from batch_runner import (run_batch, parse_tickers, read_tickers_file, TickerOutcome,
+                          BATCH_WORKERS, REPORT_FILE_NAME)
 
 # Configure logging to ensure subprocess output
 logging.basicConfig(
@@ -69,6 +90,97 @@ except ImportError as e:
 logger.info(f"===================================")
 
 
+def map_filing(results: dict, filing, report_date, accession_num, steps, historical: dict,
+               runner: StatementRunner, pattern_logger=None):
+    """
+    Map the requested statements of one filing and append them to results.
+    
+    Args:
+        results: Results dict of get_financial_statements() / remap_financial_statements()
+        filing: Filling (or parse_artifacts.ArtifactFiling) whose statements are mapped
+        report_date: Report date of the filing
+        accession_num: Accession number of the filing
+        steps: statement_runner steps selected by the --statement filter
+        historical: {step.key: {year: mapped_df}} of newer filings, extended in place
+        runner: StatementRunner mapping the statements
+        pattern_logger: Pattern logger, or None
+    """
+    # Map the requested statements (joined before the next filing),
+    # sharing the filing's LLM budget between them
+    budget = FilingLLMBudget(str(report_date), [step.name for step in steps])
+    for step, statement, mapped_df in runner.run(filing, steps, historical, budget):
+        if not statement:
+            continue
+        results[step.results_key].append({
+            'date': report_date,
+            'original': statement.og_df,
+            'mapped': mapped_df,
+            'raw': statement.raw_df
+        })
+        # Accumulate for next filing's temporal validation
+        if mapped_df is not None:
+            historical[step.key][str(report_date)] = mapped_df.copy()
+        
+        if pattern_logger:
+            pattern_logger.log_statement(
+                ticker=results['ticker'],
+                cik=results['cik'],
+                statement_type=step.name,
+                fiscal_year=str(report_date),
+                original_df=statement.og_df,
+                mapped_df=mapped_df,
+                statement_object=statement
+            )
+
+    if budget.used:
+        logger.info(budget.summary())
+
+    # Store metadata
+    results['metadata'].append({
+        'date': report_date,
+        'accession': accession_num,
+        'taxonomy': filing.taxonomy,
+        'llm_budget': budget.report(),
+    })
+
+
+def log_store_stats():
+    """Log the hit / write statistics of the local caches and stores used by a run."""
+    cassette = get_cassette()
+    if cassette is not None:
+        logger.info(f"HTTP cassette: {cassette.stats()}")
+    memo = get_candidate_memo()
+    if memo is not None:
+        memo.flush()
+        logger.info(f"Candidate memo: {memo.stats()}")
+    llm_cache = get_llm_cache()
+    if llm_cache is not None:
+        logger.info(f"LLM cache: {llm_cache.stats()}")
+    mapping_memory = get_mapping_memory()
+    if mapping_memory is not None:
+        logger.info(f"Mapping memory: {mapping_memory.stats()}")
+    artifacts = get_parse_artifacts()
+    if artifacts is not None:
+        logger.info(f"Parse artifacts: {artifacts.stats()}")
+
+
+def log_trace(trace_file: Optional[str] = None):
+    """
+    Log the timing summary of the run's spans on one "TRACE_SUMMARY {json}"
+    line (forwarded by the backend in its SSE "complete" event) and write
+    the Chrome trace to trace_file if given.
+    """
+    tracer = get_tracer()
+    if tracer is None:
+        return
+    if trace_file:
+        try:
+            logger.info(f"Trace written to {tracer.write_chrome_trace(trace_file)}")
+        except OSError as e:
+            logger.warning(f"Could not write trace to {trace_file}: {e}")
+    logger.info(f"TRACE_SUMMARY {json.dumps(tracer.summary(), separators=(',', ':'))}")
+
+
 def get_financial_statements(ticker: str, num_years: int = 1, quarterly: bool = False, enable_pattern_logging: bool = True, statement_filter: str = 'all'):
     """
     Fetch and process financial statements for a given ticker.
@@ -113,116 +225,63 @@ def get_financial_statements(ticker: str, num_years: int = 1, quarterly: bool =
         
         # Accumulate historical statements for cross-year temporal validation
         # Each filing's mapped_df is stored so the next filing can compare overlapping years
-        historical_income = {}
-        historical_balance = {}
-        historical_cashflow = {}
+        steps = statement_steps(statement_filter)
+        historical = {step.key: {} for step in steps}
         
-        # Process each filing
-        for idx, (report_date, accession_num) in enumerate(filings.items()):
-            logger.info(f"\nProcessing filing {idx + 1}/{len(filings)}: {report_date}")
-            logger.info(f"Accession number: {accession_num}")
-            
-            try:
-                # Create filing object
-                filing = Filling(
+        # Filings are fetched ahead by a bounded thread pool (FilingSummary,
+        # cal.xml and statement R files) while the current one is mapped;
+        # mapping itself stays newest-to-oldest for temporal validation.
+        # Within a filing the statements are mapped concurrently (StatementRunner).
+        statement_names = [step.name for step in steps]
+        
+        def build_filing(item):
+            report_date, accession_num = item
+            with trace_context(ticker=ticker, accession=accession_num, report_date=str(report_date)), \
+                    span("filing.fetch", "filing"):
+                return Filling(
                     ticker=ticker,
                     cik=company.cik,
                     acc_num_unfiltered=accession_num,
-                    company_facts=company.company_facts,
-                    quarterly=quarterly
+                    # Raw facts JSON is only loaded if the columnar table is unavailable
+                    company_facts=None if company.facts_table is not None else company.company_facts,
+                    quarterly=quarterly,
+                    facts_table=company.facts_table
                 )
+        
+        # Process each filing
+        artifacts = get_parse_artifacts()
+        with FilingPrefetcher(build_filing, filings.items(), statement_names) as prefetcher, \
+                StatementRunner() as runner, fact_cubes_released(historical.values()):
+            for idx, ((report_date, accession_num), filing) in enumerate(prefetcher):
+                logger.info(f"\nProcessing filing {idx + 1}/{len(filings)}: {report_date}")
+                logger.info(f"Accession number: {accession_num}")
                 
-                # Process income statement (if requested)
-                if statement_filter in ['income', 'all']:
-                    logger.info("Processing Income Statement...")
-                    filing.process_one_statement("income_statement", historical_statements=historical_income)
-                    if filing.income_statement:
-                        mapped_df = filing.income_statement.get_mapped_df()
-                        results['income_statements'].append({
-                            'date': report_date,
-                            'original': filing.income_statement.og_df,
-                            'mapped': mapped_df,
-                            'raw': filing.income_statement.raw_df
-                        })
-                        # Accumulate for next filing's temporal validation
-                        if mapped_df is not None:
-                            historical_income[str(report_date)] = mapped_df.copy()
-                        
-                        if pattern_logger:
-                            pattern_logger.log_statement(
-                                ticker=ticker,
-                                cik=company.cik,
-                                statement_type='income_statement',
-                                fiscal_year=str(report_date),
-                                original_df=filing.income_statement.og_df,
-                                mapped_df=mapped_df,
-                                statement_object=filing.income_statement
-                            )
-                
-                # Process balance sheet (if requested)
-                if statement_filter in ['balance', 'all']:
-                    logger.info("Processing Balance Sheet...")
-                    filing.process_one_statement("balance_sheet", historical_statements=historical_balance)
-                    if filing.balance_sheet:
-                        mapped_df = filing.balance_sheet.get_mapped_df()
-                        results['balance_sheets'].append({
-                            'date': report_date,
-                            'original': filing.balance_sheet.og_df,
-                            'mapped': mapped_df,
-                            'raw': filing.balance_sheet.raw_df
-                        })
-                        if mapped_df is not None:
-                            historical_balance[str(report_date)] = mapped_df.copy()
-                        
-                        if pattern_logger:
-                            pattern_logger.log_statement(
-                                ticker=ticker,
-                                cik=company.cik,
-                                statement_type='balance_sheet',
-                                fiscal_year=str(report_date),
-                                original_df=filing.balance_sheet.og_df,
-                                mapped_df=mapped_df,
-                                statement_object=filing.balance_sheet
-                            )
-                
-                # Process cash flow (if requested)
-                if statement_filter in ['cashflow', 'all']:
-                    logger.info("Processing Cash Flow...")
-                    filing.process_one_statement("cash_flow_statement", historical_statements=historical_cashflow)
-                    if filing.cash_flow:
-                        mapped_df = filing.cash_flow.get_mapped_df()
-                        results['cash_flows'].append({
-                            'date': report_date,
-                            'original': filing.cash_flow.og_df,
-                            'mapped': mapped_df,
-                            'raw': filing.cash_flow.raw_df
-                        })
-                        if mapped_df is not None:
-                            historical_cashflow[str(report_date)] = mapped_df.copy()
+                try:
+                    # Filing object built by the prefetcher (or the error it hit)
+                    if isinstance(filing, Exception):
+                        raise filing
+                    
+                    with trace_context(ticker=ticker, accession=accession_num, report_date=str(report_date)), \
+                            span("filing.map", "filing"):
+                        map_filing(results, filing, report_date, accession_num, steps, historical,
+                                   runner, pattern_logger)
                         
-                        if pattern_logger:
-                            pattern_logger.log_statement(
-                                ticker=ticker,
-                                cik=company.cik,
-                                statement_type='cash_flow_statement',
-                                fiscal_year=str(report_date),
-                                original_df=filing.cash_flow.og_df,
-                                mapped_df=mapped_df,
-                                statement_object=filing.cash_flow
-                            )
+                        # Manifest of the statements stored while parsing (see --remap)
+                        if artifacts is not None:
+                            try:
+                                cal_facts = filing.xml_equations
+                            except Exception:
+                                cal_facts = None
+                            artifacts.save_filing(ticker, company.cik, accession_num, report_date,
+                                                  quarterly, filing.taxonomy, cal_facts)
                 
-                # Store metadata
-                results['metadata'].append({
-                    'date': report_date,
-                    'accession': accession_num,
-                    'taxonomy': filing.taxonomy
-                })
-                
-            except Exception as e:
-                logger.error(f"Error processing filing {accession_num}: {e}")
-                continue
+                except Exception as e:
+                    logger.error(f"Error processing filing {accession_num}: {e}")
+                    continue
         
         logger.info(f"\nSuccessfully processed {len(results['income_statements'])} statements")
+        get_edgar_client().log_metrics()
+        log_store_stats()
         return results
         
     except Exception as e:
@@ -230,6 +289,127 @@ def get_financial_statements(ticker: str, num_years: int = 1, quarterly: bool =
         raise
 
 
+def remap_financial_statements(ticker: str, num_years: Optional[int] = None, quarterly: bool = False,
+                               enable_pattern_logging: bool = True, statement_filter: str = 'all'):
+    """
+    Rerun only the mapping stage of a ticker over its stored parse artifacts
+    (see parse_artifacts.py): no SEC request and no R file parsing.
+    
+    Args:
+        ticker: Stock ticker symbol collected before
+        num_years: Number of years to remap (None = every stored filing)
+        quarterly: If True, remap the stored 10-Q filings, otherwise the 10-K filings
+        enable_pattern_logging: If True, log pattern matching statistics
+        statement_filter: Which statements to remap ('income', 'balance', 'cashflow', or 'all')
+    
+    Returns:
+        dict: Same structure as get_financial_statements()
+    """
+    store = get_parse_artifacts()
+    if store is None:
+        raise RuntimeError("Parse artifacts are disabled (PARSE_ARTIFACTS=0 or an HTTP cassette is active)")
+    manifests = store.filings(ticker=ticker, quarterly=quarterly)
+    if not manifests:
+        raise ValueError(f"No stored parse artifacts for {ticker.upper()}; collect it once without --remap")
+    if num_years is not None:
+        manifests = manifests[:num_years * 4 if quarterly else num_years]
+    logger.info(f"Remapping {len(manifests)} stored filings of {ticker.upper()}...")
+    
+    pattern_logger = get_pattern_logger() if enable_pattern_logging else None
+    results = {
+        'ticker': ticker.upper(),
+        'cik': manifests[0]['cik'],
+        'income_statements': [],
+        'balance_sheets': [],
+        'cash_flows': [],
+        'metadata': []
+    }
+    steps = statement_steps(statement_filter)
+    historical = {step.key: {} for step in steps}
+    
+    # Newest to oldest, like a collection, for temporal validation
+    with StatementRunner() as runner, fact_cubes_released(historical.values()):
+        for idx, manifest in enumerate(manifests):
+            report_date, accession_num = manifest['report_date'], manifest['accession_number']
+            logger.info(f"\nProcessing filing {idx + 1}/{len(manifests)}: {report_date}")
+            logger.info(f"Accession number: {accession_num}")
+            try:
+                with trace_context(ticker=results['ticker'], accession=accession_num, report_date=report_date), \
+                        span("filing.map", "filing"):
+                    map_filing(results, ArtifactFiling(store, manifest), report_date, accession_num,
+                               steps, historical, runner, pattern_logger)
+            except Exception as e:
+                logger.error(f"Error processing filing {accession_num}: {e}")
+                continue
+    
+    logger.info(f"\nSuccessfully remapped {len(results['income_statements'])} statements")
+    log_store_stats()
+    return results
+
+
+def remap_tickers(tickers, num_years: Optional[int] = None, quarterly: bool = False,
+                  statement_filter: str = 'all', enable_pattern_logging: bool = True):
+    """
+    Remap several tickers one after another (see remap_financial_statements).
+    
+    Yields:
+        dict: Results of each ticker that could be remapped; failures are logged and skipped
+    """
+    for ticker in tickers:
+        try:
+            yield remap_financial_statements(ticker=ticker, num_years=num_years, quarterly=quarterly,
+                                             enable_pattern_logging=enable_pattern_logging,
+                                             statement_filter=statement_filter)
+        except Exception as e:
+            logger.error(f"Error remapping {ticker}: {e}")
+
+
+def collect_ticker(ticker: str, options: dict) -> TickerOutcome:
+    """
+    Collect and save one ticker of a batch (run in a batch_runner worker
+    process). Errors are returned as a failed outcome instead of raised.
+    
+    Args:
+        ticker: Stock ticker symbol
+        options: years, quarterly, statement, output and trace_dir (one
+            Chrome trace per ticker, or None) of the batch
+    
+    Returns:
+        TickerOutcome with the ticker's counts, timing summary and error
+    """
+    tracer = get_tracer()
+    if tracer is not None:
+        tracer.reset()  # the worker's previous ticker
+    start = time.perf_counter()
+    outcome = TickerOutcome(ticker=ticker, status='ok', pid=os.getpid())
+    try:
+        results = get_financial_statements(
+            ticker=ticker,
+            num_years=options.get('years') or 1,
+            quarterly=options.get('quarterly', False),
+            statement_filter=options.get('statement', 'all'),
+        )
+        outcome.filings = len(results['metadata'])
+        outcome.statements = sum(len(results[key]) for key in ('income_statements', 'balance_sheets', 'cash_flows'))
+        if not outcome.statements:
+            raise ValueError("no statements could be collected")
+        save_results(results, options['output'], options.get('quarterly', False))
+        outcome.output = str(Path(options['output']) / results['ticker'])
+    except Exception as e:
+        logger.error(f"Error collecting {ticker}: {e}")
+        outcome.status, outcome.error = 'failed', f"{type(e).__name__}: {e}"
+    outcome.seconds = round(time.perf_counter() - start, 3)
+    
+    if tracer is not None:
+        outcome.timing = tracer.summary(top=5)
+        if options.get('trace_dir'):
+            try:
+                tracer.write_chrome_trace(Path(options['trace_dir']) / f"{ticker}.json")
+            except OSError as e:
+                logger.warning(f"Could not write the trace of {ticker}: {e}")
+    return outcome
+
+
 def save_results(results: dict, output_dir: str = "data", quarterly: bool = False):
     """
     Save financial statement results to CSV files.
@@ -320,6 +500,64 @@ def print_statement(df: pd.DataFrame, title: str):
     print(f"{'='*80}\n")
 
 
+def print_results(results: dict, merge: bool):
+    """
+    Print the statements of get_financial_statements() / remap_financial_statements().
+    
+    Args:
+        results: Results dict
+        merge: If True, merge the years into single tables
+    """
+    ticker = results['ticker']
+    # Merge multiple years into single tables
+    if merge:
+        logger.info(f"\nMerging {len(results['metadata'])} years of data into unified statements...")
+        merged = merge_all_statements(results)
+
+        # Print merged statements
+        if merged['income_merged'] is not None:
+            print(format_merged_output(merged['income_merged'], ticker, 'Income'))
+
+        if merged['balance_merged'] is not None:
+            print(format_merged_output(merged['balance_merged'], ticker, 'Balance Sheet'))
+
+        if merged['cashflow_merged'] is not None:
+            print(format_merged_output(merged['cashflow_merged'], ticker, 'Cash Flow'))
+    else:
+        # Single year - print as before
+        for item in results['income_statements']:
+            if item['mapped'] is not None:
+                print_statement(
+                    item['mapped'],
+                    f"{ticker} - Income Statement - {item['date']}"
+                )
+            else:
+                print_statement(
+                    item['original'],
+                    f"{ticker} - Income Statement (Original) - {item['date']}"
+                )
+
+        # Print balance sheets
+        for item in results['balance_sheets']:
+            if item['mapped'] is not None:
+                # Only show non-zero rows
+                non_zero = item['mapped'][(item['mapped'] != 0).any(axis=1)]
+                print_statement(
+                    non_zero,
+                    f"{ticker} - Balance Sheet - {item['date']}"
+                )
+
+        # Print cash flows
+        for item in results['cash_flows']:
+            if item['mapped'] is not None:
+                # Only show non-zero rows
+                non_zero = item['mapped'][(item['mapped'] != 0).any(axis=1)]
+                print_statement(
+                    non_zero,
+                    f"{ticker} - Cash Flow - {item['date']}"
+                )
+
+
 def main():
     """
     Main entry point for the CLI.
@@ -330,14 +568,34 @@ def main():
     parser.add_argument(
         '--ticker',
         type=str,
-        required=True,
+        default=None,
         help='Stock ticker symbol (e.g., AAPL, MSFT)'
     )
+    parser.add_argument(
+        '--tickers',
+        nargs='+',
+        metavar='TICKER',
+        default=None,
+        help='Collect several tickers in one batch on a process pool (see --workers)'
+    )
+    parser.add_argument(
+        '--tickers-file',
+        type=str,
+        metavar='FILE',
+        default=None,
+        help='Collect the tickers listed in FILE (one or more per line, # comments) in one batch'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=BATCH_WORKERS,
+        help=f'Worker processes of a --tickers / --tickers-file batch (default: {BATCH_WORKERS})'
+    )
     parser.add_argument(
         '--years',
         type=int,
-        default=1,
-        help='Number of years of data to fetch (default: 1)'
+        default=None,
+        help='Number of years of data to fetch (default: 1; with --remap: every stored filing)'
     )
     parser.add_argument(
         '--quarterly',
@@ -362,72 +620,107 @@ def main():
         action='store_true',
         help='Enable verbose logging'
     )
+    parser.add_argument(
+        '--offline',
+        action='store_true',
+        help='Serve SEC archive documents from the local archive cache only (no network)'
+    )
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument(
+        '--record',
+        type=str,
+        metavar='DIR',
+        default=None,
+        help='Record every SEC HTTP exchange into the cassette directory DIR'
+    )
+    cassette.add_argument(
+        '--replay',
+        type=str,
+        metavar='DIR',
+        default=None,
+        help='Serve every SEC HTTP request from the cassette directory DIR (no network)'
+    )
+    
+    parser.add_argument(
+        '--trace',
+        type=str,
+        metavar='FILE',
+        default=TRACE_FILE,
+        help='Write the timing spans of the run to FILE in Chrome trace event format '
+             '(chrome://tracing, ui.perfetto.dev); in a batch FILE is a directory with one trace per ticker'
+    )
+    
+    parser.add_argument(
+        '--remap',
+        nargs='*',
+        metavar='TICKER',
+        default=None,
+        help='Rerun only the mapping stage over stored parse artifacts (no SEC requests) '
+             'for the given tickers, --ticker, or every stored ticker'
+    )
     
     args = parser.parse_args()
+    batch = bool(args.tickers or args.tickers_file)
+    if args.remap is None and not (args.ticker or batch):
+        parser.error('--ticker, --tickers or --tickers-file is required unless --remap is given')
+    if batch and args.remap is not None:
+        parser.error('--remap takes its tickers itself; it cannot be combined with --tickers / --tickers-file')
+    if batch and args.record:
+        parser.error('--record cannot be combined with --tickers / --tickers-file (one cassette per run)')
+    
+    if args.offline:
+        os.environ['EDGAR_OFFLINE'] = '1'
+    if args.record or args.replay:
+        os.environ['EDGAR_CASSETTE_MODE'] = 'record' if args.record else 'replay'
+        os.environ['EDGAR_CASSETTE_DIR'] = args.record or args.replay
     
     if args.verbose:
         logging.getLogger().setLevel(logging.DEBUG)
     
     try:
-        # Fetch data
-        results = get_financial_statements(
-            ticker=args.ticker,
-            num_years=args.years,
-            quarterly=args.quarterly,
-            statement_filter=args.statement  # Pass the statement filter
-        )
+        if batch:
+            # Several tickers on a process pool, one output directory per ticker
+            tickers = parse_tickers(([args.ticker] if args.ticker else []) + (args.tickers or []))
+            if args.tickers_file:
+                tickers = parse_tickers(tickers + read_tickers_file(args.tickers_file))
+            output_dir = args.output or "data"
+            report = run_batch(tickers, collect_ticker, workers=args.workers, options={
+                'years': args.years,
+                'quarterly': args.quarterly,
+                'statement': args.statement,
+                'output': output_dir,
+                'trace_dir': args.trace,
+            })
+            report.log()
+            logger.info(f"Batch report written to {report.write(Path(output_dir) / REPORT_FILE_NAME)}")
+            if report.failed:
+                sys.exit(1)
+            logger.info("Processing complete!")
+            return
         
-        # Display or save results
-        if args.output:
-            save_results(results, args.output, args.quarterly)
+        if args.remap is not None:
+            # Mapping stage only, over stored parse artifacts
+            tickers = args.remap or ([args.ticker] if args.ticker else None)
+            if not tickers:
+                store = get_parse_artifacts()
+                tickers = store.tickers(quarterly=args.quarterly) if store else []
+                logger.info(f"Remapping {len(tickers)} tickers with stored parse artifacts")
+            run = remap_tickers(tickers, args.years, args.quarterly, args.statement)
         else:
-            # Merge multiple years into single tables
-            if args.years > 1:
-                logger.info(f"\nMerging {args.years} years of data into unified statements...")
-                merged = merge_all_statements(results)
-                
-                # Print merged statements
-                if merged['income_merged'] is not None:
-                    print(format_merged_output(merged['income_merged'], args.ticker, 'Income'))
-                
-                if merged['balance_merged'] is not None:
-                    print(format_merged_output(merged['balance_merged'], args.ticker, 'Balance Sheet'))
-                
-                if merged['cashflow_merged'] is not None:
-                    print(format_merged_output(merged['cashflow_merged'], args.ticker, 'Cash Flow'))
+            # Fetch data
+            run = [get_financial_statements(
+                ticker=args.ticker,
+                num_years=args.years or 1,
+                quarterly=args.quarterly,
+                statement_filter=args.statement  # Pass the statement filter
+            )]
+        
+        for results in run:
+            # Display or save results
+            if args.output:
+                save_results(results, args.output, args.quarterly)
             else:
-                # Single year - print as before
-                for item in results['income_statements']:
-                    if item['mapped'] is not None:
-                        print_statement(
-                            item['mapped'],
-                            f"{args.ticker} - Income Statement - {item['date']}"
-                        )
-                    else:
-                        print_statement(
-                            item['original'],
-                            f"{args.ticker} - Income Statement (Original) - {item['date']}"
-                        )
-                
-                # Print balance sheets
-                for item in results['balance_sheets']:
-                    if item['mapped'] is not None:
-                        # Only show non-zero rows
-                        non_zero = item['mapped'][(item['mapped'] != 0).any(axis=1)]
-                        print_statement(
-                            non_zero,
-                            f"{args.ticker} - Balance Sheet - {item['date']}"
-                        )
-                
-                # Print cash flows
-                for item in results['cash_flows']:
-                    if item['mapped'] is not None:
-                        # Only show non-zero rows
-                        non_zero = item['mapped'][(item['mapped'] != 0).any(axis=1)]
-                        print_statement(
-                            non_zero,
-                            f"{args.ticker} - Cash Flow - {item['date']}"
-                        )
+                print_results(results, merge=len(results['metadata']) > 1 if args.years is None else args.years > 1)
         
         logger.info("Processing complete!")
         
@@ -437,6 +730,9 @@ def main():
     except Exception as e:
         logger.error(f"Error: {e}")
         sys.exit(1)
+    finally:
+        if not batch:
+            log_trace(args.trace)
 
 
 if __name__ == "__main__":
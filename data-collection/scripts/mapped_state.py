@@ -0,0 +1,156 @@
+"""
+MAPPED STATE - Array-Backed Mapped Statement Used While Mapping
+
+The mappers (FinancialStatement scoring / legacy, ParsingPipeline) used to
+build the mapped statement directly in a zero-filled pandas DataFrame:
+every mapping was a `mapped_df.loc[fact] = row`, every "is this fact taken?"
+check a `(mapped_df.loc[fact] != 0).any()`, every "is this row taken?" check
+a linear scan of mapped_facts, and the original rows came from iterrows().
+
+A MappedState holds the same information in plain arrays:
+
+- values         NumPy matrix, one row per standard fact, one column per period
+- fact_rows      fact name -> row position in values
+- mapped_rows    set of original row indices that were mapped
+- facts_with_data set of facts whose row has a non-zero (or NaN) value,
+                  i.e. exactly the facts the old `!= 0` check saw as mapped
+
+The original statement is read once into a matrix (frame_values) and rows
+are addressed by position. The DataFrame is built once, by to_dataframe(),
+when mapping is done.
+
+Usage:
+    from mapped_state import MappedState, frame_values
+    state = MappedState.from_statement_map(statement_map, og_df.columns)
+    og_values = frame_values(og_df)
+    for pos, idx in enumerate(og_df.index):
+        if not state.is_row_mapped(idx) and not state.is_fact_mapped(fact):
+            state.assign(fact, og_values[pos], idx)
+    mapped_df = state.to_dataframe()
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, Hashable, Iterable, List, Optional, Set
+
+from statement_maps import MapFact
+
+logger = logging.getLogger(__name__)
+
+
+def frame_values(df: pd.DataFrame) -> np.ndarray:
+    """
+    Values of a statement DataFrame as a 2-D array: float64 (NaN for missing)
+    when every column is numeric, object otherwise.
+    """
+    try:
+        return df.to_numpy(dtype=np.float64, na_value=np.nan)
+    except (TypeError, ValueError):
+        return df.to_numpy(dtype=object)
+
+
+def numeric_frame_values(df: pd.DataFrame) -> np.ndarray:
+    """Values of a DataFrame as a float64 matrix, NaN for missing or non-numeric cells."""
+    values = frame_values(df)
+    if values.dtype != object:
+        return values
+    return df.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _has_data(values: np.ndarray) -> bool:
+    """Same test as the old `(mapped_df.loc[fact] != 0).any()` (NaN counts as data)."""
+    return bool((values != 0).any())
+
+
+class MappedState:
+    """
+    Mapped statement under construction: NumPy value matrix with integer
+    fact rows, plus set-based tracking of mapped rows and facts.
+    """
+
+    def __init__(self, facts: List[str], columns: Iterable, values: Optional[np.ndarray] = None,
+                 dtype=np.float64):
+        """
+        Args:
+            facts: Standard fact names, in statement map order (the DataFrame index)
+            columns: Period columns (the DataFrame columns)
+            values: Initial matrix (default: zeros)
+            dtype: dtype of the zero matrix when values is not given
+        """
+        self.facts = list(facts)
+        self.columns = pd.Index(columns)
+        if values is None:
+            values = np.zeros((len(self.facts), len(self.columns)), dtype=dtype)
+        self.values = values
+        self.fact_rows: Dict[str, List[int]] = {}
+        for pos, fact in enumerate(self.facts):
+            self.fact_rows.setdefault(fact, []).append(pos)
+        self.mapped_rows: Set[Hashable] = set()
+        self.facts_with_data: Set[str] = {
+            fact for fact, rows in self.fact_rows.items() if _has_data(self.values[rows])
+        }
+
+    @classmethod
+    def from_statement_map(cls, statement_map, columns: Iterable, dtype=np.float64) -> 'MappedState':
+        """Zeroed state with one row per MapFact of the statement map."""
+        facts = [mf.fact for mf in vars(statement_map).values() if isinstance(mf, MapFact)]
+        return cls(facts, columns, dtype=dtype)
+
+    @classmethod
+    def from_dataframe(cls, mapped_df: pd.DataFrame, og_values: Optional[np.ndarray] = None) -> 'MappedState':
+        """
+        State holding a copy of an existing mapped DataFrame. The matrix dtype
+        is wide enough for both the DataFrame and the original values, like
+        the upcast pandas did when rows were assigned into the DataFrame.
+        """
+        values = frame_values(mapped_df)
+        if og_values is not None:
+            values = values.astype(np.result_type(values.dtype, og_values.dtype), copy=False)
+        return cls(list(mapped_df.index), mapped_df.columns, values=values.copy())
+
+    # ── Queries ───────────────────────────────────────────────────────────
+
+    def has_fact(self, fact: str) -> bool:
+        return fact in self.fact_rows
+
+    def is_fact_mapped(self, fact: str) -> bool:
+        """True if the fact's row holds data (non-zero or NaN values)."""
+        return fact in self.facts_with_data
+
+    def is_row_mapped(self, row_idx) -> bool:
+        return row_idx in self.mapped_rows
+
+    def row(self, fact: str) -> np.ndarray:
+        """Values of a fact (its first row if the map defines it twice)."""
+        return self.values[self.fact_rows[fact][0]]
+
+    def row_series(self, fact: str) -> pd.Series:
+        return pd.Series(self.row(fact), index=self.columns, name=fact)
+
+    def nonzero_facts(self) -> List[str]:
+        """Facts with data, in statement map order."""
+        return [fact for fact in self.fact_rows if fact in self.facts_with_data]
+
+    # ── Updates ───────────────────────────────────────────────────────────
+
+    def assign(self, fact: str, values: np.ndarray, row_idx=None):
+        """
+        Set the values of a fact (all its rows) and record the original row.
+
+        Raises:
+            KeyError: if the fact is not part of the statement
+        """
+        rows = self.fact_rows[fact]
+        self.values[rows] = values
+        if _has_data(self.values[rows]):
+            self.facts_with_data.add(fact)
+        else:
+            self.facts_with_data.discard(fact)
+        if row_idx is not None:
+            self.mapped_rows.add(row_idx)
+
+    # ── Output ────────────────────────────────────────────────────────────
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(self.values.copy(), index=list(self.facts), columns=self.columns)
@@ -0,0 +1,232 @@
+"""
+MAPPING MEMORY - Persistent Knowledge Base of Learned Row → Fact Mappings
+
+Decisions of the LLM agents (e.g. tsla_AutomotiveRevenue → Total revenue for
+Tesla) used to be written only to agents/logs/llm_interactions.jsonl, so the
+same rows of the same companies were sent to the LLM again on every run.
+Accepted mappings are now stored in a sqlite knowledge base, by default
+.api_cache/mapping/mappings.sqlite, keyed by
+
+    (scope, statement type, row tag, normalised human label)
+
+where scope is the company's CIK. A mapping is stored when the LLM accepted
+it and it was either confirmed by evidence (a cross-year temporal match or a
+summation check, stored with it) or given with at least
+MAPPING_MEMORY_MIN_CONFIDENCE. The latest decision for a key wins. The
+callers only record decisions that were checked: ParsingPipeline records
+LLM tie-breaks backed by temporal or summation evidence, and the enhanced
+parser records its mappings after a verification round passed.
+
+Lookups try the company's own entry first. Without one, a global answer is
+used when at least MAPPING_MEMORY_GLOBAL_MIN companies learned the same fact
+for the same tag and label, and none of them learned a different one.
+
+ParsingPipeline._select_best_mappings() and EnhancedAgenticParser.parse()
+look rows up before building prompts: a learned fact that is among the
+row's candidates (pipeline) or target items (enhanced parser) is used
+without asking the LLM.
+
+Configuration (environment variables):
+    MAPPING_MEMORY                  Set to 0 to disable the knowledge base
+    MAPPING_MEMORY_PATH             sqlite file (default .api_cache/mapping/mappings.sqlite)
+    MAPPING_MEMORY_GLOBAL_MIN       Companies that must agree for a global answer (default 2, 0 = company only)
+    MAPPING_MEMORY_MIN_CONFIDENCE   Confidence that stores a mapping without evidence (default 0.8)
+
+Usage:
+    from mapping_memory import get_mapping_memory
+    memory = get_mapping_memory()
+    learned = memory.lookup(cik, 'income_statement', row_idx, label) if memory else None
+    if learned is None:
+        ...  # ask the LLM, then
+        memory.record(cik, 'income_statement', row_idx, label, fact, source='llm',
+                      confidence=0.9, temporal=True, summation=False)
+"""
+
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+
+_SCRIPT_DIR = Path(__file__).parent
+_PROJECT_ROOT = _SCRIPT_DIR.parent.parent  # data-collection/scripts -> project root
+MAPPING_MEMORY_ENABLED = os.environ.get("MAPPING_MEMORY", "1") != "0"
+MAPPING_MEMORY_PATH = Path(os.environ.get(
+    "MAPPING_MEMORY_PATH", _PROJECT_ROOT / ".api_cache" / "mapping" / "mappings.sqlite"
+))
+MAPPING_MEMORY_GLOBAL_MIN = int(os.environ.get("MAPPING_MEMORY_GLOBAL_MIN", "2"))
+MAPPING_MEMORY_MIN_CONFIDENCE = float(os.environ.get("MAPPING_MEMORY_MIN_CONFIDENCE", "0.8"))
+
+GLOBAL_SCOPE = "global"   # scope of mappings learned without a CIK
+
+
+def normalize_label(label: str) -> str:
+    """Lowercase alphanumeric words of a human label ("Total net sales:" -> "total net sales")."""
+    return " ".join(re.findall(r"[a-z0-9]+", (label or "").lower()))
+
+
+class LearnedMapping(NamedTuple):
+    fact: str
+    scope: str              # CIK, or 'global' for a cross-company answer
+    source: str             # 'llm' (pipeline tie-break), 'enhanced_llm', ...
+    confidence: float
+    temporal: bool          # confirmed by a cross-year match
+    summation: bool         # confirmed by a summation check
+    times_confirmed: int    # runs that accepted this fact for the key (companies, if global)
+
+
+# ─── Knowledge base ────────────────────────────────────────────────────────────
+
+class MappingMemory:
+    """
+    sqlite-backed knowledge base of accepted mappings. Safe to use from
+    several threads and processes.
+    """
+
+    def __init__(self, path: Path = MAPPING_MEMORY_PATH, global_min: int = MAPPING_MEMORY_GLOBAL_MIN,
+                 min_confidence: float = MAPPING_MEMORY_MIN_CONFIDENCE):
+        """
+        Args:
+            path: sqlite file
+            global_min: Companies that must agree for a global answer (0 = company only)
+            min_confidence: Confidence that stores a mapping without evidence
+        """
+        self.path = Path(path)
+        self.global_min = global_min
+        self.min_confidence = min_confidence
+        self.hits = 0
+        self.global_hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._db = None
+        self._open()
+
+    def _open(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS mappings ("
+                " scope TEXT, statement_type TEXT, tag TEXT, label TEXT, fact TEXT,"
+                " source TEXT, confidence REAL, temporal INTEGER, summation INTEGER,"
+                " times_confirmed INTEGER, first_seen REAL, last_seen REAL,"
+                " PRIMARY KEY (scope, statement_type, tag, label))"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS mappings_key ON mappings (statement_type, tag, label)")
+            db.commit()
+            self._db = db
+        except sqlite3.Error as e:
+            logger.warning(f"Mapping memory at {self.path} unavailable: {e}")
+            self._db = None
+
+    @staticmethod
+    def _scope(cik) -> str:
+        return str(cik) if cik else GLOBAL_SCOPE
+
+    def lookup(self, cik, statement_type: str, tag: str, label: str) -> Optional[LearnedMapping]:
+        """Learned mapping of a row: the company's own, else an agreed global one, else None."""
+        scope = self._scope(cik)
+        key = (statement_type, tag, normalize_label(label))
+        with self._lock:
+            if self._db is None:
+                self.misses += 1
+                return None
+            try:
+                row = self._db.execute(
+                    "SELECT fact, scope, source, confidence, temporal, summation, times_confirmed"
+                    " FROM mappings WHERE scope = ? AND statement_type = ? AND tag = ? AND label = ?",
+                    (scope,) + key,
+                ).fetchone()
+                if row is not None:
+                    self.hits += 1
+                    return LearnedMapping(row[0], row[1], row[2], row[3], bool(row[4]), bool(row[5]), row[6])
+                if self.global_min:
+                    facts = self._db.execute(
+                        "SELECT fact, COUNT(*), MAX(confidence), MAX(temporal), MAX(summation)"
+                        " FROM mappings WHERE statement_type = ? AND tag = ? AND label = ?"
+                        " GROUP BY fact",
+                        key,
+                    ).fetchall()
+                    if len(facts) == 1 and facts[0][1] >= self.global_min:
+                        fact, companies, confidence, temporal, summation = facts[0]
+                        self.hits += 1
+                        self.global_hits += 1
+                        return LearnedMapping(fact, GLOBAL_SCOPE, "consensus", confidence,
+                                              bool(temporal), bool(summation), companies)
+            except sqlite3.Error as e:
+                logger.debug(f"Mapping memory read failed: {e}")
+            self.misses += 1
+            return None
+
+    def record(self, cik, statement_type: str, tag: str, label: str, fact: str,
+               source: str, confidence: float, temporal: bool = False, summation: bool = False) -> bool:
+        """
+        Store an accepted mapping. Returns False (nothing stored) if it has
+        neither temporal / summation evidence nor min_confidence.
+        """
+        if not fact or not (temporal or summation or confidence >= self.min_confidence):
+            self.rejected += 1
+            return False
+        key = (self._scope(cik), statement_type, tag, normalize_label(label))
+        now = time.time()
+        with self._lock:
+            if self._db is None:
+                return False
+            try:
+                row = self._db.execute(
+                    "SELECT fact, confidence, temporal, summation, times_confirmed, first_seen FROM mappings"
+                    " WHERE scope = ? AND statement_type = ? AND tag = ? AND label = ?",
+                    key,
+                ).fetchone()
+                if row is not None and row[0] == fact:
+                    # Same answer again: accumulate its evidence
+                    values = (fact, source, max(row[1], confidence), int(bool(row[2]) or temporal),
+                              int(bool(row[3]) or summation), row[4] + 1, row[5], now)
+                else:
+                    values = (fact, source, confidence, int(temporal), int(summation), 1, now, now)
+                self._db.execute("INSERT OR REPLACE INTO mappings VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                 key + values)
+                self._db.commit()
+                self.recorded += 1
+                return True
+            except sqlite3.Error as e:
+                logger.warning(f"Mapping memory write failed: {e}")
+                return False
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "global_hits": self.global_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "recorded": self.recorded,
+            "rejected": self.rejected,
+        }
+
+
+_memory: Optional[MappingMemory] = None
+_memory_lock = threading.Lock()
+
+
+def get_mapping_memory() -> Optional[MappingMemory]:
+    """Return the shared MappingMemory, or None if disabled via MAPPING_MEMORY=0."""
+    global _memory
+    if not MAPPING_MEMORY_ENABLED:
+        return None
+    if _memory is None:
+        with _memory_lock:
+            if _memory is None:
+                _memory = MappingMemory()
+    return _memory
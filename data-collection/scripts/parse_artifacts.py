@@ -0,0 +1,360 @@
+"""
+PARSE ARTIFACTS - Per-Accession Store of Parse-Stage Output for Remapping
+
+Before any mapping happens, every run fetches the statement R files of a
+filing and parses them into og_df, rows_that_are_sum, rows_text,
+sections_dict and units_dict. That parse stage does not depend on
+statement_maps.py or USE_MATCHING, so it is stored per (accession,
+statement) the first time it runs, and `main.py --remap` reruns only the
+mapping stage over the stored artifacts: no EDGAR request, no HTML parsing,
+no companyfacts load.
+
+Layout (under PARSE_ARTIFACTS_DIR):
+    CIK{cik:010}/{accession}/filing.json            ticker, report date, form, taxonomy, statements
+    CIK{cik:010}/{accession}/calc_graph.json.gz     calculation graph (calc_graph encoding)
+    CIK{cik:010}/{accession}/{statement}.npz        one parsed statement
+
+Statement file (np.savez_compressed, no pickled objects):
+    values    float64          rows × periods of og_df (after drop_duplicates / round(2))
+    index     str              row tags (og_df.index)
+    columns   datetime64       periods (og_df.columns; str if they are not naive dates)
+    meta      uint8            UTF-8 JSON: rows_text, rows_that_are_sum, sections_dict,
+                               units_dict (UnitInfo fields)
+
+Statement files are written by Filling.process_one_statement() right after
+parsing, filing.json by get_financial_statements() once the filing is
+mapped; writes are atomic (temp file + os.replace). Bump
+ARTIFACT_FORMAT_VERSION whenever the parse stage changes what it produces:
+artifacts of another version are ignored and rewritten by the next
+collection. Like the other derived stores, the artifacts are neither read
+nor written while an HTTP cassette is active.
+
+Configuration (environment variables):
+    PARSE_ARTIFACTS         Set to 0 to disable the store
+    PARSE_ARTIFACTS_DIR     Store root (default .api_cache/parse_artifacts)
+
+Usage:
+    from parse_artifacts import get_parse_artifacts, ArtifactFiling
+    store = get_parse_artifacts()
+    for manifest in store.filings(ticker="AAPL", quarterly=False):
+        filing = ArtifactFiling(store, manifest)
+        filing.process_one_statement("income_statement")
+        mapped_df = filing.income_statement.get_mapped_df()
+"""
+
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+import dataclasses
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from calc_graph import encode_graph, load_graph, save_graph
+from http_cassette import cassette_active
+from unit_detector import UnitInfo, UnitType
+from FinancialStatement import IncomeStatement, BalanceSheet, CashFlow
+from statement_runner import STATEMENT_STEPS
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+
+_SCRIPT_DIR = Path(__file__).parent
+_PROJECT_ROOT = _SCRIPT_DIR.parent.parent  # data-collection/scripts -> project root
+PARSE_ARTIFACTS_ENABLED = os.environ.get("PARSE_ARTIFACTS", "1") != "0"
+PARSE_ARTIFACTS_DIR = Path(os.environ.get(
+    "PARSE_ARTIFACTS_DIR", _PROJECT_ROOT / ".api_cache" / "parse_artifacts"
+))
+
+ARTIFACT_FORMAT_VERSION = 1
+
+STATEMENT_CLASSES = {
+    'income_statement': IncomeStatement,
+    'balance_sheet': BalanceSheet,
+    'cash_flow_statement': CashFlow,
+}
+
+
+class StatementArtifact(NamedTuple):
+    og_df: pd.DataFrame
+    rows_that_are_sum: list
+    rows_text: dict
+    sections_dict: dict
+    units_dict: dict
+
+
+# ─── Encoding ──────────────────────────────────────────────────────────────────
+
+def encode_units(units_dict: Dict[str, UnitInfo]) -> Dict[str, dict]:
+    return {row: {**dataclasses.asdict(unit), "unit_type": unit.unit_type.value}
+            for row, unit in units_dict.items()}
+
+
+def decode_units(payload: Dict[str, dict]) -> Dict[str, UnitInfo]:
+    return {row: UnitInfo(**{**fields, "unit_type": UnitType(fields["unit_type"])})
+            for row, fields in payload.items()}
+
+
+def _encode_axis(axis: pd.Index) -> np.ndarray:
+    if isinstance(axis, pd.DatetimeIndex) and axis.tz is None:
+        return axis.values
+    return np.array([str(label) for label in axis], dtype=str)
+
+
+def _decode_axis(values: np.ndarray, name) -> pd.Index:
+    if values.dtype.kind == "M":
+        return pd.DatetimeIndex(values, name=name)
+    return pd.Index(values.tolist(), name=name)
+
+
+def _atomic_write(path: Path, write):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+# ─── Store ─────────────────────────────────────────────────────────────────────
+
+class ParseArtifactStore:
+    """Parsed statements and filing manifests, one directory per accession."""
+
+    def __init__(self, root: Path = PARSE_ARTIFACTS_DIR):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self.saved = 0
+        self.loaded = 0
+        self.missing = 0
+        self.bytes_written = 0
+
+    def filing_dir(self, cik, accession_number: str) -> Path:
+        return self.root / f"CIK{str(int(cik)).zfill(10)}" / accession_number.replace("-", "")
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    # Statements
+
+    def save_statement(self, cik, accession_number: str, statement_name: str, og_df: pd.DataFrame,
+                       rows_that_are_sum: list, rows_text: dict, sections_dict: dict,
+                       units_dict: Optional[dict]) -> bool:
+        """
+        Store the parse-stage output of one statement.
+
+        Returns:
+            True if stored; False if og_df is not numeric or the write failed
+        """
+        try:
+            values = og_df.to_numpy(dtype=np.float64)
+        except (TypeError, ValueError) as e:
+            logger.debug(f"Not storing {statement_name} of {accession_number}: {e}")
+            return False
+        meta = {
+            "version": ARTIFACT_FORMAT_VERSION,
+            "index_name": og_df.index.name,
+            "columns_name": og_df.columns.name,
+            "rows_text": rows_text,
+            "rows_that_are_sum": list(rows_that_are_sum),
+            "sections_dict": sections_dict,
+            "units_dict": encode_units(units_dict or {}),
+        }
+        arrays = {
+            "values": values,
+            "index": _encode_axis(og_df.index),
+            "columns": _encode_axis(og_df.columns),
+            "meta": np.frombuffer(json.dumps(meta, separators=(",", ":")).encode("utf-8"), dtype=np.uint8),
+        }
+        path = self.filing_dir(cik, accession_number) / f"{statement_name}.npz"
+        try:
+            _atomic_write(path, lambda f: np.savez_compressed(f, **arrays))
+        except OSError as e:
+            logger.warning(f"Could not store parse artifact {path}: {e}")
+            return False
+        self._count("saved")
+        self._count("bytes_written", path.stat().st_size)
+        return True
+
+    def load_statement(self, cik, accession_number: str, statement_name: str) -> Optional[StatementArtifact]:
+        """Stored statement, or None if missing, unreadable or in another format version."""
+        path = self.filing_dir(cik, accession_number) / f"{statement_name}.npz"
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+                if meta.get("version") != ARTIFACT_FORMAT_VERSION:
+                    self._count("missing")
+                    return None
+                og_df = pd.DataFrame(data["values"],
+                                     index=_decode_axis(data["index"], meta["index_name"]),
+                                     columns=_decode_axis(data["columns"], meta["columns_name"]))
+        except FileNotFoundError:
+            self._count("missing")
+            return None
+        except Exception as e:
+            logger.warning(f"Parse artifact {path} unreadable: {e}")
+            self._count("missing")
+            return None
+        self._count("loaded")
+        return StatementArtifact(og_df=og_df, rows_that_are_sum=meta["rows_that_are_sum"],
+                                 rows_text=meta["rows_text"], sections_dict=meta["sections_dict"],
+                                 units_dict=decode_units(meta["units_dict"]))
+
+    # Filings
+
+    def save_filing(self, ticker: str, cik, accession_number: str, report_date: str, quarterly: bool,
+                    taxonomy: Optional[str], cal_facts: Optional[dict]):
+        """
+        Store the manifest (and calculation graph) of a filing whose statements
+        were stored with save_statement().
+        """
+        directory = self.filing_dir(cik, accession_number)
+        statements = sorted(p.stem for p in directory.glob("*.npz")) if directory.exists() else []
+        if not statements:
+            return
+        manifest = {
+            "version": ARTIFACT_FORMAT_VERSION,
+            "created": time.time(),
+            "ticker": ticker.upper(),
+            "cik": str(cik),
+            "accession_number": accession_number,
+            "report_date": str(report_date),
+            "quarterly": bool(quarterly),
+            "taxonomy": taxonomy,
+            "statements": statements,
+            "has_calc_graph": cal_facts is not None,
+        }
+        try:
+            if cal_facts is not None:
+                save_graph(directory / "calc_graph.json.gz", encode_graph(cal_facts))
+            _atomic_write(directory / "filing.json",
+                          lambda f: f.write(json.dumps(manifest, indent=2).encode("utf-8")))
+        except OSError as e:
+            logger.warning(f"Could not store parse artifacts manifest for {accession_number}: {e}")
+
+    def load_calc_graph(self, manifest: dict) -> Optional[Dict[str, List[dict]]]:
+        if not manifest.get("has_calc_graph"):
+            return None
+        return load_graph(self.filing_dir(manifest["cik"], manifest["accession_number"]) / "calc_graph.json.gz")
+
+    def filings(self, ticker: Optional[str] = None, quarterly: Optional[bool] = None) -> List[dict]:
+        """
+        Stored filing manifests, newest report date first.
+
+        Args:
+            ticker: Only this ticker's filings (case-insensitive)
+            quarterly: Only 10-Q (True) or 10-K (False) filings; None = both
+        """
+        manifests = []
+        for path in self.root.glob("CIK*/*/filing.json"):
+            try:
+                manifest = json.loads(path.read_text())
+            except (OSError, ValueError) as e:
+                logger.warning(f"Parse artifacts manifest {path} unreadable: {e}")
+                continue
+            if manifest.get("version") != ARTIFACT_FORMAT_VERSION:
+                continue
+            if ticker is not None and manifest["ticker"] != ticker.upper():
+                continue
+            if quarterly is not None and manifest["quarterly"] != quarterly:
+                continue
+            manifests.append(manifest)
+        manifests.sort(key=lambda m: (m["ticker"], m["report_date"]), reverse=True)
+        return manifests
+
+    def tickers(self, quarterly: Optional[bool] = None) -> List[str]:
+        """Tickers with at least one stored filing."""
+        return sorted({manifest["ticker"] for manifest in self.filings(quarterly=quarterly)})
+
+    def stats(self) -> dict:
+        return {
+            "saved": self.saved,
+            "loaded": self.loaded,
+            "missing": self.missing,
+            "mb_written": round(self.bytes_written / 1e6, 2),
+        }
+
+
+_store: Optional[ParseArtifactStore] = None
+_store_lock = threading.Lock()
+
+
+def get_parse_artifacts() -> Optional[ParseArtifactStore]:
+    """Return the shared ParseArtifactStore, or None if disabled or a cassette is active."""
+    global _store
+    if not PARSE_ARTIFACTS_ENABLED or cassette_active():
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ParseArtifactStore()
+    return _store
+
+
+# ─── Remapping ─────────────────────────────────────────────────────────────────
+
+class ArtifactFiling:
+    """
+    Stand-in for a Filling built from stored artifacts: exposes what
+    StatementRunner and get_financial_statements() use (process_one_statement,
+    the statement attributes, xml_equations, taxonomy) without any network
+    access or R file parsing.
+    """
+
+    def __init__(self, store: ParseArtifactStore, manifest: dict):
+        self.store = store
+        self.manifest = manifest
+        self.ticker = manifest["ticker"]
+        self.cik = manifest["cik"]
+        self.accession_number = manifest["accession_number"].replace("-", "")
+        self.report_date = manifest["report_date"]
+        self.quarterly = manifest["quarterly"]
+        self.taxonomy = manifest["taxonomy"]
+
+        self.income_statement = None
+        self.balance_sheet = None
+        self.cash_flow = None
+        self._xml_equations = store.load_calc_graph(manifest)
+
+    @property
+    def xml_equations(self):
+        """
+        Stored calculation graph.
+
+        Raises:
+            ValueError: If the graph was not available when the filing was collected
+        """
+        if self._xml_equations is None:
+            raise ValueError(f"No stored calculation graph for {self.accession_number}")
+        return self._xml_equations
+
+    def process_one_statement(self, statement_name, historical_statements=None, llm_budget=None):
+        """Build the statement object from its artifact (see Filling.process_one_statement)."""
+        artifact = self.store.load_statement(self.cik, self.accession_number, statement_name)
+        if artifact is None:
+            logger.warning(f"No parse artifact for {statement_name} of accession number: {self.accession_number}")
+            return None
+        attr = next(step.attr for step in STATEMENT_STEPS if step.name == statement_name)
+        try:
+            statement = STATEMENT_CLASSES[statement_name](
+                artifact.og_df, artifact.rows_that_are_sum, artifact.rows_text, self.xml_equations,
+                artifact.sections_dict, artifact.units_dict,
+                historical_statements=historical_statements or {}, llm_budget=llm_budget, cik=self.cik,
+            )
+        except Exception as e:
+            logger.error(f"Error processing statement: {e}")
+            return None
+        setattr(self, attr, statement)
+        return statement
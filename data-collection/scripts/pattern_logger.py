@@ -15,6 +15,7 @@ Log Format:
 import os
 import json
 import hashlib
+import threading
 from datetime import datetime
 from typing import Dict, List, Optional
 import pandas as pd
@@ -50,6 +51,8 @@ class PatternLogger:
         
         # Load already-seen hashes to avoid duplicates
         self.seen_hashes = self._load_seen_hashes()
+        # Statements of a filing are mapped (and logged) from concurrent threads
+        self._lock = threading.Lock()
     
     def _load_seen_hashes(self) -> set:
         """Load set of already-logged statement hashes."""
@@ -127,9 +130,10 @@ class PatternLogger:
         """
         # Check if already logged
         hash_key = self._generate_hash(ticker, statement_type, fiscal_year)
-        if hash_key in self.seen_hashes:
-            logger.debug(f"Skipping {ticker} {statement_type} {fiscal_year} - already logged")
-            return False
+        with self._lock:
+            if hash_key in self.seen_hashes:
+                logger.debug(f"Skipping {ticker} {statement_type} {fiscal_year} - already logged")
+                return False
         
         # Extract matched row information from statement object's mapped_facts
         # mapped_facts contains tuples of (original_idx, fact_row, pattern_type, pattern)
@@ -194,13 +198,16 @@ class PatternLogger:
             'hash': hash_key
         }
         
-        # Append to log file (JSONL format - one JSON per line)
-        with open(self.log_file, 'a') as f:
-            f.write(json.dumps(log_entry) + '\n')
-        
-        # Save hash to avoid duplicates
-        self._save_hash(hash_key)
-        self.seen_hashes.add(hash_key)
+        with self._lock:
+            if hash_key in self.seen_hashes:
+                return False
+            # Append to log file (JSONL format - one JSON per line)
+            with open(self.log_file, 'a') as f:
+                f.write(json.dumps(log_entry) + '\n')
+            
+            # Save hash to avoid duplicates
+            self._save_hash(hash_key)
+            self.seen_hashes.add(hash_key)
         
         logger.info(f"Logged {ticker} {statement_type} {fiscal_year}: {matched_rows}/{total_rows} matched ({match_percentage:.1f}%)")
         
@@ -341,10 +348,13 @@ class PatternLogger:
 
 # Singleton instance
 _pattern_logger = None
+_pattern_logger_lock = threading.Lock()
 
 def get_pattern_logger(log_dir: str = "pattern_logs") -> PatternLogger:
     """Get or create the global pattern logger instance."""
     global _pattern_logger
     if _pattern_logger is None:
-        _pattern_logger = PatternLogger(log_dir)
+        with _pattern_logger_lock:
+            if _pattern_logger is None:
+                _pattern_logger = PatternLogger(log_dir)
     return _pattern_logger
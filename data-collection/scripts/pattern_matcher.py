@@ -0,0 +1,175 @@
+"""
+PATTERN MATCHER - Precompiled Multi-Pattern Matching for statement_maps
+
+The mappers used to call re.search(pattern, text, re.IGNORECASE) for every
+pattern of every MapFact on every row, for GAAP, IFRS and Human patterns
+alike, and relied on re's small internal cache for compilation. A
+StatementMapMatcher instead compiles an IncomeStatementMap / BalanceSheetMap
+/ CashFlowMap once per process:
+
+1. Every pattern is compiled once (re.IGNORECASE, as before), grouped by
+   kind (GAAP / IFRS / Human) and tagged with its MapFact and pattern index
+2. Each pattern gets a literal prefilter: the longest run of literal
+   characters that any match must contain. Patterns whose literal is not a
+   substring of the (lower-cased) text are skipped without running the regex
+
+Joining all patterns of a kind into one named-group alternation was tried
+and dropped: under IGNORECASE re tries every branch at every offset, which
+made a single combined scan several times slower than the prefiltered
+per-pattern searches (see benchmarks/bench_pattern_matcher.py).
+
+Results are exactly those of the per-pattern loops: for every MapFact, the
+patterns that match, in pattern order, each with its own leftmost match.
+The prefilter is only applied to ASCII texts (Unicode case folding can match
+non-ASCII characters against ASCII literals); other texts run every regex.
+
+Usage:
+    from pattern_matcher import get_statement_map_matcher
+    matcher = get_statement_map_matcher(statement_map)
+    hits = matcher.search('GAAP', 'us-gaap_Revenues')
+    # -> {'TotalRevenue': [(0, pattern, 'Revenues'), ...], ...}
+"""
+
+import re
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from re import _parser as sre_parse   # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse
+
+from statement_maps import MapFact
+
+logger = logging.getLogger(__name__)
+
+
+PATTERN_KINDS = {
+    'GAAP': 'gaap_pattern',
+    'IFRS': 'ifrs_pattern',
+    'Human': 'human_pattern',
+}
+
+# (pattern index, pattern, matched text) - the data of a PatternMatch
+PatternHit = Tuple[int, str, str]
+
+
+# ─── Literal prefilter ─────────────────────────────────────────────────────────
+
+def required_literal(pattern: str) -> str:
+    """
+    Longest run of consecutive top-level literal characters in a pattern,
+    lower-cased. Every match of the pattern contains it. Returns '' when no
+    safe (ASCII) literal can be derived.
+    """
+    try:
+        parsed = sre_parse.parse(pattern, re.IGNORECASE)
+    except Exception:
+        return ''
+
+    best, run = '', []
+    for op, arg in list(parsed) + [(None, None)]:
+        if op is sre_parse.LITERAL and arg < 128:
+            run.append(chr(arg).lower())
+            continue
+        if len(run) > len(best):
+            best = ''.join(run)
+        run = []
+    return best
+
+
+# ─── Compiled map ──────────────────────────────────────────────────────────────
+
+@dataclass
+class _CompiledPattern:
+    attr: str                 # MapFact attribute name on the statement map
+    index: int                # position in the MapFact's pattern list
+    pattern: str
+    regex: 're.Pattern'
+    literal: str              # '' = no prefilter
+
+
+class _KindMatcher:
+    """All patterns of one kind (GAAP / IFRS / Human) of a statement map."""
+
+    def __init__(self, kind: str, map_fact_items: List[Tuple[str, MapFact]]):
+        self.kind = kind
+        self.patterns: List[_CompiledPattern] = []
+        for attr, map_fact in map_fact_items:
+            for index, pattern in enumerate(getattr(map_fact, PATTERN_KINDS[kind]) or []):
+                if not pattern:
+                    continue
+                try:
+                    regex = re.compile(pattern, re.IGNORECASE)
+                except re.error as e:
+                    logger.error(f"Error matching {kind} pattern '{pattern}': {e}")
+                    continue
+                self.patterns.append(_CompiledPattern(attr, index, pattern, regex, required_literal(pattern)))
+
+    def search(self, text: str) -> Dict[str, List[PatternHit]]:
+        hits: Dict[str, List[PatternHit]] = {}
+        if not text or not isinstance(text, str):
+            return hits  # no pattern matches '' (re.search on non-strings raised before)
+        lowered = text.lower() if text.isascii() else None
+        for entry in self.patterns:
+            if lowered is not None and entry.literal and entry.literal not in lowered:
+                continue
+            match = entry.regex.search(text)
+            if match:
+                hits.setdefault(entry.attr, []).append((entry.index, entry.pattern, match.group(0)))
+        return hits
+
+
+class StatementMapMatcher:
+    """
+    Precompiled matcher for one statement map (all MapFacts, all kinds).
+    Use get_statement_map_matcher() to share instances.
+    """
+
+    def __init__(self, statement_map):
+        items = [(name, mf) for name, mf in vars(statement_map).items() if isinstance(mf, MapFact)]
+        self.kinds = {kind: _KindMatcher(kind, items) for kind in PATTERN_KINDS}
+
+    def search(self, kind: str, text: str) -> Dict[str, List[PatternHit]]:
+        """
+        Every pattern of the given kind that matches text, per MapFact.
+
+        Returns:
+            {MapFact attribute name: [(pattern index, pattern, matched text), ...]}
+            with each list in pattern order, i.e. exactly what
+            find_pattern_matches(text, map_fact.<kind>_pattern, kind) finds
+        """
+        return self.kinds[kind].search(text)
+
+    def first_match(self, kind: str, text: str, attr: str) -> Optional[PatternHit]:
+        """First pattern (in list order) of one MapFact matching text, or None."""
+        hits = self.search(kind, text).get(attr)
+        return hits[0] if hits else None
+
+
+def _map_signature(statement_map) -> tuple:
+    return (type(statement_map).__qualname__,) + tuple(
+        (name, tuple(mf.gaap_pattern), tuple(mf.ifrs_pattern), tuple(mf.human_pattern))
+        for name, mf in vars(statement_map).items() if isinstance(mf, MapFact)
+    )
+
+
+_matchers: Dict[tuple, StatementMapMatcher] = {}
+_matchers_lock = threading.Lock()
+
+
+def get_statement_map_matcher(statement_map) -> StatementMapMatcher:
+    """
+    Shared matcher for a statement map instance. Maps with identical
+    patterns (every IncomeStatementMap(), ...) share one compiled matcher.
+    """
+    key = _map_signature(statement_map)
+    matcher = _matchers.get(key)
+    if matcher is None:
+        with _matchers_lock:
+            matcher = _matchers.get(key)
+            if matcher is None:
+                matcher = _matchers[key] = StatementMapMatcher(statement_map)
+    return matcher
@@ -10,6 +10,7 @@ This module ties together:
 - TemporalValidator (10% cross-year rule)
 - SummationChecker (sum-check utility)
 - AgentOrchestrator (LLM tie-breaking)
+- MappingMemory (mappings learned from earlier tie-breaks, consulted first)
 
 Usage:
     from pipeline import ParsingPipeline
@@ -35,6 +36,9 @@ from temporal_validator import TemporalValidator
 from summation_checker import SummationChecker
 from agents import AgentOrchestrator, check_ollama_available
 from statement_maps import MapFact
+from mapped_state import MappedState, frame_values
+from mapping_memory import get_mapping_memory, LearnedMapping
+from tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -66,6 +70,9 @@ class PipelineConfig:
     # Discovery (find missing items via LLM)
     discovery_enabled: bool = True
     
+    # Expected LLM calls of one tie-break (Auditor, plus the Finalizer about half the time)
+    llm_tie_break_calls: float = 1.5
+    
     # Expected key facts per statement type
     expected_facts: Dict[str, List[str]] = field(default_factory=lambda: {
         'income_statement': [
@@ -100,6 +107,7 @@ class MappingResult:
     confidence: float
     used_llm: bool
     is_total_row: bool
+    used_memory: bool = False
 
 
 @dataclass
@@ -133,7 +141,9 @@ class ParsingPipeline:
                  cal_facts: Optional[Dict] = None,
                  historical_statements: Optional[Dict[str, pd.DataFrame]] = None,
                  statement_type: str = 'income_statement',
-                 config: Optional[PipelineConfig] = None):
+                 config: Optional[PipelineConfig] = None,
+                 llm_budget=None,
+                 cik: Optional[str] = None):
         """
         Args:
             statement_map: IncomeStatementMap, BalanceSheetMap, or CashFlowMap
@@ -144,6 +154,9 @@ class ParsingPipeline:
             historical_statements: Dict of {year: mapped_df} for cross-year validation
             statement_type: Type of statement being parsed
             config: Pipeline configuration
+            llm_budget: llm_budget.LLMBudget limiting the LLM calls of this
+                statement (None = thresholds only)
+            cik: Company CIK, scope of the learned mappings
         """
         self.statement_map = statement_map
         self.og_df = og_df
@@ -153,6 +166,16 @@ class ParsingPipeline:
         self.historical_statements = historical_statements or {}
         self.statement_type = statement_type
         self.config = config or PipelineConfig()
+        self.llm_budget = llm_budget
+        self.cik = cik
+        self.memory = get_mapping_memory()
+        self._learned: Dict[str, Optional[LearnedMapping]] = {}
+
+        # Original values as a matrix, rows addressed by position
+        self._og_values = frame_values(og_df)
+        self._og_positions: Dict[str, int] = {}
+        for pos, idx in enumerate(og_df.index):
+            self._og_positions.setdefault(idx, pos)
         
         # Initialize components
         self.matcher = HybridMatcher(statement_map)
@@ -189,6 +212,7 @@ class ParsingPipeline:
             analysis_model=self.config.llm_analysis_model,
             base_url=self.config.llm_base_url,
         )
+        self._agent_orchestrator.llm_budget = self.llm_budget
         return self._agent_orchestrator
 
     def run(self) -> PipelineResult:
@@ -200,39 +224,44 @@ class ParsingPipeline:
         """
         logger.info(f"[Pipeline] Starting {self.statement_type} ({len(self.og_df)} rows, {len(self.historical_statements)} historical filings)")
 
-        # ── Step 1: Create empty mapped DataFrame ──────────────────────────
-        mapped_df = self._create_mapped_df()
+        # ── Step 1: Create empty mapped state (DataFrame built at the end) ─
+        state = self._create_mapped_state()
 
         # ── Step 2: Generate regex candidates for every row ────────────────
         logger.info("[Pipeline] Step 2: Generating regex candidates...")
-        candidates_by_row = self.matcher.find_all_row_candidates(
-            self.og_df, self.rows_text
-        )
-        
-        # Attach row_data to each candidate's context
-        for row_idx, candidates in candidates_by_row.items():
-            row_data = self.og_df.loc[row_idx]
-            for c in candidates:
-                c.context['row_data'] = row_data
-                c.context['human_label'] = self.rows_text.get(row_idx, '')
+        with span("pipeline.candidates", "pipeline", rows=len(self.og_df)):
+            candidates_by_row = self.matcher.find_all_row_candidates(
+                self.og_df, self.rows_text
+            )
+            
+            # Attach row_data to each candidate's context
+            for row_idx, candidates in candidates_by_row.items():
+                row_data = self.og_df.loc[row_idx]
+                for c in candidates:
+                    c.context['row_data'] = row_data
+                    c.context['human_label'] = self.rows_text.get(row_idx, '')
 
         # ── Step 3: Temporal validation ────────────────────────────────────
         if self.temporal_validator and self.historical_statements:
             logger.info("[Pipeline] Step 3: Temporal cross-year validation (%d historical filings)", len(self.historical_statements))
-            self.temporal_validator.validate_all_candidates(candidates_by_row)
+            with span("pipeline.temporal", "pipeline", historical=len(self.historical_statements)):
+                self.temporal_validator.validate_all_candidates(candidates_by_row)
         else:
             logger.info("[Pipeline] Step 3: Temporal validation skipped (no historical data)")
 
         # ── Step 4: Summation checking ─────────────────────────────────────
         if self.summation_checker:
             logger.info("[Pipeline] Step 4: Summation verification (%d sum-marked rows)", len(self.rows_that_are_sum))
-            self.summation_checker.score_all_candidates(candidates_by_row)
+            with span("pipeline.summation", "pipeline"):
+                self.summation_checker.score_all_candidates(candidates_by_row)
         else:
             logger.info("[Pipeline] Step 4: Summation checking skipped")
 
         # ── Step 5: Select best candidates & LLM tie-breaking ──────────────
         logger.info("[Pipeline] Step 5: Selecting best matches...")
-        mappings = self._select_best_mappings(candidates_by_row, mapped_df)
+        with span("pipeline.select", "pipeline") as select_span:
+            mappings = self._select_best_mappings(candidates_by_row, state)
+            select_span.set(mapped=len(mappings), llm=sum(1 for m in mappings if m.used_llm))
 
         # ── Step 6: Discovery of missing items ─────────────────────────────
         discovered = []
@@ -244,17 +273,28 @@ class ParsingPipeline:
         if missing_facts and self.config.discovery_enabled:
             logger.info("[Pipeline] Step 6: LLM Discovery for missing items: %s", missing_facts)
             agent = self._get_agent()
+            max_calls = None
+            if agent and self.llm_budget is not None:
+                affordable = self.llm_budget.affordable_calls()
+                max_calls = None if affordable == float('inf') else int(affordable)
+                self.llm_budget.record('discovery', ','.join(missing_facts), len(missing_facts),
+                                       max_calls != 0, f"{max_calls} batches" if max_calls is not None else "")
+                if max_calls == 0:
+                    logger.info("[Pipeline] Step 6: Discovery skipped (LLM budget exhausted)")
+                    agent = None
             if agent:
-                discoveries = agent.discover_missing_items(
-                    self.og_df, self.rows_text,
-                    mapped_row_idxs, missing_facts, self.statement_type
-                )
+                with span("pipeline.discovery", "pipeline", missing=len(missing_facts)):
+                    discoveries = agent.discover_missing_items(
+                        self.og_df, self.rows_text,
+                        mapped_row_idxs, missing_facts, self.statement_type,
+                        max_calls=max_calls,
+                    )
                 for disc in discoveries:
                     if (disc.suggested_fact and disc.confidence >= 0.6 and
-                        disc.suggested_fact in mapped_df.index and
-                        disc.row_idx in self.og_df.index):
+                        state.has_fact(disc.suggested_fact) and
+                        disc.row_idx in self._og_positions):
                         # Apply the discovery
-                        mapped_df.loc[disc.suggested_fact] = self.og_df.loc[disc.row_idx]
+                        state.assign(disc.suggested_fact, self._og_row(disc.row_idx), disc.row_idx)
                         discovered.append({
                             'row_idx': disc.row_idx,
                             'fact': disc.suggested_fact,
@@ -271,7 +311,7 @@ class ParsingPipeline:
         # ── Compute statistics ─────────────────────────────────────────────
         total_rows = len(self.og_df)
         mapped_rows = len(mappings) + len(discovered)
-        non_zero_facts = len(mapped_df.index[(mapped_df != 0).any(axis=1)])
+        non_zero_facts = sum(len(state.fact_rows[f]) for f in state.nonzero_facts())
         
         stats = {
             'total_rows': total_rows,
@@ -280,9 +320,12 @@ class ParsingPipeline:
             'match_percentage': (mapped_rows / total_rows * 100) if total_rows > 0 else 0,
             'non_zero_facts': non_zero_facts,
             'llm_invocations': sum(1 for m in mappings if m.used_llm),
+            'memory_hits': sum(1 for m in mappings if m.used_memory),
             'discovered_items': len(discovered),
             'missing_expected': [f for f in missing_facts if f not in {d['fact'] for d in discovered}],
         }
+        if self.llm_budget is not None:
+            stats['llm_budget'] = self.llm_budget.report()
         
         unmapped = [idx for idx in self.og_df.index if idx not in mapped_row_idxs]
         
@@ -293,7 +336,7 @@ class ParsingPipeline:
         # Log key mappings
         for m in sorted(mappings, key=lambda x: x.total_score, reverse=True):
             dim_flag = ' [DIM]' if m.row_idx != m.row_idx.split('::')[-1].lstrip('D1:').lstrip('D2:') else ''
-            llm_flag = ' [LLM]' if m.used_llm else ''
+            llm_flag = ' [LLM]' if m.used_llm else (' [MEM]' if m.used_memory else '')
             logger.info(
                 f"[Pipeline]   {m.fact_name:40s} <- {m.row_idx:50s} "
                 f"(score={m.total_score:6.1f}, {m.pattern_type}){dim_flag}{llm_flag}"
@@ -315,31 +358,37 @@ class ParsingPipeline:
                 logger.debug(f"[Pipeline]   ... and {len(unmapped) - 10} more")
 
         return PipelineResult(
-            mapped_df=mapped_df,
+            mapped_df=state.to_dataframe(),
             mappings=mappings,
             unmapped_rows=unmapped,
             discovered_mappings=discovered,
             statistics=stats,
         )
 
-    def _create_mapped_df(self) -> pd.DataFrame:
-        """Create a zeroed DataFrame from the statement map."""
-        map_facts = vars(self.statement_map)
-        row_labels = [
-            mf.fact for mf in map_facts.values()
-            if isinstance(mf, MapFact)
-        ]
-        column_labels = self.og_df.columns
-        return pd.DataFrame(0.0, index=row_labels, columns=column_labels)
+    def _create_mapped_state(self) -> MappedState:
+        """Create a zeroed mapped state from the statement map."""
+        og_values = self._og_values
+        dtype = np.result_type(np.float64, og_values.dtype)
+        return MappedState.from_statement_map(self.statement_map, self.og_df.columns, dtype=dtype)
+
+    def _og_row(self, row_idx) -> np.ndarray:
+        """Values of an original row (its first occurrence), in column order."""
+        return self._og_values[self._og_positions[row_idx]]
 
     def _select_best_mappings(self, candidates_by_row: Dict[str, List[MatchCandidate]],
-                               mapped_df: pd.DataFrame) -> List[MappingResult]:
+                               state: MappedState) -> List[MappingResult]:
         """
         Select the best mapping for each row using combined scores.
         
         Uses LLM agents for tie-breaking when:
         - Top 2 candidates are within `llm_ambiguity_threshold` of each other
         - Best candidate score is below `llm_low_confidence_threshold`
+        
+        A row whose mapping was learned before (MappingMemory) takes the
+        learned candidate instead. With an LLM budget, only the most valuable
+        tie-breaks that fit it are sent (see _llm_need); the others keep the
+        best-scored candidate. Facts the LLM picks are recorded in the memory
+        when temporal or summation evidence backs them.
         """
         mappings = []
         mapped_facts: Set[str] = set()  # Track which facts are already assigned
@@ -354,7 +403,22 @@ class ParsingPipeline:
             reverse=True,
         )
 
+        # Rank the tie-breaks the rows would need against the budget
+        planned = None
+        reserved = 0.0   # calls planned for rows not reached yet
+        if self.llm_budget is not None and self.config.llm_enabled:
+            needs = []
+            for row_idx in row_order:
+                ranked = sorted(candidates_by_row[row_idx], key=lambda c: c.total_score, reverse=True)
+                reason, value = self._llm_need(ranked)
+                if reason and self._learned_candidate(row_idx, ranked) is None:
+                    needs.append((row_idx, value, self.config.llm_tie_break_calls))
+            planned = self.llm_budget.plan(needs)
+            reserved = sum(calls for row_idx, _, calls in needs if row_idx in planned)
+
         for row_idx in row_order:
+            if planned is not None and row_idx in planned:
+                reserved -= self.config.llm_tie_break_calls
             candidates = candidates_by_row[row_idx]
             if not candidates:
                 continue
@@ -369,25 +433,40 @@ class ParsingPipeline:
             
             best = available[0]
             used_llm = False
+            used_memory = False
 
             # Check if we need LLM tie-breaking
-            needs_llm = False
-            llm_reason = ""
-            if len(available) >= 2:
-                gap = best.total_score - available[1].total_score
-                if gap < self.config.llm_ambiguity_threshold:
-                    needs_llm = True
-                    llm_reason = (f"ambiguous: '{best.map_fact.fact}' ({best.total_score:.1f}) vs "
-                                  f"'{available[1].map_fact.fact}' ({available[1].total_score:.1f}), gap={gap:.1f}")
-            if best.total_score < self.config.llm_low_confidence_threshold:
-                needs_llm = True
-                llm_reason = f"low confidence: best score {best.total_score:.1f} < threshold {self.config.llm_low_confidence_threshold}"
+            llm_reason, llm_value = self._llm_need(available)
+            needs_llm = bool(llm_reason)
+
+            # A mapping learned from an earlier tie-break settles it without the LLM
+            learned = self._learned_candidate(row_idx, available) if needs_llm else None
+            if learned is not None:
+                logger.info(f"[Pipeline] Learned mapping for '{row_idx}': '{learned.map_fact.fact}' "
+                            f"({self._learned[row_idx].scope}), LLM not needed: {llm_reason}")
+                best = learned
+                used_memory = True
+                needs_llm = False
 
             if needs_llm:
-                if self.config.llm_enabled:
-                    logger.info(f"[Pipeline] LLM tie-break needed for '{row_idx}': {llm_reason}")
-                else:
+                if not self.config.llm_enabled:
                     logger.info(f"[Pipeline] LLM tie-break needed but DISABLED for '{row_idx}': {llm_reason}")
+                elif planned is not None:
+                    # A tie-break that only appeared once an earlier row took a
+                    # fact was not planned: it may use what the planned rows
+                    # still ahead leave of the budget
+                    calls = self.config.llm_tie_break_calls
+                    granted = self.llm_budget.can_afford(calls if row_idx in planned else calls + reserved)
+                    self.llm_budget.record('tie_break', row_idx, llm_value, granted,
+                                           "" if granted else "not within budget")
+                    if granted:
+                        logger.info(f"[Pipeline] LLM tie-break needed for '{row_idx}': {llm_reason}")
+                    else:
+                        logger.info(f"[Pipeline] LLM tie-break outside budget for '{row_idx}', "
+                                    f"keeping '{best.map_fact.fact}': {llm_reason}")
+                        needs_llm = False
+                else:
+                    logger.info(f"[Pipeline] LLM tie-break needed for '{row_idx}': {llm_reason}")
 
             if needs_llm and self.config.llm_enabled:
                 agent = self._get_agent()
@@ -434,8 +513,8 @@ class ParsingPipeline:
 
             # Apply the mapping
             fact_name = best.map_fact.fact
-            if fact_name in mapped_df.index:
-                mapped_df.loc[fact_name] = self.og_df.loc[row_idx]
+            if state.has_fact(fact_name):
+                state.assign(fact_name, self._og_row(row_idx), row_idx)
                 mapped_facts.add(fact_name)
 
                 mapping = MappingResult(
@@ -450,11 +529,69 @@ class ParsingPipeline:
                     confidence=min(1.0, best.total_score / 80.0),
                     used_llm=used_llm,
                     is_total_row=best.is_total_row,
+                    used_memory=used_memory,
                 )
                 mappings.append(mapping)
+                # Only tie-breaks confirmed by temporal / summation evidence are
+                # learned: a bare LLM answer would otherwise skip the LLM for good
+                confirmed = best.temporal_score > 0 or best.summation_score > 0
+                if used_llm and confirmed and self.memory is not None:
+                    self.memory.record(
+                        self.cik, self.statement_type, row_idx, self.rows_text.get(row_idx, ''),
+                        fact_name, source='llm', confidence=best.llm_score / 30,
+                        temporal=best.temporal_score > 0, summation=best.summation_score > 0,
+                    )
 
         return mappings
 
+    def _learned_candidate(self, row_idx: str, candidates: List[MatchCandidate]) -> Optional[MatchCandidate]:
+        """The candidate of the row's learned fact, if one was learned and is still available."""
+        if self.memory is None:
+            return None
+        if row_idx not in self._learned:
+            self._learned[row_idx] = self.memory.lookup(
+                self.cik, self.statement_type, row_idx, self.rows_text.get(row_idx, '')
+            )
+        learned = self._learned[row_idx]
+        if learned is None:
+            return None
+        return next((c for c in candidates if c.map_fact.fact == learned.fact), None)
+
+    def _llm_need(self, ranked: List[MatchCandidate]) -> Tuple[str, float]:
+        """
+        Whether the LLM should break the tie between the ranked candidates,
+        and the expected value of asking it.
+        
+        Returns:
+            (reason, value) - reason is empty if the thresholds are not hit.
+            The value is 0..1: how far the top gap / best score falls below
+            its threshold, halved for each kind of evidence (temporal,
+            summation) that singles out the best candidate already.
+        """
+        if not ranked:
+            return "", 0.0
+        best = ranked[0]
+        reason = ""
+        value = 0.0
+        if len(ranked) >= 2:
+            gap = best.total_score - ranked[1].total_score
+            if gap < self.config.llm_ambiguity_threshold:
+                reason = (f"ambiguous: '{best.map_fact.fact}' ({best.total_score:.1f}) vs "
+                          f"'{ranked[1].map_fact.fact}' ({ranked[1].total_score:.1f}), gap={gap:.1f}")
+                value = 1.0 - gap / self.config.llm_ambiguity_threshold
+        if best.total_score < self.config.llm_low_confidence_threshold:
+            reason = f"low confidence: best score {best.total_score:.1f} < threshold {self.config.llm_low_confidence_threshold}"
+            value = max(value, 1.0 - best.total_score / self.config.llm_low_confidence_threshold)
+        if not reason:
+            return "", 0.0
+
+        others = ranked[1:]
+        if best.temporal_score > 0 and not any(c.temporal_score > 0 for c in others):
+            value *= 0.5
+        if best.summation_score > 0 and not any(c.summation_score > 0 for c in others):
+            value *= 0.5
+        return reason, max(value, 0.0)
+
     def _get_surrounding_rows(self, row_idx: str, n: int = 3) -> List[Dict]:
         """Get n rows above and below the target row for LLM context."""
         row_list = list(self.og_df.index)
@@ -0,0 +1,254 @@
+"""
+STATEMENT PARSER - DOM Backends for SEC R-File Statement Tables
+
+Filling.extract_columns_values_and_dates_from_statement and
+dates.get_datetime_index_dates_from_statement only need a handful of facts
+from an R file's HTML: the column headers, the table header text (units) and,
+for every row with a fact link, its class, link onclick/label and the value
+cells. This module extracts exactly those into a small ParsedStatement so the
+extraction logic runs on plain Python objects, with two interchangeable
+backends producing identical output:
+
+- parse_statement_lxml(content)  lxml.html + precompiled XPath (fast, default)
+- parse_statement_bs4(soup)      BeautifulSoup select()/find_all() (reference)
+
+Both reproduce BeautifulSoup's semantics (class-token matching, .text,
+get_text(strip=True), .string), which test_statement_parser.py checks on
+recorded R files. XML statements (old filings) always use BeautifulSoup.
+
+Configuration (environment variables):
+    STATEMENT_PARSER    'lxml' (default) or 'bs4'
+
+Usage:
+    from statement_parser import parse_statement_content
+    document = parse_statement_content(response.content)
+    columns, values, dates, ... = filing.extract_columns_values_and_dates_from_statement(document, name)
+"""
+
+import os
+import re
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+
+STATEMENT_PARSER = os.environ.get("STATEMENT_PARSER", "lxml").lower()
+
+# BOM, <?xml ... encoding=...?> or <meta charset>, which libxml2 honours itself
+_DECLARED_ENCODING = re.compile(rb'^(?:\xef\xbb\xbf|\xff\xfe|\xfe\xff)|<\?xml[^>]*encoding|<meta[^>]*charset',
+                                re.IGNORECASE)
+_ENCODING_SNIFF_BYTES = 2048
+
+VALUE_CELL_CLASSES = {"text", "nump", "num"}
+NUMBER_CELL_CLASSES = {"num", "nump"}
+
+
+# ─── Parsed representation ─────────────────────────────────────────────────────
+
+@dataclass
+class DateHeader:
+    """One <th class="th"> column header."""
+    text: str                    # header.text.strip()
+    colspan: Optional[str]       # raw colspan attribute
+    date: Optional[str]          # str(th.div.string) when present
+
+
+@dataclass
+class StatementCell:
+    """One value cell (td.text / td.nump / td.num) of a row."""
+    classes: List[str]
+    text: str                    # cell.text
+
+
+@dataclass
+class StatementRow:
+    """A <tr> with a fact link (td.pl a)."""
+    classes: Optional[List[str]]  # row.get('class')
+    onclick: Optional[str]        # onclick of the first fact link
+    label: str                    # link.get_text(strip=True)
+    has_number: bool              # row has td.num / td.nump cells
+    cells: List[StatementCell] = field(default_factory=list)
+
+
+@dataclass
+class StatementTable:
+    header_texts: List[str]       # get_text() of every <th> in the table
+    rows: List[StatementRow] = field(default_factory=list)
+
+
+@dataclass
+class ParsedStatement:
+    date_headers: List[DateHeader] = field(default_factory=list)
+    title_headers: List[str] = field(default_factory=list)   # get_text() of th.tl
+    tables: List[StatementTable] = field(default_factory=list)
+
+
+# ─── BeautifulSoup backend ─────────────────────────────────────────────────────
+
+def parse_statement_bs4(soup: BeautifulSoup) -> ParsedStatement:
+    """Reference backend: the DOM access the extraction code has always used."""
+    document = ParsedStatement()
+    for th in soup.find_all("th", {"class": "th"}):
+        document.date_headers.append(DateHeader(
+            text=th.text.strip(),
+            colspan=th.get("colspan"),
+            date=str(th.div.string) if th.div and th.div.string else None,
+        ))
+    document.title_headers = [th.get_text() for th in soup.find_all("th", {"class": "tl"})]
+
+    for table in soup.find_all("table"):
+        parsed_table = StatementTable(header_texts=[th.get_text() for th in table.find_all("th")])
+        for row in table.select("tr"):
+            links = row.select("td.pl a, td.pl.custom a")
+            if not links:
+                continue
+            parsed_table.rows.append(StatementRow(
+                classes=row.get("class"),
+                onclick=links[0].get("onclick"),
+                label=links[0].get_text(strip=True),
+                has_number=bool(row.select("td.num, td.nump")),
+                cells=[StatementCell(classes=cell.get("class"), text=cell.text)
+                       for cell in row.select("td.text, td.nump, td.num")],
+            ))
+        document.tables.append(parsed_table)
+    return document
+
+
+# ─── lxml backend ──────────────────────────────────────────────────────────────
+
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+_XP_DATE_HEADERS = etree.XPath(f"//th[{_has_class('th')}]")
+_XP_TITLE_HEADERS = etree.XPath(f"//th[{_has_class('tl')}]")
+_XP_FIRST_DIV = etree.XPath("(.//div)[1]")
+_XP_LINKS = etree.XPath(f".//td[{_has_class('pl')}]//a")
+_XP_TEXT = etree.XPath(".//text()")
+_XP_STRING = etree.XPath("string()")
+
+
+def _classes(el) -> Optional[List[str]]:
+    value = el.get("class")
+    return value.split() if value is not None else None
+
+
+def _text(el) -> str:
+    """BeautifulSoup .text / get_text()."""
+    return _XP_STRING(el)
+
+
+def _text_strip(el) -> str:
+    """BeautifulSoup get_text(strip=True)."""
+    return "".join(s.strip() for s in _XP_TEXT(el) if s.strip())
+
+
+def _single_string(el) -> Optional[str]:
+    """BeautifulSoup .string: the only child string, descending single children."""
+    nodes = []
+    if el.text:
+        nodes.append(el.text)
+    for child in el:
+        nodes.append(child)
+        if child.tail:
+            nodes.append(child.tail)
+    if len(nodes) != 1:
+        return None
+    node = nodes[0]
+    if isinstance(node, str):
+        return node
+    if not isinstance(node.tag, str):  # comment / processing instruction
+        return node.text
+    return _single_string(node)
+
+
+_parsers = threading.local()
+
+
+def _utf8_parser() -> lxml.html.HTMLParser:
+    """Per-thread HTML parser for documents that do not declare an encoding."""
+    parser = getattr(_parsers, "utf8", None)
+    if parser is None:
+        parser = _parsers.utf8 = lxml.html.HTMLParser(encoding="utf-8")
+    return parser
+
+
+def parse_statement_lxml(content) -> ParsedStatement:
+    """Fast backend: lxml.html tree walked with precompiled XPath expressions."""
+    # Bytes go to libxml2 as they are: it applies a declared encoding itself,
+    # and undeclared R files are UTF-8 (libxml2 would assume Latin-1)
+    parser = None
+    if isinstance(content, bytes) and not _DECLARED_ENCODING.search(content[:_ENCODING_SNIFF_BYTES]):
+        parser = _utf8_parser()
+    root = lxml.html.document_fromstring(content, parser=parser)
+
+    document = ParsedStatement()
+    for th in _XP_DATE_HEADERS(root):
+        div = _XP_FIRST_DIV(th)
+        date = _single_string(div[0]) if div else None
+        document.date_headers.append(DateHeader(
+            text=_text(th).strip(), colspan=th.get("colspan"), date=date or None,
+        ))
+    document.title_headers = [_text(th) for th in _XP_TITLE_HEADERS(root)]
+
+    for table in root.iter("table"):
+        parsed_table = StatementTable(header_texts=[_text(th) for th in table.iter("th")])
+        for row in table.iter("tr"):
+            links = _XP_LINKS(row)
+            if not links:
+                continue
+            cells = []
+            has_number = False
+            for td in row.iter("td"):
+                classes = _classes(td)
+                if not classes:
+                    continue
+                tokens = set(classes)
+                if tokens & VALUE_CELL_CLASSES:
+                    cells.append(StatementCell(classes=classes, text=_text(td)))
+                    has_number = has_number or bool(tokens & NUMBER_CELL_CLASSES)
+            parsed_table.rows.append(StatementRow(
+                classes=_classes(row),
+                onclick=links[0].get("onclick"),
+                label=_text_strip(links[0]),
+                has_number=has_number,
+                cells=cells,
+            ))
+        document.tables.append(parsed_table)
+    return document
+
+
+# ─── Entry point ───────────────────────────────────────────────────────────────
+
+def parse_statement_content(content: bytes, is_xml: bool = False,
+                            backend: str = None) -> ParsedStatement:
+    """
+    Parse a downloaded R file with the configured backend.
+
+    Args:
+        content: Raw R file bytes
+        is_xml: True for .xml statements (always parsed with BeautifulSoup)
+        backend: 'lxml' or 'bs4' (default: STATEMENT_PARSER)
+    """
+    backend = backend or STATEMENT_PARSER
+    if is_xml:
+        return parse_statement_bs4(BeautifulSoup(content, "lxml-xml", from_encoding="utf-8"))
+    if backend == "bs4":
+        return parse_statement_bs4(BeautifulSoup(content, "lxml"))
+    return parse_statement_lxml(content)
+
+
+def as_parsed_statement(soup_or_document) -> ParsedStatement:
+    """Accept either a BeautifulSoup (legacy callers) or a ParsedStatement."""
+    if isinstance(soup_or_document, ParsedStatement):
+        return soup_or_document
+    return parse_statement_bs4(soup_or_document)
@@ -0,0 +1,171 @@
+"""
+STATEMENT RUNNER - Concurrent Per-Statement Mapping Within a Filing
+
+Within one filing, the income statement, balance sheet and cash flow share
+nothing at mapping time except the Filling's facts table and calculation
+graph: each has its own R file and its own historical_* dict of newer
+filings. get_financial_statements() used to map them one after another; a
+StatementRunner maps them concurrently once the filing's shared artifacts
+are loaded:
+
+    main thread                     statement threads
+    ───────────                     ─────────────────
+    load calculation graph
+    submit all three         ──►    income_statement     ┐
+                                    balance_sheet        ├ process_one_statement
+                                    cash_flow_statement  ┘ + get_mapped_df
+    wait for each in order,  ◄──
+    log its "Processing ..."
+    yield results in step order
+
+Results are joined before the next filing is touched, so each filing still
+sees the mapped statements of every newer filing (temporal validation), and
+they are yielded in the fixed income → balance → cash flow order. The
+"Processing Income Statement..." / "Processing Balance Sheet..." /
+"Processing Cash Flow..." lines the backend turns into SSE progress events
+are still logged once per statement and filing, in that order, after the
+filing's "Processing filing i/n" line. With concurrent mapping each line is
+logged when its statement is done (waiting in step order), so the progress
+bar advances with the work instead of jumping to the end of the filing
+before mapping starts.
+
+Threads rather than processes: a Filling holds the company's whole facts
+table, the statements share the process-wide matcher / memo / fact cube
+singletons, and most of the wall time of pipeline and enhanced mapping is
+spent waiting on the LLM.
+
+Configuration (environment variables):
+    STATEMENT_WORKERS   Statements mapped concurrently (default 3, 1 = sequential)
+
+Usage:
+    from statement_runner import StatementRunner, statement_steps
+    steps = statement_steps(statement_filter)
+    historical = {step.key: {} for step in steps}
+    with StatementRunner() as runner:
+        for step, statement, mapped_df in runner.run(filing, steps, historical):
+            ...
+"""
+
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Any
+
+from tracing import span, trace_context, propagate
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+
+STATEMENT_WORKERS = int(os.environ.get("STATEMENT_WORKERS", "3"))
+
+
+class StatementStep(NamedTuple):
+    key: str              # --statement filter value
+    name: str             # Filling.process_one_statement() statement name
+    attr: str             # Filling attribute holding the statement object
+    results_key: str      # list in get_financial_statements() results
+    message: str          # progress line parsed by the backend (SSE)
+
+
+STATEMENT_STEPS = [
+    StatementStep('income', 'income_statement', 'income_statement', 'income_statements',
+                  "Processing Income Statement..."),
+    StatementStep('balance', 'balance_sheet', 'balance_sheet', 'balance_sheets',
+                  "Processing Balance Sheet..."),
+    StatementStep('cashflow', 'cash_flow_statement', 'cash_flow', 'cash_flows',
+                  "Processing Cash Flow..."),
+]
+
+
+def statement_steps(statement_filter: str = 'all') -> List[StatementStep]:
+    """Steps selected by the --statement filter ('income', 'balance', 'cashflow' or 'all')."""
+    return [step for step in STATEMENT_STEPS if statement_filter in [step.key, 'all']]
+
+
+def map_statement(filing, step: StatementStep, historical_statements: Dict,
+                  budget=None) -> Tuple[Any, Any]:
+    """
+    Map one statement of a filing.
+
+    Args:
+        budget: llm_budget.FilingLLMBudget of the filing; the statement gets its share
+
+    Returns:
+        (statement object or None, mapped DataFrame or None)
+    """
+    with trace_context(statement=step.name), span("statement.map", "statement"):
+        filing.process_one_statement(step.name, historical_statements=historical_statements,
+                                     llm_budget=budget.for_statement(step.name) if budget else None)
+        statement = getattr(filing, step.attr)
+        if not statement:
+            return statement, None
+        return statement, statement.get_mapped_df()
+
+
+class StatementRunner:
+    """
+    Maps the statements of one filing at a time, concurrently, and yields
+    them in step order once all of them have finished.
+    """
+
+    def __init__(self, workers: int = STATEMENT_WORKERS):
+        """
+        Args:
+            workers: Statements mapped concurrently (1 = sequential, in the caller's thread)
+        """
+        self.workers = max(1, workers)
+        self._executor: Optional[ThreadPoolExecutor] = \
+            ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="statement") \
+            if self.workers > 1 else None
+
+    def run(self, filing, steps: List[StatementStep],
+            historical: Dict[str, Dict], budget=None) -> Iterator[Tuple[StatementStep, Any, Any]]:
+        """
+        Map the given statements of a filing.
+
+        Args:
+            filing: Filling whose statements are mapped
+            steps: Statements to map, in output order
+            historical: {step.key: historical_statements dict} of newer filings
+            budget: llm_budget.FilingLLMBudget split between the statements (None = unlimited)
+
+        Yields:
+            (step, statement object or None, mapped DataFrame or None) in step
+            order. An exception raised while mapping a statement is re-raised
+            at its position, after every statement of the filing has finished.
+        """
+        if self._executor is None or len(steps) < 2:
+            for step in steps:
+                logger.info(step.message)
+                yield (step,) + map_statement(filing, step, historical[step.key], budget)
+            return
+
+        # Shared by all statements: load once instead of racing three loads
+        try:
+            filing.xml_equations
+        except Exception as e:
+            logger.debug(f"Calculation graph unavailable for {filing.accession_number}: {e}")
+
+        futures = [self._executor.submit(propagate(map_statement), filing, step, historical[step.key], budget)
+                   for step in steps]
+        # Progress lines advance the backend's bar: log each once its statement is done
+        for step, future in zip(steps, futures):
+            wait([future])
+            logger.info(step.message)
+        for step, future in zip(steps, futures):
+            yield (step,) + future.result()
+
+    def close(self):
+        """Stop the statement threads."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -13,6 +13,13 @@ Rules:
 4. If multiple regex matches exist for a "Total" concept, prioritize the one 
    that actually functions as a sum
 
+The numeric check considers every contiguous block of up to 20 rows ending
+just above the candidate. Prefix sums of the signed and absolute values of
+every column are computed once per statement, so each block costs O(1) per
+period, and a block only counts when the sum holds in every period the row
+reports (not just the first column). Sums confirmed in several periods get
+a higher confidence.
+
 Usage:
     from summation_checker import SummationChecker
     checker = SummationChecker(og_df, rows_that_are_sum, cal_facts)
@@ -26,6 +33,8 @@ from typing import Dict, List, Optional, Tuple, Set
 from dataclasses import dataclass, field
 from itertools import combinations
 
+from mapped_state import numeric_frame_values
+
 logger = logging.getLogger(__name__)
 
 
@@ -74,6 +83,17 @@ class SummationChecker:
     PARTIAL_SUM_BONUS = 5.0
     IS_TOTAL_BONUS = 20.0  # Bonus for candidates whose fact is a "Total" type
 
+    # Numeric block check
+    LOOKBACK_ROWS = 20          # Largest block of rows above a candidate total
+    PERIOD_CONFIDENCE = 0.05    # Extra confidence per additional period confirming a sum
+    MAX_PERIOD_BONUS = 0.10
+    # (sign, sum_type, confidence with >= 2 components, with 1 component), in order of preference
+    NUMERIC_SUM_MODES = (
+        (1.0, 'exact', 0.8, 0.5),       # actual ≈ sum
+        (-1.0, 'exact', 0.75, 0.45),    # actual ≈ -sum
+        (0.0, 'absolute', 0.7, 0.4),    # |actual| ≈ sum of |values|
+    )
+
     # Total-type fact patterns
     TOTAL_FACT_KEYWORDS = {
         'total', 'net cash', 'gross profit', 'operating income',
@@ -97,15 +117,30 @@ class SummationChecker:
         self.cal_facts = cal_facts or {}
         self.tolerance = tolerance
         
-        # Pre-compute row values for first non-zero column for fast checking
-        self._row_values = {}
+        # Pre-compute per-column prefix sums for the numeric block check
+        self._index: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._raw = np.zeros((0, 0))
         if og_df is not None and not og_df.empty:
-            first_col = og_df.columns[0] if len(og_df.columns) > 0 else None
-            if first_col is not None:
-                for idx in og_df.index:
-                    val = og_df.loc[idx, first_col]
-                    if not pd.isna(val):
-                        self._row_values[idx] = float(val)
+            self._index = list(og_df.index)
+            for pos, idx in enumerate(self._index):
+                self._positions.setdefault(idx, pos)    # first occurrence, like list.index()
+            self._raw = numeric_frame_values(og_df)
+        values = np.nan_to_num(self._raw, nan=0.0)
+        nonzero = values != 0
+        self._row_has_data = nonzero.any(axis=1)
+        self._prefix = self._prefix_sums(values)
+        self._prefix_abs = self._prefix_sums(np.abs(values))
+        self._prefix_nonzero = self._prefix_sums(nonzero.astype(np.int64))
+        self._prefix_rows = self._prefix_sums(self._row_has_data.astype(np.int64))
+        self._numeric_best = None   # per-row block results, computed on first use
+
+    @staticmethod
+    def _prefix_sums(values: np.ndarray) -> np.ndarray:
+        """Prefix sums along rows with a leading zero row: P[j] - P[i] = sum(values[i:j])."""
+        prefix = np.zeros((values.shape[0] + 1,) + values.shape[1:], dtype=values.dtype)
+        np.cumsum(values, axis=0, out=prefix[1:])
+        return prefix
 
     def check_row(self, row_idx: str, row_data: Optional[pd.Series] = None) -> SumCheckResult:
         """
@@ -261,6 +296,98 @@ class SummationChecker:
         Strategy: Look at contiguous blocks of rows above this one.
         Financial statements have a structure where totals follow
         their components.
+
+        Every block [start, row) of up to LOOKBACK_ROWS rows is evaluated at
+        once from the prefix sums, in every period. A block matches a mode
+        (sum, negated sum, absolute sum) when the sum is within tolerance in
+        every period where the row or the block has a value (periods where
+        the row is NaN are skipped) and at least one non-zero period
+        confirms it. The most confident match wins; on ties the larger block
+        and the earlier mode, as in the original single-period search.
+        """
+        pos = self._positions.get(row_idx)
+        if not pos:
+            return None
+
+        if self._numeric_best is None:
+            self._numeric_best = self._evaluate_blocks()
+        confidence, start, mode, pct_difference, computed = (arr[pos] for arr in self._numeric_best)
+        if confidence < 0:
+            return None
+
+        start = int(start)
+        return SumCheckResult(
+            row_idx=row_idx, is_sum_row=True, sum_type=self.NUMERIC_SUM_MODES[mode][1],
+            component_rows=[r for r, has_data in zip(self._index[start:pos], self._row_has_data[start:pos])
+                            if has_data],
+            computed_sum=float(computed), actual_value=actual_value,
+            tolerance_used=self.tolerance, pct_difference=float(pct_difference),
+            confidence=float(confidence),
+        )
+
+    def _evaluate_blocks(self) -> Tuple[np.ndarray, ...]:
+        """
+        Best numeric block match of every row, all rows and periods at once.
+
+        Returns:
+            (confidence, start, mode, pct_difference, computed_sum) arrays
+            indexed by row position; confidence -1 means no match. The
+            computed sum is the one of the first period confirming the match.
+        """
+        n_rows, n_modes = len(self._index), len(self.NUMERIC_SUM_MODES)
+        positions = np.arange(n_rows)[:, None]
+        starts = positions - np.arange(self.LOOKBACK_ROWS, 0, -1)[None, :]   # largest block first
+        in_range = starts >= 0
+        starts = np.maximum(starts, 0)
+
+        sums = self._prefix[positions] - self._prefix[starts]            # (rows, blocks, periods)
+        abs_sums = self._prefix_abs[positions] - self._prefix_abs[starts]
+        has_values = (self._prefix_nonzero[positions] - self._prefix_nonzero[starts]) > 0
+        n_components = self._prefix_rows[positions] - self._prefix_rows[starts]  # (rows, blocks)
+
+        actual = self._raw[:, None, :]
+        reported = ~np.isnan(actual)
+        actual = np.where(reported, actual, 0.0)
+        compared = reported & ((actual != 0) | has_values)      # periods a block must satisfy
+        confirming = compared & (actual != 0) & has_values
+        evidence = confirming.sum(axis=2)
+        period_bonus = np.minimum(self.PERIOD_CONFIDENCE * (evidence - 1), self.MAX_PERIOD_BONUS)
+        usable = in_range & (evidence > 0)
+
+        shape = starts.shape + (n_modes,)
+        confidences = np.full(shape, -1.0)
+        differences = np.zeros(shape)
+        computed = np.zeros(shape)
+        first_period = np.argmax(confirming, axis=2)[..., None]
+        for m, (sign, _, conf_multi, conf_single) in enumerate(self.NUMERIC_SUM_MODES):
+            block = abs_sums if sign == 0.0 else sign * sums
+            target = np.abs(actual) if sign == 0.0 else actual
+            pct = np.where(compared, self._pct_diff_array(target, block), 0.0)
+            matched = usable & (pct <= self.tolerance).all(axis=2)
+            base = np.where(n_components >= 2, conf_multi, conf_single)
+            confidences[..., m] = np.where(matched, base + period_bonus, -1.0)
+            differences[..., m] = pct.max(axis=2, initial=0.0)
+            computed[..., m] = np.take_along_axis(block, first_period, axis=2)[..., 0]
+
+        # First maximum per row: larger block first, then mode order
+        flat = confidences.reshape(n_rows, -1)
+        best = np.argmax(flat, axis=1) if flat.shape[1] else np.zeros(n_rows, dtype=np.int64)
+        rows = np.arange(n_rows)
+        block_idx, mode = np.divmod(best, n_modes)
+        return (
+            flat[rows, best],
+            starts[rows, block_idx],
+            mode,
+            differences.reshape(n_rows, -1)[rows, best],
+            computed.reshape(n_rows, -1)[rows, best],
+        )
+
+    def _check_numeric_sum_first_column(self, row_idx: str, row_data: pd.Series,
+                                        actual_value: float) -> Optional[SumCheckResult]:
+        """
+        Previous numeric check: suffix sums of the first column only, rebuilt
+        per row in Python. Kept as a reference for
+        benchmarks/bench_summation_checker.py.
         """
         row_list = list(self.og_df.index)
         try:
@@ -413,6 +540,14 @@ class SummationChecker:
 
         return candidates_by_row
 
+    @staticmethod
+    def _pct_diff_array(val1: np.ndarray, val2: np.ndarray) -> np.ndarray:
+        """_pct_diff element-wise."""
+        avg = (np.abs(val1) + np.abs(val2)) / 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pct = np.abs(val1 - val2) / avg
+        return np.where(avg == 0, 0.0, pct)
+
     @staticmethod
     def _pct_diff(val1: float, val2: float) -> float:
         """Calculate percentage difference between two values."""
@@ -11,6 +11,12 @@ This handles the common case where SEC filings overlap years:
 - A 2022 10-K filing contains 2022, 2021, 2020 data
 - The 2022 values should match (within restatement tolerance)
 
+Comparisons run against the historical fact cube (fact_cube.py), which
+merges all prior filings of the statement type into one filings × facts ×
+period-ends array and is updated incrementally as filings finish.
+validate_all_candidates scores every candidate of every row in a few
+vectorised operations; the per-filing / per-column rules are unchanged.
+
 Usage:
     from temporal_validator import TemporalValidator
     validator = TemporalValidator(historical_statements, tolerance=0.10)
@@ -20,9 +26,11 @@ Usage:
 import logging
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 from dataclasses import dataclass
 
+from fact_cube import HistoricalFactCube, get_fact_cube
+
 logger = logging.getLogger(__name__)
 
 
@@ -90,6 +98,11 @@ class TemporalValidator:
         self.historical_statements = historical_statements or {}
         self.tolerance = tolerance
 
+    @property
+    def cube(self) -> HistoricalFactCube:
+        """Fact cube of the historical statements (synced with the dict on access)."""
+        return get_fact_cube(self.historical_statements)
+
     def validate_candidate(self, fact_name: str, row_data: pd.Series) -> TemporalValidationResult:
         """
         Validate a candidate's row data against historical statements.
@@ -101,113 +114,93 @@ class TemporalValidator:
         Returns:
             TemporalValidationResult with score and match details
         """
-        result = TemporalValidationResult(
-            fact_name=fact_name,
-            total_comparisons=0,
-            matched_comparisons=0,
-            matches=[],
-            score=0.0,
-        )
-
         if not self.historical_statements:
-            return result
-
-        current_columns = row_data.index.tolist()
-
-        for hist_year, hist_df in self.historical_statements.items():
-            # Check if this fact exists in historical data
-            if fact_name not in hist_df.index:
-                continue
-
-            hist_row = hist_df.loc[fact_name]
-
-            # Find overlapping columns (years that exist in both)
-            common_cols = [col for col in current_columns if col in hist_row.index]
-            if not common_cols:
-                continue
-
-            for col in common_cols:
-                curr_val = row_data[col]
-                hist_val = hist_row[col]
-
-                # Skip NaN comparisons
-                if pd.isna(curr_val) or pd.isna(hist_val):
-                    continue
-
-                result.total_comparisons += 1
+            return self._empty_result(fact_name)
+        return self.validate_block([fact_name], row_data.index, self._row_values(row_data)[None, :])[0]
 
-                # Skip zero==zero (not informative)
-                if curr_val == 0 and hist_val == 0:
-                    continue
-
-                # Historical value is 0 -> fact wasn't mapped in the older filing.
-                # This is NOT a mismatch; just no data to compare. Skip.
-                if hist_val == 0:
-                    continue
-
-                # Current value is 0 but historical is non-zero: we might be
-                # matching the wrong row. Mild penalty.
-                if curr_val == 0:
-                    match = TemporalMatch(
-                        year_column=str(col),
-                        hist_filing_year=str(hist_year),
-                        current_value=float(curr_val),
-                        historical_value=float(hist_val),
-                        pct_difference=1.0,
-                        matched=False,
-                    )
-                    result.matches.append(match)
-                    result.score += self.ZERO_VS_NONZERO_PENALTY
-                    logger.debug(
-                        f"  Temporal MISMATCH (current zero, hist nonzero): {fact_name} {col}: "
-                        f"current={curr_val:,.0f} vs hist({hist_year})={hist_val:,.0f}"
-                    )
-                    continue
+    def validate_block(self, fact_names: Sequence[str], columns: Sequence,
+                       current: np.ndarray) -> List[TemporalValidationResult]:
+        """
+        Validate many (fact, row values) pairs sharing the same columns at once.
 
-                # Calculate percentage difference
-                avg = (abs(curr_val) + abs(hist_val)) / 2
-                diff = abs(curr_val - hist_val)
-                pct_diff = diff / avg if avg != 0 else 0
+        For every historical filing (in dict order) and every current column
+        the filing also has, a comparison is made unless either value is NaN:
+        zero vs zero and a zero historical value (fact not mapped back then)
+        count as comparisons but are skipped; a zero current value against a
+        non-zero historical one is a ZERO_VS_NONZERO_PENALTY mismatch; other
+        pairs match when within tolerance (+PER_YEAR_MATCH_BONUS) or not
+        (MISMATCH_PENALTY). ALL_YEARS_MATCH_BONUS applies when every
+        comparison matched.
 
-                is_match = pct_diff <= self.tolerance
+        Args:
+            fact_names: Fact of each pair
+            columns: Current period columns
+            current: Array (pairs, columns) of current values
 
-                match = TemporalMatch(
-                    year_column=str(col),
-                    hist_filing_year=str(hist_year),
-                    current_value=float(curr_val),
-                    historical_value=float(hist_val),
-                    pct_difference=pct_diff,
+        Returns:
+            One TemporalValidationResult per pair
+        """
+        if not self.historical_statements or len(fact_names) == 0:
+            return [self._empty_result(f) for f in fact_names]
+
+        cube = self.cube
+        hist = cube.lookup(fact_names, columns)              # (filings, pairs, columns)
+        curr = np.broadcast_to(current[None, :, :], hist.shape)
+
+        compared = ~np.isnan(curr) & ~np.isnan(hist)
+        zero_current = curr == 0
+        informative = compared & (hist != 0)                 # skips zero==zero and hist==0
+        zero_penalty = informative & zero_current
+        valued = informative & ~zero_current
+        avg = (np.abs(curr) + np.abs(hist)) / 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pct = np.where(valued, np.abs(curr - hist) / avg, 1.0)
+        matched = valued & (pct <= self.tolerance)
+        mismatched = valued & ~matched
+
+        total = compared.sum(axis=(0, 2))
+        n_matched = matched.sum(axis=(0, 2))
+        scores = (self.PER_YEAR_MATCH_BONUS * n_matched
+                  + self.MISMATCH_PENALTY * mismatched.sum(axis=(0, 2))
+                  + self.ZERO_VS_NONZERO_PENALTY * zero_penalty.sum(axis=(0, 2)))
+        scores = scores + np.where((total > 0) & (n_matched == total), self.ALL_YEARS_MATCH_BONUS, 0.0)
+
+        # Comparison details, ordered by filing then column like the per-filing loops
+        recorded = informative.transpose(1, 0, 2)            # (pairs, filings, columns)
+        col_labels = [str(c) for c in columns]
+        filing_labels = [str(f) for f in cube.filings]
+        results = []
+        for i, fact_name in enumerate(fact_names):
+            matches = []
+            for f, c in zip(*np.nonzero(recorded[i])):
+                is_match = bool(matched[f, i, c])
+                matches.append(TemporalMatch(
+                    year_column=col_labels[c],
+                    hist_filing_year=filing_labels[f],
+                    current_value=float(curr[f, i, c]),
+                    historical_value=float(hist[f, i, c]),
+                    pct_difference=float(pct[f, i, c]),
                     matched=is_match,
-                )
-                result.matches.append(match)
-
-                if is_match:
-                    result.matched_comparisons += 1
-                    result.score += self.PER_YEAR_MATCH_BONUS
-                    logger.debug(
-                        f"  Temporal MATCH: {fact_name} {col}: "
-                        f"current={curr_val:,.0f} vs hist({hist_year})={hist_val:,.0f} "
-                        f"(diff={pct_diff*100:.1f}%)"
-                    )
-                else:
-                    result.score += self.MISMATCH_PENALTY
-                    logger.debug(
-                        f"  Temporal MISMATCH: {fact_name} {col}: "
-                        f"current={curr_val:,.0f} vs hist({hist_year})={hist_val:,.0f} "
-                        f"(diff={pct_diff*100:.1f}%)"
-                    )
-
-        # Bonus if ALL comparisons matched
-        if result.total_comparisons > 0 and result.matched_comparisons == result.total_comparisons:
-            result.score += self.ALL_YEARS_MATCH_BONUS
-
-        return result
+                ))
+            results.append(TemporalValidationResult(
+                fact_name=fact_name,
+                total_comparisons=int(total[i]),
+                matched_comparisons=int(n_matched[i]),
+                matches=matches,
+                score=float(scores[i]),
+            ))
+            if matches and logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"  Temporal {fact_name}: {int(n_matched[i])}/{int(total[i])} matched, "
+                             f"score={float(scores[i]):.1f}")
+        return results
 
     def validate_all_candidates(self, candidates_by_row: Dict[str, list]) -> Dict[str, list]:
         """
         Apply temporal validation to all candidates for all rows.
         
-        Modifies each MatchCandidate's temporal_score in-place.
+        Modifies each MatchCandidate's temporal_score in-place. Candidates
+        are validated together, one block per set of row columns (normally
+        a single block for the whole statement).
         
         Args:
             candidates_by_row: Dict mapping row_idx -> List[MatchCandidate]
@@ -219,23 +212,41 @@ class TemporalValidator:
             logger.debug("No historical statements available for temporal validation")
             return candidates_by_row
 
+        # The row_data should be attached to the candidate's context
+        blocks: Dict[tuple, Tuple[Sequence, list, list]] = {}
         for row_idx, candidates in candidates_by_row.items():
             for candidate in candidates:
-                # Get the row data for this candidate
-                # The row_data should be attached to the candidate's context
                 row_data = candidate.context.get('row_data')
                 if row_data is None:
                     continue
-
-                result = self.validate_candidate(
-                    candidate.map_fact.fact,
-                    row_data,
-                )
+                key = tuple(row_data.index)
+                if key not in blocks:
+                    blocks[key] = (row_data.index, [], [])
+                blocks[key][1].append(candidate)
+                blocks[key][2].append(self._row_values(row_data))
+
+        for columns, candidates, rows in blocks.values():
+            results = self.validate_block([c.map_fact.fact for c in candidates], columns, np.vstack(rows))
+            for candidate, result in zip(candidates, results):
                 candidate.temporal_score = result.score
                 candidate.context['temporal_result'] = result
 
         return candidates_by_row
 
+    @staticmethod
+    def _row_values(row_data: pd.Series) -> np.ndarray:
+        return pd.to_numeric(row_data, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+
+    @staticmethod
+    def _empty_result(fact_name: str) -> TemporalValidationResult:
+        return TemporalValidationResult(
+            fact_name=fact_name,
+            total_comparisons=0,
+            matched_comparisons=0,
+            matches=[],
+            score=0.0,
+        )
+
     def get_cross_year_summary(self) -> Dict:
         """
         Get a summary of available cross-year data for debugging.
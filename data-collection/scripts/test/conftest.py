@@ -0,0 +1,2 @@
+# Redirect the persistent stores before any test module imports them
+import store_isolation  # noqa: F401
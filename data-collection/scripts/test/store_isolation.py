@@ -0,0 +1,21 @@
+"""
+Keeps the persistent stores of a test run out of the developer's .api_cache.
+
+Tests that build real statements go through the candidate memo, the mapping
+memory and the LLM response cache, whose paths are read from the environment
+when those modules are imported. Importing this module first (conftest.py
+does for pytest, the test scripts do for direct runs) points them at a
+temporary directory removed at exit.
+"""
+
+import os
+import atexit
+import shutil
+import tempfile
+
+STORES_DIR = tempfile.mkdtemp(prefix="test-stores-")
+atexit.register(shutil.rmtree, STORES_DIR, ignore_errors=True)
+
+os.environ["CANDIDATE_MEMO_PATH"] = os.path.join(STORES_DIR, "candidate_memo.sqlite")
+os.environ["MAPPING_MEMORY_PATH"] = os.path.join(STORES_DIR, "mappings.sqlite")
+os.environ["LLM_CACHE_PATH"] = os.path.join(STORES_DIR, "responses.sqlite")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for the multi-ticker batch mode (batch_runner.py, main.py --tickers).
+
+Runs offline: ticker list parsing, a batch on spawned worker processes
+with a failing ticker and a crashing worker, and main.collect_ticker()
+with the collection stubbed out.
+"""
+
+import os
+import sys
+import json
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+# Add the scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("DISABLE_LLM", "1")
+
+from batch_runner import run_batch, parse_tickers, read_tickers_file, TickerOutcome
+
+
+def fake_collect(ticker, options):
+    """Worker stand-in: BOOM raises, CRASH kills its worker process."""
+    if ticker == "CRASH":
+        os._exit(1)
+    if ticker == "BOOM":
+        raise RuntimeError("company facts unavailable")
+    out = Path(options["output"]) / ticker
+    out.mkdir(parents=True, exist_ok=True)
+    (out / "pid").write_text(str(os.getpid()))
+    return TickerOutcome(ticker=ticker, status="ok", seconds=0.1, filings=1, statements=3,
+                         output=str(out), pid=os.getpid(), timing={"by_name": {"http": {"total_s": 0.05}}})
+
+
+def test_ticker_lists():
+    """Tickers are split on commas / whitespace, upper-cased and deduplicated; files allow comments."""
+    assert parse_tickers(["aapl,msft", " goog  AAPL", ""]) == ["AAPL", "MSFT", "GOOG"]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "tickers.txt"
+        path.write_text("# watchlist\nAAPL\nmsft, nvda  # chips\n\nAAPL\n")
+        assert read_tickers_file(path) == ["AAPL", "MSFT", "NVDA"]
+    print("✅ PASSED: ticker lists")
+
+
+def test_batch_isolates_failures():
+    """A raising ticker and a crashing worker fail alone; the rest is collected per ticker."""
+    with tempfile.TemporaryDirectory() as tmp:
+        tickers = ["AAPL", "BOOM", "CRASH", "MSFT", "GOOG"]
+        report = run_batch(tickers, fake_collect, workers=2, options={"output": tmp})
+
+        assert [o.ticker for o in report.outcomes] == tickers
+        status = {o.ticker: o.status for o in report.outcomes}
+        assert status == {"AAPL": "ok", "BOOM": "failed", "CRASH": "failed", "MSFT": "ok", "GOOG": "ok"}
+        errors = {o.ticker: o.error for o in report.failed}
+        assert errors["BOOM"] == "RuntimeError: company facts unavailable"
+        assert errors["CRASH"] == "worker process died"
+        # Collected in worker processes, each ticker into its own directory
+        assert all((Path(tmp) / t / "pid").read_text() != str(os.getpid()) for t in ["AAPL", "MSFT", "GOOG"])
+
+        data = json.loads(report.write(Path(tmp) / "batch_report.json").read_text())
+        assert (data["tickers"], data["succeeded"], data["failed"]) == (5, 3, ["BOOM", "CRASH"])
+        assert data["outcomes"][0]["statements"] == 3 and data["workers"] == 2
+        report.log()
+    print("✅ PASSED: batch isolates failing tickers and crashed workers")
+
+
+def test_collect_ticker_outcome():
+    """main.collect_ticker saves the CSVs and reports counts; errors become failed outcomes."""
+    import main
+
+    periods = pd.DatetimeIndex(["2024-09-28", "2023-09-30"])
+    mapped = pd.DataFrame({periods[0]: [1.0], periods[1]: [2.0]}, index=["Revenue"])
+
+    def fake_statements(ticker, num_years=1, quarterly=False, statement_filter='all'):
+        if ticker == "NONE":
+            raise ValueError(f"Ticker {ticker} not found")
+        item = {"date": "2024-09-28", "original": mapped, "mapped": mapped, "raw": None}
+        return {"ticker": ticker, "cik": "0000320193", "income_statements": [item],
+                "balance_sheets": [], "cash_flows": [], "metadata": [{"date": "2024-09-28"}]}
+
+    collect = main.get_financial_statements
+    main.get_financial_statements = fake_statements
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            options = {"years": 1, "quarterly": False, "statement": "income", "output": tmp,
+                       "trace_dir": str(Path(tmp) / "traces")}
+            outcome = main.collect_ticker("AAPL", options)
+            assert outcome.ok and (outcome.filings, outcome.statements) == (1, 1)
+            assert (Path(tmp) / "AAPL" / "income_statement_2024-09-28_annual.csv").exists()
+            assert outcome.output == str(Path(tmp) / "AAPL") and outcome.pid == os.getpid()
+
+            failed = main.collect_ticker("NONE", options)
+            assert failed.status == "failed" and failed.error == "ValueError: Ticker NONE not found"
+            if main.get_tracer() is not None:
+                assert (Path(tmp) / "traces" / "AAPL.json").exists()
+    finally:
+        main.get_financial_statements = collect
+    print("✅ PASSED: collect_ticker outcomes")
+
+
+if __name__ == "__main__":
+    test_ticker_lists()
+    test_batch_isolates_failures()
+    test_collect_ticker_outcome()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Tests for calculation linkbase discovery and the per-accession graph store.
+
+Runs offline: a fake EDGAR client serves index.json, the directory listing
+and a small _cal.xml.
+"""
+
+import sys
+import json
+from pathlib import Path
+
+import requests
+
+# Add the scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import calc_graph
+from cal_xml import parse_calculation_arcs
+
+BASE = "https://www.sec.gov/Archives/edgar/data/320193/000032019324000123"
+
+CAL_XML = b"""<?xml version="1.0" encoding="utf-8"?>
+<link:linkbase xmlns:link="http://www.xbrl.org/2003/linkbase" xmlns:xlink="http://www.w3.org/1999/xlink">
+  <link:calculationLink xlink:role="http://apple.com/role/CONSOLIDATEDBALANCESHEETS" xlink:type="extended">
+    <link:loc xlink:type="locator" xlink:href="aapl.xsd#us-gaap_Assets" xlink:label="loc_us-gaap_Assets_1"/>
+    <link:loc xlink:type="locator" xlink:href="aapl.xsd#us-gaap_AssetsCurrent" xlink:label="loc_us-gaap_AssetsCurrent_2"/>
+    <link:loc xlink:type="locator" xlink:href="aapl.xsd#us-gaap_AssetsNoncurrent" xlink:label="loc_us-gaap_AssetsNoncurrent_3"/>
+    <link:loc xlink:type="locator" xlink:href="aapl.xsd#us-gaap_Cash" xlink:label="loc_us-gaap_Cash_4"/>
+    <link:calculationArc xlink:type="arc" xlink:from="loc_us-gaap_Assets_1" xlink:to="loc_us-gaap_AssetsCurrent_2" weight="1"/>
+    <link:calculationArc xlink:type="arc" xlink:from="loc_us-gaap_Assets_1" xlink:to="loc_us-gaap_AssetsNoncurrent_3" weight="1"/>
+    <link:calculationArc xlink:type="arc" xlink:from="loc_us-gaap_AssetsCurrent_2" xlink:to="loc_us-gaap_Cash_4" weight="-1"/>
+  </link:calculationLink>
+</link:linkbase>
+"""
+
+
+def _response(url, content, status=200):
+    response = requests.Response()
+    response.status_code = status
+    response._content = content
+    response.url = url
+    return response
+
+
+class _FakeClient:
+    def __init__(self, pages):
+        self.pages = pages
+        self.requested = []
+
+    def get(self, url, **kwargs):
+        self.requested.append(url)
+        if url in self.pages:
+            return _response(url, self.pages[url])
+        return _response(url, b"not found", status=404)
+
+
+def _install(monkeypatch, pages):
+    client = _FakeClient(pages)
+    monkeypatch.setattr(calc_graph, "get_edgar_client", lambda: client)
+    monkeypatch.setattr("cal_xml.get_edgar_client", lambda: client)
+    return client
+
+
+GRAPH = {
+    "us-gaap_Assets": [{"fact": "us-gaap_AssetsCurrent", "weight": "1"},
+                       {"fact": "us-gaap_AssetsNoncurrent", "weight": "1"}],
+    "us-gaap_AssetsCurrent": [{"fact": "us-gaap_Cash", "weight": "-1.0"}],
+    "us-gaap_Liabilities": [],
+}
+
+
+def test_encoding_round_trip():
+    """The compact form decodes to the same graph, in the same order."""
+    graph = GRAPH
+    payload = calc_graph.encode_graph(graph)
+    assert payload["facts"][:2] == ["us-gaap_Assets", "us-gaap_AssetsCurrent"]
+    decoded = calc_graph.decode_graph(json.loads(json.dumps(payload)))
+    assert decoded == graph
+    assert list(decoded) == list(graph)
+    print("✅ PASSED: compact graph round trip")
+
+
+def test_discovery_via_index_json_and_store(tmp_path, monkeypatch):
+    """index.json finds the linkbase; the second load comes from the store."""
+    monkeypatch.setattr(calc_graph, "CALC_GRAPH_DIR", tmp_path)
+    index = {"directory": {"item": [{"name": "R2.htm"}, {"name": "aapl-20240928_cal.xml"}]}}
+    client = _install(monkeypatch, {
+        f"{BASE}/index.json": json.dumps(index).encode(),
+        f"{BASE}/aapl-20240928_cal.xml": CAL_XML,
+    })
+
+    graph = calc_graph.load_calculation_graph("320193", "0000320193-24-000123")
+    assert graph == parse_calculation_arcs(CAL_XML)
+    assert BASE not in client.requested  # no HTML directory listing
+    assert calc_graph.graph_path("320193", "000032019324000123").exists()
+
+    client.requested.clear()
+    assert calc_graph.load_calculation_graph("320193", "000032019324000123") == graph
+    assert client.requested == []
+    print("✅ PASSED: index.json discovery + persisted graph")
+
+
+def test_directory_listing_fallback_and_missing(tmp_path, monkeypatch):
+    """Without index.json the HTML listing is used; no linkbase -> ValueError."""
+    monkeypatch.setattr(calc_graph, "CALC_GRAPH_DIR", tmp_path)
+    listing = b'<html><a href="/Archives/edgar/data/320193/000032019324000123/aapl_cal.xml">x</a></html>'
+    _install(monkeypatch, {BASE: listing, f"{BASE}/aapl_cal.xml": CAL_XML})
+    assert calc_graph.find_cal_xml_url(BASE) == f"{BASE}/aapl_cal.xml"
+
+    _install(monkeypatch, {BASE: b"<html></html>"})
+    try:
+        calc_graph.load_calculation_graph("320193", "000032019324000123")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    print("✅ PASSED: directory listing fallback")
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Tests for the persistent HybridMatcher candidate memo.
+
+Checks that memoised candidates are identical to freshly matched ones,
+survive a new process (new CandidateMemo on the same file) and are dropped
+when the statement_maps version changes.
+"""
+
+import sys
+import shutil
+import tempfile
+from pathlib import Path
+
+# Add the scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from statement_maps import IncomeStatementMap, BalanceSheetMap, CashFlowMap
+from statement_parser import parse_statement_lxml
+from hybrid_matcher import HybridMatcher
+import candidate_memo
+from candidate_memo import CandidateMemo, statement_key, statement_maps_version, VERSIONED_SOURCES
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "r_files"
+
+ROWS = [
+    ("us-gaap_Revenues", "Total revenues"),
+    ("us-gaap_NetIncomeLoss", "Net income"),
+    ("amzn_FulfillmentExpense", "Fulfillment"),
+    ("tsla_DepreciationAmortizationAndImpairment", "Depreciation, amortization and impairment"),
+    ("D1:us-gaap_CostOfGoodsAndServicesSold", "Services"),
+    ("Revenue::us-gaap_RevenueFromContractWithCustomerExcludingAssessedTax", "Products"),
+    ("ifrs-full_ProfitLoss", "Profit for the year"),
+]
+
+
+def _rows():
+    rows = list(ROWS)
+    for path in sorted(FIXTURES_DIR.glob("*.htm")):
+        for table in parse_statement_lxml(path.read_bytes()).tables:
+            for row in table.rows:
+                rows.append((row.onclick.split("defref_")[-1].split("',")[0], row.label))
+    return rows
+
+
+def _snapshot(candidates):
+    return [(c.map_fact.fact, c.pattern_type, c.priority, c.regex_score, c.context,
+             [(m.pattern_index, m.pattern, m.match_string, m.match_length) for m in c.matched_patterns])
+            for c in candidates]
+
+
+def test_memoised_candidates_identical():
+    """Memo misses, memory hits and disk hits all return the uncached candidates."""
+    rows = _rows()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "memo.sqlite"
+        for map_cls in (IncomeStatementMap, BalanceSheetMap, CashFlowMap):
+            reference = HybridMatcher(map_cls(), memo=CandidateMemo(None))
+            reference._memo = None   # always match from scratch
+            memo = CandidateMemo(path)
+            matcher = HybridMatcher(map_cls(), memo=memo)
+            for tag, label in rows:
+                expected = _snapshot(reference.find_candidates(tag, None, label))
+                assert _snapshot(matcher.find_candidates(tag, None, label)) == expected, tag
+                assert _snapshot(matcher.find_candidates(tag, None, label)) == expected, tag
+            memo.flush()
+            assert memo.hits >= len(rows) and memo.misses <= len(rows)
+
+            reopened = CandidateMemo(path)
+            matcher = HybridMatcher(map_cls(), memo=reopened)
+            for tag, label in rows:
+                expected = _snapshot(reference.find_candidates(tag, None, label))
+                assert _snapshot(matcher.find_candidates(tag, None, label)) == expected, tag
+            assert reopened.misses == 0 and reopened.hits == len(rows)
+    print("✅ PASSED: memoised candidates identical")
+
+
+def test_candidates_are_fresh_objects():
+    """Mutating a returned candidate does not leak into later lookups."""
+    matcher = HybridMatcher(IncomeStatementMap(), memo=CandidateMemo(None))
+    first = matcher.find_candidates("us-gaap_Revenues", None, "Total revenues")
+    first[0].regex_score = -1.0
+    first[0].context["llm_reason"] = "mutated"
+    second = matcher.find_candidates("us-gaap_Revenues", None, "Total revenues")
+    assert second[0] is not first[0]
+    assert second[0].regex_score > 0 and "llm_reason" not in second[0].context
+    print("✅ PASSED: fresh candidate objects")
+
+
+def test_version_change_invalidates():
+    """Entries of another statement_maps version are dropped on open."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "memo.sqlite"
+        key = (statement_key(IncomeStatementMap()), "us-gaap_Revenues", False, "Total revenues")
+        old = CandidateMemo(path, version="old")
+        old.put(key, [["Revenue", "GAAP", 1.0, {}, []]])
+        old.flush()
+        assert CandidateMemo(path, version="old").get(key) is not None
+        assert CandidateMemo(path, version="new").get(key) is None
+        assert CandidateMemo(path, version="old").get(key) is None
+
+        changed = IncomeStatementMap()
+        next(iter(v for v in vars(changed).values() if hasattr(v, "gaap_pattern"))).gaap_pattern.append(r"Foo")
+        assert statement_key(changed) != statement_key(IncomeStatementMap())
+
+        # Editing any versioned source (e.g. the precompiled patterns) changes the version
+        sources = Path(tmp) / "scripts"
+        sources.mkdir()
+        for name in VERSIONED_SOURCES:
+            shutil.copy(candidate_memo._SCRIPT_DIR / name, sources / name)
+        script_dir, candidate_memo._SCRIPT_DIR = candidate_memo._SCRIPT_DIR, sources
+        try:
+            assert "pattern_matcher.py" in VERSIONED_SOURCES
+            before = statement_maps_version()
+            with open(sources / "pattern_matcher.py", "a") as f:
+                f.write("\n# prefilter change\n")
+            assert statement_maps_version() != before
+        finally:
+            candidate_memo._SCRIPT_DIR = script_dir
+    print("✅ PASSED: version invalidation")
+
+
+if __name__ == "__main__":
+    test_memoised_candidates_identical()
+    test_candidates_are_fresh_objects()
+    test_version_change_invalidates()
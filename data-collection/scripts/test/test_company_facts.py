@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Tests for the indexed company facts table.
+
+Runs offline on a synthetic companyfacts payload and checks that indexed
+lookups return the same rows as the DataFrame masks they replace.
+"""
+
+import io
+import sys
+from pathlib import Path
+
+# Add the scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from company_facts import CompanyFactsTable
+from companyfacts_store import ingest_company_facts, save_fact_columns, load_fact_columns
+from unit_detector import UnitDetector
+
+
+def _item(val, start, end, accn="0000320193-24-000001", form="10-Q"):
+    return {"val": val, "start": start, "end": end, "accn": accn, "fy": 2024,
+            "fp": "Q3", "form": form, "filed": "2024-08-02"}
+
+
+COMPANY_FACTS = {
+    "facts": {
+        "us-gaap": {
+            "Revenues": {
+                "label": "Revenues",
+                "units": {"USD": [
+                    _item(300, "2023-10-01", "2024-06-29"),   # 9 months
+                    _item(100, "2024-03-31", "2024-06-29"),   # 3 months
+                    _item(200, "2023-12-31", "2024-06-29"),   # 6 months
+                    _item(100, "2024-03-31", "2024-06-29"),   # duplicate, dropped
+                    _item(400, "2023-10-01", "2024-09-28", form="10-K"),
+                ]},
+            },
+            "CommonStockSharesOutstanding": {
+                "label": "Shares outstanding",
+                "units": {"shares": [
+                    {"val": 15, "end": "2024-06-29", "accn": "x", "form": "10-Q"},
+                ]},
+            },
+        }
+    }
+}
+
+
+def _mask(df, fact, end):
+    return df[(df["fact"] == fact) & (df["end"] == end)]
+
+
+def test_lookup_matches_boolean_mask():
+    """first_value/lookup agree with the masks used before."""
+    table = CompanyFactsTable.from_company_facts(COMPANY_FACTS)
+    assert table.taxonomy == "us-gaap"
+    assert table.labels["Revenues"] == "Revenues"
+    assert len(table.df) == 5
+    assert isinstance(table.df["fact"].dtype, pd.CategoricalDtype)
+    for fact, end in [("Revenues", "2024-06-29"), ("Revenues", "2024-09-28 00:00:00"),
+                      ("Revenues", "2020-01-01"), ("Missing", "2024-06-29"),
+                      ("CommonStockSharesOutstanding", "2024-06-29")]:
+        expected = _mask(table.df, fact, end.split(" ")[0])
+        assert table.lookup(fact, end).index.tolist() == expected.index.tolist()
+        first = expected.iloc[0]["val"] if not expected.empty else None
+        assert table.first_value(fact, end) == first
+    print("✅ PASSED: indexed lookup == boolean mask")
+
+
+def test_quarterly_period_selection():
+    """Quarterly verification picks the 3-month row like the DataFrame path."""
+    table = CompanyFactsTable.from_company_facts(COMPANY_FACTS)
+    for quarterly in (False, True):
+        indexed = UnitDetector.get_company_fact_for_period(table, "Revenues", "2024-06-29", quarterly)
+        legacy = UnitDetector.get_company_fact_for_period(table.df, "Revenues", "2024-06-29", quarterly)
+        assert indexed["val"] == legacy["val"]
+    assert table.fact_for_period("Revenues", "2024-06-29", True)["val"] == 100
+    assert table.fact_for_period("Revenues", "2024-06-29", False)["val"] == 300
+    # Instant facts have no start date
+    assert table.fact_for_period("CommonStockSharesOutstanding", "2024-06-29", True)["val"] == 15
+    print("✅ PASSED: quarterly period selection")
+
+
+def test_columnar_store_round_trip(tmp_path):
+    """Streamed columns survive save/mmap-load and build the same table."""
+    columns = ingest_company_facts(json.dumps(COMPANY_FACTS).encode())
+    assert len(columns) == 6
+    assert columns.strings["fact"] == ["Revenues", "CommonStockSharesOutstanding"]
+    assert columns.columns["fact"].dtype == np.int32
+
+    save_fact_columns(columns, tmp_path / "CIK0000320193")
+    loaded = load_fact_columns(tmp_path / "CIK0000320193")
+    assert isinstance(loaded.columns["val"], np.memmap)
+    assert load_fact_columns(tmp_path / "CIK0000320193", max_age_hours=0) is None
+
+    from_store = CompanyFactsTable.from_columns(loaded)
+    from_json = CompanyFactsTable.from_company_facts(COMPANY_FACTS)
+    assert from_store.labels == from_json.labels
+    assert from_store.taxonomy == from_json.taxonomy
+    cols = ["fact", "unit", "end", "start", "period_days", "form", "accn"]
+    left = from_store.df[cols].astype(str).reset_index(drop=True)
+    right = from_json.df[cols].astype(str).reset_index(drop=True)
+    assert left.equals(right)
+    assert (from_store.df["val"].to_numpy() == from_json.df["val"].to_numpy()).all()
+    assert from_store.fact_for_period("Revenues", "2024-06-29", True)["val"] == 100
+    print("✅ PASSED: columnar store round trip")
+
+
+class _ChunkedStream(io.RawIOBase):
+    """Binary stream handing out at most 7 bytes per read, like a slow socket."""
+
+    def __init__(self, data: bytes):
+        self.data = io.BytesIO(data)
+        self.reads = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        self.reads += 1
+        return self.data.read(min(size, 7) if size and size > 0 else 7)
+
+
+def test_streamed_ingest_single_pass():
+    """A chunked stream is read once; IFRS is used only when there are no GAAP facts."""
+    payload = json.dumps(COMPANY_FACTS).encode()
+    stream = _ChunkedStream(payload)
+    columns = ingest_company_facts(stream)
+    assert columns.taxonomy == "us-gaap" and len(columns) == 6
+    assert stream.reads == -(-len(payload) // 7) + 1     # every byte once, then EOF
+
+    ifrs = {"facts": {"dei": {}, "ifrs-full": {"Revenue": COMPANY_FACTS["facts"]["us-gaap"]["Revenues"]}}}
+    columns = ingest_company_facts(_ChunkedStream(json.dumps(ifrs).encode()))
+    assert columns.taxonomy == "ifrs-full" and columns.strings["fact"] == ["Revenue"]
+
+    both = {"facts": {"ifrs-full": ifrs["facts"]["ifrs-full"], **COMPANY_FACTS["facts"]}}
+    assert ingest_company_facts(json.dumps(both).encode()).taxonomy == "us-gaap"
+    try:
+        ingest_company_facts(b'{"facts": {"dei": {}}}')
+        assert False, "expected KeyError"
+    except KeyError:
+        pass
+    print("✅ PASSED: streamed single-pass ingest")
+
+
+if __name__ == "__main__":
+    import tempfile
+    test_lookup_matches_boolean_mask()
+    test_quarterly_period_selection()
+    test_streamed_ingest_single_pass()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_columnar_store_round_trip(Path(tmp))
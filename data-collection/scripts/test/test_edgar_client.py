@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared EDGAR client (rate limiting, retries, metrics).
+
+Runs fully offline: the requests.Session is replaced by a stub.
+"""
+
+import sys
+import time
+import logging
+from pathlib import Path
+
+# Add the scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import requests
+
+from edgar_client import EdgarClient, TokenBucket, endpoint_name
+from archive_cache import ArchiveCache, OfflineCacheMiss, is_archive_url
+from http_cassette import CassetteMiss
+
+logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class _StubSession:
+    """Minimal stand-in for requests.Session returning canned responses."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+        self.headers = {}
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        status, headers, *body = self.responses.pop(0)
+        resp = requests.Response()
+        resp.status_code = status
+        resp.headers.update(headers)
+        resp._content = body[0] if body else b"{}"
+        resp.url = url
+        return resp
+
+
+def _client(responses, tmp_path):
+    client = EdgarClient(rate_limiter=TokenBucket(rate=1000, state_file=tmp_path / "bucket.state"))
+    client.archive_cache = ArchiveCache(tmp_path / "archive")
+    client.session = _StubSession(responses)
+    return client
+
+
+def test_endpoint_classification():
+    """URLs are bucketed into stable endpoint names."""
+    base = "https://www.sec.gov/Archives/edgar/data/320193/000032019324000123"
+    assert endpoint_name("https://data.sec.gov/submissions/CIK0000320193.json") == "submissions"
+    assert endpoint_name("https://data.sec.gov/api/xbrl/companyfacts/CIK0000320193.json") == "companyfacts"
+    assert endpoint_name("https://www.sec.gov/files/company_tickers.json") == "company_tickers"
+    assert endpoint_name(f"{base}/FilingSummary.xml") == "archives_filing_summary"
+    assert endpoint_name(f"{base}/aapl-20240928_cal.xml") == "archives_cal_xml"
+    assert endpoint_name(f"{base}/R4.htm") == "archives_statement"
+    assert endpoint_name(base) == "archives_index"
+    print("✅ PASSED: endpoint classification")
+
+
+def test_token_bucket_limits_rate(tmp_path):
+    """A 20 req/s bucket with burst 1 needs ~0.45s for 10 tokens."""
+    bucket = TokenBucket(rate=20, capacity=1, state_file=tmp_path / "bucket.state")
+    start = time.perf_counter()
+    for _ in range(10):
+        bucket.acquire()
+    elapsed = time.perf_counter() - start
+    assert elapsed >= 0.4, f"bucket too permissive: {elapsed:.3f}s"
+    print(f"✅ PASSED: 10 tokens took {elapsed:.2f}s")
+
+
+def test_token_bucket_shared_state(tmp_path):
+    """Two buckets on the same state file draw from the same pool."""
+    state = tmp_path / "shared.state"
+    a = TokenBucket(rate=5, capacity=2, state_file=state)
+    b = TokenBucket(rate=5, capacity=2, state_file=state)
+    assert a.acquire() == 0
+    assert b.acquire() == 0
+    # Pool of 2 is now empty for both instances
+    assert a.acquire() > 0
+    print("✅ PASSED: shared token bucket state")
+
+
+def test_retry_after_honoured(tmp_path):
+    """429 with Retry-After is retried, then the 200 is returned."""
+    client = _client([(429, {"Retry-After": "0"}), (200, {})], tmp_path)
+    resp = client.get("https://data.sec.gov/submissions/CIK0000320193.json")
+    assert resp.status_code == 200
+    assert client.session.calls == 2
+    metrics = client.get_metrics()["submissions"]
+    assert metrics["requests"] == 2
+    assert metrics["errors"] == 1
+    assert metrics["retries"] == 1
+    print("✅ PASSED: Retry-After handling and metrics")
+
+
+def test_gives_up_after_max_retries(tmp_path):
+    """Persistent 503s return the last response after max_retries."""
+    client = _client([(503, {"Retry-After": "0"})] * 3, tmp_path)
+    client.max_retries = 2
+    resp = client.get("https://www.sec.gov/files/company_tickers.json")
+    assert resp.status_code == 503
+    assert client.session.calls == 3
+    print("✅ PASSED: retries are bounded")
+
+
+ARCHIVE_URL = "https://www.sec.gov/Archives/edgar/data/320193/000032019324000123/R2.htm"
+
+
+def test_archive_url_detection():
+    """Only documents inside an accession folder are treated as immutable."""
+    assert is_archive_url(ARCHIVE_URL)
+    assert is_archive_url("https://www.sec.gov/Archives/edgar/data/320193/000032019324000123")
+    assert not is_archive_url("https://www.sec.gov/Archives/edgar/data/320193/")
+    assert not is_archive_url("https://data.sec.gov/submissions/CIK0000320193.json")
+    print("✅ PASSED: archive URL detection")
+
+
+def test_archive_cache_serves_repeat_requests(tmp_path):
+    """Second GET of an archive document is served from disk."""
+    client = _client([(200, {"Content-Type": "text/html"})], tmp_path)
+    first = client.get(ARCHIVE_URL)
+    second = client.get(ARCHIVE_URL)
+    assert first.content == second.content
+    assert client.session.calls == 1
+    assert client.get_metrics()["archives_statement"]["cache_hits"] == 1
+    print("✅ PASSED: archive cache hit")
+
+
+def test_archive_cache_is_content_addressed(tmp_path):
+    """Identical content under two URLs is stored once."""
+    cache = ArchiveCache(tmp_path / "archive")
+    cache.put(ARCHIVE_URL, b"<html>same</html>")
+    cache.put(ARCHIVE_URL.replace("R2", "R3"), b"<html>same</html>")
+    objects = list((tmp_path / "archive" / "objects").rglob("*.zz"))
+    assert len(objects) == 1
+    assert cache.get(ARCHIVE_URL.replace("R2", "R3"))[0] == b"<html>same</html>"
+    print("✅ PASSED: content-addressed storage")
+
+
+def test_mutable_endpoints_replayed_only_offline(tmp_path, monkeypatch):
+    """Submissions are refetched online but replayed from disk offline."""
+    url = "https://data.sec.gov/submissions/CIK0000320193.json"
+    client = _client([(200, {}, b'{"v": 1}'), (200, {}, b'{"v": 2}')], tmp_path)
+    client.get(url)
+    client.get(url)
+    assert client.session.calls == 2
+    monkeypatch.setenv("EDGAR_OFFLINE", "1")
+    assert client.get(url).content == b'{"v": 2}'
+    assert client.session.calls == 2
+    # Only the latest copy is kept, outside the content-addressed store
+    assert not (tmp_path / "archive" / "objects").exists()
+    assert len(list((tmp_path / "archive" / "latest").rglob("*.zz"))) == 1
+    print("✅ PASSED: mutable endpoints replayed offline")
+
+
+def test_cache_keyed_by_query_string(tmp_path, monkeypatch):
+    """Requests differing only in their params are cached and replayed separately."""
+    search = "https://www.sec.gov/cgi-bin/browse-edgar"
+    client = _client([(200, {}, b"berkshire"), (200, {}, b"apple")], tmp_path)
+    client.get(search, params={"company": "berkshire", "type": "13F-HR"})
+    client.get(search, params={"company": "apple", "type": "13F-HR"})
+    monkeypatch.setenv("EDGAR_OFFLINE", "1")
+    assert client.get(search, params={"company": "berkshire", "type": "13F-HR"}).content == b"berkshire"
+    assert client.get(search, params={"company": "apple", "type": "13F-HR"}).content == b"apple"
+    try:
+        client.get(search)
+        assert False, "expected OfflineCacheMiss"
+    except OfflineCacheMiss:
+        pass
+    assert client.session.calls == 2
+    print("✅ PASSED: cache keyed by query string")
+
+
+def test_streamed_responses_not_cached(tmp_path):
+    """stream=True GETs are left to the caller; cached documents still expose response.raw."""
+    facts = "https://data.sec.gov/api/xbrl/companyfacts/CIK0000320193.json"
+    client = _client([(200, {"Content-Length": "2"})], tmp_path)
+    assert client.get(facts, stream=True).status_code == 200
+    assert not (tmp_path / "archive").exists()
+    assert client.get_metrics()["companyfacts"]["bytes"] == 2
+
+    client.archive_cache.put(ARCHIVE_URL, b"cached", "text/html")
+    assert client.get(ARCHIVE_URL, stream=True).raw.read() == b"cached"
+    print("✅ PASSED: streamed responses")
+
+
+def test_offline_mode_never_hits_network(tmp_path, monkeypatch):
+    """Offline mode serves cached documents and raises on misses."""
+    client = _client([], tmp_path)
+    client.archive_cache.put(ARCHIVE_URL, b"cached", "text/html")
+    monkeypatch.setenv("EDGAR_OFFLINE", "1")
+    assert client.get(ARCHIVE_URL).content == b"cached"
+    try:
+        client.get(ARCHIVE_URL.replace("R2", "R9"))
+        assert False, "expected OfflineCacheMiss"
+    except OfflineCacheMiss:
+        pass
+    assert client.session.calls == 0
+    print("✅ PASSED: offline mode")
+
+
+
+def test_cassette_record_then_replay(tmp_path, monkeypatch):
+    """Recorded exchanges (errors and query strings included) replay without network."""
+    search = "https://www.sec.gov/cgi-bin/browse-edgar"
+    missing = ARCHIVE_URL.replace("R2", "R9")
+    client = _client([(200, {"Content-Type": "application/json"}), (404, {}), (200, {})], tmp_path)
+    monkeypatch.setenv("EDGAR_CASSETTE_DIR", str(tmp_path / "cassette"))
+    monkeypatch.setenv("EDGAR_CASSETTE_MODE", "record")
+    client.get("https://data.sec.gov/submissions/CIK0000320193.json")
+    client.get(missing)
+    client.get(search, params={"company": "berkshire", "type": "13F-HR"})
+    assert client.session.calls == 3
+
+    monkeypatch.setenv("EDGAR_CASSETTE_MODE", "replay")
+    replay = _client([], tmp_path)
+    resp = replay.get("https://data.sec.gov/submissions/CIK0000320193.json")
+    assert resp.status_code == 200 and resp.json() == {}
+    assert resp.headers["Content-Type"] == "application/json"
+    assert replay.get(missing).status_code == 404
+    assert replay.get(search, params={"company": "berkshire", "type": "13F-HR"}).status_code == 200
+    try:
+        replay.get(search, params={"company": "apple", "type": "13F-HR"})
+        assert False, "expected CassetteMiss"
+    except CassetteMiss:
+        pass
+    assert replay.session.calls == 0
+    print("✅ PASSED: cassette record/replay")
+
+
+if __name__ == "__main__":
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+        test_endpoint_classification()
+        test_token_bucket_limits_rate(tmp_path)
+        test_token_bucket_shared_state(tmp_path)
+        test_retry_after_honoured(tmp_path)
+        test_gives_up_after_max_retries(tmp_path)
+        test_archive_url_detection()
+        test_archive_cache_serves_repeat_requests(tmp_path)
+        test_archive_cache_is_content_addressed(tmp_path)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Tests for the historical fact cube and the cross-year checks built on it.
+
+Checks that TemporalValidator and FinancialStatement._compare_with_historical
+give exactly the results of the previous per-filing / per-column loops
+(reproduced below), and that the cube follows the historical dict
+incrementally and lets go of it once released.
+"""
+
+import gc
+import sys
+import random
+import weakref
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add the scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import fact_cube
+from fact_cube import HistoricalFactCube, get_fact_cube, fact_cubes_released
+from temporal_validator import TemporalValidator
+from FinancialStatement import FinancialStatement
+
+FACTS = ["Total revenue", "COGS", "Gross profit", "Operating income", "Net income", "Total Assets"]
+
+
+def reference_temporal(historical, fact_name, row_data, tolerance=0.10):
+    """The per-filing loop TemporalValidator.validate_candidate used to run."""
+    total = matched = 0
+    score = 0.0
+    matches = []
+    for hist_year, hist_df in historical.items():
+        if fact_name not in hist_df.index:
+            continue
+        hist_row = hist_df.loc[fact_name]
+        for col in [c for c in row_data.index if c in hist_row.index]:
+            curr_val, hist_val = row_data[col], hist_row[col]
+            if pd.isna(curr_val) or pd.isna(hist_val):
+                continue
+            total += 1
+            if (curr_val == 0 and hist_val == 0) or hist_val == 0:
+                continue
+            if curr_val == 0:
+                matches.append((str(col), str(hist_year), 1.0, False))
+                score += TemporalValidator.ZERO_VS_NONZERO_PENALTY
+                continue
+            pct = abs(curr_val - hist_val) / ((abs(curr_val) + abs(hist_val)) / 2)
+            is_match = pct <= tolerance
+            matches.append((str(col), str(hist_year), pct, is_match))
+            if is_match:
+                matched += 1
+                score += TemporalValidator.PER_YEAR_MATCH_BONUS
+            else:
+                score += TemporalValidator.MISMATCH_PENALTY
+    if total > 0 and matched == total:
+        score += TemporalValidator.ALL_YEARS_MATCH_BONUS
+    return total, matched, score, matches
+
+
+def reference_historical(historical, fact_name, current_row, tolerance=0.10):
+    """The per-filing loop FinancialStatement._compare_with_historical used to run."""
+    matched_years, total = [], 0
+    for hist_year, hist_df in historical.items():
+        if fact_name not in hist_df.index:
+            continue
+        hist_row = hist_df.loc[fact_name]
+        for col in [c for c in current_row.index if c in hist_row.index]:
+            curr_val, hist_val = current_row[col], hist_row[col]
+            if pd.isna(curr_val) or pd.isna(hist_val):
+                continue
+            total += 1
+            if curr_val == 0 or hist_val == 0:
+                continue
+            if abs(curr_val - hist_val) / ((abs(curr_val) + abs(hist_val)) / 2) <= tolerance:
+                matched_years.append((hist_year, col))
+    return {'matched': True, 'matched_years': matched_years, 'total_comparisons': total} if matched_years else None
+
+
+def _value(rng, base):
+    roll = rng.random()
+    if roll < 0.15:
+        return 0.0
+    if roll < 0.2:
+        return np.nan
+    return round(base * rng.uniform(0.85, 1.15), 2)
+
+
+def _history(rng, n_filings):
+    historical = {}
+    for i in range(n_filings):
+        year = 2015 + i
+        columns = [str(year - k) for k in range(3)]
+        facts = [f for f in FACTS if rng.random() < 0.85]
+        historical[str(year)] = pd.DataFrame(
+            [[_value(rng, 1000.0 * (FACTS.index(f) + 1)) for _ in columns] for f in facts],
+            index=facts, columns=columns,
+        )
+    return historical
+
+
+def test_temporal_validator_identical_to_loops():
+    """Scores, counts and comparison details match the per-filing loops."""
+    rng = random.Random(3)
+    for trial in range(40):
+        historical = _history(rng, rng.randint(1, 8))
+        validator = TemporalValidator(historical, tolerance=0.10)
+        year = 2015 + len(historical)
+        columns = [str(year - k) for k in range(3)]
+        for fact in FACTS + ["Unknown fact"]:
+            row = pd.Series([_value(rng, 1000.0 * (FACTS.index(fact) + 1) if fact in FACTS else 5.0)
+                             for _ in columns], index=columns)
+            result = validator.validate_candidate(fact, row)
+            total, matched, score, matches = reference_temporal(historical, fact, row)
+            assert (result.total_comparisons, result.matched_comparisons, result.score) == (total, matched, score)
+            assert [(m.year_column, m.hist_filing_year, m.pct_difference, m.matched)
+                    for m in result.matches] == matches, (trial, fact)
+    print("✅ PASSED: temporal validator parity")
+
+
+def test_compare_with_historical_identical_to_loop():
+    """_compare_with_historical matches the per-filing loop."""
+    rng = random.Random(5)
+    for trial in range(40):
+        historical = _history(rng, rng.randint(1, 8))
+        statement = FinancialStatement(pd.DataFrame(), [], {}, {}, historical_statements=historical)
+        year = 2015 + len(historical)
+        columns = [str(year - k) for k in range(3)] + ["2001"]
+        for fact in FACTS:
+            row = pd.Series([_value(rng, 1000.0 * (FACTS.index(fact) + 1)) for _ in columns], index=columns)
+            assert statement._compare_with_historical(fact, row) == reference_historical(historical, fact, row)
+    print("✅ PASSED: historical comparison parity")
+
+
+def test_cube_follows_dict_incrementally():
+    """New filings are appended as layers; replacing an entry rebuilds the cube."""
+    rng = random.Random(9)
+    source = _history(rng, 3)
+    historical = dict(list(source.items())[:1])
+    cube = get_fact_cube(historical)
+    assert cube.filings == ["2015"] and cube.values.shape[0] == 1
+
+    layer = cube.values[0].copy()
+    for key, df in list(source.items())[1:]:
+        historical[key] = df
+        assert get_fact_cube(historical) is cube
+    assert cube.filings == ["2015", "2016", "2017"]
+    first = cube.lookup(list(source["2015"].index), source["2015"].columns)[0]
+    assert np.array_equal(first, source["2015"].to_numpy(), equal_nan=True)
+    assert np.array_equal(cube.values[0][:layer.shape[0], :layer.shape[1]], layer, equal_nan=True)
+
+    replaced = source["2016"] * 2
+    historical["2016"] = replaced
+    get_fact_cube(historical)
+    assert cube.filings == ["2015", "2016", "2017"]
+    second = cube.lookup(list(replaced.index), replaced.columns)[1]
+    assert np.array_equal(second, replaced.to_numpy(), equal_nan=True)
+
+    empty = HistoricalFactCube()
+    assert empty.lookup(["Total revenue"], ["2024"]).shape == (0, 1, 1)
+    print("✅ PASSED: incremental cube")
+
+
+def test_released_cubes_free_their_frames():
+    """After fact_cubes_released() no cube keeps the dict's DataFrames alive."""
+    historical = {"income_statement": _history(random.Random(3), 2), "balance_sheet": {}}
+    frame = weakref.ref(historical["income_statement"]["2015"])
+    with fact_cubes_released(historical.values()):
+        cube = get_fact_cube(historical["income_statement"])
+        assert get_fact_cube(historical["income_statement"]) is cube
+        get_fact_cube(historical["balance_sheet"])
+    assert not any(c.source is h for c in fact_cube._cubes.values() for h in historical.values())
+
+    del cube, historical
+    gc.collect()
+    assert frame() is None
+    print("✅ PASSED: released cubes")
+
+
+if __name__ == "__main__":
+    test_temporal_validator_identical_to_loops()
+    test_compare_with_historical_identical_to_loop()
+    test_cube_follows_dict_incrementally()
+    test_released_cubes_free_their_frames()
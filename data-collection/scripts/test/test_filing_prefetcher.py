@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for the filing prefetcher (ordering, bounded lookahead, error passing).
+
+Runs offline with fake filings that sleep instead of downloading.
+"""
+
+import sys
+import time
+import threading
+from pathlib import Path
+
+# Add the scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from filing_prefetcher import FilingPrefetcher
+
+
+class _FakeFiling:
+    def __init__(self, name):
+        self.name = name
+        self.prefetched = None
+
+    def prefetch_statement_documents(self, statement_names):
+        self.prefetched = list(statement_names)
+
+
+def test_yields_in_input_order_with_bounded_lookahead():
+    """Slow early filings still come out first; at most depth+1 are in flight."""
+    started = []
+    lock = threading.Lock()
+
+    def build(item):
+        with lock:
+            started.append(item)
+        time.sleep(0.05 if item == 0 else 0.01)
+        return _FakeFiling(item)
+
+    order = []
+    with FilingPrefetcher(build, range(8), ["income_statement"], depth=2, workers=4) as prefetcher:
+        for item, filing in prefetcher:
+            # Consumer is on `item`; only item+1..item+2 may have been started
+            assert max(started) <= item + 2
+            assert filing.prefetched == ["income_statement"]
+            order.append(item)
+    assert order == list(range(8))
+    print("✅ PASSED: ordered, bounded prefetch")
+
+
+def test_errors_are_yielded_not_raised():
+    """A failing filing is reported in place and later filings still arrive."""
+    def build(item):
+        if item == 1:
+            raise ValueError("no FilingSummary")
+        return _FakeFiling(item)
+
+    with FilingPrefetcher(build, range(3), [], depth=2) as prefetcher:
+        results = list(prefetcher)
+    assert [item for item, _ in results] == [0, 1, 2]
+    assert isinstance(results[1][1], ValueError)
+    assert isinstance(results[2][1], _FakeFiling)
+    print("✅ PASSED: errors passed to consumer")
+
+
+if __name__ == "__main__":
+    test_yields_in_input_order_with_bounded_lookahead()
+    test_errors_are_yielded_not_raised()
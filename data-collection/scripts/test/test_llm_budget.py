@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-filing LLM budget (llm_budget.py).
+
+Runs offline: the pipeline's agent is a fake that charges the budget
+instead of calling Ollama, and the enhanced parser is only scheduled.
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Add the scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import store_isolation  # noqa: F401  (before the modules opening the stores)
+
+from llm_budget import LLMBudget, FilingLLMBudget
+from hybrid_matcher import MatchCandidate
+from statement_maps import IncomeStatementMap, MapFact
+from pipeline import ParsingPipeline, PipelineConfig
+from agents.llm_agents import AgentDecision
+from enhanced_agentic_parser import EnhancedAgenticParser, ConfusableGroup
+
+
+def test_plan_ranks_by_value_within_budget():
+    """The most valuable decisions that fit are granted; worthless ones never are."""
+    budget = LLMBudget(max_calls=3)
+    granted = budget.plan([("a", 0.2, 1.0), ("b", 0.9, 2.0), ("c", 0.5, 1.5), ("d", 0.0, 0.5), ("e", 0.2, 1.0)])
+    assert granted == {"b", "a"}   # c does not fit after b, a wins the tie with e by input order
+
+    assert LLMBudget().plan([("a", 0.1, 100.0)]) == {"a"}   # unlimited
+
+    # Seconds: the measured mean call time is the cost model
+    budget = LLMBudget(max_seconds=30)
+    budget.charge(10.0)
+    budget.charge(0.0, cached=True)
+    assert budget.call_seconds() == 10.0
+    assert budget.affordable_calls() == 2.0
+    assert budget.can_afford(2) and not budget.can_afford(2.5)
+    print("✅ PASSED: decisions granted by expected value")
+
+
+def test_filing_budget_split_and_report():
+    """Calls are split evenly between statements and the report shows how they were spent."""
+    budget = FilingLLMBudget("2024-09-28", ["income_statement", "balance_sheet", "cash_flow_statement"],
+                             max_calls=10, max_seconds=90)
+    shares = [budget.for_statement(name) for name in budget.statements]
+    assert [b.max_calls for b in shares] == [4, 3, 3]
+    assert all(b.max_seconds == 30 for b in shares)
+    assert not budget.used
+
+    income = budget.for_statement("income_statement")
+    income.charge(4.0)
+    income.charge(0.0, cached=True)
+    income.record("tie_break", "us-gaap_Revenues", 0.8, True)
+    income.record("tie_break", "us-gaap_OtherIncome", 0.1, False, "not within budget")
+    report = budget.report()
+    assert (report["calls"], report["cached"], report["seconds"]) == (1, 1, 4.0)
+    statement = report["statements"]["income_statement"]
+    assert statement["decisions"] == {"tie_break": {"llm": 1, "deterministic": 1}}
+    assert [d["key"] for d in statement["deterministic"]] == ["us-gaap_OtherIncome"]
+    assert budget.used and "income_statement: 1 calls (1 cached), 1 deterministic" in budget.summary()
+    print("✅ PASSED: filing budget split and report")
+
+
+class FakeAgent:
+    """Resolves every tie-break to the runner-up (or the only candidate), charging one call."""
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.resolved = []
+
+    def resolve_ambiguous_match(self, row_idx, human_label, candidates, **kwargs):
+        self.resolved.append(row_idx)
+        self.budget.charge(1.0)
+        return AgentDecision(agent_name="Fake", selected_fact=candidates[min(1, len(candidates) - 1)].map_fact.fact,
+                             confidence=0.9, reasoning="test")
+
+
+def _candidate(fact, regex_score, temporal_score=0.0):
+    return MatchCandidate(map_fact=MapFact(fact), pattern_type="GAAP", matched_patterns=[],
+                          regex_score=regex_score, temporal_score=temporal_score)
+
+
+def test_pipeline_tie_breaks_follow_expected_value():
+    """Only the most valuable tie-break fits; the others keep the best-scored candidate."""
+    rows = ["us-gaap_RowA", "us-gaap_RowB", "us-gaap_RowC"]
+    og_df = pd.DataFrame({"2024": [1.0, 2.0, 3.0]}, index=rows)
+    budget = LLMBudget(max_calls=2)
+    pipeline = ParsingPipeline(IncomeStatementMap(), og_df, {r: r for r in rows}, [],
+                               config=PipelineConfig(temporal_enabled=False, summation_enabled=False),
+                               llm_budget=budget)
+    pipeline.memory = None
+    agent = FakeAgent(budget)
+    pipeline._agent_orchestrator = agent
+
+    candidates = {
+        # gap 10: value 1/3
+        "us-gaap_RowA": [_candidate("Total revenue", 60), _candidate("COGS", 50)],
+        # gap 2: value 13/15, but temporal evidence singles out the best one -> halved
+        "us-gaap_RowB": [_candidate("Gross profit", 40, temporal_score=20), _candidate("Operating income", 58)],
+        # gap 4: value 11/15, the most valuable
+        "us-gaap_RowC": [_candidate("Net income", 50), _candidate("Interest expense", 46)],
+    }
+    state = pipeline._create_mapped_state()
+    mappings = {m.row_idx: m for m in pipeline._select_best_mappings(candidates, state)}
+
+    assert agent.resolved == ["us-gaap_RowC"]
+    assert mappings["us-gaap_RowC"].fact_name == "Interest expense" and mappings["us-gaap_RowC"].used_llm
+    assert mappings["us-gaap_RowA"].fact_name == "Total revenue" and not mappings["us-gaap_RowA"].used_llm
+    assert mappings["us-gaap_RowB"].fact_name == "Gross profit"
+    report = budget.report()
+    assert report["decisions"]["tie_break"] == {"llm": 1, "deterministic": 2}
+    print("✅ PASSED: pipeline tie-breaks gated by the budget")
+
+
+def test_tie_break_appearing_after_an_earlier_row():
+    """A tie-break that only appears once a higher row takes a fact uses what the plan leaves."""
+    rows = ["a", "b", "c"]
+    og_df = pd.DataFrame({"2024": [1.0, 2.0, 3.0]}, index=rows)
+
+    def select(budget):
+        candidates = {
+            # No tie-break until b takes Total revenue: then only COGS (20, low confidence) is left
+            "a": [_candidate("Total revenue", 50), _candidate("COGS", 20)],
+            "b": [_candidate("Total revenue", 60)],
+            # gap 4: planned up front
+            "c": [_candidate("Net income", 45), _candidate("Interest expense", 41)],
+        }
+        pipeline = ParsingPipeline(IncomeStatementMap(), og_df, {r: r for r in rows}, [],
+                                   config=PipelineConfig(temporal_enabled=False, summation_enabled=False),
+                                   llm_budget=budget)
+        pipeline.memory = None
+        pipeline._agent_orchestrator = FakeAgent(budget)
+        pipeline._select_best_mappings(candidates, pipeline._create_mapped_state())
+        return pipeline._agent_orchestrator.resolved
+
+    # Unlimited budget: the same tie-breaks as without one
+    unlimited = LLMBudget(0, 0)
+    assert select(unlimited) == ["a", "c"]
+    assert all(d["granted"] for d in unlimited.decisions)
+
+    # Room for one tie-break (1.5 calls): it stays reserved for the planned row c
+    limited = LLMBudget(max_calls=2)
+    assert select(limited) == ["c"]
+    denied, = [d for d in limited.decisions if not d["granted"]]
+    assert denied["key"] == "a" and denied["reason"] == "not within budget"
+    print("✅ PASSED: unplanned tie-breaks within the budget")
+
+
+def test_enhanced_groups_outside_budget_map_deterministically():
+    """Groups beyond the budget take the deterministic mapping, without overriding others."""
+    budget = LLMBudget(max_calls=1)
+    parser = EnhancedAgenticParser(
+        llm_budget=budget,
+        deterministic_mappings=lambda: {"r3": "Net income", "r4": "Total revenue", "r5": "Not A Target"},
+    )
+    keyword = ConfusableGroup(group_id="revenue", group_type="revenue", rows=["r1", "r2"],
+                              target_items=["Total revenue"], reason="test")
+    other = ConfusableGroup(group_id="other", group_type="other", rows=["r3", "r4", "r5", "r6"],
+                            target_items=[], reason="test")
+    granted, skipped = parser._schedule_groups([other, keyword], cross_year_hints={"r6": "COGS"})
+    assert [g.group_id for g in granted] == ["revenue"]   # 2 open rows vs 3 * 0.5
+    assert [g.group_id for g in skipped] == ["other"]
+
+    mappings, confidence, reasoning = {"r1": "Total revenue"}, {"r1": 0.9}, {"r1": "LLM"}
+    mapped = parser._apply_deterministic_mappings(skipped, mappings, confidence, reasoning)
+    assert mapped == {"r3"}   # r4's fact is already mapped, r5's is not a target item
+    assert mappings["r3"] == "Net income" and confidence["r3"] == 0.5
+
+    assert EnhancedAgenticParser()._schedule_groups([other, keyword], {}) == ([other, keyword], [])
+    print("✅ PASSED: enhanced parser groups scheduled within the budget")
+
+
+if __name__ == "__main__":
+    test_plan_ranks_by_value_within_budget()
+    test_filing_budget_split_and_report()
+    test_pipeline_tie_breaks_follow_expected_value()
+    test_tie_break_appearing_after_an_earlier_row()
+    test_enhanced_groups_outside_budget_map_deterministically()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for the persistent LLM response cache.
+
+Checks hits across cache instances (new process), TTL expiry, LRU eviction,
+the bypass flag, and that the agents answer from the cache without calling
+the model.
+"""
+
+import sys
+import json
+import time
+import tempfile
+from pathlib import Path
+
+# Add the scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import store_isolation  # noqa: F401  (before the modules opening the stores)
+
+import agents.llm_cache as llm_cache
+from agents.llm_cache import LLMResponseCache
+
+SYSTEM = "You are a financial data mapper."
+USER = "Map us-gaap_Revenues to a standard item."
+
+
+def test_hits_persist_and_key_on_model_and_temperature():
+    """A stored response is found by a new cache on the same file, only for the same key."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "responses.sqlite"
+        LLMResponseCache(path).put("llama3.2", 0.1, SYSTEM, USER, '{"fact": "Total revenue"}')
+
+        cache = LLMResponseCache(path)
+        assert cache.get("llama3.2", 0.1, SYSTEM, USER) == '{"fact": "Total revenue"}'
+        assert cache.get("mistral", 0.1, SYSTEM, USER) is None
+        assert cache.get("llama3.2", 0.7, SYSTEM, USER) is None
+        assert cache.get("llama3.2", 0.1, SYSTEM, USER + " ") is None
+        # Failed calls are never cached
+        cache.put("llama3.2", 0.1, SYSTEM, "other", None)
+        assert cache.get("llama3.2", 0.1, SYSTEM, "other") is None
+
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"]) == (1, 4)
+
+        stats_file = Path(tmp) / "llm_cache_stats.jsonl"
+        cache.write_stats(stats_file)
+        record = json.loads(stats_file.read_text().splitlines()[-1])
+        assert record["hits"] == 1 and record["hit_rate"] == 0.2
+    print("✅ PASSED: responses persist, keyed by model/temperature/prompts")
+
+
+def test_ttl_eviction_and_bypass():
+    """Expired entries miss, the least recently used entries are evicted, bypass skips reads."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "responses.sqlite"
+        cache = LLMResponseCache(path, ttl_days=1)
+        cache.put("m", 0.1, SYSTEM, "old", "a")
+        cache._db.execute("UPDATE responses SET created = ?", (time.time() - 2 * 86400,))
+        cache._db.commit()
+        assert cache.get("m", 0.1, SYSTEM, "old") is None
+        assert cache.expired == 1
+
+        cache = LLMResponseCache(path, max_entries=2)
+        for i, prompt in enumerate(["p0", "p1"]):
+            cache.put("m", 0.1, SYSTEM, prompt, f"r{i}")
+        cache._db.execute("UPDATE responses SET last_used = 0 WHERE response = 'r1'")
+        cache._db.commit()
+        cache.put("m", 0.1, SYSTEM, "p2", "r2")
+        assert cache.evicted == 1
+        assert cache.get("m", 0.1, SYSTEM, "p1") is None
+        assert cache.get("m", 0.1, SYSTEM, "p0") == "r0"
+
+        bypass = LLMResponseCache(path, bypass=True)
+        assert bypass.get("m", 0.1, SYSTEM, "p0") is None
+        bypass.put("m", 0.1, SYSTEM, "p0", "fresh")
+        assert LLMResponseCache(path).get("m", 0.1, SYSTEM, "p0") == "fresh"
+        assert bypass.stats()["bypassed"] == 1
+    print("✅ PASSED: TTL, LRU eviction and bypass")
+
+
+def test_agents_answer_from_cache():
+    """A cached prompt is answered without creating or calling a model."""
+    from enhanced_agentic_parser import EnhancedAgenticParser
+    from agents import llm_log
+    from agents.llm_agents import AgentOrchestrator
+
+    with tempfile.TemporaryDirectory() as tmp:
+        previous = llm_cache._cache, llm_log._llm_logger
+        llm_cache._cache = LLMResponseCache(Path(tmp) / "responses.sqlite")
+        llm_log._llm_logger = llm_log.LLMInteractionLogger(Path(tmp))
+        try:
+            llm_cache._cache.put("llama3.2", 0.1, SYSTEM, USER, '{"ok": true}')
+            for agent in (EnhancedAgenticParser(), AgentOrchestrator()):
+                agent.enabled = True
+                agent._get_llm = lambda model: (_ for _ in ()).throw(AssertionError("model called"))
+                assert agent._invoke_llm(SYSTEM, USER) == '{"ok": true}'
+            assert llm_cache._cache.hits == 2
+            llm_log._llm_logger.close()
+            logged = json.loads((Path(tmp) / "llm_interactions.jsonl").read_text().splitlines()[-1])
+            assert logged["cache"] == "hit"
+        finally:
+            llm_cache._cache, llm_log._llm_logger = previous
+    print("✅ PASSED: agents use cached responses")
+
+
+if __name__ == "__main__":
+    test_hits_persist_and_key_on_model_and_temperature()
+    test_ttl_eviction_and_bypass()
+    test_agents_answer_from_cache()
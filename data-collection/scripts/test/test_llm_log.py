@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for the buffered LLM interaction logger (agents/llm_log.py).
+
+Runs offline in a temporary log directory: batching off the calling
+thread, size rotation with compression and pruning, sampling, the bounded
+queue, and the per-agent summary of the query tool.
+"""
+
+import sys
+import gzip
+import json
+import tempfile
+import threading
+from pathlib import Path
+
+# Add the scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agents.llm_log import LLMInteractionLogger, iter_records, rotated_logs, summarize, main
+
+
+def _record(i, agent="Auditor", duration=1.0, error=None, cache=None):
+    record = {"timestamp": f"2026-01-01T00:00:{i % 60:02d}", "agent": agent, "model": "llama3.2",
+              "system_prompt": "system", "user_prompt": f"prompt {i}", "response": "{}" if not error else None,
+              "duration_seconds": duration, "error": error}
+    if cache:
+        record["cache"] = cache
+    return record
+
+
+def test_writes_in_background_and_rotates():
+    """Records are written by the writer thread; full files are compressed and pruned."""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = LLMInteractionLogger(Path(tmp), max_mb=2 / 1024, backups=2, flush_seconds=0.05)
+        for i in range(40):
+            log.log(_record(i))
+            if i % 10 == 9:
+                log.flush()   # one write per ten records, so size checks happen between them
+        log.close()
+        assert log._thread.name == "llm-log" and not log._thread.is_alive()
+
+        rotated = rotated_logs(Path(tmp))
+        assert log.rotations >= 2 and len(rotated) == 2
+        assert all(json.loads(gzip.open(p, "rt").readline())["agent"] == "Auditor" for p in rotated)
+        # The kept files plus the current one hold the newest records, in order
+        prompts = [r["user_prompt"] for r in iter_records(Path(tmp))]
+        assert prompts == [f"prompt {i}" for i in range(40 - len(prompts), 40)]
+        assert log.stats()["written"] == 40
+    print("✅ PASSED: background writes, size rotation, compression, pruning")
+
+
+def test_writers_sharing_a_directory():
+    """Two writers (as in two processes) rotate under the lock and lose no records."""
+    with tempfile.TemporaryDirectory() as tmp:
+        logs = [LLMInteractionLogger(Path(tmp), max_mb=2 / 1024, backups=100, flush_seconds=0.05)
+                for _ in range(2)]
+        for i in range(60):
+            log = logs[i % 2]
+            log.log(_record(i))
+            log.flush()
+        for log in logs:
+            log.close()
+
+        assert sum(log.rotations for log in logs) >= 2
+        assert all(log.rotations for log in logs)   # each rotated a file the other had open
+        prompts = sorted(int(r["user_prompt"].split()[1]) for r in iter_records(Path(tmp)))
+        assert prompts == list(range(60))
+    print("✅ PASSED: shared log directory")
+
+
+def test_sampling_and_bounded_queue():
+    """Unsampled records keep their metrics only; errors are always full; a full queue drops."""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = LLMInteractionLogger(Path(tmp), sample_rate=0.0)
+        log.log(_record(0))
+        log.log(_record(1, error="timeout"))
+        log.close()
+        unsampled, failed = iter_records(Path(tmp))
+        assert unsampled["sampled"] is False and "user_prompt" not in unsampled
+        assert unsampled["duration_seconds"] == 1.0
+        assert failed["sampled"] is True and failed["user_prompt"] == "prompt 1"
+
+        half = LLMInteractionLogger(Path(tmp) / "half", sample_rate=0.5)
+        assert [half.sampled(_record(i)) for i in range(20)] == [half.sampled(_record(i)) for i in range(20)]
+        assert 0 < sum(half.sampled(_record(i)) for i in range(200)) < 200
+        half.close()
+
+        # Hold the writer inside a write so the queue fills up
+        blocked = LLMInteractionLogger(Path(tmp) / "blocked", queue_size=2, batch=1)
+        release = threading.Event()
+        write = blocked._write
+        blocked._write = lambda records: release.wait(5) and write(records)
+        for i in range(6):
+            blocked.log(_record(i))
+        assert blocked.stats()["dropped"] >= 3
+        release.set()
+        blocked.close()
+    print("✅ PASSED: sampling and bounded queue")
+
+
+def test_summary_per_agent():
+    """Per-agent error rates and latency over rotated and current files; cache hits excluded from latency."""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = LLMInteractionLogger(Path(tmp), max_mb=1 / 1024, backups=10)
+        records = [_record(i, duration=float(i + 1)) for i in range(4)] + [
+            _record(4, error="timeout", duration=60.0),
+            _record(5, cache="hit", duration=0.0),
+            _record(6, agent="Discoverer", duration=2.0),
+        ]
+        for record in records:
+            log.log(record)
+            log.flush()
+        log.close()
+        assert rotated_logs(Path(tmp))
+
+        summary = summarize(iter_records(Path(tmp)))
+        auditor = summary["Auditor"]
+        assert (auditor["calls"], auditor["errors"], auditor["cached"]) == (6, 1, 1)
+        assert round(auditor["error_rate"], 3) == 0.167
+        assert auditor["p50_seconds"] == 3.0 and auditor["p95_seconds"] == 60.0
+        assert summary["Discoverer"]["mean_seconds"] == 2.0
+        assert list(summarize(iter_records(Path(tmp)), agent="Discoverer")) == ["Discoverer"]
+        assert summarize(iter_records(Path(tmp)), since="2026-01-01T00:00:05")["Auditor"]["calls"] == 1
+        assert main(["--dir", tmp]) == 0
+    print("✅ PASSED: per-agent summary")
+
+
+if __name__ == "__main__":
+    test_writes_in_background_and_rotates()
+    test_writers_sharing_a_directory()
+    test_sampling_and_bounded_queue()
+    test_summary_per_agent()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for concurrent LLM calls (agents.llm_pool).
+
+Runs offline: the LLM is replaced by functions that sleep longer for
+earlier prompts, so completion order is the reverse of input order.
+"""
+
+import sys
+import json
+import time
+import threading
+from pathlib import Path
+
+# Add the scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import store_isolation  # noqa: F401  (before the modules opening the stores)
+
+import agents.llm_pool as llm_pool
+from agents.llm_pool import map_ordered
+from agents.llm_agents import AgentOrchestrator
+from enhanced_agentic_parser import EnhancedAgenticParser, ConfusableGroup, BatchMappingResult
+
+
+def test_map_ordered_overlaps_and_keeps_input_order():
+    """Calls overlap, results follow the input order, the first failure is raised after all finished."""
+    finished = []
+    lock = threading.Lock()
+
+    def slow(i):
+        time.sleep(0.2 - i * 0.05)
+        with lock:
+            finished.append(i)
+        return i * 10
+
+    start = time.perf_counter()
+    assert map_ordered(slow, range(4)) == [0, 10, 20, 30]
+    elapsed = time.perf_counter() - start
+    assert finished == [3, 2, 1, 0]
+    assert elapsed < 0.35, f"calls did not overlap ({elapsed:.2f}s)"
+
+    done = []
+
+    def failing(i):
+        time.sleep(0.05 if i == 0 else 0.0)
+        if i in (1, 2):
+            raise ValueError(f"call {i}")
+        done.append(i)
+        return i
+
+    try:
+        map_ordered(failing, range(4))
+    except ValueError as e:
+        assert str(e) == "call 1"
+    else:
+        raise AssertionError("expected the failure of call 1")
+    assert sorted(done) == [0, 3]
+    print(f"✅ PASSED: 4 calls in {elapsed:.2f}s, results in input order")
+
+
+def test_sequential_when_concurrency_is_one():
+    """LLM_CONCURRENCY=1 runs the calls inline, in order."""
+    previous = llm_pool.LLM_CONCURRENCY
+    llm_pool.LLM_CONCURRENCY = 1
+    try:
+        threads = set()
+        assert map_ordered(lambda i: threads.add(threading.current_thread().name) or i, range(3)) == [0, 1, 2]
+        assert threads == {threading.current_thread().name}
+    finally:
+        llm_pool.LLM_CONCURRENCY = previous
+    print("✅ PASSED: sequential fallback")
+
+
+def test_discoverer_batches_merge_in_batch_order():
+    """Discoverer chunks are sent concurrently and their results merged in row order."""
+    rows = [{'idx': f"us-gaap_Row{i}", 'human_label': f"Row {i}", 'camelcase_words': '', 'values': {}}
+            for i in range(12)]
+    orchestrator = AgentOrchestrator()
+    orchestrator.enabled = True
+    finished = []
+
+    def fake_llm(system_prompt, user_prompt, model=None, agent_name=""):
+        batch_rows = [r['idx'] for r in rows if f"`{r['idx']}`" in user_prompt]
+        time.sleep(0.15 if batch_rows[0] == "us-gaap_Row0" else 0.01)
+        finished.append(batch_rows[0])
+        return json.dumps([{"row_idx": idx, "suggested_fact": None, "confidence": 0.1} for idx in batch_rows])
+
+    orchestrator._invoke_llm = fake_llm
+    results = orchestrator.run_discoverer(rows, ["Total revenue"], "income_statement")
+    assert [r.row_idx for r in results] == [r['idx'] for r in rows]
+    assert len(finished) == 3 and finished[-1] == "us-gaap_Row0"   # first batch finished last
+    print("✅ PASSED: discoverer results merged in batch order")
+
+
+def test_enhanced_groups_merge_in_group_order():
+    """Confusable-group batches finish out of order but come back in group order."""
+    parser = EnhancedAgenticParser()
+    groups = [ConfusableGroup(group_id=f"g{i}", group_type=f"type{i}", rows=[f"row{i}"],
+                              target_items=[], reason="test") for i in range(3)]
+
+    def fake_map_batch(group, og_df, rows_text, sum_info, numerical_contexts):
+        time.sleep(0.1 if group.group_id == "g0" else 0.0)
+        return BatchMappingResult(group_id=group.group_id, mappings={group.rows[0]: "Revenue"},
+                                  confidence={}, reasoning={}, unmapped_rows=[])
+
+    parser._map_batch = fake_map_batch
+    results = parser._map_groups(groups, None, {}, {}, {})
+    assert [r.group_id for r in results] == ["g0", "g1", "g2"]
+    print("✅ PASSED: group batches merged in group order")
+
+
+if __name__ == "__main__":
+    test_map_ordered_overlaps_and_keeps_input_order()
+    test_sequential_when_concurrency_is_one()
+    test_discoverer_batches_merge_in_batch_order()
+    test_enhanced_groups_merge_in_group_order()
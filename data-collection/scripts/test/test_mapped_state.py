@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Tests for the array-backed mapped state used by the mappers.
+
+Checks the MappedState bookkeeping against the DataFrame checks it replaces
+and runs the legacy, scoring and pipeline mappers on a small statement.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add the scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import store_isolation  # noqa: F401  (before the modules opening the stores)
+
+from statement_maps import IncomeStatementMap
+from mapped_state import MappedState, frame_values
+from FinancialStatement import IncomeStatement
+
+COLUMNS = ["2024", "2023", "2022"]
+OG_DF = pd.DataFrame(
+    [
+        [391035.0, 383285.0, 394328.0],
+        [210352.0, 214137.0, 223546.0],
+        [180683.0, 169148.0, 170782.0],
+        [123216.0, 114301.0, 119437.0],
+        [93736.0, 96995.0, 99803.0],
+        [6.08, 6.13, 6.11],
+    ],
+    index=[
+        "us-gaap_Revenues",
+        "us-gaap_CostOfGoodsAndServicesSold",
+        "us-gaap_GrossProfit",
+        "us-gaap_OperatingIncomeLoss",
+        "us-gaap_NetIncomeLoss",
+        "us-gaap_EarningsPerShareDiluted",
+    ],
+    columns=COLUMNS,
+)
+ROWS_TEXT = {
+    "us-gaap_Revenues": "Total net sales",
+    "us-gaap_CostOfGoodsAndServicesSold": "Total cost of sales",
+    "us-gaap_GrossProfit": "Gross margin",
+    "us-gaap_OperatingIncomeLoss": "Operating income",
+    "us-gaap_NetIncomeLoss": "Net income",
+    "us-gaap_EarningsPerShareDiluted": "Diluted (in dollars per share)",
+}
+
+
+def test_state_matches_dataframe_checks():
+    """is_fact_mapped follows the old `(row != 0).any()` test, NaN included."""
+    state = MappedState(["A", "B", "C"], COLUMNS)
+    assert not state.is_fact_mapped("A") and state.nonzero_facts() == []
+
+    state.assign("A", np.array([1.0, 0.0, 0.0]), "row_a")
+    state.assign("B", np.array([np.nan, 0.0, 0.0]), "row_b")
+    state.assign("C", np.zeros(3), "row_c")
+    assert state.is_fact_mapped("A") and state.is_fact_mapped("B") and not state.is_fact_mapped("C")
+    assert state.is_row_mapped("row_c") and not state.is_row_mapped("row_d")
+    assert state.nonzero_facts() == ["A", "B"]
+
+    state.assign("A", np.zeros(3))          # overwritten with zeros -> free again
+    assert not state.is_fact_mapped("A")
+
+    df = state.to_dataframe()
+    reference = {f for f in df.index if (df.loc[f] != 0).any()}
+    assert reference == state.facts_with_data == {"B"}
+    assert list(df.columns) == COLUMNS and df.shape == (3, 3)
+
+    mixed = pd.DataFrame({"x": [1.0, None], "y": ["a", "b"]})
+    assert frame_values(mixed).dtype == object
+    assert frame_values(OG_DF).dtype == np.float64
+    print("✅ PASSED: mapped state bookkeeping")
+
+
+def test_mappers_produce_mapped_dataframe():
+    """Every array-backed mode maps the obvious rows into a float DataFrame."""
+    previous = {name: os.environ.get(name) for name in ("USE_MATCHING", "DISABLE_LLM")}
+    try:
+        for mode in ("legacy", "scoring", "pipeline"):
+            os.environ["USE_MATCHING"] = mode
+            os.environ["DISABLE_LLM"] = "1"
+            statement = IncomeStatement(OG_DF, [], ROWS_TEXT, {}, {}, None)
+            statement.create_zeroed_df_from_map()   # int zeros, as in production
+            statement.map_facts()
+
+            mapped = statement.mapped_df
+            assert list(mapped.index) == [mf.fact for mf in vars(IncomeStatementMap()).values()
+                                          if hasattr(mf, "gaap_pattern")], mode
+            assert (mapped.dtypes == np.float64).all(), mode
+            mapped_rows = [m[0] for m in statement.mapped_facts]
+            assert len(mapped_rows) == len(set(mapped_rows)), mode
+            for row_idx, fact, *_ in statement.mapped_facts:
+                assert mapped.loc[fact].tolist() == OG_DF.loc[row_idx].tolist(), (mode, fact)
+            assert "us-gaap_Revenues" in mapped_rows and "us-gaap_NetIncomeLoss" in mapped_rows, mode
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+    print("✅ PASSED: array-backed mappers")
+
+
+if __name__ == "__main__":
+    test_state_matches_dataframe_checks()
+    test_mappers_produce_mapped_dataframe()
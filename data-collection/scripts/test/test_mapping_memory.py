@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Tests for the learned mapping knowledge base (mapping_memory.py).
+
+Runs offline on a temporary sqlite file: checks company vs global scope,
+which mappings are stored, and that the pipeline and the enhanced parser
+use learned mappings instead of asking the LLM.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+# Add the scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import store_isolation  # noqa: F401  (before the modules opening the stores)
+
+from mapping_memory import MappingMemory, normalize_label
+from hybrid_matcher import MatchCandidate
+from statement_maps import IncomeStatementMap, MapFact
+from pipeline import ParsingPipeline, PipelineConfig
+from agents.llm_agents import AgentDecision
+from enhanced_agentic_parser import EnhancedAgenticParser, BatchMappingResult, VerificationResult
+
+TESLA = "0001318605"
+
+
+def test_company_scope_then_global_consensus():
+    """A company's own mapping wins; other companies' mappings need agreement."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "mappings.sqlite"
+        memory = MappingMemory(path)
+        assert normalize_label("Total net sales:") == "total net sales"
+        assert memory.record(TESLA, "income_statement", "tsla_AutomotiveRevenue", "Automotive sales",
+                             "Total revenue", source="llm", confidence=0.9)
+        # Stored under the normalised label, found by a new instance
+        learned = MappingMemory(path).lookup(TESLA, "income_statement", "tsla_AutomotiveRevenue", "AUTOMOTIVE  sales:")
+        assert learned.fact == "Total revenue" and learned.scope == TESLA
+        assert memory.lookup(TESLA, "balance_sheet", "tsla_AutomotiveRevenue", "Automotive sales") is None
+
+        # One other company is not enough for a global answer, two agreeing are
+        tag, label = "us-gaap_CostOfGoodsAndServicesSold", "Cost of sales"
+        memory.record("1", "income_statement", tag, label, "COGS", source="llm", confidence=0.5, temporal=True)
+        assert memory.lookup(TESLA, "income_statement", tag, label) is None
+        memory.record("2", "income_statement", tag, label, "COGS", source="llm", confidence=0.95)
+        learned = memory.lookup(TESLA, "income_statement", tag, label)
+        assert (learned.fact, learned.scope, learned.times_confirmed, learned.temporal) == ("COGS", "global", 2, True)
+
+        # A disagreeing company voids the consensus
+        memory.record("3", "income_statement", tag, label, "SG&A", source="llm", confidence=0.95)
+        assert memory.lookup(TESLA, "income_statement", tag, label) is None
+
+        # Same answer again accumulates evidence, a new answer replaces it
+        memory.record("1", "income_statement", tag, label, "COGS", source="llm", confidence=0.6, summation=True)
+        learned = memory.lookup("1", "income_statement", tag, label)
+        assert (learned.times_confirmed, learned.temporal, learned.summation) == (2, True, True)
+        memory.record("1", "income_statement", tag, label, "Total revenue", source="llm", confidence=0.9)
+        assert memory.lookup("1", "income_statement", tag, label).times_confirmed == 1
+
+        # Without evidence, low-confidence answers are not stored
+        assert not memory.record(TESLA, "income_statement", "us-gaap_Other", "Other", "R&D",
+                                 source="llm", confidence=0.5)
+        stats = memory.stats()
+        assert stats["global_hits"] == 1 and stats["rejected"] == 1
+    print("✅ PASSED: company scope, global consensus, evidence")
+
+
+class FakeAgent:
+    """Picks the runner-up candidate; fails the test if called for a learned row."""
+
+    def __init__(self):
+        self.resolved = []
+
+    def resolve_ambiguous_match(self, row_idx, human_label, candidates, **kwargs):
+        self.resolved.append(row_idx)
+        return AgentDecision(agent_name="Fake", selected_fact=candidates[1].map_fact.fact,
+                             confidence=0.9, reasoning="test")
+
+
+def _run_pipeline(memory, agent, temporal_score=0.0):
+    rows = ["tsla_AutomotiveRevenue"]
+    og_df = pd.DataFrame({"2024": [100.0]}, index=rows)
+    pipeline = ParsingPipeline(IncomeStatementMap(), og_df, {rows[0]: "Automotive sales"}, [],
+                               config=PipelineConfig(temporal_enabled=False, summation_enabled=False),
+                               cik=TESLA)
+    pipeline.memory = memory
+    pipeline._agent_orchestrator = agent
+    candidates = {rows[0]: [
+        MatchCandidate(map_fact=MapFact("Other operating expenses"), pattern_type="CamelCase",
+                       matched_patterns=[], regex_score=30),
+        MatchCandidate(map_fact=MapFact("Total revenue"), pattern_type="CamelCase",
+                       matched_patterns=[], regex_score=25, temporal_score=temporal_score),
+    ]}
+    return pipeline._select_best_mappings(candidates, pipeline._create_mapped_state())
+
+
+def test_pipeline_learns_then_skips_the_llm():
+    """Tie-breaks backed by evidence are recorded and reused; bare LLM answers are not."""
+    with tempfile.TemporaryDirectory() as tmp:
+        memory = MappingMemory(Path(tmp) / "mappings.sqlite")
+
+        # No temporal / summation evidence: asked again on the next run
+        for _ in range(2):
+            agent = FakeAgent()
+            [unconfirmed] = _run_pipeline(memory, agent)
+            assert agent.resolved == ["tsla_AutomotiveRevenue"]
+            assert unconfirmed.fact_name == "Total revenue" and unconfirmed.used_llm
+        assert memory.lookup(TESLA, "income_statement", "tsla_AutomotiveRevenue", "Automotive sales") is None
+
+        # The picked candidate matched earlier filings: learned
+        first_agent, second_agent = FakeAgent(), FakeAgent()
+        [first] = _run_pipeline(memory, first_agent, temporal_score=4)
+        assert first_agent.resolved == ["tsla_AutomotiveRevenue"]
+        assert first.fact_name == "Total revenue" and first.used_llm
+
+        [second] = _run_pipeline(memory, second_agent)
+        assert second_agent.resolved == []
+        assert second.fact_name == "Total revenue" and second.used_memory and not second.used_llm
+    print("✅ PASSED: pipeline uses learned tie-breaks")
+
+
+def test_enhanced_parser_leaves_learned_rows_out_of_prompts():
+    """Learned rows are removed from the confusable groups and mapped from memory."""
+    with tempfile.TemporaryDirectory() as tmp:
+        memory = MappingMemory(Path(tmp) / "mappings.sqlite")
+        memory.record(TESLA, "income_statement", "tsla_AutomotiveRevenue", "Automotive sales",
+                      "Total revenue", source="enhanced_llm", confidence=0.9)
+        parser = EnhancedAgenticParser(cik=TESLA)
+        parser.memory = memory
+        parser.max_verification_iterations = 0
+        prompted = []
+
+        def fake_map_batch(group, og_df, rows_text, sum_info, numerical_contexts):
+            prompted.extend(group.rows)
+            return BatchMappingResult(group_id=group.group_id, mappings={"tsla_ServicesRevenue": "Total revenue"},
+                                      confidence={"tsla_ServicesRevenue": 0.9}, reasoning={}, unmapped_rows=[])
+
+        parser._map_batch = fake_map_batch
+        og_df = pd.DataFrame({"2024": [80.0, 20.0]}, index=["tsla_AutomotiveRevenue", "tsla_ServicesRevenue"])
+        result = parser.parse(og_df, {"tsla_AutomotiveRevenue": "Automotive sales",
+                                      "tsla_ServicesRevenue": "Services revenue"}, [])
+
+        assert "tsla_AutomotiveRevenue" not in prompted and "tsla_ServicesRevenue" in prompted
+        mapped = {m.row_idx: (m.mapped_to, m.mapped_via) for m in result.mappings}
+        assert mapped == {"tsla_AutomotiveRevenue": ("Total revenue", "memory")}
+        assert result.statistics["memory_hits"] == 1
+    print("✅ PASSED: enhanced parser maps learned rows without the LLM")
+
+
+def test_enhanced_parser_records_only_verified_mappings():
+    """LLM mappings are learned only after a verification round ran and passed."""
+    og_df = pd.DataFrame({"2024": [20.0]}, index=["tsla_ServicesRevenue"])
+    rows_text = {"tsla_ServicesRevenue": "Services revenue"}
+
+    def fake_map_batch(group, og_df, rows_text, sum_info, numerical_contexts):
+        return BatchMappingResult(group_id=group.group_id, mappings={"tsla_ServicesRevenue": "Total revenue"},
+                                  confidence={"tsla_ServicesRevenue": 0.9}, reasoning={}, unmapped_rows=[])
+
+    def fake_verify(*args):
+        return VerificationResult(is_valid=True, issues=[], suggestions=[], confidence=0.9, reasoning="")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        memory = MappingMemory(Path(tmp) / "mappings.sqlite")
+        parser = EnhancedAgenticParser(cik=TESLA)
+        parser.memory = memory
+        parser._map_batch = fake_map_batch
+
+        # Verification skipped (turned off here, as when the LLM budget runs out)
+        parser.max_verification_iterations = 0
+        result = parser.parse(og_df, rows_text, [])
+        assert result.mappings[0].mapped_via == "batch_llm" and result.verification_iterations == 0
+        assert memory.lookup(TESLA, "income_statement", "tsla_ServicesRevenue", "Services revenue") is None
+
+        parser.max_verification_iterations = 1
+        parser._verify_mappings = fake_verify
+        parser.parse(og_df, rows_text, [])
+        learned = memory.lookup(TESLA, "income_statement", "tsla_ServicesRevenue", "Services revenue")
+        assert learned is not None and learned.fact == "Total revenue"
+    print("✅ PASSED: enhanced parser records only verified mappings")
+
+
+if __name__ == "__main__":
+    test_company_scope_then_global_consensus()
+    test_pipeline_learns_then_skips_the_llm()
+    test_enhanced_parser_leaves_learned_rows_out_of_prompts()
+    test_enhanced_parser_records_only_verified_mappings()
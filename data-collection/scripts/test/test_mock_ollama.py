@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Tests for the mock Ollama server (agents/mock_ollama.py).
+
+Runs offline against a server on a free local port: checks the endpoints
+the agents use, replay / rule / default answers, latency and the
+max-parallel limit.
+"""
+
+import sys
+import json
+import time
+import tempfile
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# Add the scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agents.mock_ollama import MockOllamaServer, detect_agent
+from agents.llm_agents import (
+    AUDITOR_SYSTEM_PROMPT, DISCOVERER_SYSTEM_PROMPT, check_ollama_available, list_ollama_models,
+)
+from enhanced_agentic_parser import BATCH_MAPPER_SYSTEM_PROMPT, VERIFIER_SYSTEM_PROMPT
+from agentic_parser import MAPPER_SYSTEM_PROMPT
+
+
+def _chat(server, system, user, model="llama3.2", stream=False):
+    response = requests.post(f"{server.base_url}/api/chat", json={
+        "model": model, "stream": stream, "format": "json",
+        "messages": [{"role": "system", "content": system}, {"role": "user", "content": user}],
+    }, timeout=10)
+    if not stream or response.status_code != 200:
+        return response
+    chunks = [json.loads(line) for line in response.text.splitlines()]
+    assert chunks[-1]["done"] and not any(c["done"] for c in chunks[:-1])
+    return "".join(c["message"]["content"] for c in chunks)
+
+
+def test_endpoints_and_default_answers():
+    """Tags, version, chat (streamed and not) and per-agent default answers."""
+    assert detect_agent(BATCH_MAPPER_SYSTEM_PROMPT) == "BatchMapper"
+    assert detect_agent(VERIFIER_SYSTEM_PROMPT) == "Verifier"
+    assert detect_agent(MAPPER_SYSTEM_PROMPT) == "Mapper"
+
+    with MockOllamaServer() as server:
+        assert check_ollama_available(server.base_url)
+        assert list_ollama_models(server.base_url) == ["llama3.2:latest", "mistral:latest"]
+        assert requests.get(f"{server.base_url}/api/version", timeout=5).json()["version"]
+
+        reply = _chat(server, AUDITOR_SYSTEM_PROMPT, "Row: us-gaap_Revenues").json()
+        assert reply["done"] and json.loads(reply["message"]["content"])["selected_fact"] is None
+        content = _chat(server, VERIFIER_SYSTEM_PROMPT, "Mappings: ...", stream=True)
+        assert json.loads(content)["is_valid"] is True
+
+        generated = requests.post(f"{server.base_url}/api/generate", json={
+            "model": "mistral", "system": BATCH_MAPPER_SYSTEM_PROMPT, "prompt": "rows", "stream": False,
+        }, timeout=5).json()
+        assert json.loads(generated["response"]) == {"mappings": []}
+
+        assert _chat(server, AUDITOR_SYSTEM_PROMPT, "x", model="deepseek-r1").status_code == 404
+        stats = server.stats()
+        assert stats["requests"] == 3 and stats["by_source"] == {"default": 3}
+        assert stats["by_agent"] == {"Auditor": 1, "Verifier": 1, "BatchMapper": 1}
+    print("✅ PASSED: Ollama endpoints and default answers")
+
+
+def test_replay_then_rules_then_default():
+    """Recorded answers win over rules; rules expand regex groups and set latency."""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = Path(tmp) / "llm_interactions.jsonl"
+        records = [
+            {"system_prompt": DISCOVERER_SYSTEM_PROMPT, "user_prompt": "rows A", "response": '{"recorded": 1}'},
+            {"system_prompt": DISCOVERER_SYSTEM_PROMPT, "user_prompt": "rows B", "response": None, "error": "timeout"},
+        ]
+        log.write_text("\n".join(json.dumps(r) for r in records) + "\n")
+        rules = [
+            {"agent": "Auditor", "match": r"`(us-gaap_\w+)`",
+             "response": '{"selected_fact": "Total revenue", "reasoning": "\\1"}', "latency": 0.2},
+            {"match": "rows", "response": {"suggested_fact": "COGS", "confidence": 0.8}},
+        ]
+        with MockOllamaServer(rules=rules, replay_files=[log]) as server:
+            assert json.loads(_chat(server, DISCOVERER_SYSTEM_PROMPT, "rows A").json()["message"]["content"]) == \
+                {"recorded": 1}
+            # Failed recordings are not replayed
+            assert json.loads(_chat(server, DISCOVERER_SYSTEM_PROMPT, "rows B").json()["message"]["content"]) == \
+                {"suggested_fact": "COGS", "confidence": 0.8}
+
+            start = time.perf_counter()
+            answer = _chat(server, AUDITOR_SYSTEM_PROMPT, "Row `us-gaap_SalesRevenueNet`", stream=True)
+            assert time.perf_counter() - start >= 0.2
+            assert json.loads(answer)["reasoning"] == "us-gaap_SalesRevenueNet"
+
+            # Agent-restricted rule does not apply to other agents
+            assert json.loads(_chat(server, VERIFIER_SYSTEM_PROMPT, "`us-gaap_X`").json()["message"]["content"]) \
+                ["is_valid"] is True
+            assert server.stats()["by_source"] == {"replay": 1, "rule": 2, "default": 1}
+    print("✅ PASSED: replay, rules and defaults")
+
+
+def test_latency_jitter_and_max_parallel():
+    """Jitter is deterministic per prompt; max_parallel queues extra requests."""
+    with MockOllamaServer(jitter=0.3) as server:
+        delays = {server.responder.respond("s", f"u{i}")[3] for _ in range(2) for i in range(3)}
+        assert len(delays) == 3 and all(0.0 <= d <= 0.3 for d in delays)
+
+    with MockOllamaServer(latency=0.15, max_parallel=2) as server:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            replies = list(pool.map(lambda i: _chat(server, AUDITOR_SYSTEM_PROMPT, f"row {i}"), range(4)))
+        elapsed = time.perf_counter() - start
+        assert all(r.status_code == 200 for r in replies)
+        assert server.stats()["max_in_flight"] == 2
+        assert elapsed >= 0.3, f"4 requests in 2 slots took only {elapsed:.2f}s"
+    print(f"✅ PASSED: deterministic jitter, 4 requests / 2 slots in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    test_endpoints_and_default_answers()
+    test_replay_then_rules_then_default()
+    test_latency_jitter_and_max_parallel()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-accession parse artifact store (parse_artifacts.py).
+
+Runs offline in a temporary store: round-trips a parsed statement, checks
+the filing manifests, and remaps a stored filing through main.py without
+any SEC request.
+"""
+
+import os
+import sys
+import json
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add the scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import store_isolation  # noqa: F401  (before the modules opening the stores)
+os.environ.setdefault("DISABLE_LLM", "1")
+
+import parse_artifacts
+from parse_artifacts import ParseArtifactStore, ArtifactFiling, ARTIFACT_FORMAT_VERSION
+from unit_detector import UnitInfo, UnitType
+from FinancialStatement import IncomeStatement
+
+CIK = "0000320193"
+ACCESSION = "0000320193-24-000123"
+
+ROWS = ["us-gaap_Revenues", "us-gaap_CostOfRevenue", "us-gaap_GrossProfit"]
+ROWS_TEXT = {"us-gaap_Revenues": "Net sales", "us-gaap_CostOfRevenue": "Cost of sales",
+             "us-gaap_GrossProfit": "Gross margin"}
+CAL_FACTS = {"us-gaap_GrossProfit": [{"fact": "us-gaap_Revenues", "weight": 1.0},
+                                     {"fact": "us-gaap_CostOfRevenue", "weight": -1.0}]}
+
+
+def _statement():
+    periods = pd.DatetimeIndex(["2024-09-28", "2023-09-30", "2022-09-24"])
+    og_df = pd.DataFrame([[391035.0, 383285.0, 394328.0],
+                          [210352.0, 214137.0, np.nan],
+                          [180683.0, 169148.0, 170782.0]], index=ROWS, columns=periods)
+    units = {row: UnitInfo(unit_type=UnitType.CURRENCY, base_unit="USD", source="header",
+                           original_scale=1e6) for row in ROWS}
+    return og_df, ["us-gaap_GrossProfit"], dict(ROWS_TEXT), {"first_section": list(ROWS)}, units
+
+
+def test_statement_round_trip():
+    """og_df, labels, sums, sections and units come back as they were parsed."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ParseArtifactStore(Path(tmp))
+        og_df, sums, rows_text, sections, units = _statement()
+        assert store.save_statement(CIK, ACCESSION, "income_statement", og_df, sums, rows_text, sections, units)
+
+        artifact = ParseArtifactStore(Path(tmp)).load_statement(CIK, ACCESSION.replace("-", ""), "income_statement")
+        pd.testing.assert_frame_equal(artifact.og_df, og_df)
+        assert artifact.rows_text == rows_text and artifact.rows_that_are_sum == sums
+        assert artifact.sections_dict == sections
+        assert artifact.units_dict["us-gaap_Revenues"] == units["us-gaap_Revenues"]
+
+        # Missing statements, text-only frames and other format versions are not served
+        assert store.load_statement(CIK, ACCESSION, "balance_sheet") is None
+        assert not store.save_statement(CIK, ACCESSION, "cash_flow_statement",
+                                        pd.DataFrame({"a": ["n/a"]}), [], {}, {}, {})
+        parse_artifacts.ARTIFACT_FORMAT_VERSION = ARTIFACT_FORMAT_VERSION + 1
+        try:
+            assert store.load_statement(CIK, ACCESSION, "income_statement") is None
+        finally:
+            parse_artifacts.ARTIFACT_FORMAT_VERSION = ARTIFACT_FORMAT_VERSION
+        assert store.stats()["saved"] == 1 and store.stats()["missing"] == 2
+    print("✅ PASSED: statement artifact round trip")
+
+
+def test_manifests_and_artifact_filing():
+    """Manifests list filings newest first; ArtifactFiling builds statements without a Filling."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ParseArtifactStore(Path(tmp))
+        for report_date, accession in [("2023-09-30", "0000320193-23-000106"), ("2024-09-28", ACCESSION)]:
+            store.save_statement(CIK, accession, "income_statement", *_statement())
+            store.save_filing("aapl", CIK, accession, report_date, False, "us-gaap", CAL_FACTS)
+        # A filing without stored statements gets no manifest
+        store.save_filing("MSFT", "789019", "0000950170-24-087843", "2024-06-30", False, "us-gaap", None)
+
+        manifests = store.filings(ticker="AAPL")
+        assert [m["report_date"] for m in manifests] == ["2024-09-28", "2023-09-30"]
+        assert manifests[0]["statements"] == ["income_statement"]
+        assert store.tickers() == ["AAPL"] and store.filings(ticker="AAPL", quarterly=True) == []
+        manifest_path = store.filing_dir(CIK, ACCESSION) / "filing.json"
+        assert json.loads(manifest_path.read_text())["accession_number"] == ACCESSION
+
+        filing = ArtifactFiling(store, manifests[0])
+        assert filing.xml_equations == CAL_FACTS and filing.taxonomy == "us-gaap"
+        filing.process_one_statement("income_statement")
+        assert isinstance(filing.income_statement, IncomeStatement)
+        assert filing.income_statement.rows_text == ROWS_TEXT
+        assert filing.process_one_statement("balance_sheet") is None and filing.balance_sheet is None
+    print("✅ PASSED: manifests and artifact filings")
+
+
+def test_remap_from_artifacts_only():
+    """main.remap_financial_statements maps stored filings newest first from the store alone."""
+    import main
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ParseArtifactStore(Path(tmp))
+        for report_date, accession in [("2023-09-30", "0000320193-23-000106"), ("2024-09-28", ACCESSION)]:
+            store.save_statement(CIK, accession, "income_statement", *_statement())
+            store.save_filing("AAPL", CIK, accession, report_date, False, "us-gaap", CAL_FACTS)
+
+        previous, parse_artifacts._store = parse_artifacts._store, store
+        try:
+            results = main.remap_financial_statements("aapl", statement_filter="income",
+                                                      enable_pattern_logging=False)
+            assert [m["date"] for m in results["metadata"]] == ["2024-09-28", "2023-09-30"]
+            assert len(results["income_statements"]) == 2 and results["balance_sheets"] == []
+            assert results["income_statements"][0]["original"].shape == (3, 3)
+            assert len(main.remap_financial_statements("AAPL", num_years=1, statement_filter="income",
+                                                       enable_pattern_logging=False)["metadata"]) == 1
+            # Tickers without artifacts are logged and skipped
+            remapped = main.remap_tickers(["MSFT", "AAPL"], statement_filter="income", enable_pattern_logging=False)
+            assert [r["ticker"] for r in remapped] == ["AAPL"]
+        finally:
+            parse_artifacts._store = previous
+    print("✅ PASSED: remap from stored artifacts")
+
+
+if __name__ == "__main__":
+    test_statement_round_trip()
+    test_manifests_and_artifact_filing()
+    test_remap_from_artifacts_only()
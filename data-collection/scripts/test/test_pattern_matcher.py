@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for the precompiled statement_maps matcher.
+
+Checks that StatementMapMatcher finds exactly what the per-pattern
+find_pattern_matches() loop finds, on the R file fixtures and on edge cases
+(dimensional prefixes, IFRS tags, non-ASCII labels).
+"""
+
+import sys
+from pathlib import Path
+
+# Add the scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import store_isolation  # noqa: F401  (before the modules opening the stores)
+
+from statement_maps import IncomeStatementMap, BalanceSheetMap, CashFlowMap, MapFact
+from statement_parser import parse_statement_lxml
+from hybrid_matcher import find_pattern_matches, HybridMatcher
+from pattern_matcher import (StatementMapMatcher, get_statement_map_matcher,
+                             required_literal, PATTERN_KINDS)
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "r_files"
+
+ROWS = [
+    ("us-gaap_Revenues", "Total revenues"),
+    ("us-gaap_NetIncomeLoss", "Net income"),
+    ("us-gaap_EarningsPerShareDiluted", "Diluted (in dollars per share)"),
+    ("us-gaap_LiabilitiesAndStockholdersEquity", "Total liabilities and shareholders' equity"),
+    ("us-gaap_NetCashProvidedByUsedInOperatingActivities", "Cash generated by operating activities"),
+    ("ifrs-full_ProfitLoss", "Profit for the year"),
+    ("ifrs-full_Revenue", "Revenue"),
+    ("amzn_FulfillmentExpense", "Fulfillment"),
+    ("D1:us-gaap_CostOfGoodsAndServicesSold", "Services"),
+    ("us-gaap_Revenues", "Umsatzerlöse – Net ſales"),       # non-ASCII: no prefilter
+    ("us-gaap_CashAndCashEquivalentsAtCarryingValue", ""),
+]
+
+
+def _rows():
+    rows = list(ROWS)
+    for path in sorted(FIXTURES_DIR.glob("*.htm")):
+        for table in parse_statement_lxml(path.read_bytes()).tables:
+            for row in table.rows:
+                rows.append((row.onclick.split("defref_")[-1].split("',")[0], row.label))
+    return rows
+
+
+def test_required_literal():
+    """The prefilter literal is the longest top-level literal run, lower-cased."""
+    assert required_literal(r"(?i)OperatingIncome[LoLosss]*\b") == "operatingincome"
+    assert required_literal(r"(?i)\bnet\s+sales\b") == "sales"
+    assert required_literal(r"(?i)(revenue|sales)") == ""
+    assert required_literal(r"(?i)^Cost(?:Of)?Revenue") == "revenue"
+    print("✅ PASSED: literal extraction")
+
+
+def test_matcher_identical_to_pattern_loop():
+    """Every MapFact / kind yields the same matches as find_pattern_matches()."""
+    rows = _rows()
+    for map_cls in (IncomeStatementMap, BalanceSheetMap, CashFlowMap):
+        statement_map = map_cls()
+        matcher = StatementMapMatcher(statement_map)
+        items = [(n, mf) for n, mf in vars(statement_map).items() if isinstance(mf, MapFact)]
+        for tag, label in rows:
+            for kind, attr in PATTERN_KINDS.items():
+                text = label if kind == "Human" else tag
+                hits = matcher.search(kind, text)
+                for name, mf in items:
+                    expected = [(m.pattern_index, m.pattern, m.match_string)
+                                for m in find_pattern_matches(text, getattr(mf, attr), kind)]
+                    assert hits.get(name, []) == expected, (map_cls.__name__, kind, name, text)
+    print("✅ PASSED: matcher identical to per-pattern loop")
+
+
+def test_matchers_are_shared_and_used_by_hybrid_matcher():
+    """Maps with identical patterns share one compiled matcher."""
+    assert get_statement_map_matcher(IncomeStatementMap()) is get_statement_map_matcher(IncomeStatementMap())
+    candidates = HybridMatcher(IncomeStatementMap()).find_candidates("us-gaap_Revenues", None, "Total revenues")
+    assert candidates and candidates[0].pattern_type == "GAAP"
+    print("✅ PASSED: shared matchers")
+
+
+if __name__ == "__main__":
+    test_required_literal()
+    test_matcher_identical_to_pattern_loop()
+    test_matchers_are_shared_and_used_by_hybrid_matcher()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Parity tests for the statement parser backends (lxml vs BeautifulSoup).
+
+Runs offline over the recorded R files in test/fixtures/r_files/ and
+encoding variants of one of them. With STATEMENT_PARSER_TEST_CACHE=1 the R
+files already in the local EDGAR archive cache (.api_cache/edgar/archive)
+are checked as well. Both the parsed representation and the final 7-tuple
+returned by Filling.extract_columns_values_and_dates_from_statement must be
+identical.
+"""
+
+import os
+import sys
+import json
+import logging
+from pathlib import Path
+
+# Add the scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from bs4 import BeautifulSoup
+
+from statement_parser import parse_statement_bs4, parse_statement_lxml
+from archive_cache import ARCHIVE_CACHE_DIR, ArchiveCache
+from Filling import Filling
+from constants import GAAP
+
+logging.basicConfig(level=logging.WARNING)
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "r_files"
+MAX_CACHED_FILES = 200
+
+
+def _encoding_variants(content: bytes):
+    """The annual fixture with a non-ASCII label, undeclared and with declared encodings."""
+    label = "Research and développement — R&amp;D".encode("utf-8")
+    utf8 = content.replace(b"Research and development", label)
+    cp1252 = content.replace(b"Research and development", label.decode("utf-8").encode("cp1252"))
+    return [
+        ("utf8_undeclared.htm", utf8),
+        ("utf8_xml_prolog.htm", b'<?xml version="1.0" encoding="utf-8"?>\n' + utf8),
+        ("cp1252_meta_charset.htm",
+         cp1252.replace(b"<head>", b'<head>\n<meta http-equiv="Content-Type" content="text/html; charset=windows-1252">', 1)),
+    ]
+
+
+def _recorded_r_files():
+    """(name, content) of fixture R files, plus cached /Archives/ R files when opted in."""
+    files = [(path.name, path.read_bytes()) for path in sorted(FIXTURES_DIR.glob("*.htm"))]
+    files += _encoding_variants((FIXTURES_DIR / "income_statement_annual.htm").read_bytes())
+    if os.environ.get("STATEMENT_PARSER_TEST_CACHE", "0") != "1":
+        return files
+    cache = ArchiveCache(ARCHIVE_CACHE_DIR)
+    cached = 0
+    for entry_path in sorted((ARCHIVE_CACHE_DIR / "urls").glob("*/*.json")):
+        if cached >= MAX_CACHED_FILES:
+            break
+        try:
+            url = json.loads(entry_path.read_text())["url"]
+        except Exception:
+            continue
+        if url.rsplit("/", 1)[-1].startswith("R") and url.endswith(".htm"):
+            hit = cache.get(url)
+            if hit:
+                files.append((url, hit[0]))
+                cached += 1
+    return files
+
+
+RECORDED = _recorded_r_files()
+
+
+def _filling(quarterly=False):
+    """A Filling with only the state the extraction code needs (no network)."""
+    filing = Filling.__new__(Filling)
+    filing.quarterly = quarterly
+    filing.yearly = not quarterly
+    filing.facts_table = None
+    filing.taxonomy = GAAP
+    filing.unit_multiplier_set = []
+    return filing
+
+
+@pytest.mark.parametrize("name,content", RECORDED, ids=[name for name, _ in RECORDED])
+def test_parsed_statement_parity(name, content):
+    """Both backends produce the same headers, rows and cells."""
+    expected = parse_statement_bs4(BeautifulSoup(content, "lxml"))
+    actual = parse_statement_lxml(content)
+    assert actual.date_headers == expected.date_headers
+    assert actual.title_headers == expected.title_headers
+    assert len(actual.tables) == len(expected.tables)
+    for table_actual, table_expected in zip(actual.tables, expected.tables):
+        assert table_actual.header_texts == table_expected.header_texts
+        assert table_actual.rows == table_expected.rows
+
+
+@pytest.mark.parametrize("statement_name", ["income_statement", "balance_sheet"])
+@pytest.mark.parametrize("name,content", RECORDED, ids=[name for name, _ in RECORDED])
+def test_extraction_parity(name, content, statement_name):
+    """The 7-tuple is identical for a BeautifulSoup and an lxml-parsed document."""
+    quarterly = "quarterly" in name
+    legacy = _filling(quarterly).extract_columns_values_and_dates_from_statement(
+        BeautifulSoup(content, "lxml"), statement_name)
+    fast = _filling(quarterly).extract_columns_values_and_dates_from_statement(
+        parse_statement_lxml(content), statement_name)
+
+    columns, values, dates, sums, texts, sections, units = fast
+    assert columns == legacy[0]
+    assert values == legacy[1]
+    assert list(dates) == list(legacy[2])
+    assert sums == legacy[3]
+    assert texts == legacy[4]
+    assert sections == legacy[5]
+    assert {k: repr(v) for k, v in units.items()} == {k: repr(v) for k, v in legacy[6].items()}
+
+
+def test_fixture_contents():
+    """Sanity check of what the extraction sees in the annual fixture."""
+    content = (FIXTURES_DIR / "income_statement_annual.htm").read_bytes()
+    columns, values, dates, sums, texts, sections, units = \
+        _filling().extract_columns_values_and_dates_from_statement(
+            parse_statement_lxml(content), "income_statement")
+    assert len(dates) == 3
+    assert "us-gaap_GrossProfit" in sums and "us-gaap_OperatingExpenses" in sums
+    assert texts["us-gaap_ResearchAndDevelopmentExpense"] == "Research and development"
+    assert values[columns.index("us-gaap_NonoperatingIncomeExpense")] == [269e6, -565e6, -334e6]
+    assert "Operating expenses:" in sections
+
+    for name, variant in _encoding_variants(content):
+        texts = _filling().extract_columns_values_and_dates_from_statement(
+            parse_statement_lxml(variant), "income_statement")[4]
+        assert texts["us-gaap_ResearchAndDevelopmentExpense"] == "Research and développement — R&D", name
+    print("✅ PASSED: fixture extraction")
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
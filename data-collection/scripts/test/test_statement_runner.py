@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for the statement runner (concurrent per-statement mapping of a filing).
+
+Runs offline with a fake filing whose statements sleep instead of mapping.
+"""
+
+import sys
+import time
+import logging
+import threading
+from pathlib import Path
+
+# Add the scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from statement_runner import StatementRunner, statement_steps
+
+
+class _FakeStatement:
+    def __init__(self, name, historical):
+        self.name = name
+        self.historical = historical
+
+    def get_mapped_df(self):
+        return f"mapped {self.name}"
+
+
+class _FakeFiling:
+    accession_number = "000000000000000000"
+
+    def __init__(self, delay=0.1, fail=None, missing=None, events=None):
+        self.delay = delay
+        self.events = events
+        self.fail = fail
+        self.missing = missing
+        self.threads = {}
+        self.income_statement = self.balance_sheet = self.cash_flow = None
+        self.equations_loaded = 0
+
+    @property
+    def xml_equations(self):
+        self.equations_loaded += 1
+        return {}
+
+    def process_one_statement(self, statement_name, historical_statements=None, llm_budget=None):
+        self.threads[statement_name] = threading.current_thread().name
+        time.sleep(self.delay)
+        if self.events is not None:
+            self.events.append(f"mapped {statement_name}")
+        if statement_name == self.fail:
+            raise ValueError(f"{statement_name} failed")
+        if statement_name == self.missing:
+            return None
+        attr = {'income_statement': 'income_statement', 'balance_sheet': 'balance_sheet',
+                'cash_flow_statement': 'cash_flow'}[statement_name]
+        setattr(self, attr, _FakeStatement(statement_name, historical_statements))
+
+
+def _historical(steps):
+    return {step.key: {"2024-01-01": step.key} for step in steps}
+
+
+def test_statements_run_concurrently_and_yield_in_order():
+    """The three statements overlap in time; results come back income → balance → cash flow."""
+    steps = statement_steps('all')
+    filing = _FakeFiling(delay=0.2)
+    with StatementRunner(workers=3) as runner:
+        start = time.perf_counter()
+        results = list(runner.run(filing, steps, _historical(steps)))
+        elapsed = time.perf_counter() - start
+
+    assert [step.name for step, _, _ in results] == ['income_statement', 'balance_sheet', 'cash_flow_statement']
+    assert [mapped for _, _, mapped in results] == [f"mapped {step.name}" for step in steps]
+    # Each statement got its own historical dict
+    assert [statement.historical for _, statement, _ in results] == [{"2024-01-01": step.key} for step in steps]
+    assert len(set(filing.threads.values())) == 3
+    assert filing.equations_loaded == 1
+    assert elapsed < 0.5, f"statements did not overlap ({elapsed:.2f}s)"
+    print(f"✅ PASSED: 3 statements mapped concurrently in {elapsed:.2f}s, yielded in order")
+
+
+def test_progress_lines_precede_results():
+    """Each 'Processing ...' line is logged, in order, once its statement is mapped and before any result."""
+    steps = statement_steps('all')
+    messages = []
+    handler = logging.Handler()
+    handler.emit = lambda record: messages.append(record.getMessage())
+    runner_logger = logging.getLogger("statement_runner")
+    runner_logger.addHandler(handler)
+    runner_logger.setLevel(logging.INFO)
+    try:
+        with StatementRunner(workers=3) as runner:
+            for _ in runner.run(_FakeFiling(delay=0.01, events=messages), steps, _historical(steps)):
+                messages.append("result")
+    finally:
+        runner_logger.removeHandler(handler)
+    progress = [m for m in messages if not m.startswith("mapped ")]
+    assert progress == ["Processing Income Statement...", "Processing Balance Sheet...",
+                        "Processing Cash Flow...", "result", "result", "result"]
+    for step in steps:
+        assert messages.index(f"mapped {step.name}") < messages.index(step.message)
+    print("✅ PASSED: progress lines logged in SSE order")
+
+
+def test_failures_are_raised_after_join():
+    """A failing statement raises at its position, after all statements of the filing finished."""
+    steps = statement_steps('all')
+    filing = _FakeFiling(delay=0.05, fail='balance_sheet', missing='cash_flow_statement')
+    seen = []
+    with StatementRunner(workers=3) as runner:
+        try:
+            for step, statement, mapped in runner.run(filing, steps, _historical(steps)):
+                seen.append((step.key, mapped))
+        except ValueError as e:
+            assert "balance_sheet" in str(e)
+        else:
+            raise AssertionError("expected the balance sheet failure")
+    assert seen == [('income', 'mapped income_statement')]
+    assert set(filing.threads) == {'income_statement', 'balance_sheet', 'cash_flow_statement'}
+
+    # A statement that could not be built yields (step, None, None)
+    filing = _FakeFiling(delay=0.0, missing='cash_flow_statement')
+    with StatementRunner(workers=1) as runner:
+        results = list(runner.run(filing, statement_steps('cashflow'), _historical(steps)))
+    assert [(step.key, statement, mapped) for step, statement, mapped in results] == [('cashflow', None, None)]
+    print("✅ PASSED: failures re-raised in order after the join")
+
+
+if __name__ == "__main__":
+    test_statements_run_concurrently_and_yield_in_order()
+    test_progress_lines_precede_results()
+    test_failures_are_raised_after_join()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for the prefix-sum SummationChecker block check.
+
+Checks that on single-period statements the vectorised check finds exactly
+what the previous first-column search found, and that with several periods
+a sum must hold in all of them.
+"""
+
+import sys
+import random
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add the scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from summation_checker import SummationChecker
+
+
+def _first_value(row):
+    return next((float(v) for v in row if not pd.isna(v) and v != 0), 0.0)
+
+
+def _summary(result):
+    if result is None:
+        return None
+    return (result.sum_type, round(result.confidence, 6), result.component_rows, result.computed_sum)
+
+
+def test_single_period_identical_to_first_column_search():
+    """One period: same sum type, confidence, components and sum as before."""
+    rng = random.Random(7)
+    for trial in range(200):
+        n = rng.randint(2, 30)
+        values = [float(rng.choice([0, 0, rng.randint(-500, 500)])) for _ in range(n)]
+        for pos in rng.sample(range(1, n), k=min(3, n - 1)):    # plant some totals
+            start = rng.randint(max(0, pos - 25), pos - 1)
+            values[pos] = rng.choice([1, -1]) * sum(values[start:pos])
+        if rng.random() < 0.3:
+            values[rng.randrange(n)] = np.nan
+        index = [f"r{trial}_{i}" for i in range(n)]
+        df = pd.DataFrame({"2024": values}, index=index)
+        checker = SummationChecker(df, [], {})
+        for idx in index:
+            row = df.loc[idx]
+            actual = _first_value(row)
+            if actual == 0:
+                continue
+            expected = checker._check_numeric_sum_first_column(idx, row, actual)
+            assert _summary(checker._check_numeric_sum(idx, row, actual)) == _summary(expected), (trial, idx)
+    print("✅ PASSED: single-period parity")
+
+
+def test_sum_must_hold_in_every_period():
+    """A total confirmed in every period is boosted; a first-column coincidence is rejected."""
+    df = pd.DataFrame(
+        {
+            "2024": [np.nan, 100.0, 50.0, 150.0, 70.0, 220.0],
+            "2023": [np.nan, 90.0, 40.0, 130.0, 60.0, 199.0],
+            "2022": [np.nan, 80.0, 30.0, 110.0, 50.0, np.nan],
+        },
+        index=["Header", "Products", "Services", "Total revenue", "Other", "Coincidence"],
+    )
+    checker = SummationChecker(df, [], {})
+
+    total = checker.check_row("Total revenue")
+    assert total.is_sum_row and total.sum_type == "exact"
+    assert total.component_rows == ["Products", "Services"]
+    assert total.computed_sum == 150.0
+    assert abs(total.confidence - (0.8 + SummationChecker.MAX_PERIOD_BONUS)) < 1e-9
+
+    # 220 = 150 + 70 in 2024 only (2023 differs, 2022 not reported)
+    row = df.loc["Coincidence"]
+    assert checker._check_numeric_sum_first_column("Coincidence", row, 220.0).is_sum_row
+    assert not checker.check_row("Coincidence").is_sum_row
+    print("✅ PASSED: multi-period consistency")
+
+
+def test_negative_and_absolute_sums():
+    """Negated and absolute-value sums are detected in every period."""
+    df = pd.DataFrame(
+        {
+            "2024": [-30.0, -20.0, 50.0, 10.0, -5.0, 15.0],
+            "2023": [-25.0, -15.0, 40.0, 8.0, -4.0, 12.0],
+        },
+        index=["Cost A", "Cost B", "Total costs", "Gain", "Loss", "Gross"],
+    )
+    checker = SummationChecker(df, [], {})
+    costs = checker.check_row("Total costs")
+    assert costs.sum_type == "exact" and costs.component_rows == ["Cost A", "Cost B"]
+    assert costs.computed_sum == 50.0
+    gross = checker.check_row("Gross")
+    assert gross.sum_type == "absolute" and gross.component_rows == ["Gain", "Loss"]
+    assert not checker.check_row("Cost A").is_sum_row
+    print("✅ PASSED: negative and absolute sums")
+
+
+if __name__ == "__main__":
+    test_single_period_identical_to_first_column_search()
+    test_sum_must_hold_in_every_period()
+    test_negative_and_absolute_sums()
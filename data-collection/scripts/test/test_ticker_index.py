@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared ticker/CIK/name index.
+
+Runs offline: the index is loaded from a fresh file written by the test,
+so no download of company_tickers.json happens.
+"""
+
+import sys
+import json
+from pathlib import Path
+
+# Add the scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ticker_index import TickerIndex
+
+SAMPLE = {
+    "0": {"cik_str": 320193, "ticker": "AAPL", "title": "Apple Inc."},
+    "1": {"cik_str": 2488, "ticker": "AMD", "title": "ADVANCED MICRO DEVICES INC"},
+    "2": {"cik_str": 789019, "ticker": "MSFT", "title": "MICROSOFT CORP"},
+    "3": {"cik_str": 1067983, "ticker": "BRK-B", "title": "BERKSHIRE HATHAWAY INC"},
+    "4": {"cik_str": 1067983, "ticker": "BRK-A", "title": "BERKSHIRE HATHAWAY INC"},
+    "5": {"cik_str": 1018724, "ticker": "AMZN", "title": "AMAZON COM INC"},
+}
+
+
+def _index(tmp_path):
+    path = tmp_path / "company_tickers.json"
+    path.write_text(json.dumps(SAMPLE))
+    return TickerIndex(path=path, ttl_hours=24)
+
+
+def test_lookup_cik(tmp_path):
+    """Tickers resolve to zero-padded CIKs; dotted class shares are normalised."""
+    index = _index(tmp_path)
+    assert index.lookup_cik("aapl") == "0000320193"
+    assert index.lookup_cik("BRK.B") == "0001067983"
+    assert index.by_cik["0001067983"].ticker == "BRK-B"
+    try:
+        index.lookup_cik("NOPE")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    print("✅ PASSED: ticker -> CIK lookup")
+
+
+def test_search_ticker_and_name_prefix(tmp_path):
+    """Exact ticker first, then ticker prefixes, then name prefixes."""
+    index = _index(tmp_path)
+    assert [r["ticker"] for r in index.search("AM")] == ["AMD", "AMZN"]
+    assert [r["ticker"] for r in index.search("amd")][0] == "AMD"
+    assert [r["ticker"] for r in index.search("micro")] == ["MSFT", "AMD"]
+    assert [r["ticker"] for r in index.search("berk", limit=1)] == ["BRK-A"]
+    assert index.search("apple")[0] == {"ticker": "AAPL", "cik": "0000320193", "name": "Apple Inc."}
+    print("✅ PASSED: prefix search")
+
+
+if __name__ == "__main__":
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        test_lookup_cik(Path(tmp))
+        test_search_ticker_and_name_prefix(Path(tmp))
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Tests for the stage timing spans (tracing.py).
+
+Runs offline: span attributes and context propagation into thread pools,
+the Chrome trace export and the per-filing summary, and the spans of a
+remap run through main.py over a temporary parse artifact store.
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import store_isolation  # noqa: F401  (before the modules opening the stores)
+os.environ.setdefault("DISABLE_LLM", "1")
+
+import tracing
+from tracing import Tracer, SpanTimer, trace_context, propagate
+
+
+def _use(tracer):
+    """Make tracer the process-wide tracer; returns the previous one."""
+    previous, tracing._tracer = tracing._tracer, tracer
+    return previous
+
+
+def test_spans_context_and_threads():
+    """Spans carry the trace_context attributes, also in pool threads submitted through propagate()."""
+    tracer = Tracer(max_spans=6)
+    previous = _use(tracer)
+    try:
+        with trace_context(ticker="AAPL"), tracing.span("filing.map", "filing", accession="A-1") as s:
+            s.set(statements=2)
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                def work(name):
+                    with trace_context(statement=name), tracing.span("statement.map", "statement"):
+                        return tracing.current_context()
+                contexts = [pool.submit(propagate(work), n).result() for n in ["income_statement", "balance_sheet"]]
+        assert contexts[0] == {"ticker": "AAPL", "statement": "income_statement"}
+        assert tracing.current_context() == {}
+
+        try:
+            with tracing.span("http", "http", endpoint="submissions"):
+                raise ValueError("boom")
+        except ValueError:
+            pass
+
+        spans = tracer.spans()
+        statement_spans = [e for e in spans if e["name"] == "statement.map"]
+        assert {e["args"]["statement"] for e in statement_spans} == {"income_statement", "balance_sheet"}
+        assert all(e["args"]["ticker"] == "AAPL" for e in statement_spans)
+        filing = next(e for e in spans if e["name"] == "filing.map")
+        assert filing["args"] == {"ticker": "AAPL", "accession": "A-1", "statements": 2}
+        assert next(e for e in spans if e["name"] == "http")["args"]["error"] == "ValueError"
+
+        # Only max_spans are kept
+        for _ in range(5):
+            with tracing.span("extra"):
+                pass
+        assert len(tracer.spans()) == 6 and tracer.summary()["dropped"] == 3
+    finally:
+        _use(previous)
+    print("✅ PASSED: span attributes and context propagation")
+
+
+def test_chrome_trace_and_summary():
+    """Chrome export has X and thread metadata events; the filing breakdown uses self time."""
+    tracer = Tracer()
+    previous = _use(tracer)
+    try:
+        with trace_context(ticker="MSFT", accession="B-1", report_date="2024-06-30"):
+            with tracing.span("filing.map", "filing"):
+                with tracing.span("pipeline.select", "pipeline"):
+                    time.sleep(0.02)
+                    with tracing.span("llm.invoke", "llm", agent="Auditor"):
+                        time.sleep(0.03)
+                timer = SpanTimer("statement.units", "units")
+                for _ in range(3):
+                    with timer.time():
+                        time.sleep(0.002)
+                timer.close()
+        with trace_context(accession="B-1"), tracing.span("filing.prefetch", "filing"):
+            with tracing.span("http", "http"):
+                time.sleep(0.01)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = tracer.write_chrome_trace(Path(tmp) / "traces" / "run.json")
+            trace = json.loads(path.read_text())
+        phases = {e["ph"] for e in trace["traceEvents"]}
+        assert phases == {"X", "M"}
+        assert any(e["name"] == "thread_name" for e in trace["traceEvents"])
+        llm = next(e for e in trace["traceEvents"] if e["name"] == "llm.invoke")
+        assert llm["dur"] >= 30000 and llm["args"]["agent"] == "Auditor"
+
+        summary = tracer.summary()
+        assert summary["spans"] == 6 and summary["by_name"]["statement.units"]["count"] == 1
+        units = next(e for e in tracer.spans() if e["name"] == "statement.units")
+        assert units["args"]["calls"] == 3
+        filing, = summary["filings"]
+        assert (filing["ticker"], filing["report_date"]) == ("MSFT", "2024-06-30")
+        by_category = filing["by_category"]
+        # The LLM call is not counted again in the pipeline step around it
+        assert by_category["llm"] >= 0.03 and 0.02 <= by_category["pipeline"] < 0.03
+        assert by_category["http"] >= 0.01 and "filing" not in by_category
+        assert filing["seconds"] >= 0.06
+        assert summary["slowest"][0]["name"] == "filing.map"
+        json.dumps(summary)
+    finally:
+        _use(previous)
+    print("✅ PASSED: Chrome trace export and summary")
+
+
+def test_remap_run_spans():
+    """A remap run records filing, statement and pipeline spans with their attributes."""
+    import main
+    import parse_artifacts
+    from parse_artifacts import ParseArtifactStore
+    from test_parse_artifacts import CIK, ACCESSION, CAL_FACTS, _statement
+
+    tracer = Tracer()
+    previous = _use(tracer)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ParseArtifactStore(Path(tmp))
+        store.save_statement(CIK, ACCESSION, "income_statement", *_statement())
+        store.save_filing("AAPL", CIK, ACCESSION, "2024-09-28", False, "us-gaap", CAL_FACTS)
+        previous_store, parse_artifacts._store = parse_artifacts._store, store
+        matching = os.environ.get("USE_MATCHING")
+        os.environ["USE_MATCHING"] = "pipeline"
+        try:
+            main.remap_financial_statements("AAPL", statement_filter="income", enable_pattern_logging=False)
+            main.log_trace(Path(tmp) / "trace.json")
+            assert json.loads((Path(tmp) / "trace.json").read_text())["traceEvents"]
+        finally:
+            parse_artifacts._store = previous_store
+            _use(previous)
+            if matching is None:
+                os.environ.pop("USE_MATCHING")
+            else:
+                os.environ["USE_MATCHING"] = matching
+
+    names = {e["name"] for e in tracer.spans()}
+    assert {"filing.map", "statement.map", "statement.match", "pipeline.candidates", "pipeline.select"} <= names
+    step = next(e for e in tracer.spans() if e["name"] == "pipeline.candidates")
+    assert step["args"]["statement"] == "income_statement" and step["args"]["accession"] == ACCESSION
+    filing, = tracer.summary()["filings"]
+    assert filing["accession"] == ACCESSION and "pipeline" in filing["by_category"]
+    print("✅ PASSED: spans of a remap run")
+
+
+if __name__ == "__main__":
+    test_spans_context_and_threads()
+    test_chrome_trace_and_summary()
+    test_remap_run_spans()
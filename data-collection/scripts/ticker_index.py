@@ -0,0 +1,257 @@
+"""
+TICKER INDEX - Shared, Locally Persisted Ticker / CIK / Name Index
+
+SEC publishes every listed ticker in https://www.sec.gov/files/company_tickers.json
+(several MB). Instead of downloading and linearly scanning that file for every
+Company() or insider lookup, this module keeps one copy on disk, refreshes it
+once a day and builds in-memory indexes from it:
+
+- by_ticker:  ticker -> entry                     (O(1) ticker -> CIK)
+- by_cik:     CIK -> entry                        (O(1) CIK -> ticker/name)
+- names:      sorted (normalised name, ticker)    (prefix search via bisect)
+- tickers:    sorted tickers                      (prefix search via bisect)
+
+If the daily refresh fails the last downloaded copy is used, so lookups keep
+working offline. While an HTTP cassette is recording or replaying (see
+http_cassette.py) the file is bypassed and the index is built from the
+cassette's copy instead.
+
+Configuration (environment variables):
+    TICKER_INDEX_PATH       Location of the persisted index file
+                            (default .api_cache/edgar/company_tickers.json)
+    TICKER_INDEX_TTL_HOURS  Refresh interval in hours (default 24)
+
+Usage:
+    from ticker_index import get_ticker_index
+    index = get_ticker_index()
+    cik = index.lookup_cik("AAPL")          # -> "0000320193"
+    index.search("micro", limit=10)         # -> [{ticker, cik, name}, ...]
+"""
+
+import os
+import re
+import json
+import time
+import bisect
+import logging
+import tempfile
+import threading
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from edgar_client import get_edgar_client
+from http_cassette import cassette_active
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+
+_SCRIPT_DIR = Path(__file__).parent
+_PROJECT_ROOT = _SCRIPT_DIR.parent.parent  # data-collection/scripts -> project root
+TICKER_INDEX_PATH = Path(os.environ.get(
+    "TICKER_INDEX_PATH", _PROJECT_ROOT / ".api_cache" / "edgar" / "company_tickers.json"
+))
+TICKER_INDEX_TTL_HOURS = float(os.environ.get("TICKER_INDEX_TTL_HOURS", "24"))
+
+COMPANY_TICKERS_URL = "https://www.sec.gov/files/company_tickers.json"
+
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9 ]+')
+
+
+def normalize_ticker(ticker: str) -> str:
+    """SEC spells class shares with a dash (BRK.B -> BRK-B)."""
+    return ticker.strip().upper().replace(".", "-")
+
+
+def normalize_name(name: str) -> str:
+    """Lower-case, strip punctuation and collapse whitespace for name matching."""
+    return " ".join(_NON_ALNUM_RE.sub(" ", name.lower()).split())
+
+
+@dataclass(frozen=True)
+class TickerEntry:
+    ticker: str
+    cik: str      # 10-digit zero-padded
+    name: str
+
+
+# ─── Index ─────────────────────────────────────────────────────────────────────
+
+class TickerIndex:
+    """
+    In-memory ticker/CIK/name index backed by a persisted company_tickers.json.
+    """
+
+    def __init__(self, path: Path = TICKER_INDEX_PATH,
+                 ttl_hours: float = TICKER_INDEX_TTL_HOURS):
+        """
+        Args:
+            path: Where the raw SEC file is persisted between runs
+            ttl_hours: Age after which the file is downloaded again
+        """
+        self.path = Path(path)
+        self.ttl_seconds = ttl_hours * 3600
+        self.by_ticker: Dict[str, TickerEntry] = {}
+        self.by_cik: Dict[str, TickerEntry] = {}
+        self._names: List[Tuple[str, str]] = []
+        self._tickers: List[str] = []
+        self._loaded_mtime: Optional[float] = None
+        self._from_cassette = False
+        self._lock = threading.Lock()
+
+    # ── Loading ───────────────────────────────────────────────────────────────
+
+    def _is_stale(self) -> bool:
+        try:
+            return (time.time() - self.path.stat().st_mtime) > self.ttl_seconds
+        except FileNotFoundError:
+            return True
+
+    def _fetch(self) -> bytes:
+        response = get_edgar_client().get(COMPANY_TICKERS_URL)
+        response.raise_for_status()
+        return response.content
+
+    def _download(self):
+        payload = self._fetch()
+        json.loads(payload)  # validate before replacing the local copy
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp, self.path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        logger.info("Refreshed ticker index (%d bytes)", len(payload))
+
+    def build(self, raw: dict):
+        """Build the lookup structures from the company_tickers.json payload."""
+        by_ticker: Dict[str, TickerEntry] = {}
+        by_cik: Dict[str, TickerEntry] = {}
+        for row in raw.values():
+            entry = TickerEntry(
+                ticker=normalize_ticker(row["ticker"]),
+                cik=str(row["cik_str"]).zfill(10),
+                name=row.get("title", ""),
+            )
+            by_ticker.setdefault(entry.ticker, entry)
+            # company_tickers.json lists the primary share class first
+            by_cik.setdefault(entry.cik, entry)
+
+        self.by_ticker = by_ticker
+        self.by_cik = by_cik
+        self._names = sorted((normalize_name(e.name), e.ticker) for e in by_ticker.values())
+        self._tickers = sorted(by_ticker)
+
+    def ensure_loaded(self):
+        """Refresh the file if it is older than the TTL and (re)build the index."""
+        with self._lock:
+            if cassette_active():
+                if not self._from_cassette:
+                    self.build(json.loads(self._fetch()))
+                    self._from_cassette = True
+                    self._loaded_mtime = None
+                return
+            self._from_cassette = False
+
+            if self._is_stale():
+                try:
+                    self._download()
+                except Exception as exc:
+                    if not self.path.exists():
+                        raise
+                    logger.warning("Ticker index refresh failed, using stale copy: %s", exc)
+
+            mtime = self.path.stat().st_mtime
+            if mtime != self._loaded_mtime:
+                with open(self.path) as f:
+                    self.build(json.load(f))
+                self._loaded_mtime = mtime
+
+    # ── Queries ───────────────────────────────────────────────────────────────
+
+    def lookup(self, ticker: str) -> Optional[TickerEntry]:
+        self.ensure_loaded()
+        return self.by_ticker.get(normalize_ticker(ticker))
+
+    def lookup_cik(self, ticker: str) -> str:
+        """
+        Resolve a ticker to its 10-digit CIK.
+
+        Raises:
+            ValueError: if the ticker is not listed by SEC
+        """
+        entry = self.lookup(ticker)
+        if entry is None:
+            raise ValueError(f"Ticker {normalize_ticker(ticker)} not found in SEC database")
+        return entry.cik
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        """
+        Autocomplete search: exact ticker first, then ticker prefixes, then
+        company-name prefixes (on the whole name or any word of it).
+        """
+        self.ensure_loaded()
+        q_ticker = normalize_ticker(query)
+        q_name = normalize_name(query)
+        if not q_ticker and not q_name:
+            return []
+
+        results: List[str] = []
+        seen = set()
+
+        def add(ticker: str) -> bool:
+            if ticker not in seen:
+                seen.add(ticker)
+                results.append(ticker)
+            return len(results) >= limit
+
+        if q_ticker in self.by_ticker and add(q_ticker):
+            return self._as_dicts(results)
+
+        start = bisect.bisect_left(self._tickers, q_ticker)
+        for ticker in self._tickers[start:]:
+            if not ticker.startswith(q_ticker):
+                break
+            if add(ticker):
+                return self._as_dicts(results)
+
+        if q_name:
+            start = bisect.bisect_left(self._names, (q_name, ""))
+            for name, ticker in self._names[start:]:
+                if not name.startswith(q_name):
+                    break
+                if add(ticker):
+                    return self._as_dicts(results)
+
+            # Word-prefix matches ("micro" -> "Advanced Micro Devices")
+            if len(q_name) >= 3:
+                needle = " " + q_name
+                for name, ticker in self._names:
+                    if needle in " " + name and add(ticker):
+                        break
+
+        return self._as_dicts(results)
+
+    def _as_dicts(self, tickers: List[str]) -> List[dict]:
+        return [asdict(self.by_ticker[t]) for t in tickers]
+
+
+_index: Optional[TickerIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_ticker_index() -> TickerIndex:
+    """Return the process-wide TickerIndex (created on first use)."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = TickerIndex()
+    return _index
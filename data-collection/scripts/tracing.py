@@ -0,0 +1,348 @@
+"""
+TRACING - Stage-Level Timing Spans for a Collection Run, with Chrome Trace Export
+
+A slow filing used to be explained by reading timestamps off the log. The
+stages of a run now record spans (name, category, start, duration, thread
+and attributes):
+
+    company     Company() init: ticker lookup, submissions, company facts
+    http        every EdgarClient request (endpoint, status, source: network,
+                archive cache or cassette)
+    filing      building / prefetching / mapping one filing
+    parse       parsing of a statement R file and extraction of its table
+    units       per-row unit detection of a statement (one span summing all
+                rows, "calls" attribute)
+    statement   parsing + mapping of one statement (StatementRunner)
+    mapping     matching of a statement's rows (USE_MATCHING mode)
+    pipeline    each step of ParsingPipeline.run()
+    llm         each LLM call of the agents and the enhanced / agentic parsers
+
+Attributes set with trace_context() (ticker, accession, report_date,
+statement) are added to every span opened inside it, including spans of
+the prefetch, statement and LLM threads: their pools submit through
+propagate(), which runs the call in a copy of the submitter's context.
+
+Spans are kept in memory (at most TRACE_MAX_SPANS, later ones are counted
+as dropped). main.py writes them with --trace FILE in the Chrome trace
+event format (chrome://tracing, https://ui.perfetto.dev) and logs a compact
+summary (per-name totals, per-filing breakdown, slowest spans) on one
+"TRACE_SUMMARY {json}" line, which the backend forwards in the SSE
+"complete" event.
+
+Configuration (environment variables):
+    TRACE               Set to 0 to disable span recording
+    TRACE_FILE          Chrome trace written at the end of main.py (default: none, see --trace)
+    TRACE_MAX_SPANS     Spans kept per run (default 200000)
+
+Usage:
+    from tracing import span, trace_context, propagate
+    with trace_context(ticker="AAPL"), span("company.init", "company") as s:
+        ...
+        s.set(filings=12)
+    executor.submit(propagate(fn), item)
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from pathlib import Path
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+
+TRACE_ENABLED = os.environ.get("TRACE", "1") != "0"
+TRACE_FILE = os.environ.get("TRACE_FILE") or None
+TRACE_MAX_SPANS = int(os.environ.get("TRACE_MAX_SPANS", "200000"))
+
+# Categories whose spans wrap a whole filing / statement; left out of the
+# per-filing breakdown, which is about where inside a filing the time went
+WRAPPER_CATEGORIES = {"filing", "statement"}
+
+_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("trace_context", default={})
+
+
+# ─── Context ───────────────────────────────────────────────────────────────────
+
+@contextmanager
+def trace_context(**attrs):
+    """Add attributes (ticker, accession, statement, ...) to every span opened inside."""
+    token = _context.set({**_context.get(), **{k: v for k, v in attrs.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def current_context() -> Dict[str, Any]:
+    """Attributes set by the enclosing trace_context() blocks."""
+    return dict(_context.get())
+
+
+def propagate(fn: Callable) -> Callable:
+    """Wrap fn to run in a copy of the caller's context (for executor.submit)."""
+    ctx = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return ctx.run(fn, *args, **kwargs)
+    return run
+
+
+# ─── Spans ─────────────────────────────────────────────────────────────────────
+
+class Span:
+    """An open span; set() adds attributes known only once the stage ran."""
+
+    __slots__ = ("name", "cat", "attrs", "start")
+
+    def __init__(self, name: str, cat: str, attrs: Dict[str, Any]):
+        self.name = name
+        self.cat = cat
+        self.attrs = attrs
+        self.start = time.perf_counter()
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class _NullSpan:
+    """Span handed out while tracing is disabled."""
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _json_value(value):
+    return value if isinstance(value, (str, int, float, bool)) or value is None else str(value)
+
+
+class Tracer:
+    """Thread-safe in-memory span recorder."""
+
+    def __init__(self, max_spans: int = TRACE_MAX_SPANS):
+        self.max_spans = max_spans
+        self.pid = os.getpid()
+        self._origin = time.perf_counter()
+        self._origin_wall = time.time()
+        self._events: List[Dict] = []
+        self._threads: Dict[int, str] = {}
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, cat: str = "app", **attrs):
+        """Record the duration of the block; exceptions are recorded and re-raised."""
+        s = Span(name, cat, {**_context.get(), **attrs})
+        try:
+            yield s
+        except BaseException as e:
+            s.attrs["error"] = type(e).__name__
+            raise
+        finally:
+            self.record(s.name, s.cat, s.start, time.perf_counter() - s.start, **s.attrs)
+
+    def record(self, name: str, cat: str, start: float, duration: float, **attrs):
+        """
+        Record a span measured by the caller.
+
+        Args:
+            start: time.perf_counter() at the start of the span
+            duration: Seconds
+        """
+        thread = threading.current_thread()
+        event = {
+            "name": name, "cat": cat, "ph": "X",
+            "ts": round((start - self._origin) * 1e6, 1),
+            "dur": round(duration * 1e6, 1),
+            "pid": self.pid, "tid": thread.ident,
+            "args": {k: _json_value(v) for k, v in attrs.items()},
+        }
+        with self._lock:
+            if len(self._events) >= self.max_spans:
+                self._dropped += 1
+                return
+            self._events.append(event)
+            self._threads.setdefault(thread.ident, thread.name)
+
+    def spans(self) -> List[Dict]:
+        """Recorded spans (Chrome "X" events), in completion order."""
+        with self._lock:
+            return list(self._events)
+
+    def reset(self):
+        with self._lock:
+            self._events.clear()
+            self._threads.clear()
+            self._dropped = 0
+
+    def chrome_trace(self) -> Dict:
+        """The spans as a Chrome trace event document."""
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+            dropped = self._dropped
+        metadata = [{"name": "process_name", "ph": "M", "pid": self.pid, "tid": 0,
+                     "args": {"name": "data-collection"}}]
+        metadata += [{"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}}
+                     for tid, name in threads.items()]
+        return {"traceEvents": metadata + events, "displayTimeUnit": "ms",
+                "otherData": {"started": self._origin_wall, "dropped_spans": dropped}}
+
+    def write_chrome_trace(self, path) -> Path:
+        """Write chrome_trace() as JSON to path (directories are created)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+        return path
+
+    def summary(self, top: int = 10) -> Dict:
+        """
+        Compact timing summary of the recorded spans.
+
+        Returns:
+            dict with the traced wall time, per-name totals (count, total_s,
+            max_s; the `top` largest), one entry per filing (seconds of its
+            "filing" spans and the self time of each category spent on it,
+            slowest filing first) and the `top` slowest spans.
+        """
+        with self._lock:
+            events = list(self._events)
+            dropped = self._dropped
+        if not events:
+            return {"seconds": 0.0, "spans": 0, "dropped": dropped, "by_name": {}, "filings": [], "slowest": []}
+
+        start = min(e["ts"] for e in events)
+        end = max(e["ts"] + e["dur"] for e in events)
+
+        by_name = defaultdict(lambda: {"count": 0, "total_s": 0.0, "max_s": 0.0})
+        for e in events:
+            stats = by_name[e["name"]]
+            stats["count"] += 1
+            stats["total_s"] += e["dur"] / 1e6
+            stats["max_s"] = max(stats["max_s"], e["dur"] / 1e6)
+        names = sorted(by_name, key=lambda n: -by_name[n]["total_s"])[:top]
+
+        # Per filing: its "filing" spans (fetch, map) and the self time of every
+        # other span carrying its accession, so nested stages are not counted twice
+        self_time = _self_times(events)
+        filings: Dict[str, Dict] = {}
+        for e, own in zip(events, self_time):
+            accession = e["args"].get("accession")
+            if accession is None:
+                continue
+            entry = filings.setdefault(accession, {
+                "ticker": e["args"].get("ticker"), "accession": accession,
+                "report_date": e["args"].get("report_date"), "seconds": 0.0, "by_category": defaultdict(float)})
+            # Prefetch threads only know the accession
+            entry["ticker"] = entry["ticker"] or e["args"].get("ticker")
+            entry["report_date"] = entry["report_date"] or e["args"].get("report_date")
+            if e["cat"] == "filing":
+                entry["seconds"] += e["dur"] / 1e6
+            elif e["cat"] not in WRAPPER_CATEGORIES:
+                entry["by_category"][e["cat"]] += own / 1e6
+        for entry in filings.values():
+            entry["seconds"] = round(entry["seconds"], 3)
+            entry["by_category"] = {cat: round(s, 3) for cat, s in
+                                    sorted(entry["by_category"].items(), key=lambda i: -i[1])}
+
+        slowest = sorted(events, key=lambda e: -e["dur"])[:top]
+        return {
+            "seconds": round((end - start) / 1e6, 3),
+            "spans": len(events),
+            "dropped": dropped,
+            "by_name": {n: {"count": by_name[n]["count"], "total_s": round(by_name[n]["total_s"], 3),
+                            "max_s": round(by_name[n]["max_s"], 3)} for n in names},
+            "filings": sorted(filings.values(), key=lambda f: -f["seconds"]),
+            "slowest": [{"name": e["name"], "cat": e["cat"], "seconds": round(e["dur"] / 1e6, 3), **e["args"]}
+                        for e in slowest],
+        }
+
+
+def _self_times(events: List[Dict]) -> List[float]:
+    """Duration of each span minus its direct children on the same thread (µs)."""
+    self_time = [e["dur"] for e in events]
+    by_thread = defaultdict(list)
+    for i, e in enumerate(events):
+        by_thread[e["tid"]].append(i)
+    for indices in by_thread.values():
+        stack: List[int] = []
+        for i in sorted(indices, key=lambda i: (events[i]["ts"], -events[i]["dur"])):
+            e = events[i]
+            while stack and events[stack[-1]]["ts"] + events[stack[-1]]["dur"] <= e["ts"]:
+                stack.pop()
+            if stack:
+                self_time[stack[-1]] -= e["dur"]
+            stack.append(i)
+    return [max(0.0, t) for t in self_time]
+
+
+# ─── Singleton ─────────────────────────────────────────────────────────────────
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Optional[Tracer]:
+    """Process-wide tracer, or None when disabled (TRACE=0)."""
+    global _tracer
+    if not TRACE_ENABLED:
+        return None
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = Tracer()
+    return _tracer
+
+
+@contextmanager
+def span(name: str, cat: str = "app", **attrs):
+    """Record a span on the process-wide tracer (a no-op when tracing is disabled)."""
+    tracer = get_tracer()
+    if tracer is None:
+        yield _NULL_SPAN
+        return
+    with tracer.span(name, cat, **attrs) as s:
+        yield s
+
+
+class SpanTimer:
+    """
+    Accumulates the time of many short calls (e.g. unit detection per row)
+    into a single span, recorded by close().
+    """
+
+    def __init__(self, name: str, cat: str = "app", **attrs):
+        self.name = name
+        self.cat = cat
+        self.attrs = attrs
+        self.start: Optional[float] = None
+        self.seconds = 0.0
+        self.calls = 0
+
+    @contextmanager
+    def time(self):
+        t0 = time.perf_counter()
+        if self.start is None:
+            self.start = t0
+        try:
+            yield
+        finally:
+            self.seconds += time.perf_counter() - t0
+            self.calls += 1
+
+    def close(self):
+        tracer = get_tracer()
+        if tracer is not None and self.calls:
+            tracer.record(self.name, self.cat, self.start, self.seconds,
+                          **{**_context.get(), **self.attrs, "calls": self.calls})
@@ -17,6 +17,8 @@ from dataclasses import dataclass
 from typing import Optional, Tuple
 from enum import Enum
 
+from company_facts import CompanyFactsTable
+
 logger = logging.getLogger(__name__)
 
 
@@ -95,12 +97,21 @@ class UnitDetector:
         Returns:
             (currency_scale, shares_scale, has_explicit_units)
         """
-        # Get all header text
-        headers = table.find_all('th')
-        if not headers:
+        return cls.parse_header_texts([h.get_text() for h in table.find_all('th')])
+    
+    @classmethod
+    def parse_header_texts(cls, header_texts) -> Tuple[float, float, bool]:
+        """
+        parse_table_header() on the text of each <th> of a table (as produced
+        by statement_parser), so no DOM is needed.
+        
+        Returns:
+            (currency_scale, shares_scale, has_explicit_units)
+        """
+        if not header_texts:
             return 1000, 1, False  # Default: thousands
         
-        header_text = ' '.join([h.get_text().lower() for h in headers])
+        header_text = ' '.join([h.lower() for h in header_texts])
         original_header_text = header_text  # Keep original for logging
         
         # Default values
@@ -166,6 +177,10 @@ class UnitDetector:
         if company_facts_df is None or company_facts_df.empty:
             return None
         
+        # Indexed table shared per company: O(1) (fact, end) lookup
+        if isinstance(company_facts_df, CompanyFactsTable):
+            return company_facts_df.fact_for_period(concept, end_date, is_quarterly)
+        
         # Filter by concept and end date
         filtered = company_facts_df[
             (company_facts_df['fact'] == concept) & 
@@ -295,7 +310,7 @@ class UnitDetector:
             end_date: Period end date
             header_currency_scale: Scale from table header for currency
             header_shares_scale: Scale from table header for shares
-            company_facts_df: DataFrame of company facts
+            company_facts_df: CompanyFactsTable (or plain DataFrame) of company facts
             is_quarterly: Whether this is quarterly data
             human_label: Human-readable label for the fact
         
@@ -108,6 +108,24 @@ export const getFinancialData = async (ticker) => {
   }
 };
 
+/**
+ * Autocomplete SEC tickers by symbol or company-name prefix.
+ * @param {string} query
+ * @param {number} limit - Max suggestions
+ * @returns {Promise<Array<{ticker: string, cik: string, name: string}>>}
+ */
+export const searchTickers = async (query, limit = 10) => {
+  try {
+    const response = await axios.get(`${API_BASE_URL}/api/tickers/search`, {
+      params: { q: query, limit },
+    });
+    return response.data.results;
+  } catch (error) {
+    console.error("Error searching tickers", error);
+    return [];
+  }
+};
+
 // ──────────────────────────────────────────────────────────────
 // Insider Trading (Form 4)
 // ──────────────────────────────────────────────────────────────
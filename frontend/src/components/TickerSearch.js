@@ -1,12 +1,40 @@
-import React, { useState } from 'react';
+import React, { useState, useEffect } from 'react';
+import { searchTickers } from '../api';
+
+const SEARCH_DEBOUNCE_MS = 200;
 
 function TickerSearch({ tickers, onSelect, selectedTicker }) {
   const [searchTerm, setSearchTerm] = useState('');
   const [showDropdown, setShowDropdown] = useState(false);
+  const [suggestions, setSuggestions] = useState([]);
 
-  const filteredTickers = tickers.filter(ticker =>
-    ticker.toLowerCase().includes(searchTerm.toLowerCase())
-  );
+  // Query the SEC ticker index (ticker or company-name prefix), debounced
+  useEffect(() => {
+    const term = searchTerm.trim();
+    if (!term) {
+      setSuggestions([]);
+      return undefined;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      const results = await searchTickers(term);
+      if (!cancelled) setSuggestions(results);
+    }, SEARCH_DEBOUNCE_MS);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchTerm]);
+
+  // Tickers with data already collected come first
+  const localMatches = tickers
+    .filter(ticker => ticker.toLowerCase().includes(searchTerm.toLowerCase()))
+    .map(ticker => ({ ticker, name: '' }));
+  const localSet = new Set(localMatches.map(item => item.ticker));
+  const filteredTickers = [
+    ...localMatches,
+    ...suggestions.filter(item => !localSet.has(item.ticker)),
+  ];
 
   const handleSelect = (ticker) => {
     onSelect(ticker);
@@ -26,7 +54,7 @@ function TickerSearch({ tickers, onSelect, selectedTicker }) {
     <div className="ticker-search">
       <input
         type="text"
-        placeholder="Search for a ticker (e.g., AAPL, AMZN)..."
+        placeholder="Search for a ticker or company (e.g., AAPL, Amazon)..."
         value={searchTerm}
         onChange={(e) => {
           setSearchTerm(e.target.value);
@@ -38,13 +66,14 @@ function TickerSearch({ tickers, onSelect, selectedTicker }) {
       />
       {showDropdown && searchTerm && filteredTickers.length > 0 && (
         <div className="dropdown">
-          {filteredTickers.slice(0, 10).map(ticker => (
+          {filteredTickers.slice(0, 10).map(({ ticker, name }) => (
             <div
               key={ticker}
               className="dropdown-item"
               onClick={() => handleSelect(ticker)}
             >
-              {ticker}
+              <strong>{ticker}</strong>
+              {name && <span className="dropdown-item-name"> — {name}</span>}
             </div>
           ))}
         </div>